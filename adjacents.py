@@ -13,8 +13,11 @@ from qgis.core import (
     QgsProject
 )
 from qgis.utils import iface
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .data_models import ShapeInfo  # noqa
 from .common import ensure_object_layer_fields, log_msg, logFile
+from .common import object_layer_fields
 
 
 class AdjacentUnits:
@@ -55,31 +58,19 @@ class AdjacentUnits:
 
         return proprietor
 
-    def add_adjacents_layer(self):
-        """Створює та заповнює шар 'Суміжники'."""
+    def data_fields(self):
+        """Поля даних шару 'Суміжники'."""
+        return object_layer_fields()
+
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Суміжники' за деревом: призначає відсутні
+        object_id і додає ShapeInfo шару self.layer до xml_data.shapes.
+        """
         parcel_info = self.root.find(".//ParcelInfo")
         adjacents_parent = parcel_info.find("AdjacentUnits")
         if adjacents_parent is None:
-
-            return None
-
-        layer_name = "Суміжники"
-
-        layers_to_remove = [
-            child.layerId() for child in self.group.children() if child.name() == layer_name]
-        if layers_to_remove:
-            QgsProject.instance().removeMapLayers(layers_to_remove)
-
-        self.layer = QgsVectorLayer(
-            f"LineString?crs={self.crs_epsg}", layer_name, "memory")
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "adjacent.qml"))
-
-        self.layer.setCustomProperty("skip_save_dialog", True)
-
-        provider = self.layer.dataProvider()
-
-        ensure_object_layer_fields(self.layer)
+            return []
 
         existing_shapes_in_layer = set()
         if self.xml_data:
@@ -97,6 +88,7 @@ class AdjacentUnits:
                 used_object_ids.add(int(obj_id_text))
         next_object_id = 1
 
+        features = []
         for adjacent in adjacents_parent.findall(".//AdjacentUnitInfo"):
             object_id_text = str(adjacent.get("object_id") or "").strip()
             boundary_lines = adjacent.find(".//AdjacentBoundary/Lines")
@@ -104,7 +96,8 @@ class AdjacentUnits:
                 try:
 
                     from .topology import GeometryProcessor
-                    processor = GeometryProcessor(self.root.getroottree())
+                    processor = GeometryProcessor(
+                        self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
                     object_shape = processor._get_polyline_object_shape(
                         boundary_lines)
 
@@ -131,7 +124,7 @@ class AdjacentUnits:
                     if boundary_coords and len(boundary_coords) >= 2:
                         line_string = QgsLineString(
                             [QgsPointXY(p.y(), p.x()) for p in boundary_coords])
-                        feature = QgsFeature(self.layer.fields())
+                        feature = QgsFeature(fields)
                         feature.setGeometry(QgsGeometry(line_string))
                         object_id = int(object_id_text) if object_id_text.isdigit() else None
                         feature.setAttributes([object_id, object_shape])
@@ -143,16 +136,43 @@ class AdjacentUnits:
                                 object_shape=object_shape)
                             self.xml_data.shapes.append(shape_info)
 
-                        provider.addFeature(feature)
+                        features.append(feature)
 
                 except ValueError:
 
                     continue
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        self.xml_ua_layers.added_layers.append(layer_node)
-        self.xml_ua_layers.last_to_first(self.group)
+        return features
+
+    def add_adjacents_layer(self):
+        """Створює та заповнює шар 'Суміжники'."""
+        parcel_info = self.root.find(".//ParcelInfo")
+        adjacents_parent = parcel_info.find("AdjacentUnits")
+        if adjacents_parent is None:
+
+            return None
+
+        layer_name = "Суміжники"
+
+        layers_to_remove = [
+            child.layerId() for child in self.group.children() if child.name() == layer_name]
+        if layers_to_remove:
+            QgsProject.instance().removeMapLayers(layers_to_remove)
+
+        self.layer = QgsVectorLayer(
+            f"LineString?crs={self.crs_epsg}", layer_name, "memory")
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "adjacent.qml"))
+
+        self.layer.setCustomProperty("skip_save_dialog", True)
+
+        provider = self.layer.dataProvider()
+
+        ensure_object_layer_fields(self.layer)
+
+        provider.addFeatures(self.build_features(self.layer.fields()))
+
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
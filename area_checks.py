@@ -4,7 +4,29 @@ from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable
+
+from .geometry_snapshot import GeometrySnapshot
+from .xml_paths import LocalNamePath, child_text, uses_namespace
+
+
+# Вирази XPath простими іменами; для документів з простором імен
+# LocalNamePath використовує їхні варіанти з local-name().
+_PARCEL_AREA_SIZE_TEXT = LocalNamePath("string(//ParcelMetricInfo/Area/Size[1])")
+_PARCEL_AREA_SIZES = LocalNamePath("//ParcelMetricInfo/Area/Size")
+_PARCEL_EXTERNAL_LINES = LocalNamePath(".//ParcelInfo/ParcelMetricInfo/Externals/Boundary/Lines[1]")
+_POINTS = LocalNamePath(".//PointInfo/Point")
+_POLYLINES = LocalNamePath(".//Polyline/PL")
+_PL_UIDPS = LocalNamePath("./Points/P/text()")
+_LAND_PARCEL_INFOS = LocalNamePath(".//LandsParcel/LandParcelInfo")
+_EXTERNALS = LocalNamePath(".//Externals[1]")
+_BOUNDARY_LINES = LocalNamePath("./Boundary/Lines[1]")
+_INTERNAL_BOUNDARIES = LocalNamePath("./Internals/Boundary")
+_LINES = LocalNamePath("./Lines[1]")
+_LINE_ULIDS = LocalNamePath("./Line/ULID/text()")
+_AREAS = LocalNamePath("./Area")
+_SIZE = LocalNamePath("./Size[1]")
+
 
 def _parse_float(value, default=None):
     """
@@ -225,11 +247,71 @@ def _chain_lines_to_ring(ulids: Iterable[str], ulid_to_coords: dict[str, list[tu
     return ring
 
 
+def compute_parcel_area_ha_from_lines(xml_tree, geometry: GeometrySnapshot | None = None) -> float | None:
+    """
+    Обчислює площу ділянки (га) за зовнішнім контуром ParcelMetricInfo/Externals,
+    зібраним з ліній Polyline/PL. Працює лише з lxml, тому придатна для фонових
+    потоків і процесів. Якщо передано знімок geometry, вузли та лінії беруться з нього.
+    """
+    if xml_tree is None:
+        return None
+    root = xml_tree.getroot()
+    if root is None:
+        return None
+
+    namespaced = uses_namespace(root)
+    lines = _PARCEL_EXTERNAL_LINES(root, namespaced)
+    if not lines:
+        return None
+    ulids = [str(t).strip() for t in _LINE_ULIDS(lines[0], namespaced) if str(t).strip()]
+    if not ulids:
+        return None
+
+    if geometry is not None:
+        ulid_to_coords = geometry.ulid_to_coords()
+    else:
+        uidp_to_xy: dict[str, tuple[float, float]] = {}
+        for point in _POINTS(root, namespaced):
+            uidp = child_text(point, "UIDP", namespaced)
+            if not uidp:
+                continue
+            x_val = _parse_float(child_text(point, "X", namespaced), default=None)
+            y_val = _parse_float(child_text(point, "Y", namespaced), default=None)
+            if x_val is None or y_val is None:
+                continue
+            uidp_to_xy[uidp] = (x_val, y_val)
+
+        wanted = set(ulids)
+        ulid_to_coords: dict[str, list[tuple[float, float]]] = {}
+        for pl in _POLYLINES(root, namespaced):
+            ulid = child_text(pl, "ULID", namespaced)
+            if ulid not in wanted:
+                continue
+            coords = []
+            for u in _PL_UIDPS(pl, namespaced):
+                xy = uidp_to_xy.get(str(u).strip())
+                if not xy:
+                    coords = []
+                    break
+                coords.append(xy)
+            if len(coords) >= 2:
+                ulid_to_coords[ulid] = coords
+
+    if any(u not in ulid_to_coords for u in ulids):
+        return None
+    ring = _chain_lines_to_ring(ulids, ulid_to_coords)
+    if not ring or len(ring) < 4:
+        return None
+    return _ring_area_m2(ring) / 10000.0
+
+
 def run_area_checks_and_fix_tree(
     *,
     xml_tree,
     parcel_area_computer,
     threshold_round_digits: int = 4,
+    geometry_builder: Callable[[object], GeometrySnapshot] | None = None,
+    lint=None,
 ) -> AreaChecksResult:
     """
     Виконує 4 перевірки:
@@ -238,31 +320,46 @@ def run_area_checks_and_fix_tree(
     3) площі угідь XML vs обчислені (виправляються в дереві),
     4) юридичний баланс: сума площ угідь (обчислених, q4) vs площа ділянки з XML (початково, q4).
 
+    Якщо передано geometry_builder, після виправлення десяткових ком він один
+    раз будує знімок геометрії (GeometrySnapshot), за яким обчислюються площі
+    ділянки та угідь; parcel_area_computer тоді отримує його як geometry.
+
+    Якщо передано lint (document_lint.OpenLint), десяткові коми вже знайдено
+    й виправлено спільним обходом дерева, а елементи та початковий текст
+    площі ділянки беруться з нього — дерево повторно не обходиться.
+
     Повертає результати і прапорці.
     """
     root = xml_tree.getroot() if xml_tree is not None else None
+    namespaced = uses_namespace(root)
 
     # Початковий текст площі ділянки з XML (для балансу)
-    try:
-        parcel_area_text_initial = (
-            xml_tree.xpath(
-                "string(//*[local-name()='ParcelMetricInfo']/*[local-name()='Area']/*[local-name()='Size'][1])"
-            )
-            or ""
-        ).strip()
-    except Exception:
-        parcel_area_text_initial = ""
+    if lint is not None:
+        parcel_area_text_initial = lint.parcel_area.initial_text or ""
+    else:
+        try:
+            parcel_area_text_initial = (_PARCEL_AREA_SIZE_TEXT(xml_tree, namespaced) or "").strip()
+        except Exception:
+            parcel_area_text_initial = ""
 
     # 1) Десяткова кома
-    comma_hits = _find_decimal_comma_numbers_in_tree(xml_tree)
+    if lint is not None:
+        comma_hits = lint.decimal_commas.hits
+        comma_fixed = lint.decimal_commas.changes
+    else:
+        comma_hits = _find_decimal_comma_numbers_in_tree(xml_tree)
+        comma_fixed = _normalize_decimal_commas_in_tree(xml_tree) if comma_hits else []
     comma_examples = []
     for h in comma_hits[:5]:
         comma_examples.append(f"<{h.get('tag', '')}>: '{h.get('text', '')}'")
-    comma_fixed = _normalize_decimal_commas_in_tree(xml_tree) if comma_hits else []
 
     # 2) Площа ділянки
     parcel_area_xml_ha = _parse_float(parcel_area_text_initial, default=None)
-    parcel_area_computed_ha = parcel_area_computer(xml_tree)
+    geometry = geometry_builder(xml_tree) if geometry_builder is not None and root is not None else None
+    if geometry is not None:
+        parcel_area_computed_ha = parcel_area_computer(xml_tree, geometry=geometry)
+    else:
+        parcel_area_computed_ha = parcel_area_computer(xml_tree)
     parcel_area_fixed = False
     parcel_area_new_text = ""
     if parcel_area_computed_ha is not None:
@@ -273,9 +370,8 @@ def run_area_checks_and_fix_tree(
             if round(parcel_area_xml_ha, threshold_round_digits) != round(parcel_area_computed_ha, threshold_round_digits):
                 # Оновлюємо всі ParcelMetricInfo/Area/Size незалежно від namespace
                 try:
-                    for size_el in xml_tree.xpath(
-                        "//*[local-name()='ParcelMetricInfo']/*[local-name()='Area']/*[local-name()='Size']"
-                    ):
+                    size_els = lint.parcel_area.sizes if lint is not None else _PARCEL_AREA_SIZES(xml_tree, namespaced)
+                    for size_el in size_els:
                         try:
                             size_el.text = parcel_area_new_text
                         except Exception:
@@ -293,43 +389,42 @@ def run_area_checks_and_fix_tree(
     lands_sum_computed_valid = True
 
     if root is not None:
-        # UIDP -> (X, Y)
-        uidp_to_xy: dict[str, tuple[float, float]] = {}
-        for point in root.xpath(".//*[local-name()='PointInfo']/*[local-name()='Point']"):
-            uidp = (point.xpath("string(./*[local-name()='UIDP'][1])") or "").strip()
-            if not uidp:
-                continue
-            x_text = (point.xpath("string(./*[local-name()='X'][1])") or "").strip()
-            y_text = (point.xpath("string(./*[local-name()='Y'][1])") or "").strip()
-            x_val = _parse_float(x_text, default=None)
-            y_val = _parse_float(y_text, default=None)
-            if x_val is None or y_val is None:
-                continue
-            uidp_to_xy[uidp] = (x_val, y_val)
-
-        # ULID -> coords (по PL/Points/P -> UIDP -> (X,Y))
-        ulid_to_coords: dict[str, list[tuple[float, float]]] = {}
-        for pl in root.xpath(".//*[local-name()='Polyline']/*[local-name()='PL']"):
-            ulid = (pl.xpath("string(./*[local-name()='ULID'][1])") or "").strip()
-            if not ulid:
-                continue
-            uidps = [
-                str(t).strip()
-                for t in pl.xpath("./*[local-name()='Points']/*[local-name()='P']/text()")
-                if str(t).strip()
-            ]
-            coords: list[tuple[float, float]] = []
-            ok = True
-            for u in uidps:
-                xy = uidp_to_xy.get(u)
-                if not xy:
-                    ok = False
-                    break
-                coords.append(xy)
-            if ok and len(coords) >= 2:
-                ulid_to_coords[ulid] = coords
+        if geometry is not None:
+            ulid_to_coords = geometry.ulid_to_coords()
+        else:
+            # UIDP -> (X, Y)
+            uidp_to_xy: dict[str, tuple[float, float]] = {}
+            for point in _POINTS(root, namespaced):
+                uidp = child_text(point, "UIDP", namespaced)
+                if not uidp:
+                    continue
+                x_text = child_text(point, "X", namespaced)
+                y_text = child_text(point, "Y", namespaced)
+                x_val = _parse_float(x_text, default=None)
+                y_val = _parse_float(y_text, default=None)
+                if x_val is None or y_val is None:
+                    continue
+                uidp_to_xy[uidp] = (x_val, y_val)
 
-        lands_infos = root.xpath(".//*[local-name()='LandsParcel']/*[local-name()='LandParcelInfo']")
+            # ULID -> coords (по PL/Points/P -> UIDP -> (X,Y))
+            ulid_to_coords: dict[str, list[tuple[float, float]]] = {}
+            for pl in _POLYLINES(root, namespaced):
+                ulid = child_text(pl, "ULID", namespaced)
+                if not ulid:
+                    continue
+                uidps = [str(t).strip() for t in _PL_UIDPS(pl, namespaced) if str(t).strip()]
+                coords: list[tuple[float, float]] = []
+                ok = True
+                for u in uidps:
+                    xy = uidp_to_xy.get(u)
+                    if not xy:
+                        ok = False
+                        break
+                    coords.append(xy)
+                if ok and len(coords) >= 2:
+                    ulid_to_coords[ulid] = coords
+
+        lands_infos = _LAND_PARCEL_INFOS(root, namespaced)
         for i, land_info in enumerate(lands_infos, 1):
             metric_info = None
             for ch in land_info:
@@ -339,35 +434,27 @@ def run_area_checks_and_fix_tree(
             if metric_info is None:
                 continue
 
-            externals = metric_info.xpath(".//*[local-name()='Externals'][1]")
+            externals = _EXTERNALS(metric_info, namespaced)
             if not externals:
                 continue
             externals = externals[0]
 
-            ext_lines = externals.xpath("./*[local-name()='Boundary']/*[local-name()='Lines'][1]")
+            ext_lines = _BOUNDARY_LINES(externals, namespaced)
             if not ext_lines:
                 continue
-            ext_ulids = [
-                str(t).strip()
-                for t in ext_lines[0].xpath("./*[local-name()='Line']/*[local-name()='ULID']/text()")
-                if str(t).strip()
-            ]
+            ext_ulids = [str(t).strip() for t in _LINE_ULIDS(ext_lines[0], namespaced) if str(t).strip()]
             ext_ring = _chain_lines_to_ring(ext_ulids, ulid_to_coords)
             if not ext_ring:
                 continue
 
             area_m2 = _ring_area_m2(ext_ring)
 
-            internals = externals.xpath("./*[local-name()='Internals']/*[local-name()='Boundary']")
+            internals = _INTERNAL_BOUNDARIES(externals, namespaced)
             for b in internals:
-                b_lines = b.xpath("./*[local-name()='Lines'][1]")
+                b_lines = _LINES(b, namespaced)
                 if not b_lines:
                     continue
-                b_ulids = [
-                    str(t).strip()
-                    for t in b_lines[0].xpath("./*[local-name()='Line']/*[local-name()='ULID']/text()")
-                    if str(t).strip()
-                ]
+                b_ulids = [str(t).strip() for t in _LINE_ULIDS(b_lines[0], namespaced) if str(t).strip()]
                 hole_ring = _chain_lines_to_ring(b_ulids, ulid_to_coords)
                 if hole_ring:
                     area_m2 -= _ring_area_m2(hole_ring)
@@ -384,9 +471,9 @@ def run_area_checks_and_fix_tree(
             new_text_for_report = f"{computed_ha:.{threshold_round_digits}f}"
 
             # В XSD: MetricInfo/Area може бути unbounded.
-            for area_el in metric_info.xpath("./*[local-name()='Area']"):
-                unit = (area_el.xpath("string(./*[local-name()='MeasurementUnit'][1])") or "").strip()
-                size_el = area_el.xpath("./*[local-name()='Size'][1]")
+            for area_el in _AREAS(metric_info, namespaced):
+                unit = child_text(area_el, "MeasurementUnit", namespaced)
+                size_el = _SIZE(area_el, namespaced)
                 if not size_el:
                     continue
                 size_el = size_el[0]
@@ -417,8 +504,8 @@ def run_area_checks_and_fix_tree(
 
             if updated_any:
                 lands_fixed += 1
-                cadastral_code = (land_info.xpath("string(./*[local-name()='CadastralCode'][1])") or "").strip()
-                land_code = (land_info.xpath("string(./*[local-name()='LandCode'][1])") or "").strip()
+                cadastral_code = child_text(land_info, "CadastralCode", namespaced)
+                land_code = child_text(land_info, "LandCode", namespaced)
                 mismatches.append(
                     LandAreaMismatch(
                         idx=i,
@@ -0,0 +1,231 @@
+"""
+Пакетна перевірка кадастрових XML без графічного інтерфейсу QGIS.
+
+Для кожного файлу у пулі процесів виконуються: XSD-валідація, area_checks,
+proximity_checks, topology_checks, зріз/перенумерація геометрії та пошук невикористаних
+вузлів/поліліній (як у XmlTopologyFixer). Поруч із файлами записуються ті самі
+звіти, що й у плагіні (Check_*.txt, *_area_err.txt, *_proximity.txt,
+*_topology.txt, *_нумерація.txt), а підсумок — у CSV. Файли XML не змінюються.
+
+Запуск (з каталогу, що містить каталог плагіна):
+
+    python -m xml_ua.batch_validator D:/archive/quarter_01 "D:/archive/**/*.xml" --csv summary.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, fields
+from decimal import Decimal
+
+from lxml import etree
+
+from .open_pipeline import (
+    find_unused_geometry,
+    prepare_xml_for_open,
+    validate_xsd,
+    write_check_report,
+)
+
+
+DEFAULT_XSD_PATH = os.path.join(os.path.dirname(__file__), "templates", "UAXML.xsd")
+SUMMARY_CSV_NAME = "xml_ua_summary.csv"
+
+
+@dataclass(frozen=True)
+class BatchFileResult:
+    file: str
+    status: str
+    error: str = ""
+    xsd_errors: int | None = None
+    comma_hits: int = 0
+    parcel_area_xml_ha: float | None = None
+    parcel_area_computed_ha: float | None = None
+    parcel_area_mismatch: bool = False
+    lands_checked: int = 0
+    lands_mismatched: int = 0
+    balance_diff_ha: str = ""
+    close_points: int = 0
+    near_line_points: int = 0
+    topology_issues: int = 0
+    unused_points: int = 0
+    unused_polylines: int = 0
+    numbering_changed: bool = False
+    empty_pn: int = 0
+    duplicate_pn: int = 0
+    reports: str = ""
+    elapsed_sec: float = 0.0
+
+
+def collect_xml_files(inputs, recursive: bool = False) -> list[str]:
+    """Розгортає каталоги, glob-шаблони та окремі файли у впорядкований список XML."""
+    found: dict[str, None] = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*.xml") if recursive else os.path.join(item, "*.xml")
+            matches = glob.glob(pattern, recursive=recursive)
+        elif any(ch in item for ch in "*?["):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+        for path in sorted(matches):
+            if os.path.isfile(path) and path.lower().endswith(".xml"):
+                found[os.path.abspath(path)] = None
+    return list(found)
+
+
+def validate_file(xml_path: str, xsd_path: str | None, threshold_m: float = 0.3) -> BatchFileResult:
+    """Перевіряє один файл; усі зміни виконуються лише в пам'яті. Викликається у worker-процесі."""
+    started = time.time()
+    try:
+        tree = etree.parse(xml_path)
+    except Exception as e:
+        return BatchFileResult(file=xml_path, status="parse_error", error=str(e),
+                               elapsed_sec=time.time() - started)
+
+    reports = []
+    xsd_errors = None
+    if xsd_path:
+        xsd_errors = validate_xsd(tree, xsd_path)
+        if xsd_errors:
+            reports.append(write_check_report(xml_path=xml_path, errors=xsd_errors))
+
+    unused_points, unused_polylines = find_unused_geometry(tree.getroot())
+
+    prepared = prepare_xml_for_open(xml_path, tree=tree, proximity_threshold_m=threshold_m)
+    for report_path in (prepared.area_report_path, prepared.numbering_report_path,
+                        prepared.proximity_report_path, prepared.topology_report_path):
+        if report_path:
+            reports.append(report_path)
+
+    errors = [e for e in (prepared.area_error, prepared.area_report_error,
+                          prepared.renumber_error, prepared.proximity_error, prepared.topology_error) if e]
+
+    area = prepared.area_result
+    proximity = prepared.proximity_result
+    topology = prepared.topology_result
+    balance_diff = area.balance_diff_q4_ha if area is not None else None
+
+    has_issues = bool(
+        xsd_errors
+        or (area is not None and area.any_issue)
+        or (proximity is not None and (proximity.close_hits or proximity.near_line_hits))
+        or (topology is not None and topology.issues)
+        or unused_points or unused_polylines
+        or prepared.was_renumbered
+    )
+    if errors:
+        status = "error"
+    elif has_issues:
+        status = "issues"
+    else:
+        status = "ok"
+
+    return BatchFileResult(
+        file=xml_path,
+        status=status,
+        error="; ".join(errors),
+        xsd_errors=len(xsd_errors) if xsd_errors is not None else None,
+        comma_hits=area.comma_hits_count if area is not None else 0,
+        parcel_area_xml_ha=area.parcel_area_xml_ha if area is not None else None,
+        parcel_area_computed_ha=area.parcel_area_computed_ha if area is not None else None,
+        parcel_area_mismatch=bool(area is not None and area.parcel_area_fixed),
+        lands_checked=area.lands_checked if area is not None else 0,
+        lands_mismatched=area.lands_fixed if area is not None else 0,
+        balance_diff_ha="" if balance_diff is None or balance_diff == Decimal("0.0000") else str(balance_diff),
+        close_points=len(proximity.close_hits) if proximity is not None else 0,
+        near_line_points=len(proximity.near_line_hits) if proximity is not None else 0,
+        topology_issues=len(topology.issues) if topology is not None else 0,
+        unused_points=len(unused_points),
+        unused_polylines=len(unused_polylines),
+        numbering_changed=prepared.was_renumbered,
+        empty_pn=prepared.empty_pn,
+        duplicate_pn=len(prepared.duplicate_pn),
+        reports="|".join(os.path.basename(p) for p in reports),
+        elapsed_sec=round(time.time() - started, 3),
+    )
+
+
+def write_summary_csv(csv_path: str, results) -> str:
+    names = [f.name for f in fields(BatchFileResult)]
+    with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(names)
+        for result in results:
+            writer.writerow(["" if getattr(result, n) is None else getattr(result, n) for n in names])
+    return csv_path
+
+
+def run_batch(xml_paths, *, xsd_path: str | None = DEFAULT_XSD_PATH, threshold_m: float = 0.3,
+              workers: int | None = None, on_result=None) -> list[BatchFileResult]:
+    """
+    Перевіряє файли у пулі процесів. on_result(done, total, result) викликається
+    в міру надходження результатів. Повертає результати в порядку xml_paths.
+    """
+    total = len(xml_paths)
+    results: dict[str, BatchFileResult] = {}
+    workers = max(1, min(workers or os.cpu_count() or 1, total or 1))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(validate_file, p, xsd_path, threshold_m): p for p in xml_paths}
+        for future in as_completed(futures):
+            xml_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = BatchFileResult(file=xml_path, status="error", error=str(e))
+            results[xml_path] = result
+            if on_result is not None:
+                on_result(len(results), total, result)
+    return [results[p] for p in xml_paths]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m xml_ua.batch_validator",
+        description="Пакетна перевірка кадастрових XML (XSD, площі, близькі/створні точки, топологія, нумерація, сиротські вузли).",
+    )
+    parser.add_argument("inputs", nargs="+", help="каталоги, glob-шаблони або XML-файли")
+    parser.add_argument("-r", "--recursive", action="store_true", help="шукати XML у підкаталогах")
+    parser.add_argument("--csv", dest="csv_path", default="", help=f"шлях підсумкового CSV (типово {SUMMARY_CSV_NAME} у поточному каталозі)")
+    parser.add_argument("--xsd", default=DEFAULT_XSD_PATH, help="шлях до XSD-схеми")
+    parser.add_argument("--no-xsd", action="store_true", help="не виконувати XSD-валідацію")
+    parser.add_argument("--threshold", type=float, default=0.3, help="поріг близьких/створних точок, м")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="кількість процесів (типово — кількість ядер)")
+    args = parser.parse_args(argv)
+
+    xml_paths = collect_xml_files(args.inputs, recursive=args.recursive)
+    if not xml_paths:
+        print("XML-файлів не знайдено.", file=sys.stderr)
+        return 2
+
+    def on_result(done, total, result):
+        print(f"[{done}/{total}] {result.status:<11} {result.file}" + (f" — {result.error}" if result.error else ""))
+
+    started = time.time()
+    results = run_batch(
+        xml_paths,
+        xsd_path=None if args.no_xsd else args.xsd,
+        threshold_m=args.threshold,
+        workers=args.workers or None,
+        on_result=on_result,
+    )
+    csv_path = write_summary_csv(args.csv_path or os.path.abspath(SUMMARY_CSV_NAME), results)
+
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    print(
+        f"Перевірено {len(results)} файлів за {time.time() - started:.1f}с: "
+        + ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+        + f". Підсумок: {csv_path}"
+    )
+    return 1 if counts.get("error") or counts.get("parse_error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,6 +32,7 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtWidgets import QMessageBox
 
+from .style_cache import load_named_style
 from .common import PARCEL_MARGIN_FACTOR, log_calls, logFile
 from qgis.PyQt.QtWidgets import QInputDialog
 
@@ -320,7 +321,7 @@ class BoundaryAgreementCreator:
 
                 style_path = self._ensure_act_style("control_point_act.qml")
                 if os.path.exists(style_path):
-                    duplicated.loadNamedStyle(style_path)
+                    load_named_style(duplicated, style_path)
                     duplicated.triggerRepaint()
 
                 _attach_layer(act_group, duplicated, index=0)
@@ -358,7 +359,7 @@ class BoundaryAgreementCreator:
 
             style_path = self._ensure_act_style(style_file)
             if os.path.exists(style_path):
-                duplicated.loadNamedStyle(style_path)
+                load_named_style(duplicated, style_path)
                 duplicated.triggerRepaint()
 
             _attach_layer(act_group, duplicated)
@@ -428,7 +429,7 @@ class BoundaryAgreementCreator:
 
         style_path = self._ensure_act_style("adjacent_act.qml")
         if os.path.exists(style_path):
-            duplicated.loadNamedStyle(style_path)
+            load_named_style(duplicated, style_path)
             duplicated.triggerRepaint()
 
     def _create_boundary_lines_layer(
@@ -489,7 +490,7 @@ class BoundaryAgreementCreator:
 
             style_path = self._ensure_act_style("lines_act.qml")
             if os.path.exists(style_path):
-                mem.loadNamedStyle(style_path)
+                load_named_style(mem, style_path)
                 mem.triggerRepaint()
 
             if not attach_layer(act_group, mem):
@@ -564,7 +565,7 @@ class BoundaryAgreementCreator:
 
         style_path = self._ensure_act_style("points_parcel_act.qml")
         if os.path.exists(style_path):
-            mem_layer.loadNamedStyle(style_path)
+            load_named_style(mem_layer, style_path)
             mem_layer.triggerRepaint()
 
         project.addMapLayer(mem_layer, False)
@@ -680,7 +681,7 @@ class BoundaryAgreementCreator:
 
         style_path = self._ensure_act_style("points_act.qml")
         if os.path.exists(style_path):
-            layer.loadNamedStyle(style_path)
+            load_named_style(layer, style_path)
             labeling = layer.labeling()
             if labeling:
                 settings = labeling.settings()
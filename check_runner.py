@@ -0,0 +1,495 @@
+"""
+Реєстр перевірок документа XML та їх паралельне виконання.
+
+Кожна перевірка (CheckJob) оголошує вхідні дані, які їй потрібні (requires):
+- "tree" — спільне дерево знімка, лише для читання;
+- "tree_copy" — власна копія дерева, яку перевірка може змінювати
+  (area_checks та перенумерація виправляють дерево, а в режимі перевірки
+  виправлення не повинні потрапити в документ);
+- "geometry" — знімок геометрії (GeometrySnapshot), будується один раз;
+- "xml_path", "xsd_path", "threshold_m" — параметри знімка.
+
+CheckSnapshot — незмінні вхідні дані одного запуску. CheckRun виконує
+незалежні перевірки одночасно: типово у пулі потоків (розбір, XSD-валідація
+lxml та NumPy звільняють GIL), або в переданому пулі процесів — тоді кожен
+процес отримує серіалізований знімок (payload) і сам розбирає дерево.
+Результати (CheckOutcome) віддаються в порядку завершення: poll() — без
+блокування (для QTimer у головному потоці), run_checks() — з очікуванням
+(для фонового завдання чи пакетної перевірки).
+Підсумки зводяться в один звіт (build_checks_report) і рядок для панелі
+повідомлень (summary_message).
+"""
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from . import area_checks
+from .geometry_snapshot import GeometrySnapshot, build_geometry_snapshot
+from .numbering_report import build_geometry_numbering_report, snapshot_geometry_numbering
+from .proximity_checks import run_proximity_checks
+from .topology_checks import ISSUE_TITLES, run_topology_checks
+
+
+ProgressCb = Callable[[int], None]
+
+# Скільки рядків деталей однієї перевірки потрапляє у зведений звіт.
+REPORT_DETAILS_LIMIT = 200
+
+
+class CheckCanceled(Exception):
+    """Запуск перевірок скасовано."""
+
+
+@dataclass(frozen=True)
+class CheckSummary:
+    issues: int
+    summary: str
+    details: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class CheckJob:
+    name: str
+    title: str
+    requires: tuple[str, ...]
+    run: Callable[[dict], object]
+    summarize: Callable[[object], CheckSummary]
+
+
+@dataclass(frozen=True)
+class CheckOutcome:
+    name: str
+    title: str
+    result: object = None
+    error: str | None = None
+    issues: int = 0
+    summary: str = ""
+    details: tuple[str, ...] = ()
+    elapsed_sec: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.issues == 0
+
+
+CHECK_JOBS: dict[str, CheckJob] = {}
+
+
+def register_check(job: CheckJob) -> CheckJob:
+    """Додає перевірку до реєстру (або замінює однойменну)."""
+    CHECK_JOBS[job.name] = job
+    return job
+
+
+class CheckSnapshot:
+    """
+    Вхідні дані перевірок. Дерево знімка перевірки лише читають; для
+    живого документа плагіна знімок створюється з копії (from_document).
+    """
+
+    def __init__(
+        self,
+        xml_path: str,
+        tree,
+        *,
+        geometry: GeometrySnapshot | None = None,
+        xsd_path: str | None = None,
+        threshold_m: float = 0.3,
+    ):
+        self.xml_path = xml_path
+        self.tree = tree
+        self.xsd_path = xsd_path
+        self.threshold_m = threshold_m
+        self._geometry = geometry
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_document(cls, xml_path: str, xml_tree, **kwargs) -> CheckSnapshot:
+        """Знімок копії дерева: документ можна редагувати, поки йдуть перевірки."""
+        return cls(xml_path, _copy_tree(xml_tree), **kwargs)
+
+    @property
+    def geometry(self) -> GeometrySnapshot:
+        with self._lock:
+            if self._geometry is None:
+                self._geometry = build_geometry_snapshot(self.tree)
+            return self._geometry
+
+    def payload(self) -> tuple:
+        """Дані знімка для передачі в інший процес (див. run_check_in_worker)."""
+        from lxml import etree
+
+        return (self.xml_path, etree.tostring(self.tree.getroot()), self._geometry, self.xsd_path, self.threshold_m)
+
+    @classmethod
+    def from_payload(cls, payload: tuple) -> CheckSnapshot:
+        from lxml import etree
+
+        xml_path, xml_bytes, geometry, xsd_path, threshold_m = payload
+        return cls(xml_path, etree.ElementTree(etree.fromstring(xml_bytes)),
+                   geometry=geometry, xsd_path=xsd_path, threshold_m=threshold_m)
+
+    def inputs_for(self, job: CheckJob) -> dict:
+        inputs = {}
+        for name in job.requires:
+            if name == "tree_copy":
+                inputs[name] = _copy_tree(self.tree)
+            else:
+                inputs[name] = getattr(self, name)
+        return inputs
+
+
+def _copy_tree(xml_tree):
+    from lxml import etree
+
+    return etree.ElementTree(copy.deepcopy(xml_tree.getroot()))
+
+
+def _outcome(job: CheckJob, inputs: dict) -> CheckOutcome:
+    started = time.time()
+    try:
+        result = job.run(inputs)
+        summary = job.summarize(result)
+    except CheckCanceled:
+        raise
+    except Exception as e:
+        return CheckOutcome(name=job.name, title=job.title, error=str(e), summary=f"помилка: {e}",
+                            elapsed_sec=time.time() - started)
+    return CheckOutcome(
+        name=job.name,
+        title=job.title,
+        result=result,
+        issues=summary.issues,
+        summary=summary.summary,
+        details=summary.details,
+        elapsed_sec=time.time() - started,
+    )
+
+
+def run_check_in_worker(name: str, payload: tuple) -> CheckOutcome:
+    """Точка входу для пулу процесів: одна перевірка над знімком з payload."""
+    job = CHECK_JOBS[name]
+    snapshot = CheckSnapshot.from_payload(payload)
+    inputs = snapshot.inputs_for(job)
+    inputs["progress"] = lambda value: None
+    return _outcome(job, inputs)
+
+
+class CheckRun:
+    """
+    Один запуск перевірок names (типово — усіх зареєстрованих) над snapshot.
+    executor — пул процесів викликача (напр. ProcessPoolExecutor); без нього
+    перевірки виконуються у власному пулі потоків. Проміжний прогрес
+    перевірок доступний лише в пулі потоків.
+    """
+
+    def __init__(self, snapshot: CheckSnapshot, names=None, *, max_workers: int | None = None, executor=None):
+        self.snapshot = snapshot
+        self.jobs = [CHECK_JOBS[name] for name in (names or CHECK_JOBS) if name in CHECK_JOBS]
+        self.outcomes: list[CheckOutcome] = []
+        self.started = time.time()
+        self._canceled = threading.Event()
+        self._progress = {job.name: 0 for job in self.jobs}
+        if executor is not None:
+            self._executor = None
+            payload = snapshot.payload()
+            self._futures = {executor.submit(run_check_in_worker, job.name, payload): job for job in self.jobs}
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(len(self.jobs) or 1, max_workers or os.cpu_count() or 1)),
+            thread_name_prefix="xml_ua_check",
+        )
+        self._futures = {self._executor.submit(self._run_job, job): job for job in self.jobs}
+
+    @property
+    def total(self) -> int:
+        return len(self.jobs)
+
+    @property
+    def finished(self) -> bool:
+        return not self._futures
+
+    def progress(self) -> int:
+        """Середній прогрес перевірок, 0..100."""
+        if not self._progress:
+            return 100
+        return int(sum(self._progress.values()) / len(self._progress))
+
+    def _job_progress(self, name: str) -> ProgressCb:
+        def report(value) -> None:
+            if self._canceled.is_set():
+                raise CheckCanceled()
+            self._progress[name] = max(0, min(100, int(value)))
+        return report
+
+    def _run_job(self, job: CheckJob) -> CheckOutcome:
+        try:
+            inputs = self.snapshot.inputs_for(job)
+            inputs["progress"] = self._job_progress(job.name)
+            return _outcome(job, inputs)
+        except CheckCanceled:
+            raise
+        except Exception as e:
+            return CheckOutcome(name=job.name, title=job.title, error=str(e), summary=f"помилка: {e}")
+        finally:
+            self._progress[job.name] = 100
+
+    def poll(self) -> list[CheckOutcome]:
+        """Результати перевірок, що завершились після попереднього виклику."""
+        fresh = []
+        for future in [f for f in self._futures if f.done()]:
+            job = self._futures.pop(future)
+            if future.cancelled():
+                continue
+            exc = future.exception()
+            if isinstance(exc, CheckCanceled):
+                continue
+            if exc is not None:
+                outcome = CheckOutcome(name=job.name, title=job.title, error=str(exc), summary=f"помилка: {exc}")
+            else:
+                outcome = future.result()
+            self._progress[job.name] = 100
+            self.outcomes.append(outcome)
+            fresh.append(outcome)
+        if not self._futures and self._executor is not None:
+            self._executor.shutdown(wait=False)
+        return fresh
+
+    def wait(self, timeout: float | None = None) -> list[CheckOutcome]:
+        """Чекає завершення хоча б однієї перевірки (не довше timeout) і повертає poll()."""
+        if self._futures:
+            wait(list(self._futures), timeout=timeout, return_when=FIRST_COMPLETED)
+        return self.poll()
+
+    def cancel(self) -> None:
+        """Скасовує незапущені перевірки; запущені зупиняються на найближчому кроці прогресу."""
+        self._canceled.set()
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def ordered_outcomes(self) -> list[CheckOutcome]:
+        """Результати в порядку перевірок запуску, а не завершення."""
+        order = {job.name: i for i, job in enumerate(self.jobs)}
+        return sorted(self.outcomes, key=lambda o: order.get(o.name, len(order)))
+
+
+def run_checks(
+    snapshot: CheckSnapshot,
+    names=None,
+    *,
+    max_workers: int | None = None,
+    executor=None,
+    progress: ProgressCb | None = None,
+    on_result: Callable[[CheckOutcome, int, int], None] | None = None,
+) -> dict[str, CheckOutcome]:
+    """
+    Виконує перевірки names і чекає їх завершення. on_result(outcome, done,
+    total) та progress викликаються в потоці виклику; виняток з progress
+    (напр. скасування) скасовує решту перевірок і передається далі.
+    Повертає {назва перевірки: CheckOutcome}.
+    """
+    run = CheckRun(snapshot, names, max_workers=max_workers, executor=executor)
+    try:
+        while not run.finished:
+            fresh = run.wait(0.1)
+            done = len(run.outcomes) - len(fresh)
+            for outcome in fresh:
+                done += 1
+                if on_result is not None:
+                    on_result(outcome, done, run.total)
+            if progress is not None:
+                progress(run.progress())
+    except BaseException:
+        run.cancel()
+        raise
+    return {outcome.name: outcome for outcome in run.ordered_outcomes()}
+
+
+def summary_message(outcomes) -> str:
+    """Один рядок для панелі повідомлень: перевірки з проблемами або "проблем не знайдено"."""
+    problems = [f"{o.title}: {o.summary}" for o in outcomes if not o.ok]
+    return "; ".join(problems) if problems else "проблем не знайдено"
+
+
+def checks_report_path(xml_path: str) -> str:
+    p = Path(xml_path)
+    return str(p.with_name(f"{p.stem}_checks.txt"))
+
+
+def build_checks_report(*, xml_path: str, outcomes, elapsed_sec: float) -> str:
+    outcomes = list(outcomes)
+    out: list[str] = []
+    out.append(f"Файл: {xml_path}")
+    out.append(f"Дата/час: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    out.append(f"Перевірок: {len(outcomes)}, з проблемами: {sum(1 for o in outcomes if not o.ok)}")
+    out.append(f"Час: {elapsed_sec:.2f} сек")
+    out.append("")
+
+    for i, outcome in enumerate(outcomes, 1):
+        out.append(f"{i}. {outcome.title}: {outcome.summary} ({outcome.elapsed_sec:.2f} сек)")
+        for detail in outcome.details[:REPORT_DETAILS_LIMIT]:
+            out.append(f"  - {detail}")
+        if len(outcome.details) > REPORT_DETAILS_LIMIT:
+            out.append(f"  … ще {len(outcome.details) - REPORT_DETAILS_LIMIT}")
+        out.append("")
+
+    return "\n".join(out).rstrip("\n") + "\n"
+
+
+def write_checks_report(*, xml_path: str, report_text: str) -> str:
+    report_path = checks_report_path(xml_path)
+    Path(report_path).write_text(report_text, encoding="utf-8")
+    return report_path
+
+
+# --- зареєстровані перевірки ---------------------------------------------
+#
+# open_pipeline сам запускає перевірки цього модуля, тож його функції
+# імпортуються під час виконання перевірки.
+
+def _run_xsd(inputs: dict):
+    from .open_pipeline import xsd_error_log
+
+    if not inputs["xsd_path"]:
+        return None
+    return xsd_error_log(inputs["tree"], inputs["xsd_path"])
+
+
+def _summarize_xsd(result) -> CheckSummary:
+    if result is None:
+        return CheckSummary(0, "схему не задано")
+    if not result:
+        return CheckSummary(0, "відповідає схемі")
+    return CheckSummary(
+        len(result),
+        f"помилок {len(result)}",
+        tuple(f"{path or 'XML'} (рядок {line}): {message}" for path, line, message in result),
+    )
+
+
+def _run_area(inputs: dict):
+    return area_checks.run_area_checks_and_fix_tree(
+        xml_tree=inputs["tree_copy"],
+        parcel_area_computer=area_checks.compute_parcel_area_ha_from_lines,
+        geometry_builder=build_geometry_snapshot,
+    )
+
+
+def _summarize_area(result) -> CheckSummary:
+    details = []
+    if result.comma_hits_count:
+        details.append(f"десяткова кома у числових полях: {result.comma_hits_count}")
+    if result.parcel_area_fixed:
+        details.append(
+            f"площа ділянки {result.parcel_area_xml_text or '—'} га, за геометрією {result.parcel_area_new_text} га")
+    for m in result.land_mismatches:
+        label = " ".join(part for part in (m.cadastral_code, m.land_code) if part) or str(m.idx)
+        details.append(f"угіддя {label}: {m.old_text or '—'} га, за геометрією {m.new_text} га")
+    if result.balance_diff_q4_ha is not None and result.balance_diff_q4_ha != 0:
+        details.append(f"баланс площ угідь і ділянки не сходиться: {result.balance_diff_q4_ha} га")
+    if not details:
+        return CheckSummary(0, f"площі відповідають геометрії (угідь: {result.lands_checked})")
+    return CheckSummary(len(details), f"розбіжностей {len(details)}", tuple(details))
+
+
+def _run_numbering(inputs: dict):
+    from .open_pipeline import cleanup_and_renumber_geometry
+
+    tree = inputs["tree_copy"]
+    before = snapshot_geometry_numbering(tree)
+    messages: list[str] = []
+    changed = cleanup_and_renumber_geometry(tree.getroot(), log=messages.append, numbering=before)
+    report_text = ""
+    if changed:
+        report_text = build_geometry_numbering_report(
+            xml_path="", before=before, after=snapshot_geometry_numbering(tree))
+    return changed, tuple(messages), report_text
+
+
+def _summarize_numbering(result) -> CheckSummary:
+    changed, messages, _ = result
+    if not changed:
+        return CheckSummary(0, "нумерація послідовна, невикористаної геометрії немає")
+    return CheckSummary(1, "потрібне очищення/перенумерація геометрії", messages)
+
+
+def _run_pn(inputs: dict):
+    from .open_pipeline import _find_pn_issues
+
+    return _find_pn_issues(inputs["tree"])
+
+
+def _summarize_pn(result) -> CheckSummary:
+    empty_pn, duplicate_pn = result
+    if not empty_pn and not duplicate_pn:
+        return CheckSummary(0, "PN заповнені та унікальні")
+    details = []
+    if empty_pn:
+        details.append(f"порожніх PN: {empty_pn}")
+    details.extend(f"неунікальний PN: {pn}" for pn in duplicate_pn)
+    return CheckSummary(empty_pn + len(duplicate_pn),
+                        f"порожніх={empty_pn}, неунікальних={len(duplicate_pn)}", tuple(details))
+
+
+def _run_proximity(inputs: dict):
+    return run_proximity_checks(
+        xml_tree=inputs["tree"],
+        geometry=inputs["geometry"],
+        threshold_m=inputs["threshold_m"],
+        progress=inputs["progress"],
+    )
+
+
+def _summarize_proximity(result) -> CheckSummary:
+    details = [f"близькі: UIDP {h.uidp} — {h.other_uidp} ({h.distance_m:.3f} м)" for h in result.close_hits]
+    details.extend(f"створні: UIDP {h.uidp} — ULID {h.ulid} ({h.distance_m:.3f} м)" for h in result.near_line_hits)
+    if not details:
+        return CheckSummary(0, f"проблем не знайдено (поріг {result.threshold_m} м)")
+    return CheckSummary(
+        len(details),
+        f"близьких={len(result.close_hits)}, створних={len(result.near_line_hits)} (поріг {result.threshold_m} м)",
+        tuple(details),
+    )
+
+
+def _run_topology(inputs: dict):
+    return run_topology_checks(xml_tree=inputs["tree"], geometry=inputs["geometry"], progress=inputs["progress"])
+
+
+def _summarize_topology(result) -> CheckSummary:
+    if not result.issues:
+        return CheckSummary(0, f"проблем не знайдено (полігонів: {result.objects_total})")
+    counts = {}
+    for issue in result.issues:
+        counts[issue.kind] = counts.get(issue.kind, 0) + 1
+    details = tuple(
+        f"{ISSUE_TITLES.get(issue.kind, issue.kind)}: {' / '.join(issue.objects)}: {issue.detail}"
+        + (f" (ULID: {', '.join(issue.ulids)})" if issue.ulids else "")
+        + (f" (UIDP: {', '.join(dict.fromkeys(issue.uidps))})" if issue.uidps else "")
+        for issue in result.issues
+    )
+    return CheckSummary(
+        len(result.issues),
+        ", ".join(f"{ISSUE_TITLES.get(kind, kind).lower()}={cnt}" for kind, cnt in counts.items()),
+        details,
+    )
+
+
+register_check(CheckJob("xsd", "XSD", ("tree", "xsd_path"), _run_xsd, _summarize_xsd))
+register_check(CheckJob("area", "Площі", ("tree_copy",), _run_area, _summarize_area))
+register_check(CheckJob("numbering", "Нумерація геометрії", ("tree_copy",), _run_numbering, _summarize_numbering))
+register_check(CheckJob("pn", "PN вузлів", ("tree",), _run_pn, _summarize_pn))
+register_check(CheckJob(
+    "proximity", "Близькі/створні точки", ("tree", "geometry", "threshold_m"), _run_proximity, _summarize_proximity))
+register_check(CheckJob("topology", "Топологія", ("tree", "geometry"), _run_topology, _summarize_topology))
@@ -20,6 +20,7 @@ from types import ModuleType, FunctionType
 from gc import get_referents
 
 from qgis.core import QgsField
+from qgis.core import QgsFields
 
 
 logFile = open(os.path.dirname(__file__) + "/log.md", "w", encoding="utf-8")
@@ -240,6 +241,29 @@ def ensure_object_layer_fields(layer):
         pass
 
 
+def object_layer_fields():
+    """
+    Data fields of the plugin's polygon/adjacent layers, as added by
+    ensure_object_layer_fields: object_id (integer), object_shape (string).
+    """
+    fields = QgsFields()
+    fields.append(QgsField("object_id", QVariant.Int))
+    fields.append(QgsField("object_shape", QVariant.String))
+    return fields
+
+
+def set_object_attributes(feature, object_id, object_shape):
+    """
+    Sets object_id/object_shape on a feature by field name, so the values land in the
+    right columns regardless of provider key fields (e.g. the GeoPackage fid).
+    """
+    fields = feature.fields()
+    if fields.indexFromName("object_id") != -1:
+        feature.setAttribute("object_id", object_id)
+    if fields.indexFromName("object_shape") != -1:
+        feature.setAttribute("object_shape", object_shape)
+
+
 def next_object_id_in_container(parent, child_tag: str) -> str:
     """
     Returns the next available positive integer object_id (as text) within a container element.
@@ -845,49 +869,3 @@ def insert_element_in_order(parent_element, new_element):
         insert_before_element.addprevious(new_element)
     else:
         parent_element.append(new_element)
-
-
-def sort_children_in_parcel_info(parcel_info_element):
-    """
-    Сортує дочірні елементи <ParcelInfo> згідно з порядком, визначеним у схемі XSD.
-    Повертає True, якщо порядок було змінено, інакше False.
-    """
-
-    order = [
-        "ParcelLocationInfo",
-        "CategoryPurposeInfo",
-        "OwnershipInfo",
-        "ParcelMetricInfo",
-        "Proprietors",
-        "LegalModeInfo",
-        "TechnicalDocumentationInfo",
-        "StateActInfo",
-        "ValuationInfo",
-        "Leases",
-        "Subleases",
-        "Restrictions",
-        "LandsParcel",
-        "AdjacentUnits",
-        "AdditionalInfoBlock"
-    ]
-
-    current_children = list(parcel_info_element)
-    current_tags = [child.tag for child in current_children]
-
-    sorted_children = []
-
-    children_map = {child.tag: child for child in current_children}
-
-    for tag in order:
-        if tag in children_map:
-            sorted_children.append(children_map[tag])
-
-    present_tags_sorted = [child.tag for child in sorted_children]
-    if current_tags != present_tags_sorted:
-
-        parcel_info_element.clear()
-        for child in sorted_children:
-            parcel_info_element.append(child)
-        return True  # Порядок було змінено
-
-    return False  # Порядок не змінювався
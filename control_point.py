@@ -3,6 +3,7 @@ import os
 from qgis.core import (
     QgsFeature,
     QgsField,
+    QgsFields,
     QgsGeometry,
     QgsPointXY,
     QgsProject,
@@ -11,6 +12,10 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtWidgets import QMessageBox
 
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
+from .feature_diff import apply_feature_diff
+
 
 class ControlPoint:
     """
@@ -43,8 +48,12 @@ class ControlPoint:
         return list(dict.fromkeys(uidps))
 
     def redraw_layer(self):
+        """
+        Оновлює шар за XML, змінюючи лише відмінні об'єкти (зіставлення за UIDP).
+        Повертає (додано, видалено, змінено).
+        """
         if not self.layer:
-            return
+            return None
 
         if self.points_handler:
             try:
@@ -52,14 +61,21 @@ class ControlPoint:
             except Exception:
                 pass
 
+        return apply_feature_diff(self.layer, self.build_features(self.layer.fields()), "UIDP")
+
+    def data_fields(self):
+        """Поля даних шару 'Закріплені вузли'."""
+        fields = QgsFields()
+        fields.append(QgsField("UIDP", QVariant.String))
+        return fields
+
+    def build_features(self, fields):
+        """Будує об'єкти шару за вже зчитаними вузлами points_handler."""
         uidps = self._get_control_point_uidps()
         xml_points = getattr(self.points_handler, "xmlPoints", []) if self.points_handler else []
         point_by_uidp = {p.get("UIDP"): p for p in xml_points if p.get("UIDP")}
 
-        provider = self.layer.dataProvider()
-        self.layer.startEditing()
-        self.layer.deleteFeatures(self.layer.allFeatureIds())
-
+        features = []
         for uidp in uidps:
             xml_point = point_by_uidp.get(uidp)
             if not xml_point:
@@ -69,15 +85,14 @@ class ControlPoint:
             if not x or not y:
                 continue
             try:
-                feature = QgsFeature(self.layer.fields())
+                feature = QgsFeature(fields)
 
                 feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(float(y), float(x))))
-                feature.setAttributes([uidp])
-                provider.addFeature(feature)
+                feature.setAttribute("UIDP", uidp)
+                features.append(feature)
             except Exception:
                 continue
-
-        self.layer.commitChanges()
+        return features
 
     def add_control_points_layer(self):
         layer_name = "Закріплені вузли"
@@ -96,19 +111,18 @@ class ControlPoint:
 
         style_path = os.path.join(self.plugin_dir, "templates", "control_point.qml")
         if os.path.exists(style_path):
-            self.layer.loadNamedStyle(style_path)
+            load_named_style(self.layer, style_path)
 
         self.layer.setReadOnly(True)
 
         provider = self.layer.dataProvider()
-        provider.addAttributes([QgsField("UIDP", QVariant.String)])
+        provider.addAttributes(self.data_fields().toList())
         self.layer.updateFields()
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        self.group.addLayer(self.layer)
+        add_layer_to_group(self.group, self.layer)
 
         if self.xml_data:
             self.layer.setCustomProperty("xml_data_object_id", id(self.xml_data))
 
-        self.redraw_layer()
         return self.layer
@@ -1,4 +1,8 @@
 
+from .edit_journal import EditJournal
+from .ring_cache import RingCache
+from .element_registry import ElementRegistry
+
 
 class ShapeInfo:
     """Клас для зберігання опису геометричного об'єкта та його зв'язку з картою."""
@@ -19,7 +23,9 @@ class xml_data:
         self.tree = tree
         self.group_name = group_name
         self.backup_path = backup_path
-        self.temp_tree_state = None
+        self.journal = EditJournal()  # Журнал змін дерева для undo/redo та відкату
+        self.ring_cache = RingCache()  # Зібрані кільця полігонів для побудови шарів
+        self.element_registry = ElementRegistry()  # Об'єкт шару <-> XML-елемент <-> елемент дерева
         self.changed = False
         self.was_ever_changed = False
         self.shapes = []  # Список об'єктів ShapeInfo для відстеження геометрії
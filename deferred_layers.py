@@ -0,0 +1,223 @@
+"""
+Відкладене створення рідко використовуваних шарів групи XML.
+
+У режимі відкладених шарів (налаштування xml_ua/lazy_layers, дія
+"Створювати рідковживані шари за потреби" в меню інструментів) xmlUaLayers
+під час відкриття файлу не будує шари DEFERRED_LAYERS. Замість них у групу
+додаються порожні шари-заглушки (без полів, стилю та об'єктів) з вимкненою
+видимістю. Справжній шар будується обробником (add_*_layer) і стає на місце
+заглушки, коли її вперше:
+- вмикають у дереві шарів;
+- вибирають поточним шаром у дереві шарів;
+- запитують з коду плагіна (xmlUaLayers.layer_by_name / feature_by,
+  redraw_specific_layer).
+
+Отже час відкриття залежить лише від шарів, якими справді користуються.
+"""
+
+from qgis.core import QgsLayerTreeLayer
+from qgis.core import QgsProject
+from qgis.core import QgsVectorLayer
+from qgis.PyQt.QtCore import QTimer
+from qgis.utils import iface
+
+from .common import logFile
+from .common import log_calls
+from .layer_batch import add_layer_to_group
+
+
+LAZY_LAYERS_SETTING_KEY = "xml_ua/lazy_layers"
+DEFERRED_PROPERTY = "xml_ua_deferred"
+
+# Назва шару -> тип геометрії заглушки (як у шару, що її замінить).
+DEFERRED_LAYERS = {
+    "Кадастрова зона": "MultiPolygon",
+    "Кадастровий квартал": "MultiPolygon",
+    "Оренда": "MultiPolygon",
+    "Суборенда": "MultiPolygon",
+    "Обмеження": "MultiPolygon",
+    "Суміжники": "LineString",
+}
+
+
+def is_deferred(layer):
+    """True, якщо layer — заглушка відкладеного шару."""
+    return bool(layer is not None and layer.customProperty(DEFERRED_PROPERTY, False))
+
+
+def _node_index(group, layer_id):
+    for i, child in enumerate(group.children()):
+        if isinstance(child, QgsLayerTreeLayer) and child.layerId() == layer_id:
+            return i, child
+    return None, None
+
+
+class DeferredLayers:
+    """Заглушки відкладених шарів однієї групи xmlUaLayers."""
+
+    def __init__(self, layers_obj):
+        self.layers_obj = layers_obj
+        self._pending = {}  # назва шару -> (id заглушки, функція побудови)
+        self._connected = False
+
+    def defer(self, layer_name, build):
+        """
+        Додає у групу заглушку шару layer_name. build() будує справжній шар
+        (метод add_*_layer обробника) і повертає його.
+        """
+        layers_obj = self.layers_obj
+        placeholder = QgsVectorLayer(
+            f"{DEFERRED_LAYERS[layer_name]}?crs={layers_obj.crsEpsg}", layer_name, "memory")
+        placeholder.setCustomProperty(DEFERRED_PROPERTY, True)
+        placeholder.setCustomProperty("skip_save_dialog", True)
+        placeholder.setReadOnly(True)
+        if layers_obj.xml_data:
+            placeholder.setCustomProperty("xml_data_object_id", str(id(layers_obj.xml_data)))
+            placeholder.setCustomProperty("xml_group_name", layers_obj.group_name)
+
+        add_layer_to_group(layers_obj.group, placeholder, on_top=True, visible=False)
+
+        self._pending[layer_name] = (placeholder.id(), build)
+        self._connect_signals()
+        return placeholder
+
+    def discard(self):
+        """Забуває заглушки (група перебудовується або закривається)."""
+        self._pending.clear()
+        self._disconnect_signals()
+
+    # --- побудова -------------------------------------------------------
+
+    def materialize(self, layer_name):
+        """
+        Будує відкладений шар layer_name і ставить його на місце заглушки.
+        Повертає збудований шар або None, якщо шар не відкладено чи
+        побудова не вдалася.
+        """
+        entry = self._pending.pop(layer_name, None)
+        if entry is None:
+            return None
+        placeholder_id, build = entry
+        layers_obj = self.layers_obj
+        group = layers_obj.group
+        project = QgsProject.instance()
+        if project.mapLayer(placeholder_id) is None:
+            # Заглушку видалено разом з розділом XML, будувати нічого.
+            if not self._pending:
+                self._disconnect_signals()
+            return None
+
+        _, placeholder_node = _node_index(group, placeholder_id)
+        visible = placeholder_node.itemVisibilityChecked() if placeholder_node is not None else False
+        was_current = False
+        try:
+            current = iface.layerTreeView().currentLayer()
+            was_current = current is not None and current.id() == placeholder_id
+        except Exception:
+            pass
+
+        dockwidget = getattr(getattr(layers_obj, "plugin", None), "dockwidget", None)
+        prev_suppress = getattr(dockwidget, "_suppress_close_on_layer_remove", False)
+        if dockwidget is not None:
+            dockwidget._suppress_close_on_layer_remove = True
+        try:
+            try:
+                layer = build()
+            except Exception as e:
+                log_calls(logFile, f"Не вдалося побудувати відкладений шар '{layer_name}': {e}")
+                layer = None
+
+            if layer is not None:
+                _, node = _node_index(group, layer.id())
+                index, _ = _node_index(group, placeholder_id)
+                if index is not None and node is not None:
+                    # Спершу новий вузол на місце заглушки, потім видалення
+                    # вузла, створеного build(): інакше шар на мить лишається
+                    # без вузла і міст дерева шарів видаляє його з проекту.
+                    built_node = node
+                    node = group.insertLayer(index, layer)
+                    group.removeChildNode(built_node)
+                if node is not None:
+                    node.setItemVisibilityChecked(visible)
+
+            if project.mapLayer(placeholder_id) is not None:
+                group.removeLayer(project.mapLayer(placeholder_id))
+                project.removeMapLayer(placeholder_id)
+        finally:
+            if dockwidget is not None:
+                dockwidget._suppress_close_on_layer_remove = prev_suppress
+
+        if layer is None:
+            return None
+
+        layers_obj.adopt_layer(layer)
+        if was_current:
+            try:
+                iface.layerTreeView().setCurrentLayer(layer)
+            except Exception:
+                pass
+
+        log_calls(logFile, f"Відкладений шар '{layer_name}' групи '{group.name()}' побудовано.")
+        if not self._pending:
+            self._disconnect_signals()
+        return layer
+
+    def materialize_placeholder(self, layer):
+        """Будує шар, заглушкою якого є layer. Повертає збудований шар або None."""
+        if layer is None:
+            return None
+        entry = self._pending.get(layer.name())
+        if entry is None or entry[0] != layer.id():
+            return None
+        return self.materialize(layer.name())
+
+    # --- тригери --------------------------------------------------------
+
+    def _pending_name(self, layer_id):
+        for layer_name, (placeholder_id, _) in self._pending.items():
+            if placeholder_id == layer_id:
+                return layer_name
+        return None
+
+    def _on_visibility_changed(self, node):
+        if not isinstance(node, QgsLayerTreeLayer):
+            return
+        try:
+            layer_name = self._pending_name(node.layerId())
+            checked = node.itemVisibilityChecked()
+        except RuntimeError:
+            return
+        if layer_name is not None and checked:
+            # Дерево шарів не змінюємо всередині його власного сигналу.
+            QTimer.singleShot(0, lambda: self.materialize(layer_name))
+
+    def _on_current_layer_changed(self, layer):
+        if not is_deferred(layer):
+            return
+        layer_name = self._pending_name(layer.id())
+        if layer_name is not None:
+            QTimer.singleShot(0, lambda: self.materialize(layer_name))
+
+    def _connect_signals(self):
+        if self._connected:
+            return
+        try:
+            # visibilityChanged групи надходить і для її дочірніх вузлів.
+            self.layers_obj.group.visibilityChanged.connect(self._on_visibility_changed)
+            iface.layerTreeView().currentLayerChanged.connect(self._on_current_layer_changed)
+            self._connected = True
+        except Exception:
+            pass
+
+    def _disconnect_signals(self):
+        if not self._connected:
+            return
+        self._connected = False
+        try:
+            self.layers_obj.group.visibilityChanged.disconnect(self._on_visibility_changed)
+        except Exception:
+            pass
+        try:
+            iface.layerTreeView().currentLayerChanged.disconnect(self._on_current_layer_changed)
+        except Exception:
+            pass
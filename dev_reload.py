@@ -0,0 +1,44 @@
+"""
+Перезавантаження модулів аналізу під час розробки.
+
+У звичайному режимі відкриття XML використовує вже імпортовані модулі. У
+режимі розробника (налаштування xml_ua/dev_reload_modules, дія
+"Перезавантажувати модулі аналізу" в меню інструментів) модулі перевірок
+перезавантажуються перед кожним відкриттям, тож зміни в area_checks,
+proximity_checks тощо підхоплюються без перезапуску QGIS.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+
+
+# Порядок важливий: залежні модулі перезавантажуються після своїх залежностей.
+ANALYSIS_MODULES = (
+    "xml_paths",
+    "geometry_snapshot",
+    "area_checks",
+    "numbering_report",
+    "proximity_vectorized",
+    "proximity_checks",
+    "document_lint",
+    "topology_checks",
+    "check_runner",
+    "open_pipeline",
+    "open_cache",
+)
+
+
+def reload_analysis_modules(package: str | None = None) -> list[str]:
+    """Перезавантажує модулі аналізу відкриття. Повертає імена перезавантажених модулів."""
+    package = package or __package__
+    reloaded = []
+    for name in ANALYSIS_MODULES:
+        full_name = f"{package}.{name}"
+        module = sys.modules.get(full_name)
+        if module is None:
+            importlib.import_module(full_name)
+        else:
+            importlib.reload(module)
+        reloaded.append(name)
+    return reloaded
@@ -24,9 +24,11 @@
 """
 
 
+from .style_cache import load_named_style
 from .data_models import xml_data, ShapeInfo
 import os
-import copy
+import sys
+import time
 import shutil
 import re
 from datetime import datetime
@@ -41,6 +43,7 @@ from qgis.PyQt.QtCore import QSize
 from qgis.PyQt.QtCore import QTimer
 from qgis.PyQt.QtCore import Qt
 from qgis.PyQt.QtCore import QItemSelectionModel
+from qgis.PyQt.QtCore import QSettings
 
 from qgis.core import Qgis
 from qgis.core import QgsLayerTreeGroup
@@ -71,18 +74,45 @@ from .tree_view import CustomTreeView
 
 
 from .layers import xmlUaLayers
+from .layer_sync import refresh_layers_incrementally
+from .layer_registry import LayerRegistry
+from .deferred_layers import is_deferred
+from .feature_diff import key_field_for_layer
 
 from .common import logFile
 from .common import log_calls
 from .common import ensure_object_layer_fields
 from .common import next_object_id_in_container
+from .common import set_object_attributes
 from .topology import GeometryProcessor
 from .common import size
 from .common import xsd_path
 from .common import connector
+from . import check_runner
+from . import open_cache
+from . import open_pipeline
+from .dev_reload import reload_analysis_modules
+from .open_cache import default_cache_dir
+from .open_pipeline import prepare_xml_in_worker
+from .open_pipeline import attach_tree
+from .open_pipeline import remove_object_id_attributes
+from .open_pipeline import write_check_report
+from .topology_checks import ISSUE_TITLES
+from .topology_layer import add_topology_layer
+from .xml_paths import LocalNamePath
+from .xml_paths import METRIC_POINTS
+from .xml_paths import child_text
+from .xml_paths import uses_namespace
 
 LOG = True
 
+_PARCEL_METRIC_INFO_PATH = (
+    "/UkrainianCadastralExchangeFile/InfoPart/CadastralZoneInfo/CadastralQuarters"
+    "/CadastralQuarterInfo/Parcels/ParcelInfo/ParcelMetricInfo"
+)
+_PARCEL_AREA_SIZES = LocalNamePath(_PARCEL_METRIC_INFO_PATH + "/Area/Size")
+_PARCEL_EXTERNALS = LocalNamePath(_PARCEL_METRIC_INFO_PATH + "/Externals")
+
 
 class BackupTask(QgsTask):
     """Фонове завдання для створення резервної копії файлу."""
@@ -128,6 +158,141 @@ class BackupTask(QgsTask):
                     logFile, f"Створення резервної копії скасовано: {self.source_path}")
 
 
+class OpenXmlTask(QgsTask):
+    """
+    Фонове завдання відкриття XML: розбір файлу та всі перевірки, що працюють
+    лише з lxml-деревом (див. open_cache.prepare_xml_cached). Вкладка,
+    модель, шари та діалоги створюються у finished() в головному потоці.
+    """
+
+    def __init__(self, xml_path, backup_path, original_path, description, dockwidget, cache_dir=None):
+        super().__init__(description, QgsTask.CanCancel)
+        self.xml_path = xml_path
+        self.backup_path = backup_path
+        self.original_path = original_path
+        self.cache_dir = cache_dir
+        self.dockwidget = dockwidget
+        self.exception = None
+        self.progress_message = None
+        self.prepared = None
+
+    def _progress(self, value):
+        """Оновлює прогрес та перериває роботу, якщо завдання скасовано."""
+        if self.isCanceled():
+            # Через модуль, а не імпортоване ім'я: після reload_analysis_modules()
+            # клас має збігатися з тим, що перехоплює open_pipeline.
+            raise open_pipeline.OpenCanceled()
+        self.setProgress(max(0.0, min(100.0, float(value))))
+
+    def run(self):
+        """Розбирає XML та виконує перевірки без звернень до GUI."""
+        try:
+            self.prepared = open_cache.prepare_xml_cached(
+                self.xml_path,
+                cache_dir=self.cache_dir,
+                backup_path=self.backup_path,
+                original_path=self.original_path,
+                progress=self._progress,
+            )
+            return True
+        except open_pipeline.OpenCanceled:
+            return False
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Завершує відкриття в головному потоці."""
+
+        if self.dockwidget and self in self.dockwidget.running_tasks:
+            self.dockwidget.running_tasks.remove(self)
+
+        iface = self.dockwidget.iface
+        if self.progress_message is not None:
+            try:
+                iface.messageBar().popWidget(self.progress_message)
+            except Exception:
+                pass
+            self.progress_message = None
+
+        if result:
+            self.dockwidget._finish_open_xml_file(self.prepared)
+        elif self.exception:
+            log_calls(
+                logFile, f"Не вдалося відкрити {self.xml_path}: {self.exception}")
+            QMessageBox.critical(iface.mainWindow(
+            ), "Помилка", f"Не вдалося відкрити XML файл:\n{self.exception}")
+        else:
+            log_calls(logFile, f"Відкриття XML скасовано: {self.xml_path}")
+            iface.messageBar().pushMessage(
+                "XML-UA",
+                f"Відкриття {os.path.basename(self.xml_path)} скасовано.",
+                level=Qgis.Info,
+                duration=5,
+            )
+
+
+OPEN_CACHE_ENABLED_KEY = "xml_ua/open_cache_enabled"
+OPEN_CACHE_DIR_KEY = "xml_ua/open_cache_dir"
+
+
+def _open_cache_dir():
+    """
+    Каталог кешу результатів відкриття або None, якщо кеш вимкнено
+    (QSettings xml_ua/open_cache_enabled, xml_ua/open_cache_dir).
+    """
+    enabled = QSettings().value(OPEN_CACHE_ENABLED_KEY, True)
+    if not isinstance(enabled, bool):
+        enabled = str(enabled).strip().lower() in ("1", "true", "yes", "on")
+    if not enabled:
+        return None
+    return str(QSettings().value(OPEN_CACHE_DIR_KEY, "") or "").strip() or default_cache_dir()
+
+
+def _python_executable_for_workers():
+    """
+    Повертає інтерпретатор Python для дочірніх процесів. У QGIS sys.executable
+    часто вказує на саму програму (qgis-bin), яку не можна запускати як worker.
+    """
+    executable = sys.executable or ""
+    if os.path.basename(executable).lower().startswith("python"):
+        return executable
+
+    candidates = []
+    for prefix in (sys.exec_prefix, sys.prefix):
+        if os.name == "nt":
+            candidates.append(os.path.join(prefix, "pythonw.exe"))
+            candidates.append(os.path.join(prefix, "python.exe"))
+        else:
+            candidates.append(os.path.join(
+                prefix, "bin", f"python{sys.version_info.major}.{sys.version_info.minor}"))
+            candidates.append(os.path.join(prefix, "bin", "python3"))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _worker_process_pool(max_workers):
+    """
+    ProcessPoolExecutor (spawn) з інтерпретатором _python_executable_for_workers()
+    або None, якщо дочірні процеси в цьому середовищі недоступні.
+    """
+    python_executable = _python_executable_for_workers()
+    if not python_executable:
+        return None
+    try:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        mp_context = multiprocessing.get_context("spawn")
+        mp_context.set_executable(python_executable)
+        return ProcessPoolExecutor(max_workers=max(1, max_workers), mp_context=mp_context)
+    except Exception as e:
+        log_calls(logFile, f"Пул процесів недоступний: {e}")
+        return None
+
+
 FORM_CLASS, _ = uic.loadUiType(os.path.join(
     os.path.dirname(__file__), 'xml_ua_dockwidget_base.ui'))
 
@@ -195,6 +360,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         self.resize(400, self.height())
 
         self.opened_xmls = []
+        self.layer_registry = LayerRegistry()  # id шару / назва групи / дерево -> xml_data
 
         self.full_xml_file_name = None
         self.layers_obj = None
@@ -228,12 +394,20 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         connector.connect(QgsProject.instance(),
                           "layerWillBeRemoved", self.on_layer_will_be_removed)
+        # Після on_layer_will_be_removed: обробнику ще потрібні записи реєстру.
+        connector.connect(QgsProject.instance(),
+                          "layerWillBeRemoved", self.layer_registry.on_layer_will_be_removed)
+        connector.connect(QgsProject.instance(),
+                          "layersAdded", self.layer_registry.on_layers_added)
 
         self.save_icon = self.style().standardIcon(QStyle.SP_DialogSaveButton)
 
         self.tab_save_buttons = {}
 
         self.running_tasks = []
+        # Пул процесів для перевірок check_runner: None — ще не створено,
+        # False — недоступний (перевірки виконуються в потоках).
+        self._check_executor = None
 
         self.LAYER_NAME_TO_XML_CONTAINER_PATH = {
             "Суміжники": ".//ParcelInfo/AdjacentUnits",
@@ -324,6 +498,10 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                              "doubleClicked", self.double_clicked)
         connector.disconnect(QgsProject.instance(
         ), "layerWillBeRemoved", self.on_layer_will_be_removed)
+        connector.disconnect(QgsProject.instance(
+        ), "layerWillBeRemoved", self.layer_registry.on_layer_will_be_removed)
+        connector.disconnect(QgsProject.instance(
+        ), "layersAdded", self.layer_registry.on_layers_added)
         connector.disconnect(self.iface.layerTreeView(),
                              "clicked", self.clicked)
 
@@ -343,20 +521,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
     def _remove_object_id_attributes_from_tree(self, xml_tree):
         """Видаляє технічні object_id з XML-дерева. Повертає кількість видалених атрибутів."""
-        if xml_tree is None:
-            return 0
-
-        root = xml_tree.getroot()
-        if root is None:
-            return 0
-
-        removed_count = 0
-        for node in root.xpath(".//*[@object_id]"):
-            if "object_id" in node.attrib:
-                del node.attrib["object_id"]
-                removed_count += 1
-
-        return removed_count
+        return remove_object_id_attributes(xml_tree)
 
     def process_action_check(self):
         """Перевіряє поточний активний XML-файл."""
@@ -380,98 +545,154 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         log_calls(
             logFile, f"Запуск повної валідації для файлу: {self.current_xml.path}")
 
+        xml_path = self.current_xml.path
+        xml_name = os.path.basename(xml_path)
+
+        # Перевірки check_runner працюють у пулі потоків (або процесів) на копії дерева, тож
+        # документ лишається доступним для редагування, а результати
+        # надходять у панель повідомлень у міру завершення.
+        try:
+            snapshot = check_runner.CheckSnapshot.from_document(xml_path, tree_view.xml_tree, xsd_path=xsd_path)
+            run = None
+            executor = self._check_process_pool()
+            if executor is not None:
+                try:
+                    run = check_runner.CheckRun(snapshot, executor=executor)
+                except Exception as e:
+                    log_calls(logFile, f"Пул процесів перевірок недоступний: {e}")
+                    self.shutdown_check_pool(disable=True)
+            if run is None:
+                run = check_runner.CheckRun(snapshot)
+        except Exception as e:
+            log_calls(logFile, f"Не вдалося запустити перевірки: {e}")
+            QMessageBox.critical(self, "Помилка", f"Не вдалося запустити перевірки: {e}")
+            return
+
         message_bar = self.iface.messageBar()
         progress_message = message_bar.createMessage(
-            "XML-UA", f"Перевірка файлу: {os.path.basename(self.current_xml.path)}..."
+            "XML-UA", f"Перевірка файлу: {xml_name}..."
         )
         progress_bar = QProgressBar()
-        progress_bar.setRange(0, 100)
+        progress_bar.setRange(0, run.total + 1)
         progress_bar.setValue(0)
         progress_bar.setMaximumWidth(220)
         progress_message.layout().addWidget(progress_bar)
         message_bar.pushWidget(progress_message, Qgis.Info)
 
-        simulated_progress = {"value": 0}
-        simulated_timer = QTimer(self)
-
-        def tick_progress():
-            if simulated_progress["value"] < 95:
-                simulated_progress["value"] += 1
-                progress_bar.setValue(simulated_progress["value"])
-
-        simulated_timer.timeout.connect(tick_progress)
-        simulated_timer.start(100)
-
-        def set_progress(value):
-            clamped = max(0, min(100, value))
-            if clamped > simulated_progress["value"]:
-                simulated_progress["value"] = clamped
-            progress_bar.setValue(simulated_progress["value"])
-            QApplication.processEvents()
-
+        # Локальні перевірки підсвічують елементи дерева, тому виконуються в
+        # головному потоці, поки решта перевірок іде у фоні.
         try:
-            set_progress(10)
-
-            local_errors = tree_view._validate_and_color_tree(
-                generate_report=True
-            )
-            set_progress(45)
+            local_errors = tree_view._validate_and_color_tree(generate_report=True)
+        except Exception as e:
+            log_calls(logFile, f"Помилка локальної перевірки дерева: {e}")
+            local_errors = []
+        progress_bar.setValue(1)
 
+        state = {"busy": False, "xsd_errors": []}
+        poll_timer = QTimer(self)
 
-            xsd_tree = None
+        def on_outcome(outcome):
+            log_calls(
+                logFile,
+                f"Перевірка «{outcome.title}» завершена за {outcome.elapsed_sec:.2f}с: {outcome.summary}")
+            if outcome.name == "xsd" and outcome.result:
+                try:
+                    state["xsd_errors"] = tree_view.mark_xsd_errors(outcome.result, generate_report=True)
+                except Exception as e:
+                    log_calls(logFile, f"Не вдалося підсвітити помилки XSD: {e}")
+                    state["xsd_errors"] = list(outcome.details)
+            progress_bar.setValue(1 + len(run.outcomes))
+            progress_message.setText(
+                f"Перевірка файлу: {xml_name} ({len(run.outcomes)}/{run.total}) — {outcome.title}: {outcome.summary}")
+
+        def finish():
+            poll_timer.stop()
+            poll_timer.deleteLater()
             try:
-                xsd_tree = copy.deepcopy(tree_view.xml_tree)
+                message_bar.popWidget(progress_message)
             except Exception:
-                try:
-                    root = tree_view.xml_tree.getroot() if tree_view.xml_tree is not None else None
-                    if root is not None:
-                        xsd_tree = etree.ElementTree(etree.fromstring(etree.tostring(root)))
-                except Exception:
-                    xsd_tree = tree_view.xml_tree
-
-            # Технічні object_id потрібні для нумерації/шарів, але не є частиною обмінного XML за XSD.
-            # Валідуємо "очищену" копію, щоб не ламати внутрішні зв'язки плагіна під час роботи.
-            self._remove_object_id_attributes_from_tree(xsd_tree)
+                pass
 
-            xsd_errors = tree_view.validate_against_xsd(
-                xsd_path, generate_report=True, reset_visuals=False, xml_tree=xsd_tree
-            )
-            set_progress(80)
-            errors_list = xsd_errors + local_errors
+            outcomes = run.ordered_outcomes()
+            report_path = ""
+            try:
+                report_text = check_runner.build_checks_report(
+                    xml_path=xml_path, outcomes=outcomes, elapsed_sec=time.time() - run.started)
+                report_path = check_runner.write_checks_report(xml_path=xml_path, report_text=report_text)
+                log_calls(logFile, f"Створено зведений звіт перевірок: {report_path}")
+            except Exception as e:
+                log_calls(logFile, f"Не вдалося зберегти зведений звіт перевірок: {e}")
 
+            errors_list = state["xsd_errors"] + local_errors
             if errors_list:
-                report_path = os.path.join(os.path.dirname(
-                    self.current_xml.path), f"Check_{os.path.basename(self.current_xml.path)}.txt")
                 try:
-                    with open(report_path, 'w', encoding='utf-8') as f:
-                        f.write(
-                            f"Звіт про помилки для файлу: {self.current_xml.path}\n")
-                        f.write("="*50 + "\n")
-                        for i, error in enumerate(errors_list, 1):
-                            f.write(f"{i}. {error}\n")
-                            self.iface.messageBar().pushMessage(
-                                f"Помилка валідації #{i}", error, level=Qgis.Warning, duration=0)
+                    write_check_report(xml_path=xml_path, errors=errors_list)
+                    for i, error in enumerate(errors_list, 1):
+                        self.iface.messageBar().pushMessage(
+                            f"Помилка валідації #{i}", error, level=Qgis.Warning, duration=0)
                 except Exception as e:
                     log_calls(
                         logFile, f"Не вдалося зберегти звіт про помилки: {e}")
                     QMessageBox.critical(
                         self, "Помилка", f"Не вдалося зберегти звіт про помилки: {e}")
+
+            report_hint = f" Звіт: {os.path.basename(report_path)}" if report_path else ""
+            if errors_list or any(not o.ok for o in outcomes):
+                summary = check_runner.summary_message(o for o in outcomes if o.name != "xsd" or not o.ok)
+                if local_errors:
+                    summary = f"Локальна перевірка: помилок {len(local_errors)}; " + summary
+                self.iface.messageBar().pushMessage(
+                    "xml_ua:",
+                    f"Перевірку файлу '{xml_name}' завершено. {summary}.{report_hint}",
+                    level=Qgis.Warning,
+                    duration=15,
+                )
+                log_calls(logFile, f"Валідацію завершено: {summary}")
             else:
                 self.iface.messageBar().pushMessage(
                     "xml_ua:",
-                    f"Перевірку файлу '{os.path.basename(self.current_xml.path)}' завершено. Помилок не знайдено.",
+                    f"Перевірку файлу '{xml_name}' завершено. Помилок не знайдено.{report_hint}",
                     level=Qgis.Success,
                     duration=5
                 )
                 log_calls(logFile, "Валідацію завершено. Помилок не знайдено.")
 
-            set_progress(100)
-            simulated_timer.stop()
-            message_bar.popWidget(progress_message)
-        except Exception:
-            simulated_timer.stop()
-            message_bar.popWidget(progress_message)
-            raise
+        def poll_results():
+            if state["busy"]:
+                return
+            state["busy"] = True
+            try:
+                for outcome in run.poll():
+                    on_outcome(outcome)
+            finally:
+                state["busy"] = False
+            if run.finished:
+                finish()
+
+        poll_timer.timeout.connect(poll_results)
+        poll_timer.start(100)
+
+    def _check_process_pool(self):
+        """
+        Пул процесів для перевірок «Перевірити»: створюється при першій
+        перевірці й використовується повторно. None, якщо ядро одне, пул
+        недоступний або ввімкнено перезавантаження модулів аналізу (дочірні
+        процеси не побачили б перезавантажених модулів).
+        """
+        if self.plugin and getattr(self.plugin, "dev_reload_enabled", False):
+            return None
+        if self._check_executor is None:
+            cpu_count = os.cpu_count() or 1
+            executor = _worker_process_pool(min(len(check_runner.CHECK_JOBS), cpu_count)) if cpu_count > 1 else None
+            self._check_executor = executor if executor is not None else False
+        return self._check_executor or None
+
+    def shutdown_check_pool(self, disable=False):
+        """Зупиняє пул процесів перевірок; disable=True — більше його не створювати."""
+        executor = self._check_executor
+        self._check_executor = False if disable else None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def process_action_sort_by_xsd(self):
         """Впорядковує структуру активного XML згідно з XSD-порядком."""
@@ -568,28 +789,33 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 self, "Помилка", f"Не вдалося впорядкувати структуру за XSD:\n{e}")
     def process_action_open(self):
         """
-        Handles the action of opening an XML file.
-        This method performs the following steps:
-        1. Logs the action.
-        2. Closes all tabs except "Структура", "Реквізити", and "Ділянка".
-        3. Clears existing data in TreeView and TableViews.
-        4. Opens a file dialog to select an XML file.
-        5. If no file is selected, shows a warning message and exits.
-        6. Sets the window title to the selected file's name.
-        7. Loads data from the selected XML file.
-        8. Expands initial elements in the TreeView and sets the column width.
-        9. Retrieves the layers_obj name from the XML layers and logs it.
+        Handles the action of opening one or several XML files.
+        For every selected file a timestamped backup copy is created in the
+        background. A single file is opened by OpenXmlTask; several files are
+        pre-analysed in parallel in a process pool (open_xml_files_parallel).
         Returns:
             None
         """
 
-        xml_path, _ = QFileDialog.getOpenFileName(
-            self, "Відкрити XML файл", "", "XML файли (*.xml)")
+        xml_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Відкрити XML файли", "", "XML файли (*.xml)")
 
-        if not xml_path:
+        if not xml_paths:
             QMessageBox.warning(self, "Помилка", "Файл не вибрано.")
             return
 
+        if len(xml_paths) > 1:
+            self.open_xml_files_parallel(xml_paths)
+            return
+
+        xml_path = xml_paths[0]
+        backup_path, original_path = self._backup_paths_for(xml_path)
+        self._start_backup_task(xml_path, backup_path)
+
+        self.open_xml_file(xml_path, backup_path, original_path)
+
+    def _backup_paths_for(self, xml_path):
+        """Повертає (backup_path, original_path) для файлу з урахуванням мітки часу в імені."""
         dir_name = os.path.dirname(xml_path)
         file_basename, ext = os.path.splitext(os.path.basename(xml_path))
 
@@ -597,7 +823,6 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         match = re.match(timestamp_pattern, file_basename)
 
         now = datetime.now()
-        original_path = xml_path
 
         if match:
 
@@ -619,26 +844,169 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 dir_name, f"{file_basename}_{new_timestamp}{ext}")
             original_path = xml_path
 
+        return backup_path, original_path
+
+    def _start_backup_task(self, xml_path, backup_path):
+        """Запускає BackupTask для створення резервної копії файлу."""
         task_description = f"Створення резервної копії для {os.path.basename(xml_path)}"
         backup_task = BackupTask(xml_path, backup_path, task_description, self)
 
         self.running_tasks.append(backup_task)
         QgsApplication.taskManager().addTask(backup_task)  # Додаємо завдання до менеджера
 
-        self.open_xml_file(xml_path, backup_path, original_path)
+    def open_xml_files_parallel(self, xml_paths):
+        """
+        Відкриває кілька XML: розбір, площі, нумерація, близькі точки та XSD
+        виконуються у пулі процесів (open_pipeline.prepare_xml_in_worker),
+        а вкладки й групи шарів додаються в міру надходження результатів.
+        Якщо пул процесів недоступний, файли відкриваються через OpenXmlTask.
+        """
+        jobs = []
+        for xml_path in xml_paths:
+            backup_path, original_path = self._backup_paths_for(xml_path)
+            self._start_backup_task(xml_path, backup_path)
+            jobs.append((xml_path, backup_path, original_path))
+
+        executor = _worker_process_pool(min(len(jobs), os.cpu_count() or 1))
+        if executor is None:
+            for job in jobs:
+                self.open_xml_file(*job)
+            return
+
+        cache_dir = _open_cache_dir()
+        futures = {}
+        for xml_path, backup_path, original_path in jobs:
+            future = executor.submit(
+                prepare_xml_in_worker, xml_path, backup_path, original_path, xsd_path, cache_dir)
+            futures[future] = (xml_path, backup_path, original_path)
+
+        total = len(futures)
+        message_bar = self.iface.messageBar()
+        progress_message = message_bar.createMessage(
+            "XML-UA", f"Паралельне відкриття та перевірка {total} файлів...")
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, total)
+        progress_bar.setValue(0)
+        progress_bar.setMaximumWidth(220)
+        progress_message.layout().addWidget(progress_bar)
+        cancel_button = QPushButton("Скасувати")
+        progress_message.layout().addWidget(cancel_button)
+        message_bar.pushWidget(progress_message, Qgis.Info)
+
+        state = {"busy": False, "done": 0, "canceled": False, "finished": False}
+        poll_timer = QTimer(self)
+
+        def finish_batch():
+            if state["finished"]:
+                return
+            state["finished"] = True
+            poll_timer.stop()
+            poll_timer.deleteLater()
+            executor.shutdown(wait=False, cancel_futures=True)
+            try:
+                message_bar.popWidget(progress_message)
+            except Exception:
+                pass
+            log_calls(logFile, f"Паралельне відкриття завершено: {state['done']}/{total} файлів.")
+
+        def cancel_batch():
+            # Черга скасовується одразу; файли, що вже аналізуються у
+            # worker-процесах, зупиняються там, де це підтримує Python
+            # (terminate_workers, 3.14+), інакше доробляються у фоні, а
+            # їхні результати відкидаються.
+            state["canceled"] = True
+            futures.clear()
+            terminate_workers = getattr(executor, "terminate_workers", None)
+            if terminate_workers is not None:
+                try:
+                    terminate_workers()
+                except Exception:
+                    pass
+            finish_batch()
+            log_calls(logFile, "Паралельне відкриття XML скасовано.")
+
+        def poll_results():
+            if state["busy"] or state["finished"]:
+                return
+            state["busy"] = True
+            try:
+                for future in [f for f in futures if f.done()]:
+                    job = futures.pop(future, None)
+                    if job is None or future.cancelled() or state["canceled"]:
+                        continue
+                    try:
+                        prepared = attach_tree(future.result())
+                    except Exception as e:
+                        log_calls(logFile, f"Помилка фонового аналізу {job[0]}: {e}")
+                        if not state["canceled"]:
+                            self.open_xml_file(*job)
+                        continue
+                    state["done"] += 1
+                    progress_bar.setValue(state["done"])
+                    self._finish_open_xml_file(prepared)
+            finally:
+                state["busy"] = False
+            if not futures:
+                finish_batch()
+
+        cancel_button.clicked.connect(cancel_batch)
+        poll_timer.timeout.connect(poll_results)
+        poll_timer.start(100)
 
     def open_xml_file(self, xml_path, backup_path=None, original_path=None):
-        """Відкриває XML файл, створює вкладку та групу."""
+        """
+        Відкриває XML файл: розбір та перевірки виконуються у фоновому завданні
+        OpenXmlTask, вкладка та група шарів створюються після його завершення.
+        """
+        if self.plugin and getattr(self.plugin, "dev_reload_enabled", False):
+            try:
+                reload_analysis_modules()
+            except Exception as e:
+                log_calls(logFile, f"Помилка перезавантаження модулів аналізу: {e}")
+
+        task = OpenXmlTask(
+            xml_path,
+            backup_path,
+            original_path,
+            f"Відкриття {os.path.basename(xml_path)}",
+            self,
+            cache_dir=_open_cache_dir(),
+        )
+
+        message_bar = self.iface.messageBar()
+        progress_message = message_bar.createMessage(
+            "XML-UA",
+            f"Відкриття та перевірка {os.path.basename(xml_path)}..."
+        )
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 100)
+        progress_bar.setValue(0)
+        progress_bar.setMaximumWidth(220)
+        progress_message.layout().addWidget(progress_bar)
+        cancel_button = QPushButton("Скасувати")
+        cancel_button.clicked.connect(task.cancel)
+        progress_message.layout().addWidget(cancel_button)
+        message_bar.pushWidget(progress_message, Qgis.Info)
 
-        current_time = datetime.now().strftime("%H:%M:%S")
+        task.progress_message = progress_message
+        task.progressChanged.connect(
+            lambda value: progress_bar.setValue(int(value)))
 
-        if backup_path is None:
+        self.running_tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
 
-            pass
+    def _finish_open_xml_file(self, prepared):
+        """Створює вкладку, модель і шари для XML, підготовленого prepare_xml_cached."""
+
+        from decimal import Decimal
+
+        xml_path = prepared.xml_path
+        for message in prepared.log_messages:
+            log_calls(logFile, message)
 
         new_xml_data = xml_data(
-            path=xml_path, tree=None, group_name="", backup_path=backup_path)  # type: ignore
-        new_xml_data.original_path = original_path
+            path=xml_path, tree=None, group_name="", backup_path=prepared.backup_path)  # type: ignore
+        new_xml_data.original_path = prepared.original_path
         self.current_xml = new_xml_data
 
         new_tab = QWidget()
@@ -651,28 +1019,21 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         self.tabWidget.setCurrentIndex(index)
 
         self.current_xml.tree_view = tree_view  # type: ignore
+        tree_view.element_registry = self.current_xml.element_registry
         try:
             tree_view.dataChangedInTree.connect(self.on_tree_data_changed)
         except Exception:
             pass
 
-        self.load_data(xml_path, tree=None)  # type: ignore
+        self.load_data(xml_path, tree=prepared.tree)  # type: ignore
 
         was_decimal_normalized = False
         was_areas_fixed = False
         area_changed_on_open = False
-        try:
-            from decimal import Decimal
-            import importlib
-            from . import area_checks as _area_checks
-
-            _area_checks = importlib.reload(_area_checks)
-
-            result = _area_checks.run_area_checks_and_fix_tree(
-                xml_tree=self.current_xml.tree,
-                parcel_area_computer=self._compute_parcel_area_ha_from_tree,
-            )
-
+        result = prepared.area_result
+        if prepared.area_error is not None:
+            log_calls(logFile, f"Помилка перевірки площ/ком при відкритті XML: {prepared.area_error}")
+        elif result is not None:
             was_decimal_normalized = result.comma_hits_count > 0
             was_areas_fixed = result.parcel_area_fixed or result.lands_fixed > 0
             area_changed_on_open = was_areas_fixed or was_decimal_normalized
@@ -680,26 +1041,18 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             if area_changed_on_open:
                 self.current_xml.changed = True
                 self.current_xml.was_ever_changed = True
-                try:
-                    self.load_data(xml_path, tree=self.current_xml.tree)
-                except Exception:
-                    pass
 
-            report_path = ""
-            if result.any_issue:
-                try:
-                    report_text = _area_checks.build_area_err_report(xml_path=xml_path, result=result)
-                    report_path = _area_checks.write_area_err_report(xml_path=xml_path, report_text=report_text)
-                    log_calls(logFile, f"Створено звіт area_err: {report_path}")
-                except Exception as e:
-                    log_calls(logFile, f"Помилка створення звіту area_err: {e}")
-                    report_path = ""
-                    self.iface.messageBar().pushMessage(
-                        "XML-UA",
-                        f"Не вдалося створити звіт по площах: {e}",
-                        level=Qgis.Warning,
-                        duration=12,
-                    )
+            report_path = prepared.area_report_path
+            if report_path:
+                log_calls(logFile, f"Створено звіт area_err: {report_path}")
+            if prepared.area_report_error is not None:
+                log_calls(logFile, f"Помилка створення звіту area_err: {prepared.area_report_error}")
+                self.iface.messageBar().pushMessage(
+                    "XML-UA",
+                    f"Не вдалося створити звіт по площах: {prepared.area_report_error}",
+                    level=Qgis.Warning,
+                    duration=12,
+                )
 
             def _ensure_backup_exists():
                 try:
@@ -761,7 +1114,10 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                         body,
                     )
 
-            _show_area_err_dialog()
+            try:
+                _show_area_err_dialog()
+            except Exception as e:
+                log_calls(logFile, f"Помилка перевірки площ/ком при відкритті XML: {e}")
 
             if report_path:
                 self.iface.messageBar().pushMessage(
@@ -770,12 +1126,8 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                     level=Qgis.Info,
                     duration=10,
                 )
-        except Exception as e:
-            log_calls(logFile, f"Помилка перевірки площ/ком при відкритті XML: {e}")
 
-        removed_object_ids = self._remove_object_id_attributes_from_tree(
-            self.current_xml.tree
-        )
+        removed_object_ids = prepared.removed_object_ids
         was_object_ids_cleaned = removed_object_ids > 0
         if was_object_ids_cleaned:
             log_calls(
@@ -789,194 +1141,77 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 duration=7
             )
 
-            self.load_data(xml_path, tree=self.current_xml.tree)
-
-        was_reordered = False
-        parcel_info_element = self.current_xml.tree.find('.//ParcelInfo')
-        if parcel_info_element is not None:
-            from .common import sort_children_in_parcel_info
-            was_reordered = sort_children_in_parcel_info(parcel_info_element)
-            if was_reordered:
-                log_calls(
-                    logFile, "Порядок елементів у ParcelInfo було виправлено згідно зі схемою XSD.")
-
-                self.mark_as_changed()
+        was_reordered = prepared.was_reordered
+        if was_reordered:
+            log_calls(
+                logFile, "Порядок елементів у ParcelInfo було виправлено згідно зі схемою XSD.")
 
-                QMessageBox.information(
-                    self,
-                    "Автоматичне виправлення",
-                    "Порядок елементів у файлі було автоматично виправлено для відповідності схемі XSD.\n\n"
-                    "Будь ласка, збережіть файл, щоб застосувати зміни."
-                )
+            self.mark_as_changed()
 
-        was_renumbered = False
-        try:
-            from .topology import GeometryProcessor
-            from .numbering_report import (
-                snapshot_geometry_numbering,
-                build_geometry_numbering_report,
-                write_numbering_report,
+            QMessageBox.information(
+                self,
+                "Автоматичне виправлення",
+                "Порядок елементів у файлі було автоматично виправлено для відповідності схемі XSD.\n\n"
+                "Будь ласка, збережіть файл, щоб застосувати зміни."
             )
 
-            before_numbering = snapshot_geometry_numbering(self.current_xml.tree)
-            processor = GeometryProcessor(self.current_xml.tree)
-            was_renumbered = processor.cleanup_and_renumber_geometry()
-            if was_renumbered:
-                log_calls(
-                    logFile, "Порушення послідовності нумерації геометрії було виправлено.")
-                self.mark_as_changed()
-
-                try:
-                    after_numbering = snapshot_geometry_numbering(self.current_xml.tree)
-                    report_text = build_geometry_numbering_report(
-                        xml_path=xml_path,
-                        before=before_numbering,
-                        after=after_numbering,
-                    )
-                    report_path = write_numbering_report(
-                        xml_path=xml_path,
-                        report_text=report_text,
-                    )
-                    log_calls(
-                        logFile,
-                        f"Створено звіт про нумерацію вузлів/ліній: {report_path}"
-                    )
-                except Exception as e:
-                    log_calls(
-                        logFile,
-                        f"Помилка створення звіту про нумерацію: {e}"
-                    )
-        except Exception as e:
+        was_renumbered = prepared.was_renumbered
+        if prepared.renumber_error is not None:
             log_calls(
-                logFile, f"Помилка під час перевірки та перенумерації геометрії: {e}")
+                logFile, f"Помилка під час перевірки та перенумерації геометрії: {prepared.renumber_error}")
             QMessageBox.warning(
                 self,
                 "Помилка перенумерації",
-                f"Під час автоматичного виправлення нумерації геометрії сталася помилка:\n\n{e}"
-            )
-
-        try:
-            points = self.current_xml.tree.findall(".//PointInfo/Point")
-            pn_values = []
-            empty_pn = 0
-            for p in points:
-                pn_text = p.findtext("PN")
-                if pn_text is None or not str(pn_text).strip():
-                    empty_pn += 1
-                else:
-                    pn_values.append(str(pn_text).strip())
-
-            counts = {}
-            for pn in pn_values:
-                counts[pn] = counts.get(pn, 0) + 1
-            duplicate_pn = [pn for pn, c in counts.items() if c > 1]
-
-            if empty_pn > 0 or duplicate_pn:
-                self.iface.messageBar().pushMessage(
-                    "XML-UA",
-                    f"PN: порожніх={empty_pn}, неунікальних={len(duplicate_pn)} (це не критично).",
-                    level=Qgis.Warning,
-                    duration=10,
-                )
-        except Exception as e:
-            log_calls(logFile, f"Помилка перевірки PN при відкритті XML: {e}")
-
-        try:
-            from .proximity_checks import (
-                run_proximity_checks,
-                build_proximity_report,
-                write_proximity_report,
+                f"Під час автоматичного виправлення нумерації геометрії сталася помилка:\n\n{prepared.renumber_error}"
             )
+        elif was_renumbered:
+            log_calls(
+                logFile, "Порушення послідовності нумерації геометрії було виправлено.")
+            self.mark_as_changed()
 
-            message_bar = self.iface.messageBar()
-            progress_message = message_bar.createMessage(
+        if prepared.empty_pn > 0 or prepared.duplicate_pn:
+            self.iface.messageBar().pushMessage(
                 "XML-UA",
-                "Перевірка близьких і створних точок..."
-            )
-            progress_bar = QProgressBar()
-            progress_bar.setRange(0, 100)
-            progress_bar.setValue(0)
-            progress_bar.setMaximumWidth(220)
-            progress_message.layout().addWidget(progress_bar)
-            message_bar.pushWidget(progress_message, Qgis.Info)
-
-            simulated_progress = {"value": 0}
-            simulated_timer = QTimer(self)
-
-            def tick_progress():
-                if simulated_progress["value"] < 95:
-                    simulated_progress["value"] += 1
-                    progress_bar.setValue(simulated_progress["value"])
-
-            simulated_timer.timeout.connect(tick_progress)
-            simulated_timer.start(120)
-
-            def set_progress(value: int):
-                clamped = max(0, min(100, int(value)))
-                if clamped > simulated_progress["value"]:
-                    simulated_progress["value"] = clamped
-                progress_bar.setValue(simulated_progress["value"])
-                QApplication.processEvents()
-
-            result = run_proximity_checks(
-                xml_tree=self.current_xml.tree,
-                threshold_m=0.3,
-                progress=set_progress,
+                f"PN: порожніх={prepared.empty_pn}, неунікальних={len(prepared.duplicate_pn)} (це не критично).",
+                level=Qgis.Warning,
+                duration=10,
             )
 
-            set_progress(100)
-            simulated_timer.stop()
-            message_bar.popWidget(progress_message)
-
-            try:
-                report_text = build_proximity_report(xml_path=xml_path, result=result)
-                report_path = write_proximity_report(xml_path=xml_path, report_text=report_text)
-                log_calls(logFile, f"Створено звіт proximity: {report_path}")
-            except Exception as e:
-                log_calls(logFile, f"Помилка створення звіту proximity: {e}")
-                report_path = ""
-
-            close_cnt = len(result.close_hits)
-            collinear_cnt = len(result.near_line_hits)
+        if prepared.xsd_errors:
             log_calls(
-                logFile,
-                f"Перевірка близьких/створних точок завершена за {result.elapsed_sec:.2f}с: "
-                f"близьких={close_cnt}, створних={collinear_cnt} (поріг {result.threshold_m}м)."
+                logFile, f"XSD: {len(prepared.xsd_errors)} помилок у {os.path.basename(xml_path)}")
+            self.iface.messageBar().pushMessage(
+                "XML-UA",
+                f"{os.path.basename(xml_path)}: помилок XSD {len(prepared.xsd_errors)}. Деталі — «Перевірити».",
+                level=Qgis.Warning,
+                duration=10,
             )
 
-            if close_cnt or collinear_cnt:
-                close_preview = ", ".join(h.uidp for h in result.close_hits[:20])
-                collinear_preview = ", ".join(h.uidp for h in result.near_line_hits[:20])
-                details = []
-                if close_cnt:
-                    details.append(
-                        f"близькі={close_cnt}" + (f" (UIDP: {close_preview}{' …' if close_cnt > 20 else ''})" if close_preview else "")
-                    )
-                if collinear_cnt:
-                    details.append(
-                        f"створні={collinear_cnt}" + (f" (UIDP: {collinear_preview}{' …' if collinear_cnt > 20 else ''})" if collinear_preview else "")
-                    )
-                self.iface.messageBar().pushMessage(
-                    "XML-UA",
-                    "Проблемні точки: " + "; ".join(details) + (f". Звіт: {os.path.basename(report_path)}" if report_path else ""),
-                    level=Qgis.Warning,
-                    duration=10,
-                )
-            else:
-                self.iface.messageBar().pushMessage(
-                    "XML-UA",
-                    "Перевірка близьких/створних точок: проблем не знайдено." + (f" Звіт: {os.path.basename(report_path)}" if report_path else ""),
-                    level=Qgis.Success,
-                    duration=5,
-                )
-        except Exception as e:
-            log_calls(logFile, f"Помилка перевірки близьких/створних точок при відкритті XML: {e}")
+        if prepared.proximity_error is not None:
+            log_calls(logFile, f"Помилка перевірки близьких/створних точок при відкритті XML: {prepared.proximity_error}")
+        elif prepared.proximity_result is not None:
+            self._report_proximity_on_open(prepared.proximity_result, prepared.proximity_report_path)
+
+        if prepared.topology_error is not None:
+            log_calls(logFile, f"Помилка топологічної перевірки при відкритті XML: {prepared.topology_error}")
+        elif prepared.topology_result is not None:
+            self._report_topology_on_open(prepared.topology_result, prepared.topology_report_path)
 
         self.layers_obj = xmlUaLayers(xml_path, self.current_xml.tree, plugin=self.plugin,
                                       xml_data=self.current_xml, context="open")  # Pass self.plugin
         self.current_xml.group_name = self.layers_obj.group.name()
         self.current_xml.layers_obj = self.layers_obj  # type: ignore
 
+        if (
+            prepared.topology_result is not None
+            and prepared.topology_result.issues
+            and getattr(self.plugin, "topology_layer_enabled", False)
+        ):
+            try:
+                add_topology_layer(self.layers_obj.group, self.layers_obj.crsEpsg, prepared.topology_result)
+            except Exception as e:
+                log_calls(logFile, f"Помилка створення шару топологічних помилок: {e}")
+
         self.tabWidget.setTabText(index, self.current_xml.group_name)
         self.tabWidget.setTabToolTip(index, xml_path)
 
@@ -993,6 +1228,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         self.update_tab_save_button_state(
             index, is_enabled=(was_object_ids_cleaned or was_reordered or was_renumbered or was_decimal_normalized or was_areas_fixed))
         self.opened_xmls.append(self.current_xml)
+        self.layer_registry.add_document(self.current_xml)
 
         self.update_all_actions_state(is_file_open=True)  # type: ignore
         self.update_changed_actions_state(
@@ -1002,6 +1238,71 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         QTimer.singleShot(0, tree_view.expand_initial_elements)
 
+    def _report_proximity_on_open(self, result, report_path):
+        """Показує підсумок перевірки близьких/створних точок у панелі повідомлень."""
+        close_cnt = len(result.close_hits)
+        collinear_cnt = len(result.near_line_hits)
+        log_calls(
+            logFile,
+            f"Перевірка близьких/створних точок завершена за {result.elapsed_sec:.2f}с: "
+            f"близьких={close_cnt}, створних={collinear_cnt} (поріг {result.threshold_m}м)."
+        )
+
+        if close_cnt or collinear_cnt:
+            close_preview = ", ".join(h.uidp for h in result.close_hits[:20])
+            collinear_preview = ", ".join(h.uidp for h in result.near_line_hits[:20])
+            details = []
+            if close_cnt:
+                details.append(
+                    f"близькі={close_cnt}" + (f" (UIDP: {close_preview}{' …' if close_cnt > 20 else ''})" if close_preview else "")
+                )
+            if collinear_cnt:
+                details.append(
+                    f"створні={collinear_cnt}" + (f" (UIDP: {collinear_preview}{' …' if collinear_cnt > 20 else ''})" if collinear_preview else "")
+                )
+            self.iface.messageBar().pushMessage(
+                "XML-UA",
+                "Проблемні точки: " + "; ".join(details) + (f". Звіт: {os.path.basename(report_path)}" if report_path else ""),
+                level=Qgis.Warning,
+                duration=10,
+            )
+        else:
+            self.iface.messageBar().pushMessage(
+                "XML-UA",
+                "Перевірка близьких/створних точок: проблем не знайдено." + (f" Звіт: {os.path.basename(report_path)}" if report_path else ""),
+                level=Qgis.Success,
+                duration=5,
+            )
+
+    def _report_topology_on_open(self, result, report_path):
+        """Показує підсумок топологічної перевірки у панелі повідомлень."""
+        counts = {kind: len(result.issues_of(kind)) for kind in ISSUE_TITLES}
+        log_calls(
+            logFile,
+            f"Топологічна перевірка завершена за {result.elapsed_sec:.2f}с: "
+            f"полігонів={result.objects_total}, ребер={result.edges_total}, "
+            + ", ".join(f"{kind}={cnt}" for kind, cnt in counts.items())
+        )
+        if not result.issues:
+            return
+
+        details = []
+        for kind, cnt in counts.items():
+            if not cnt:
+                continue
+            refs = [ref for issue in result.issues_of(kind) for ref in (issue.ulids or issue.uidps)]
+            refs = list(dict.fromkeys(refs))
+            preview = ", ".join(refs[:20])
+            details.append(
+                f"{ISSUE_TITLES[kind].lower()}={cnt}" + (f" ({preview}{' …' if len(refs) > 20 else ''})" if preview else "")
+            )
+        self.iface.messageBar().pushMessage(
+            "XML-UA",
+            "Топологія: " + "; ".join(details) + (f". Звіт: {os.path.basename(report_path)}" if report_path else ""),
+            level=Qgis.Warning,
+            duration=10,
+        )
+
     def show_parcel_area_info(self):
         """Обчислює та показує інформацію про площу ділянки та вузли."""
         if not self.current_xml or self.current_xml.tree is None:
@@ -1125,6 +1426,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         self.tabWidget.setCurrentIndex(index)
 
         self.current_xml.tree_view = tree_view
+        tree_view.element_registry = self.current_xml.element_registry
         try:
             tree_view.dataChangedInTree.connect(self.on_tree_data_changed)
         except Exception:
@@ -1144,6 +1446,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         self.update_tab_save_button_state(index, is_enabled=False)
         self.opened_xmls.append(self.current_xml)
+        self.layer_registry.add_document(self.current_xml)
 
         self.current_xml.path = xml_path
         self.update_all_actions_state(is_file_open=True)
@@ -1204,6 +1507,9 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         """
         Позначає поточний XML-файл як змінений і оновлює заголовок вікна.
         """
+        if self.current_xml:
+            self.current_xml.journal.note_change()
+
         if self.current_xml and not self.current_xml.changed:
 
             self.current_xml.changed = True
@@ -1253,14 +1559,15 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         if reply == QMessageBox.Yes:
 
+            save_original = bool(
+                xml_to_save.original_path and xml_to_save.original_path != xml_to_save.path)
             xml_to_save.tree_view.save_xml_tree(
-                xml_to_save.tree, xml_to_save.path)
+                xml_to_save.tree, xml_to_save.path,
+                *((xml_to_save.original_path,) if save_original else ()))
             log_calls(
                 logFile, f"Файл, що редагується, збережено: {xml_to_save.path}")
 
-            if xml_to_save.original_path and xml_to_save.original_path != xml_to_save.path:
-                xml_to_save.tree_view.save_xml_tree(
-                    xml_to_save.tree, xml_to_save.original_path)
+            if save_original:
                 log_calls(
                     logFile, f"Оригінальний файл оновлено: {xml_to_save.original_path}")
                 self.iface.messageBar().pushMessage("Диск:",
@@ -1270,15 +1577,13 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                     "Диск:", f"Файл збережено: {xml_to_save.path}", level=Qgis.Success, duration=5)
 
             xml_to_save.changed = False
+            xml_to_save.journal.checkpoint()
 
             if self.update_tab_style_by_group_name(xml_to_save.group_name, is_changed=False) and xml_to_save == self.current_xml:
                 self.update_changed_actions_state(is_changed=False)
             self.update_window_title(xml_to_save.path)
 
-            try:
-                self.recreate_layers_for_xml_data(xml_to_save)
-            except Exception as e:
-                log_calls(logFile, f"Помилка перестворення шарів після збереження: {e}")
+            self.refresh_layers_after_save(xml_to_save)
         else:
             log_calls(logFile, "Збереження скасовано користувачем.")
 
@@ -1447,6 +1752,10 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                     tab_index_to_remove = i
                     break
 
+            self.layer_registry.remove_document(xml_to_close)
+            deferred = getattr(getattr(xml_to_close, "layers_obj", None), "deferred", None)
+            if deferred is not None:
+                deferred.discard()
             if xml_to_close in self.opened_xmls:
                 self.opened_xmls.remove(xml_to_close)
                 log_calls(
@@ -1705,11 +2014,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         log_calls(
             logFile, f"Запит на видалення розділу XML для шару: '{layer_name}'.")
 
-        xml_data = None
-        for data in self.opened_xmls:
-            if data.group_name == group_name:
-                xml_data = data
-                break
+        xml_data = self.get_xml_data_for_group(group_name)
         if not xml_data:
             log_calls(
                 logFile, f"Не знайдено відповідний xml_data для групи '{group_name}'.")
@@ -1917,6 +2222,42 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         if self.plugin:
             self.plugin.action_save_tool.setEnabled(is_changed)
             self.plugin.action_restore_backup.setEnabled(is_changed)
+            journal = getattr(self.current_xml, "journal", None)
+            self.plugin.action_undo_tool.setEnabled(bool(journal and journal.can_undo))
+            self.plugin.action_redo_tool.setEnabled(bool(journal and journal.can_redo))
+
+    def undo_xml_edit(self):
+        """Скасовує останній крок журналу змін активного XML."""
+        self._apply_journal_step(undo=True)
+
+    def redo_xml_edit(self):
+        """Повторює останній скасований крок журналу змін активного XML."""
+        self._apply_journal_step(undo=False)
+
+    def _apply_journal_step(self, undo):
+        xml_data = self.current_xml
+        if not xml_data:
+            return
+
+        journal = xml_data.journal
+        label = journal.undo() if undo else journal.redo()
+        if label is None:
+            return
+
+        log_calls(logFile, f"{'Скасовано' if undo else 'Повторено'} крок журналу: '{label}'.")
+
+        self.redraw_layers(xml_data)
+        xml_data.tree_view.rebuild_tree_view()
+
+        if journal.is_dirty:
+            self.mark_xml_data_as_changed(xml_data)
+        else:
+            xml_data.changed = False
+            self.update_tab_style_by_group_name(xml_data.group_name, is_changed=False)
+            self.update_changed_actions_state(is_changed=False)
+
+        self.iface.messageBar().pushMessage(
+            "Журнал змін", f"{'Скасовано' if undo else 'Повторено'}: {label}", level=Qgis.Info, duration=3)
 
     def update_all_actions_state(self, is_file_open):
         """Оновлює стан дій, які залежать від того, чи відкритий файл."""
@@ -2052,12 +2393,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         if index < 0 or index >= self.tabWidget.count():
             return None
 
-        tab_name = self.tabWidget.tabText(index)
-
-        for xml_data in self.opened_xmls:
-            if xml_data.group_name == tab_name:
-                return xml_data
-        return None
+        return self.get_xml_data_for_group(self.tabWidget.tabText(index))
 
     def validate_xml_structure(self, xml_path):
 
@@ -2143,13 +2479,13 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 notify=True
             )
 
+            save_original = bool(
+                xml_to_save.original_path and xml_to_save.original_path != xml_to_save.path)
             xml_to_save.tree_view.save_xml_tree(
-                xml_to_save.tree, xml_to_save.path)
-
-            if xml_to_save.original_path and xml_to_save.original_path != xml_to_save.path:
-                xml_to_save.tree_view.save_xml_tree(
-                    xml_to_save.tree, xml_to_save.original_path)
+                xml_to_save.tree, xml_to_save.path,
+                *((xml_to_save.original_path,) if save_original else ()))
 
+            if save_original:
                 self.iface.messageBar().pushMessage("Диск:",
                                                     f"Файли '{os.path.basename(xml_to_save.original_path)}' та '{os.path.basename(xml_to_save.path)}' збережено.", level=Qgis.Success, duration=5)
             else:
@@ -2157,16 +2493,14 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                     "Диск:", f"Файл збережено: {xml_to_save.path}", level=Qgis.Success, duration=5)
 
             xml_to_save.changed = False
+            xml_to_save.journal.checkpoint()
 
             if self.update_tab_style_by_group_name(xml_to_save.group_name, is_changed=False):
                 if xml_to_save == self.current_xml:
                     self.update_changed_actions_state(is_changed=False)
             self.update_window_title(xml_to_save.path)
 
-            try:
-                self.recreate_layers_for_xml_data(xml_to_save)
-            except Exception as e:
-                log_calls(logFile, f"Помилка перестворення шарів після збереження: {e}")
+            self.refresh_layers_after_save(xml_to_save)
         except Exception as e:
             log_calls(
                 logFile, f"Помилка при збереженні файлу '{xml_to_save.path}': {e}")
@@ -2259,6 +2593,11 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         if model is None:
             return QModelIndex()
 
+        registry = getattr(tree_view, "element_registry", None)
+        item = registry.item_for(xml_element) if registry is not None else None
+        if item is not None:
+            return item.index()
+
         def _walk(parent_item):
             for row in range(parent_item.rowCount()):
                 item = parent_item.child(row, 0)
@@ -2306,27 +2645,21 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         layer_name = layer.name()
 
-        if layer_name == "Вузли":
-            uidp = str(feature.attribute("UIDP") or "").strip()
-            if not uidp:
-                return None
-            for point in tree.findall(".//PointInfo/Point"):
-                if str(point.findtext("UIDP", "")).strip() == uidp:
-                    return point
-            return None
+        # Ключ об'єкта (UIDP, ULID або object_id) -> елемент через реєстр документа.
+        key = None
+        key_field = key_field_for_layer(layer)
+        if layer.fields().indexFromName(key_field) != -1:
+            key = feature.attribute(key_field)
+            if key is None or (hasattr(key, "isNull") and key.isNull()):
+                key = None
+        if key is not None or layer_name in ("Кадастрова зона", "Ділянка"):
+            xml_element = xml_data_obj.element_registry.element_for(tree, layer_name, key)
+            if xml_element is not None or layer_name in ("Вузли", "Полілінії"):
+                return xml_element
 
-        if layer_name == "Полілінії":
-            ulid = str(feature.attribute("ULID") or "").strip()
-            if not ulid:
-                return None
-            for pl in tree.findall(".//Polyline/PL"):
-                if str(pl.findtext("ULID", "")).strip() == ulid:
-                    return pl
+        if layer_name in ("Вузли", "Полілінії"):
             return None
 
-        if layer_name == "Кадастрова зона":
-            return tree.find(".//CadastralZoneInfo")
-
         if layer_name == "Кадастровий квартал":
             shape_target = str(feature.attribute("object_shape") or "").strip()
             if not shape_target:
@@ -2413,6 +2746,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         if not xml_data_obj:
             return
 
+        xml_data_obj.journal.note_change()
         xml_data_obj.changed = True
         xml_data_obj.was_ever_changed = True
         self.update_tab_style_by_group_name(xml_data_obj.group_name, is_changed=True)
@@ -2422,12 +2756,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
     def get_xml_data_for_group(self, group_name):
         """Знаходить об'єкт xml_data за іменем групи."""
-        if not self.opened_xmls:
-            return None
-        for xml_data_obj in self.opened_xmls:
-            if xml_data_obj.group_name == group_name:
-                return xml_data_obj
-        return None
+        return self.layer_registry.document_for_group(group_name)
 
     def update_xml_from_geometry_change(self, layer, feature_id):
         """
@@ -2470,14 +2799,17 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             log_calls(logFile, f"Точка з UIDP '{uidp}' не знайдена в XML.")
             return
 
-        point_element.find("X").text = f"{point_geom.y():.3f}"
-        point_element.find("Y").text = f"{point_geom.x():.3f}"
-        log_calls(
-            logFile, f"Оновлено координати для точки UIDP='{uidp}' в XML.")
+        journal = xml_data.journal
+        first_edit = not journal.has_changes
+        with journal.step(f"Переміщення вузла {uidp}"):
+            journal.set_text(point_element.find("X"), f"{point_geom.y():.3f}")
+            journal.set_text(point_element.find("Y"), f"{point_geom.x():.3f}")
+            log_calls(
+                logFile, f"Оновлено координати для точки UIDP='{uidp}' в XML.")
 
-        self.recalculate_line_lengths(tree, uidp)
+            self.recalculate_line_lengths(tree, uidp, journal=journal)
 
-        self.recalculate_parcel_area(tree)
+            self.recalculate_parcel_area(tree, xml_data_obj=xml_data)
 
         xml_data.tree_view.update_view_from_tree()
 
@@ -2487,16 +2819,13 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         except Exception:
             pass
 
-        if not hasattr(xml_data, 'temp_tree_state') or xml_data.temp_tree_state is None:
+        if first_edit:
 
             self.iface.messageBar().pushMessage(
                 "Інформація", f"Вузол '{uidp}' було переміщено. Збережіть зміни, щоб оновити XML та шари.",
                 level=Qgis.Info, duration=5
             )
 
-            original_tree = etree.parse(xml_data.path)
-            xml_data.temp_tree_state = original_tree
-
     def handle_committed_features_added(self, layer, added_features):
         """
         Обробляє додавання об'єктів після commit.
@@ -2841,137 +3170,139 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 self, "Помилка", "Вибраний об'єкт не є полігоном.")
             return
 
+        journal = self.current_xml.journal
+        first_edit = not journal.has_changes
         tree = self.current_xml.tree
-        processor = GeometryProcessor(tree)
-        try:
-            externals_element, new_points, new_polylines, object_shape = processor.process_new_geometry(geom)  # noqa
-        except ValueError as e:
-            QMessageBox.critical(self, "Критична помилка топології", str(e))
-            return
-
-        log_calls(logFile, f"Додавання угіддя: '{object_shape}'")
-
-        layers_root = QgsProject.instance().layerTreeRoot()
-        group = layers_root.findGroup(self.current_xml.group_name)
-        if not group:
-            log_calls(
-                logFile, f"Група '{self.current_xml.group_name}' не знайдена.")
-            return
-        else:
-            log_calls(
-                logFile, f"Група '{self.current_xml.group_name}' знайдена.")
+        with journal.step("Додавання угіддя"):
+            processor = GeometryProcessor(tree, journal=journal)
+            try:
+                externals_element, new_points, new_polylines, object_shape = processor.process_new_geometry(geom)  # noqa
+            except ValueError as e:
+                QMessageBox.critical(self, "Критична помилка топології", str(e))
+                return
 
-        layer_name = "Угіддя"
-        lands_layer = None
-        for child in group.children():
-            if isinstance(child, QgsLayerTreeLayer) and child.name() == layer_name:
-                lands_layer = child.layer()
-                break
+            log_calls(logFile, f"Додавання угіддя: '{object_shape}'")
 
-        if lands_layer is None:
-            log_calls(
-                logFile, f"Шар '{layer_name}' не знайдено. Створюємо новий шар.")
-            lands_layer = QgsVectorLayer(
-                f"MultiPolygon?crs={self.iface.mapCanvas().mapSettings().destinationCrs().authid()}", layer_name, "memory")
-            lands_layer.loadNamedStyle(os.path.join(
-                os.path.dirname(__file__), "templates", "lands_parcel.qml"))
-            provider = lands_layer.dataProvider()
-            ensure_object_layer_fields(lands_layer)
-            QgsProject.instance().addMapLayer(lands_layer, False)
-            group.insertChildNode(0, QgsLayerTreeLayer(lands_layer))
-            log_calls(
-                logFile, f"Створено новий шар '{layer_name}' у групі '{group.name()}'.")
+            layers_root = QgsProject.instance().layerTreeRoot()
+            group = layers_root.findGroup(self.current_xml.group_name)
+            if not group:
+                log_calls(
+                    logFile, f"Група '{self.current_xml.group_name}' не знайдена.")
+                return
+            else:
+                log_calls(
+                    logFile, f"Група '{self.current_xml.group_name}' знайдена.")
 
-        new_feature = QgsFeature(lands_layer.fields())
-        new_feature.setGeometry(geom)
+            layer_name = "Угіддя"
+            lands_layer = None
+            for child in group.children():
+                if isinstance(child, QgsLayerTreeLayer) and child.name() == layer_name:
+                    lands_layer = child.layer()
+                    break
 
-        land_code_delegate = self.current_xml.tree_view.land_code_delegate
-        land_code_items = land_code_delegate.items
+            if lands_layer is None:
+                log_calls(
+                    logFile, f"Шар '{layer_name}' не знайдено. Створюємо новий шар.")
+                lands_layer = QgsVectorLayer(
+                    f"MultiPolygon?crs={self.iface.mapCanvas().mapSettings().destinationCrs().authid()}", layer_name, "memory")
+                load_named_style(lands_layer, os.path.join(
+                    os.path.dirname(__file__), "templates", "lands_parcel.qml"))
+                provider = lands_layer.dataProvider()
+                ensure_object_layer_fields(lands_layer)
+                QgsProject.instance().addMapLayer(lands_layer, False)
+                group.insertChildNode(0, QgsLayerTreeLayer(lands_layer))
+                log_calls(
+                    logFile, f"Створено новий шар '{layer_name}' у групі '{group.name()}'.")
 
-        land_code_selection, ok = QInputDialog.getItem(self, "Вибір коду угіддя",
-                                                       "Виберіть код угіддя:", land_code_items, 0, False)
+            new_feature = QgsFeature(lands_layer.fields())
+            new_feature.setGeometry(geom)
 
-        if not ok or not land_code_selection:
-            log_calls(logFile, "Додавання угіддя скасовано користувачем.")
-            return
+            land_code_delegate = self.current_xml.tree_view.land_code_delegate
+            land_code_items = land_code_delegate.items
 
-        land_code = land_code_delegate.reverse_land_codes.get(
-            land_code_selection)  # type: ignore
-        if not land_code:
-            log_calls(
-                logFile, f"Не вдалося отримати код для '{land_code_selection}'.")
-            return
+            land_code_selection, ok = QInputDialog.getItem(self, "Вибір коду угіддя",
+                                                           "Виберіть код угіддя:", land_code_items, 0, False)
 
-        size_ha = geom.area() / 10000.0
-        new_feature.setAttributes([None, object_shape])
+            if not ok or not land_code_selection:
+                log_calls(logFile, "Додавання угіддя скасовано користувачем.")
+                return
 
-        for si in self.current_xml.shapes:
-            if si.layer_id == lands_layer.id() and si.object_shape == object_shape:
-                QMessageBox.warning(
-                    self, "Помилка додавання", f"Угіддя з такою геометрією вже існує.\nShape: {object_shape}")
+            land_code = land_code_delegate.reverse_land_codes.get(
+                land_code_selection)  # type: ignore
+            if not land_code:
                 log_calls(
-                    logFile, f"Спроба додати дублікат угіддя з object_shape: {object_shape}")
+                    logFile, f"Не вдалося отримати код для '{land_code_selection}'.")
                 return
 
-        root = tree.getroot()
-        parcel_info_element = root.find(".//ParcelInfo")
-        if parcel_info_element is None:
-            QMessageBox.critical(self, "Критична помилка",
-                                 "Не знайдено елемент ParcelInfo в XML.")
-            return
-
-        lands_parcel_element = parcel_info_element.find("LandsParcel")
-        if lands_parcel_element is None:
-            log_calls(logFile, "Розділ 'LandsParcel' відсутній. Створюємо новий.")
-            lands_parcel_element = etree.SubElement(
-                parcel_info_element, "LandsParcel")
-
-        land_parcel_info = etree.SubElement(
-            lands_parcel_element, "LandParcelInfo")
+            size_ha = geom.area() / 10000.0
+            set_object_attributes(new_feature, None, object_shape)
 
-        object_id = next_object_id_in_container(lands_parcel_element, "LandParcelInfo")
-        land_parcel_info.set("object_id", object_id)
-        new_feature.setAttributes([int(object_id), object_shape])
-
-        etree.SubElement(land_parcel_info, "LandCode").text = land_code
-        metric_info = etree.SubElement(land_parcel_info, "MetricInfo")
-        area = etree.SubElement(metric_info, "Area")
-        etree.SubElement(area, "Size").text = f"{size_ha:.4f}"
-        etree.SubElement(area, "MeasurementUnit").text = "га"
+            for si in self.current_xml.shapes:
+                if si.layer_id == lands_layer.id() and si.object_shape == object_shape:
+                    QMessageBox.warning(
+                        self, "Помилка додавання", f"Угіддя з такою геометрією вже існує.\nShape: {object_shape}")
+                    log_calls(
+                        logFile, f"Спроба додати дублікат угіддя з object_shape: {object_shape}")
+                    return
 
-        if externals_element is not None:
-            metric_info.append(externals_element)
-            log_calls(logFile, f"Додано '{object_shape}' до метрики в XML.")
+            root = tree.getroot()
+            parcel_info_element = root.find(".//ParcelInfo")
+            if parcel_info_element is None:
+                QMessageBox.critical(self, "Критична помилка",
+                                     "Не знайдено елемент ParcelInfo в XML.")
+                return
 
-        lands_layer.startEditing()
-        lands_layer.addFeature(new_feature)
-        lands_layer.commitChanges()
+            lands_parcel_element = parcel_info_element.find("LandsParcel")
+            if lands_parcel_element is None:
+                log_calls(logFile, "Розділ 'LandsParcel' відсутній. Створюємо новий.")
+                lands_parcel_element = etree.SubElement(
+                    parcel_info_element, "LandsParcel")
+                journal.record_insert(lands_parcel_element)
+
+            land_parcel_info = etree.SubElement(
+                lands_parcel_element, "LandParcelInfo")
+            journal.record_insert(land_parcel_info)
+
+            object_id = next_object_id_in_container(lands_parcel_element, "LandParcelInfo")
+            land_parcel_info.set("object_id", object_id)
+            set_object_attributes(new_feature, int(object_id), object_shape)
+
+            etree.SubElement(land_parcel_info, "LandCode").text = land_code
+            metric_info = etree.SubElement(land_parcel_info, "MetricInfo")
+            area = etree.SubElement(metric_info, "Area")
+            etree.SubElement(area, "Size").text = f"{size_ha:.4f}"
+            etree.SubElement(area, "MeasurementUnit").text = "га"
+
+            if externals_element is not None:
+                metric_info.append(externals_element)
+                log_calls(logFile, f"Додано '{object_shape}' до метрики в XML.")
+
+            lands_layer.startEditing()
+            lands_layer.addFeature(new_feature)
+            lands_layer.commitChanges()
+
+            shape_info = ShapeInfo(lands_layer.id(), object_id, object_shape)
+            self.current_xml.shapes.append(shape_info)
+            log_calls(
+                logFile, f"Додано новий об'єкт до shapes: LID:{shape_info.layer_id}, OID:{shape_info.object_id}")
 
-        shape_info = ShapeInfo(lands_layer.id(), object_id, object_shape)
-        self.current_xml.shapes.append(shape_info)
-        log_calls(
-            logFile, f"Додано новий об'єкт до shapes: LID:{shape_info.layer_id}, OID:{shape_info.object_id}")
+            self.current_xml.tree_view.rebuild_tree_view()
+            self.mark_as_changed()
 
-        self.current_xml.tree_view.rebuild_tree_view()
-        self.mark_as_changed()
+            self.redraw_current_group()
 
-        self.redraw_current_group()
-
-        processor = GeometryProcessor(self.current_xml.tree)
-        if processor.cleanup_and_renumber_geometry():
-            log_calls(
-                logFile, "Геометрію було перенумеровано після додавання угіддя.")
+            processor = GeometryProcessor(self.current_xml.tree, journal=journal)
+            if processor.cleanup_and_renumber_geometry():
+                log_calls(
+                    logFile, "Геометрію було перенумеровано після додавання угіддя.")
 
-        if not hasattr(self.current_xml, 'temp_tree_state') or self.current_xml.temp_tree_state is None:
+        if first_edit:
 
             self.iface.messageBar().pushMessage(
                 "Інформація", f"Угіддя з кодом '{land_code}' було додано. Збережіть зміни, щоб оновити XML та шари.",
                 level=Qgis.Info, duration=25
             )
 
-            original_tree = etree.parse(self.current_xml.path)
-            self.current_xml.temp_tree_state = original_tree
-
     def add_lease(self):
         """
         Додає оренду з виділеного полігону до активного XML-файлу.
@@ -3206,8 +3537,8 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             - Викликає `redraw_pickets_layer()` та `redraw_lines_layer()` для
               оновлення шарів "Вузли" та "Полілінії", оскільки могли бути додані нові елементи.
             - Викликає `add_adjacents_layer()` для повного перемалювання шару "Суміжники".
-        5.  **Створення точки відновлення**: Створює тимчасову копію стану XML-дерева
-            для можливості відкату змін.
+        5.  **Журнал змін**: Усі зміни дерева записуються одним кроком у
+            `xml_data.journal` для можливості відкату (undo/rollback).
         """  # noqa
         log_calls(logFile, "Додавання суміжника до активного XML.")
 
@@ -3235,55 +3566,55 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         polyline_points = geom.asPolyline()
 
-        temp_processor = GeometryProcessor(self.current_xml.tree)
-        shape_uidps = []
-        for i, p in enumerate(polyline_points):
-            uidp = temp_processor._get_or_create_point(p)
-            shape_uidps.append(uidp)
-        object_shape = "-".join(shape_uidps)
-        log_calls(logFile, f"Додавання нового суміжника: '{object_shape}'")
-
-        adj_units_before = self.current_xml.tree.find(".//AdjacentUnits")
-        if adj_units_before is None:
-            log_calls(logFile, "(до обробки): Розділ 'AdjacentUnits' ВІДСУТНІЙ.")
-        else:
-            count = len(adj_units_before.findall("AdjacentUnitInfo"))
-            log_calls(
-                logFile, f"(до обробки): Розділ 'AdjacentUnits' ІСНУЄ. Кількість суміжників: {count}.")
+        journal = self.current_xml.journal
+        first_edit = not journal.has_changes
+        with journal.step("Додавання суміжника"):
+            temp_processor = GeometryProcessor(self.current_xml.tree, journal=journal)
+            shape_uidps = []
+            for i, p in enumerate(polyline_points):
+                uidp = temp_processor._get_or_create_point(p)
+                shape_uidps.append(uidp)
+            object_shape = "-".join(shape_uidps)
+            log_calls(logFile, f"Додавання нового суміжника: '{object_shape}'")
+
+            adj_units_before = self.current_xml.tree.find(".//AdjacentUnits")
+            if adj_units_before is None:
+                log_calls(logFile, "(до обробки): Розділ 'AdjacentUnits' ВІДСУТНІЙ.")
+            else:
+                count = len(adj_units_before.findall("AdjacentUnitInfo"))
+                log_calls(
+                    logFile, f"(до обробки): Розділ 'AdjacentUnits' ІСНУЄ. Кількість суміжників: {count}.")
 
-        tree = self.current_xml.tree
-        log_calls(
-            logFile, f"Обробка геометрії. ID дерева XML до обробки: {id(tree)}")
-        processor = GeometryProcessor(tree)
+            tree = self.current_xml.tree
+            log_calls(
+                logFile, f"Обробка геометрії. ID дерева XML до обробки: {id(tree)}")
+            processor = GeometryProcessor(tree, journal=journal)
 
-        try:
+            try:
 
-            processor.process_adjacent_unit_geometry(geom)
-        except ValueError as e:
-            QMessageBox.critical(self, "Критична помилка топології", str(e))
-            return
+                processor.process_adjacent_unit_geometry(geom)
+            except ValueError as e:
+                QMessageBox.critical(self, "Критична помилка топології", str(e))
+                return
 
-        except Exception:
-            return
+            except Exception:
+                return
 
-        self.current_xml.tree_view.rebuild_tree_view()
-        self.mark_as_changed()  # Позначаємо файл як змінений
+            self.current_xml.tree_view.rebuild_tree_view()
+            self.mark_as_changed()  # Позначаємо файл як змінений
 
-        self.redraw_current_group()
+            self.redraw_current_group()
 
-        processor = GeometryProcessor(tree)
-        if processor.cleanup_and_renumber_geometry():
-            log_calls(
-                logFile, "Геометрію було перенумеровано після додавання суміжника.")
+            processor = GeometryProcessor(tree, journal=journal)
+            if processor.cleanup_and_renumber_geometry():
+                log_calls(
+                    logFile, "Геометрію було перенумеровано після додавання суміжника.")
 
-        if not hasattr(self.current_xml, 'temp_tree_state') or self.current_xml.temp_tree_state is None:
+        if first_edit:
 
             log_calls(
                 logFile, f"Стан shapes після додавання суміжника:\n{self.plugin.shapes_state_string()}")
 
-            original_tree = etree.parse(self.current_xml.path)
-            self.current_xml.temp_tree_state = original_tree
-
     def get_polyline_lengths(self, tree):
         """
         Повертає словник з довжинами поліліній.
@@ -3329,18 +3660,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         """Повертає елементи ParcelMetricInfo/Area/Size для ParcelInfo."""
         if tree is None:
             return []
-        return tree.xpath(
-            "/*[local-name()='UkrainianCadastralExchangeFile']"
-            "/*[local-name()='InfoPart']"
-            "/*[local-name()='CadastralZoneInfo']"
-            "/*[local-name()='CadastralQuarters']"
-            "/*[local-name()='CadastralQuarterInfo']"
-            "/*[local-name()='Parcels']"
-            "/*[local-name()='ParcelInfo']"
-            "/*[local-name()='ParcelMetricInfo']"
-            "/*[local-name()='Area']"
-            "/*[local-name()='Size']"
-        )
+        return _PARCEL_AREA_SIZES(tree, uses_namespace(tree))
 
     def _compute_parcel_area_ha_from_tree(self, tree):
         """
@@ -3350,17 +3670,8 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             return None
 
         try:
-            externals = tree.xpath(
-                "/*[local-name()='UkrainianCadastralExchangeFile']"
-                "/*[local-name()='InfoPart']"
-                "/*[local-name()='CadastralZoneInfo']"
-                "/*[local-name()='CadastralQuarters']"
-                "/*[local-name()='CadastralQuarterInfo']"
-                "/*[local-name()='Parcels']"
-                "/*[local-name()='ParcelInfo']"
-                "/*[local-name()='ParcelMetricInfo']"
-                "/*[local-name()='Externals']"
-            )
+            namespaced = uses_namespace(tree)
+            externals = _PARCEL_EXTERNALS(tree, namespaced)
             if not externals:
                 return None
 
@@ -3375,24 +3686,13 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 return None
 
             points = {}
-            for point in tree.xpath(
-                "/*[local-name()='UkrainianCadastralExchangeFile']"
-                "/*[local-name()='InfoPart']"
-                "/*[local-name()='MetricInfo']"
-                "/*[local-name()='PointInfo']"
-                "/*[local-name()='Point']"
-            ):
-                uidp_nodes = point.xpath("./*[local-name()='UIDP'][1]")
-                x_nodes = point.xpath("./*[local-name()='X'][1]")
-                y_nodes = point.xpath("./*[local-name()='Y'][1]")
-                if not uidp_nodes or not x_nodes or not y_nodes:
-                    continue
-                uidp = (uidp_nodes[0].text or "").strip()
+            for point in METRIC_POINTS(tree, namespaced):
+                uidp = child_text(point, "UIDP", namespaced)
                 if not uidp:
                     continue
                 try:
-                    x_val = float((x_nodes[0].text or "").strip())
-                    y_val = float((y_nodes[0].text or "").strip())
+                    x_val = float(child_text(point, "X", namespaced))
+                    y_val = float(child_text(point, "Y", namespaced))
                 except (TypeError, ValueError):
                     continue
                 points[uidp] = (x_val, y_val)
@@ -3453,7 +3753,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                     same_value = False
 
             if not same_value:
-                size_element.text = new_text
+                xml_data_obj.journal.set_text(size_element, new_text)
                 changed = True
 
         if not changed:
@@ -3492,11 +3792,6 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
 
         self.ensure_visible_for_xml_data(xml_data)
 
-        if not hasattr(xml_data, 'temp_tree_state') or xml_data.temp_tree_state is None:
-            xml_data.temp_tree_state = etree.parse(xml_data.path)
-            log_calls(
-                logFile, "Створено тимчасовий стан дерева (temp_tree_state) для відстеження змін геометрії.")
-
         if committed:
             try:
                 self.recalculate_parcel_area(
@@ -3515,8 +3810,13 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             log_calls(
                 logFile, f"Зміни для '{xml_data.group_name}' відкинуто користувачем. Відновлюємо попередній стан.")
 
-            if hasattr(xml_data, 'temp_tree_state') and xml_data.temp_tree_state is not None:  # noqa
-                xml_data.tree = xml_data.temp_tree_state  # Revert to the state before editing
+            if xml_data.journal.is_dirty:
+                if not xml_data.journal.rollback():
+                    # Частину змін внесено в обхід журналу — відновлюємо збережений файл.
+                    log_calls(logFile, "Журнал змін неповний, відновлення стану з файлу.")
+                    xml_data.tree = etree.parse(xml_data.path)
+                    xml_data.tree_view.xml_tree = xml_data.tree
+                    xml_data.journal.checkpoint()
 
                 self.redraw_layers(xml_data)
 
@@ -3532,8 +3832,6 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             if self.current_xml and self.current_xml.group_name == xml_data.group_name:
                 self.update_changed_actions_state(is_changed=False)
 
-        xml_data.temp_tree_state = None
-
     def format_shape_info(self, si):
         """
         Форматує об'єкт ShapeInfo у рядок для логування у форматі,
@@ -3713,8 +4011,9 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         "xml_data_object_id". Значенням цієї властивості є унікальний ідентифікатор
         (ID) об'єкта `xml_data` в пам'яті.
 
-        Ця функція зчитує цей ID з шару, а потім шукає у списку всіх відкритих
-        XML-файлів (`self.opened_xmls`) об'єкт `xml_data` з таким самим ID.
+        Відповідність шар -> xml_data береться з реєстру `self.layer_registry`
+        (словник за ID шару); для ще не зареєстрованого шару ID з властивості
+        шукається серед відкритих документів реєстру.
 
         Args:
             layer (QgsVectorLayer): Шар QGIS, для якого потрібно знайти
@@ -3739,29 +4038,19 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             log_calls(logFile, "find_xml_data_for_layer: Вхідний шар є None.")
             return None
 
-        xml_data_object_id = layer.customProperty("xml_data_object_id")
-        if xml_data_object_id is not None:
-            for xml_data in self.opened_xmls:
-
-                if id(xml_data) == int(xml_data_object_id):
-
-                    return xml_data
-
-        else:
+        xml_data = self.layer_registry.document_for_layer(layer)
+        if xml_data is None and layer.customProperty("xml_data_object_id") is None:
             log_calls(
                 logFile, f"Шар '{layer.name()}' не має custom property 'xml_data_object_id'.")
 
-        return None
+        return xml_data
 
     def recalculate_parcel_area(self, tree, xml_data_obj=None, trigger="", notify=False):
         """Перераховує та синхронізує ParcelMetricInfo/Area/Size."""
         try:
             target_xml_data = xml_data_obj
             if target_xml_data is None:
-                for candidate in self.opened_xmls:
-                    if getattr(candidate, "tree", None) is tree:
-                        target_xml_data = candidate
-                        break
+                target_xml_data = self.layer_registry.document_for_tree(tree)
             if target_xml_data is None:
                 return False
             return self.sync_parcel_area_size(
@@ -3773,8 +4062,11 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             log_calls(logFile, f"Помилка при перерахунку площі ділянки: {e}")
             return False
 
-    def recalculate_line_lengths(self, tree, changed_point_uidp):
-        """Перераховує довжини всіх ліній, які містять змінену точку."""
+    def recalculate_line_lengths(self, tree, changed_point_uidp, journal=None):
+        """
+        Перераховує довжини всіх ліній, які містять змінену точку.
+        Якщо передано journal, зміни записуються в журнал документа.
+        """
         log_calls(
             logFile, f"Перерахунок довжин ліній для точки UIDP='{changed_point_uidp}'.")
 
@@ -3803,7 +4095,10 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                     length = ((x2 - x1)**2 + (y2 - y1)**2)**0.5
 
                     length_element = pl_element.find("Length")
-                    length_element.text = f"{length:.2f}"
+                    if journal is not None:
+                        journal.set_text(length_element, f"{length:.2f}")
+                    else:
+                        length_element.text = f"{length:.2f}"
                     ulid = pl_element.find("ULID").text
                     log_calls(
                         logFile, f"Оновлено довжину для лінії ULID='{ulid}' до {length:.2f} м.")
@@ -3821,16 +4116,16 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
                 logFile, f"Група '{xml_data.group_name}' не знайдена для перемалювання.")
             return
 
-        group.removeChildren(0, len(group.children()))
-        log_calls(logFile, f"Очищено групу '{xml_data.group_name}'.")
-
+        # Шари документа, які після очищення групи залишаться поза деревом шарів.
         project = QgsProject.instance()
-        layer_ids_to_remove = []
-        for layer_id, layer in project.mapLayers().items():
+        layer_ids_to_remove = set(self.layer_registry.layer_ids_for(xml_data))
+        layer_ids_to_remove.update(
+            child.layerId() for child in group.children() if isinstance(child, QgsLayerTreeLayer))
 
-            if project.layerTreeRoot().findLayer(layer_id) is None:
-                layer_ids_to_remove.append(layer_id)
+        group.removeChildren(0, len(group.children()))
+        log_calls(logFile, f"Очищено групу '{xml_data.group_name}'.")
 
+        layer_ids_to_remove = [lid for lid in layer_ids_to_remove if project.mapLayer(lid) is not None]
         if layer_ids_to_remove:
             project.removeMapLayers(layer_ids_to_remove)
             log_calls(
@@ -3846,6 +4141,44 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
         log_calls(
             logFile, f"Шари для групи '{xml_data.group_name}' успішно перемальовано.")
 
+    def refresh_layers_after_save(self, xml_data_obj):
+        """
+        Оновлює шари групи XML після збереження, змінюючи лише ті об'єкти,
+        що відрізняються від поточного xml_data.tree. Якщо інкрементне
+        оновлення неможливе, шари перестворюються повністю.
+        """
+        if not xml_data_obj or not getattr(xml_data_obj, "tree", None):
+            return
+
+        prev_suppress_close = getattr(self, "_suppress_close_on_layer_remove", False)
+        prev_suppress_sync = getattr(self, "_suppress_layer_to_xml_sync", False)
+        self._suppress_close_on_layer_remove = True
+        self._suppress_layer_to_xml_sync = True
+        try:
+            new_layers_obj = refresh_layers_incrementally(xml_data_obj, plugin=self.plugin)
+        except Exception as e:
+            log_calls(logFile, f"Помилка інкрементного оновлення шарів: {e}")
+            new_layers_obj = None
+        finally:
+            self._suppress_close_on_layer_remove = prev_suppress_close
+            self._suppress_layer_to_xml_sync = prev_suppress_sync
+
+        if new_layers_obj is None:
+            try:
+                self.recreate_layers_for_xml_data(xml_data_obj)
+            except Exception as e:
+                log_calls(logFile, f"Помилка перестворення шарів після збереження: {e}")
+            return
+
+        xml_data_obj.layers_obj = new_layers_obj
+        if xml_data_obj is self.current_xml:
+            self.layers_obj = new_layers_obj
+
+        try:
+            self.iface.mapCanvas().refresh()
+        except Exception:
+            pass
+
     def recreate_layers_for_xml_data(self, xml_data_obj):
         """
         Перестворює (оновлює) шари у групі XML на основі поточного xml_data.tree.
@@ -3873,6 +4206,10 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             except Exception:
                 pass
 
+            deferred = getattr(getattr(xml_data_obj, "layers_obj", None), "deferred", None)
+            if deferred is not None:
+                deferred.discard()
+
 
             layer_ids_to_remove = []
             try:
@@ -3919,6 +4256,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             new_group_name = new_layers_obj.group.name() if getattr(new_layers_obj, "group", None) else old_group_name
             if new_group_name and new_group_name != old_group_name:
                 xml_data_obj.group_name = new_group_name
+                self.layer_registry.add_document(xml_data_obj)
                 for i in range(self.tabWidget.count()):
                     if self.tabWidget.tabText(i) == old_group_name:
                         self.tabWidget.setTabText(i, new_group_name)
@@ -3944,17 +4282,25 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             log_calls(logFile, f"Група '{xml_data.group_name}' не знайдена.")
             return
 
-        existing_layer = None
-        for child in group.children():
-            if isinstance(child, QgsLayerTreeLayer) and child.name() == layer_name:
-                existing_layer = child.layer()
-                break
+        existing_layer = self.layer_registry.layer_for(xml_data, layer_name)
+        if existing_layer is None:
+            for child in group.children():
+                if isinstance(child, QgsLayerTreeLayer) and child.name() == layer_name:
+                    existing_layer = child.layer()
+                    self.layer_registry.register_layer(xml_data, existing_layer)
+                    break
 
         if not existing_layer:
             log_calls(
                 logFile, f"Шар '{layer_name}' не знайдено в групі для перемалювання.")
             return
 
+        if is_deferred(existing_layer):
+            # Відкладений шар будується одразу з поточного дерева.
+            deferred = getattr(getattr(xml_data, "layers_obj", None), "deferred", None)
+            if deferred is not None and deferred.materialize_placeholder(existing_layer) is not None:
+                return
+
         existing_layer.startEditing()
         existing_layer.deleteFeatures(existing_layer.allFeatureIds())
         existing_layer.commitChanges()
@@ -4036,7 +4382,7 @@ class xml_uaDockWidget(QDockWidget, FORM_CLASS):
             feature.setGeometry(QgsGeometry(polygon))
 
             object_id_int = int(object_id_text) if object_id_text.isdigit() else None
-            feature.setAttributes([object_id_int, object_shape])
+            set_object_attributes(feature, object_id_int, object_shape)
 
             provider.addFeature(feature)
 
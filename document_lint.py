@@ -0,0 +1,280 @@
+"""
+Перевірки документа XML при відкритті за один обхід дерева.
+
+Правило (LintRule) оголошує локальні імена елементів, які воно розглядає
+(tags; None — усі елементи). run_lint() один раз проходить дерево
+(iterdescendants) і передає кожен елемент правилам, зареєстрованим на його
+ім'я. Під час обходу правила лише збирають знахідки та елементи;
+виправлення застосовуються після обходу (apply_fixes) у порядку реєстрації
+правил, а потім кожне правило підбиває підсумок (finish) уже за
+виправленим деревом.
+
+run_open_lint() збирає правила, які раніше виконувались окремими обходами
+при відкритті: десяткова кома (пошук і виправлення), технічні object_id,
+текст площі ділянки, зріз нумерації вузлів/ліній та посилань на них
+(з нього ж береться перелік використаних ULID/UIDP для
+cleanup_and_renumber_geometry), PN вузлів і знімок геометрії для перевірок
+площ та близьких/створних точок.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .area_checks import _normalize_number_text_with_comma
+from .geometry_snapshot import GeometrySnapshot, geometry_snapshot_from_elements
+from .numbering_report import GeometryNumberingSnapshot, numbering_snapshot_from_elements
+from .xml_paths import uses_namespace
+
+
+def local_name(tag) -> str:
+    """"{ns}Point" -> "Point"; для коментарів та інструкцій обробки — ""."""
+    if not isinstance(tag, str):
+        return ""
+    return tag.rsplit("}", 1)[-1] if tag[:1] == "{" else tag
+
+
+def _parent_names_are(el, *names: str) -> bool:
+    """True, якщо батьки el (від найближчого) мають локальні імена names."""
+    for name in names:
+        el = el.getparent()
+        if el is None:
+            return False
+        tag = el.tag
+        if tag != name and local_name(tag) != name:
+            return False
+    return True
+
+
+class LintRule:
+    """
+    Правило спільного обходу. visit() викликається в порядку документа для
+    елементів, які вибирає правило:
+    - tags: локальні імена елементів;
+    - text_contains: елементи, текст яких містить цей підрядок;
+    - attribute: елементи з цим атрибутом.
+    Перевірки text_contains/attribute виконує сам обхід, тож правила для
+    "усіх елементів" не викликаються для кожного з них.
+    """
+
+    tags: frozenset[str] = frozenset()
+    text_contains: str | None = None
+    attribute: str | None = None
+
+    def visit(self, el, name: str) -> None:
+        """Розглядає елемент el з локальним ім'ям name під час обходу."""
+
+    def apply_fixes(self) -> None:
+        """Застосовує виправлення, зібрані під час обходу."""
+
+    def finish(self, namespaced: bool) -> None:
+        """Підсумок після обходу та всіх виправлень."""
+
+
+def run_lint(xml_tree, rules) -> None:
+    """Один обхід дерева xml_tree для всіх rules, далі apply_fixes() і finish()."""
+    root = xml_tree.getroot() if hasattr(xml_tree, "getroot") else xml_tree
+    if root is None:
+        return
+
+    by_name: dict[str, list[LintRule]] = {}
+    for rule in rules:
+        for name in rule.tags:
+            by_name.setdefault(name, []).append(rule)
+    by_text = [(rule.text_contains, rule) for rule in rules if rule.text_contains]
+    by_attribute = [(rule.attribute, rule) for rule in rules if rule.attribute]
+
+    # Повний тег -> (локальне ім'я, правила); для документів без простору
+    # імен тег і є локальним ім'ям.
+    dispatch: dict[str, tuple[str, tuple[LintRule, ...]]] = {}
+
+    # Як і ".//*" в окремих перевірках — без самого кореня.
+    for el in root.iterdescendants():
+        tag = el.tag
+        if tag.__class__ is not str:
+            continue
+        entry = dispatch.get(tag)
+        if entry is None:
+            name = local_name(tag)
+            entry = dispatch[tag] = (name, tuple(by_name.get(name, ())))
+        name, named_rules = entry
+        for rule in named_rules:
+            rule.visit(el, name)
+        if by_text:
+            text = el.text
+            if text:
+                for marker, rule in by_text:
+                    if marker in text:
+                        rule.visit(el, name)
+        for attribute, rule in by_attribute:
+            if el.get(attribute) is not None:
+                rule.visit(el, name)
+
+    for rule in rules:
+        rule.apply_fixes()
+    namespaced = uses_namespace(root)
+    for rule in rules:
+        rule.finish(namespaced)
+
+
+class DecimalCommaRule(LintRule):
+    """Числа з десятковою комою в тексті елементів; виправляє їх на крапку."""
+
+    text_contains = ","
+
+    def __init__(self, limit: int = 2000):
+        self.limit = int(limit)
+        self.hits: list[dict] = []  # не більше limit, як _find_decimal_comma_numbers_in_tree
+        self.changes: list[dict] = []
+        self._pending: list[tuple[object, str, str]] = []
+
+    def visit(self, el, name: str) -> None:
+        txt = el.text
+        new = _normalize_number_text_with_comma(txt)
+        if new is None:
+            return
+        if len(self.hits) < self.limit:
+            self.hits.append({"tag": el.tag, "text": str(txt)})
+        self._pending.append((el, txt, new))
+
+    def apply_fixes(self) -> None:
+        for el, old, new in self._pending:
+            try:
+                el.text = new
+            except Exception:
+                continue
+            self.changes.append({"tag": el.tag, "old": str(old), "new": str(new)})
+        self._pending = []
+
+
+class ObjectIdRule(LintRule):
+    """Технічні атрибути object_id; видаляє їх (див. remove_object_id_attributes)."""
+
+    attribute = "object_id"
+
+    def __init__(self):
+        self.removed = 0
+        self._pending: list = []
+
+    def visit(self, el, name: str) -> None:
+        self._pending.append(el)
+
+    def apply_fixes(self) -> None:
+        for el in self._pending:
+            if "object_id" in el.attrib:
+                del el.attrib["object_id"]
+                self.removed += 1
+        self._pending = []
+
+
+class ParcelAreaSizeRule(LintRule):
+    """ParcelMetricInfo/Area/Size: елементи площі ділянки та її початковий текст."""
+
+    tags = frozenset({"Size"})
+
+    def __init__(self):
+        self.sizes: list = []
+        self.initial_text: str | None = None
+
+    def visit(self, el, name: str) -> None:
+        if not _parent_names_are(el, "Area", "ParcelMetricInfo"):
+            return
+        # string(//ParcelMetricInfo/Area/Size[1]): перший Size свого Area,
+        # перший у документі; текст — до виправлення десяткової коми.
+        if self.initial_text is None and not any(
+            local_name(s.tag) == "Size" for s in el.itersiblings(preceding=True)
+        ):
+            self.initial_text = "".join(el.itertext()).strip()
+        self.sizes.append(el)
+
+
+class GeometryRule(LintRule):
+    """
+    Вузли PointInfo/Point, лінії Polyline/PL та посилання на них. Після
+    обходу (і виправлення десяткових ком) будує зріз нумерації
+    (snapshot_geometry_numbering) і знімок геометрії (GeometrySnapshot).
+    """
+
+    tags = frozenset({"Point", "PL", "P", "ULID"})
+
+    def __init__(self):
+        self._points: list = []
+        self._lines: list = []
+        self._p_refs: list = []
+        self._ulid_refs: list = []
+        self._ns = ""
+        self.numbering: GeometryNumberingSnapshot | None = None
+        self.snapshot: GeometrySnapshot | None = None
+
+    def visit(self, el, name: str) -> None:
+        if name == "Point":
+            if _parent_names_are(el, "PointInfo"):
+                self._points.append(el)
+        elif name == "PL":
+            if _parent_names_are(el, "Polyline"):
+                self._lines.append(el)
+        elif name == "P":
+            if _parent_names_are(el, "Points", "PL", "Polyline"):
+                self._p_refs.append(el)
+        elif (
+            _parent_names_are(el, "Line", "Lines", "Boundary", "Externals")
+            or _parent_names_are(el, "Line", "Lines", "Boundary", "Internals")
+            or _parent_names_are(el, "Line", "Lines", "AdjacentBoundary")
+        ):
+            # numbering_report.ULID_REF_XPATH
+            self._ulid_refs.append(el)
+
+    def finish(self, namespaced: bool) -> None:
+        self._ns = "{*}" if namespaced else ""
+        self.numbering = numbering_snapshot_from_elements(
+            points=self._points,
+            lines=self._lines,
+            polyline_point_refs=self._p_refs,
+            boundary_ulid_refs=self._ulid_refs,
+            namespaced=namespaced,
+        )
+        self.snapshot = geometry_snapshot_from_elements(self._points, self._lines, namespaced=namespaced)
+        self._lines = self._p_refs = self._ulid_refs = []
+
+    def pn_issues(self) -> tuple[int, tuple[str, ...]]:
+        """
+        (кількість порожніх PN, неунікальні PN) серед вузлів, що лишились у
+        дереві: при відкритті PN перевіряють після видалення невикористаних
+        вузлів, тож підсумок рахується на вимогу.
+        """
+        empty_pn = 0
+        counts: dict[str, int] = {}
+        for p in self._points:
+            if p.getparent() is None:
+                continue
+            pn_text = p.findtext(f"{self._ns}PN")
+            if pn_text is None or not str(pn_text).strip():
+                empty_pn += 1
+            else:
+                pn = str(pn_text).strip()
+                counts[pn] = counts.get(pn, 0) + 1
+        return empty_pn, tuple(pn for pn, c in counts.items() if c > 1)
+
+
+@dataclass
+class OpenLint:
+    """Правила перевірки при відкритті після спільного обходу."""
+    decimal_commas: DecimalCommaRule
+    object_ids: ObjectIdRule
+    parcel_area: ParcelAreaSizeRule
+    geometry: GeometryRule
+
+    def rules(self) -> tuple[LintRule, ...]:
+        # Виправлення (кома, object_id) — раніше за правила, що читають текст у finish().
+        return (self.decimal_commas, self.object_ids, self.parcel_area, self.geometry)
+
+
+def run_open_lint(xml_tree) -> OpenLint:
+    """Виконує всі перевірки відкриття, що працюють з окремими елементами, за один обхід."""
+    lint = OpenLint(
+        decimal_commas=DecimalCommaRule(),
+        object_ids=ObjectIdRule(),
+        parcel_area=ParcelAreaSizeRule(),
+        geometry=GeometryRule(),
+    )
+    run_lint(xml_tree, lint.rules())
+    return lint
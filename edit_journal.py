@@ -0,0 +1,211 @@
+"""
+Журнал змін XML-дерева з оберненими операціями.
+
+Замість другої копії документа (раніше — temp_tree_state, прочитаний з диска
+при першій зміні) журнал зберігає лише елементарні операції над деревом:
+зміну тексту, вставку та видалення елемента. Кожна операція містить усе
+потрібне для відкату та повтору, тож журнал дає багатокрокові undo/redo та
+відкат до останнього збереженого стану без дискового вводу-виводу.
+
+Видалені елементи не копіюються: журнал тримає посилання на від'єднаний
+вузол і при відкаті повертає його на попереднє місце.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class TextOp:
+    element: object
+    old: str | None
+    new: str | None
+
+    def undo(self) -> None:
+        self.element.text = self.old
+
+    def redo(self) -> None:
+        self.element.text = self.new
+
+
+@dataclass(frozen=True)
+class InsertOp:
+    parent: object
+    index: int
+    element: object
+
+    def undo(self) -> None:
+        self.parent.remove(self.element)
+
+    def redo(self) -> None:
+        self.parent.insert(self.index, self.element)
+
+
+@dataclass(frozen=True)
+class RemoveOp:
+    parent: object
+    index: int
+    element: object
+
+    def undo(self) -> None:
+        self.parent.insert(self.index, self.element)
+
+    def redo(self) -> None:
+        self.parent.remove(self.element)
+
+
+@dataclass(frozen=True)
+class EditStep:
+    label: str
+    ops: tuple
+
+    def undo(self) -> None:
+        for op in reversed(self.ops):
+            op.undo()
+
+    def redo(self) -> None:
+        for op in self.ops:
+            op.redo()
+
+
+class EditJournal:
+    """
+    Журнал змін одного xml_data. Операції, виконані всередині step(),
+    об'єднуються в один крок undo/redo; поза step() кожна операція — окремий крок.
+
+    checkpoint() фіксує поточний стан дерева як збережений (після відкриття
+    чи запису на диск). rollback() повертає дерево до цього стану, якщо всі
+    зміни після нього пройшли через журнал (див. note_change()).
+    """
+
+    def __init__(self):
+        self._undo: list[EditStep] = []
+        self._redo: list[EditStep] = []
+        self._open_label: str | None = None
+        self._open_ops: list = []
+        self._depth = 0
+        self._ops_since_note = 0
+        self.untracked = False
+
+    # --- запис операцій -------------------------------------------------
+
+    def _record(self, op) -> None:
+        self._ops_since_note += 1
+        self._redo.clear()
+        if self._depth:
+            self._open_ops.append(op)
+        else:
+            self._undo.append(EditStep(type(op).__name__, (op,)))
+
+    def set_text(self, element, text) -> None:
+        """Змінює текст елемента, якщо він відрізняється, і записує операцію."""
+        old = element.text
+        if old == text:
+            return
+        element.text = text
+        self._record(TextOp(element, old, text))
+
+    def record_insert(self, element) -> None:
+        """Записує вставку вже доданого до батька елемента (разом з піддеревом)."""
+        parent = element.getparent()
+        if parent is None:
+            return
+        self._record(InsertOp(parent, parent.index(element), element))
+
+    def remove(self, element) -> None:
+        """Видаляє елемент з батька і записує операцію."""
+        parent = element.getparent()
+        if parent is None:
+            return
+        index = parent.index(element)
+        parent.remove(element)
+        self._record(RemoveOp(parent, index, element))
+
+    @contextmanager
+    def step(self, label: str):
+        """Об'єднує всі операції всередині блоку в один крок журналу."""
+        if self._depth == 0:
+            self._open_label = label
+            self._open_ops = []
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                if self._open_ops:
+                    self._undo.append(EditStep(self._open_label or "", tuple(self._open_ops)))
+                self._open_label = None
+                self._open_ops = []
+
+    # --- стан ----------------------------------------------------------
+
+    def note_change(self) -> None:
+        """
+        Викликається, коли документ позначається зміненим. Якщо з попереднього
+        виклику журнал не отримав жодної операції, зміну внесено в обхід журналу
+        і повний відкат через журнал більше не гарантований.
+        """
+        if self._ops_since_note == 0 and self._depth == 0:
+            self.untracked = True
+        self._ops_since_note = 0
+
+    def checkpoint(self) -> None:
+        """Фіксує поточний стан дерева як збережений та очищає історію."""
+        self._undo.clear()
+        self._redo.clear()
+        self._ops_since_note = 0
+        self.untracked = False
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self._undo) or bool(self._open_ops)
+
+    @property
+    def is_dirty(self) -> bool:
+        """Чи відрізняється дерево від стану останнього checkpoint()."""
+        return self.has_changes or self.untracked
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo) and self._depth == 0
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo) and self._depth == 0
+
+    # --- undo / redo / rollback ---------------------------------------
+
+    def undo(self) -> str | None:
+        """Скасовує останній крок. Повертає його назву або None."""
+        if not self.can_undo:
+            return None
+        step = self._undo.pop()
+        step.undo()
+        self._redo.append(step)
+        self._ops_since_note += 1
+        return step.label
+
+    def redo(self) -> str | None:
+        """Повторює останній скасований крок. Повертає його назву або None."""
+        if not self.can_redo:
+            return None
+        step = self._redo.pop()
+        step.redo()
+        self._undo.append(step)
+        self._ops_since_note += 1
+        return step.label
+
+    def rollback(self) -> bool:
+        """
+        Повертає дерево до стану останнього checkpoint(). Повертає False, якщо
+        після нього були зміни в обхід журналу (тоді історія не змінюється).
+        """
+        if self.untracked or self._depth:
+            return False
+        while self._undo:
+            self._undo.pop().undo()
+        self._redo.clear()
+        self._ops_since_note = 0
+        return True
@@ -0,0 +1,144 @@
+"""
+Реєстр відповідностей "об'єкт шару ↔ XML-елемент ↔ елемент моделі дерева".
+
+Для кожного відкритого документа (xml_data.element_registry) зберігає:
+- (назва шару, ключ об'єкта) -> lxml-елемент, де ключ — значення ключового
+  поля об'єкта шару (UIDP, ULID або object_id, див. feature_diff);
+- lxml-елемент -> (назва шару, ключ), для зворотного пошуку об'єкта через
+  індекс шару (layer_index.index_for(layer).fid_by(...));
+- lxml-елемент -> QStandardItem моделі дерева (реєструє CustomTreeView).
+
+Реєстр заповнюється при побудові шарів (rebuild()) та моделі дерева.
+Кожна знайдена відповідність перевіряється (елемент усе ще в дереві, ключ
+не змінився); застарілий запис замінюється результатом повного пошуку, тож
+правки дерева в обхід реєстру не призводять до хибних відповідей.
+"""
+from __future__ import annotations
+
+
+# Qt.UserRole + 10: роль, у якій CustomTreeView зберігає lxml-елемент.
+ITEM_ELEMENT_ROLE = 0x0100 + 10
+
+# Назва шару -> (XPath елементів, спосіб отримання ключа):
+# "UIDP"/"ULID" — текст дочірнього елемента, "@object_id" — атрибут,
+# "#" — порядковий номер (з 1) серед елементів XPath.
+LAYER_ELEMENTS = {
+    "Вузли": (".//PointInfo/Point", "UIDP"),
+    "Полілінії": (".//Polyline/PL", "ULID"),
+    "Кадастрова зона": (".//CadastralZoneInfo", "#"),
+    "Кадастровий квартал": (".//CadastralQuarterInfo", "#"),
+    "Ділянка": (".//ParcelInfo", "#"),
+    "Угіддя": (".//LandParcelInfo", "@object_id"),
+    "Оренда": (".//LeaseInfo", "@object_id"),
+    "Суборенда": (".//SubleaseInfo", "@object_id"),
+    "Обмеження": (".//RestrictionInfo", "@object_id"),
+    "Суміжники": (".//AdjacentUnitInfo", "@object_id"),
+}
+
+
+def _element_key(element, kind):
+    if kind == "@object_id":
+        value = element.get("object_id")
+    else:
+        value = element.findtext(kind)
+    value = str(value or "").strip()
+    return value or None
+
+
+class ElementRegistry:
+    """Відповідності об'єктів шарів, XML-елементів та елементів моделі одного документа."""
+
+    def __init__(self):
+        self._elements: dict[tuple, object] = {}
+        self._keys: dict[object, tuple] = {}
+        self._items: dict[object, object] = {}
+
+    # --- об'єкт шару <-> XML-елемент ------------------------------------
+
+    def register(self, layer_name: str, key, element) -> None:
+        entry = (layer_name, str(key))
+        previous = self._elements.get(entry)
+        if previous is not None and previous is not element:
+            self._keys.pop(previous, None)
+        self._elements[entry] = element
+        self._keys[element] = entry
+
+    def forget(self, element) -> None:
+        entry = self._keys.pop(element, None)
+        if entry is not None and self._elements.get(entry) is element:
+            del self._elements[entry]
+        self._items.pop(element, None)
+
+    def rebuild(self, tree) -> None:
+        """Заповнює відповідності для всіх шарів за поточним деревом."""
+        self._elements.clear()
+        self._keys.clear()
+        root = tree.getroot()
+        for layer_name, (xpath, kind) in LAYER_ELEMENTS.items():
+            for n, element in enumerate(root.findall(xpath), start=1):
+                key = str(n) if kind == "#" else _element_key(element, kind)
+                if key is not None:
+                    self.register(layer_name, key, element)
+
+    def _is_current(self, tree, layer_name, key, element) -> bool:
+        if element.getroottree().getroot() is not tree.getroot():
+            return False
+        xpath, kind = LAYER_ELEMENTS[layer_name]
+        if kind == "#":
+            return True
+        return _element_key(element, kind) == key
+
+    def element_for(self, tree, layer_name: str, key):
+        """
+        XML-елемент об'єкта шару layer_name з ключем key або None.
+        Для шарів з одним елементом ("Ділянка", "Кадастрова зона") ключ
+        за відсутності дорівнює "1".
+        """
+        spec = LAYER_ELEMENTS.get(layer_name)
+        if spec is None or tree is None:
+            return None
+        xpath, kind = spec
+        key = str(key or "").strip() or ("1" if kind == "#" else "")
+        if not key:
+            return None
+
+        element = self._elements.get((layer_name, key))
+        if element is not None and self._is_current(tree, layer_name, key, element):
+            return element
+
+        found = None
+        for n, candidate in enumerate(tree.getroot().findall(xpath), start=1):
+            candidate_key = str(n) if kind == "#" else _element_key(candidate, kind)
+            if candidate_key == key:
+                found = candidate
+                break
+        if found is not None:
+            self.register(layer_name, key, found)
+        elif element is not None:
+            self.forget(element)
+        return found
+
+    def key_for(self, element):
+        """(назва шару, ключ) для XML-елемента або None."""
+        return self._keys.get(element)
+
+    # --- XML-елемент <-> елемент моделі дерева ----------------------------
+
+    def register_item(self, element, item) -> None:
+        self._items[element] = item
+
+    def clear_items(self) -> None:
+        self._items.clear()
+
+    def item_for(self, element):
+        """Зареєстрований QStandardItem для елемента або None, якщо його вже видалено з моделі."""
+        item = self._items.get(element)
+        if item is None:
+            return None
+        try:
+            if item.model() is None or item.data(ITEM_ELEMENT_ROLE) is not element:
+                raise RuntimeError
+        except RuntimeError:
+            self._items.pop(element, None)
+            return None
+        return item
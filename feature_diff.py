@@ -0,0 +1,132 @@
+"""
+Застосування відмінностей між об'єктами шару та бажаним набором об'єктів.
+
+Об'єкти зіставляються за ключовим полем (UIDP для вузлів, ULID для
+поліліній, object_id для решти шарів). Через провайдер даних видаляються
+зайві, додаються нові та змінюються лише ті геометрії й атрибути, що
+відрізняються, тож переміщення одного вузла торкається O(1) об'єктів шару.
+
+Атрибути зіставляються за назвами полів, а поля первинного ключа
+провайдера (fid у GeoPackage) пропускаються, тож шар у пам'яті та шар у
+файлі з тим самим набором полів даних порівнюються напряму.
+"""
+
+from qgis.core import QgsFeature
+
+from .layer_index import invalidate_layer_index
+
+
+LAYER_KEY_FIELDS = {
+    "Вузли": "UIDP",
+    "Закріплені вузли": "UIDP",
+    "Полілінії": "ULID",
+}
+DEFAULT_KEY_FIELD = "object_id"
+
+
+def key_field_for_layer(layer):
+    """Повертає назву ключового поля для шару за його назвою."""
+    return LAYER_KEY_FIELDS.get(layer.name(), DEFAULT_KEY_FIELD)
+
+
+def data_field_names(layer):
+    """Назви полів шару без полів первинного ключа провайдера."""
+    skip = set(layer.dataProvider().pkAttributeIndexes())
+    return [field.name() for i, field in enumerate(layer.fields()) if i not in skip]
+
+
+def _field_pairs(layer, source_fields):
+    """Пари (індекс у layer, індекс у source_fields) для спільних полів даних."""
+    skip = set(layer.dataProvider().pkAttributeIndexes())
+    pairs = []
+    for i, field in enumerate(layer.fields()):
+        if i in skip:
+            continue
+        j = source_fields.indexFromName(field.name())
+        if j != -1:
+            pairs.append((i, j))
+    return pairs
+
+
+def _is_null(value):
+    return value is None or (hasattr(value, "isNull") and value.isNull())
+
+
+def _same_value(a, b):
+    if _is_null(a) or _is_null(b):
+        return _is_null(a) and _is_null(b)
+    return a == b
+
+
+def keyed_features(features, key_index):
+    """
+    Повертає {ключ: QgsFeature}. Ключ — значення ключового поля; об'єкти без
+    ключа та дублікати нумеруються за порядком появи, щоб порівняння
+    залишалося детермінованим.
+    """
+    keyed = {}
+    seen = {}
+    for feature in features:
+        value = feature.attribute(key_index) if key_index != -1 else None
+        base = "" if _is_null(value) or str(value) == "NULL" else str(value)
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        keyed[(base, n)] = feature
+    return keyed
+
+
+def apply_feature_diff(layer, features, key_field=None):
+    """
+    Приводить об'єкти шару layer до списку features через провайдер даних.
+    Повертає (додано, видалено, змінено).
+    """
+    key_field = key_field or key_field_for_layer(layer)
+    features = list(features)
+    source_fields = features[0].fields() if features else layer.fields()
+    pairs = _field_pairs(layer, source_fields)
+
+    existing = keyed_features(layer.getFeatures(), layer.fields().indexFromName(key_field))
+    desired = keyed_features(features, source_fields.indexFromName(key_field))
+
+    to_delete = [f.id() for key, f in existing.items() if key not in desired]
+    to_add = []
+    geometry_changes = {}
+    attribute_changes = {}
+
+    for key, wanted in desired.items():
+        current = existing.get(key)
+        if current is None:
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(wanted.geometry())
+            for i, j in pairs:
+                feature.setAttribute(i, wanted.attribute(j))
+            to_add.append(feature)
+            continue
+
+        if bytes(current.geometry().asWkb()) != bytes(wanted.geometry().asWkb()):
+            geometry_changes[current.id()] = wanted.geometry()
+
+        changed = {
+            i: wanted.attribute(j)
+            for i, j in pairs
+            if not _same_value(current.attribute(i), wanted.attribute(j))
+        }
+        if changed:
+            attribute_changes[current.id()] = changed
+
+    provider = layer.dataProvider()
+    if to_delete:
+        provider.deleteFeatures(to_delete)
+    if to_add:
+        provider.addFeatures(to_add)
+    if geometry_changes:
+        provider.changeGeometryValues(geometry_changes)
+    if attribute_changes:
+        provider.changeAttributeValues(attribute_changes)
+
+    modified = len(set(geometry_changes) | set(attribute_changes))
+    if to_delete or to_add or modified:
+        invalidate_layer_index(layer)
+        layer.updateExtents()
+        layer.triggerRepaint()
+    return len(to_add), len(to_delete), modified
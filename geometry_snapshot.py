@@ -0,0 +1,123 @@
+"""
+Знімок геометрії документа XML: вузли (PointInfo/Point) та полілінії
+(Polyline/PL), розібрані один раз.
+
+Знімок будується після виправлення десяткових ком і спільно
+використовується перевірками, яким потрібні координати: площі
+(area_checks) та близькі/створні точки (proximity_checks). Якщо дерево
+змінило нумерацію чи склад геометрії (cleanup_and_renumber_geometry),
+знімок треба побудувати заново.
+
+Координати зберігаються так, як їх показують шари плагіна: x <- Y, y <- X.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Segment:
+    ax: float
+    ay: float
+    bx: float
+    by: float
+    poly_idx: int
+    ulid: str
+
+
+@dataclass(frozen=True)
+class GeometrySnapshot:
+    points_total: int
+    points: tuple[tuple[str, float, float], ...]  # (UIDP, x, y) у порядку документа
+    uidp_to_xy: dict[str, tuple[float, float]]
+    polylines: tuple[tuple[str, tuple[str, ...]], ...]  # (ULID, UIDP вузлів)
+    poly_uidps: tuple[frozenset[str], ...]
+    segments: tuple[Segment, ...]
+
+    @property
+    def points_parsed(self) -> int:
+        """Вузли з UIDP та коректними координатами."""
+        return len(self.points)
+
+    @property
+    def polylines_total(self) -> int:
+        return len(self.polylines)
+
+    def ulid_to_coords(self) -> dict[str, list[tuple[float, float]]]:
+        """
+        ULID -> координати вузлів лінії (лише лінії з >= 2 вузлами, усі вузли
+        яких мають координати).
+        """
+        result: dict[str, list[tuple[float, float]]] = {}
+        uidp_to_xy = self.uidp_to_xy
+        for ulid, uidps in self.polylines:
+            if not ulid:
+                continue
+            coords = [uidp_to_xy.get(u) for u in uidps]
+            if len(coords) >= 2 and all(coords):
+                result[ulid] = coords
+        return result
+
+
+def _paths(root) -> tuple[str, str]:
+    # Документи плагіна зазвичай без простору імен; для решти — {*}.
+    ns = "{*}" if str(root.tag).startswith("{") else ""
+    return f".//{ns}PointInfo/{ns}Point", f".//{ns}Polyline/{ns}PL"
+
+
+def build_geometry_snapshot(xml_tree) -> GeometrySnapshot:
+    """Розбирає вузли та полілінії xml_tree в GeometrySnapshot одним проходом по кожному розділу."""
+    root = xml_tree.getroot()
+    point_path, pl_path = _paths(root)
+    return geometry_snapshot_from_elements(
+        root.findall(point_path),
+        root.findall(pl_path),
+        namespaced=str(root.tag).startswith("{"),
+    )
+
+
+def geometry_snapshot_from_elements(point_elems, pl_elems, *, namespaced: bool = False) -> GeometrySnapshot:
+    """
+    Будує GeometrySnapshot з уже знайдених елементів PointInfo/Point та
+    Polyline/PL (у порядку документа), напр. зібраних document_lint.
+    """
+    ns = "{*}" if namespaced else ""
+    uidp_tag, x_tag, y_tag = f"{ns}UIDP", f"{ns}X", f"{ns}Y"
+    ulid_tag, p_path = f"{ns}ULID", f"{ns}Points/{ns}P"
+
+    points: list[tuple[str, float, float]] = []
+    uidp_to_xy: dict[str, tuple[float, float]] = {}
+    for p in point_elems:
+        uidp = p.findtext(uidp_tag)
+        if not uidp or not uidp.strip():
+            continue
+        try:
+            y = float(p.findtext(x_tag))
+            x = float(p.findtext(y_tag))
+        except (TypeError, ValueError):
+            continue
+        uidp = uidp.strip()
+        points.append((uidp, x, y))
+        uidp_to_xy[uidp] = (x, y)
+
+    polylines: list[tuple[str, tuple[str, ...]]] = []
+    segments: list[Segment] = []
+    for poly_idx, pl in enumerate(pl_elems):
+        ulid = (pl.findtext(ulid_tag) or "").strip()
+        uidps = tuple(p.text.strip() for p in pl.findall(p_path) if p.text and p.text.strip())
+        polylines.append((ulid, uidps))
+        for a, b in zip(uidps, uidps[1:]):
+            axy = uidp_to_xy.get(a)
+            bxy = uidp_to_xy.get(b)
+            if axy is None or bxy is None:
+                continue
+            segments.append(Segment(axy[0], axy[1], bxy[0], bxy[1], poly_idx, ulid))
+
+    return GeometrySnapshot(
+        points_total=len(point_elems),
+        points=tuple(points),
+        uidp_to_xy=uidp_to_xy,
+        polylines=tuple(polylines),
+        poly_uidps=tuple(frozenset(uidps) for _, uidps in polylines),
+        segments=tuple(segments),
+    )
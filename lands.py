@@ -11,13 +11,16 @@ from qgis.core import (
     QgsLineString,
     QgsPointXY,
     QgsWkbTypes,
-    QgsProject,
     QgsLayerTreeLayer
 )
 from qgis.utils import iface
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .data_models import ShapeInfo  # noqa
 from .common import ensure_object_layer_fields, log_msg, insert_element_in_order, parse_float
+from .common import set_object_attributes
 from .common import logFile
+from .common import object_layer_fields
 
 
 class LandsParcels:
@@ -77,7 +80,8 @@ class LandsParcels:
 
         try:
             from .topology import GeometryProcessor
-            processor = GeometryProcessor(self.tree)
+            processor = GeometryProcessor(
+                self.tree, ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
             log_msg(
                 logFile, "GeometryProcessor успішно створено в redraw_lands_layer.")
         except Exception as e:
@@ -85,6 +89,7 @@ class LandsParcels:
                 logFile, f"Не вдалося створити GeometryProcessor в LandsParcels (redraw): {e}")
             processor = None
 
+        features = []
         for land_parcel_info in lands_parcel_container.findall("LandParcelInfo"):
             object_id_text = str(land_parcel_info.get("object_id") or "").strip()
             metric_info = land_parcel_info.find("MetricInfo")
@@ -115,9 +120,10 @@ class LandsParcels:
                 feature = QgsFeature(layer.fields())
                 feature.setGeometry(QgsGeometry(polygon))
                 object_id = int(object_id_text) if object_id_text.isdigit() else None
-                feature.setAttributes([object_id, object_shape])
-                provider.addFeature(feature)
+                set_object_attributes(feature, object_id, object_shape)
+                features.append(feature)
 
+        provider.addFeatures(features)
         layer.commitChanges()
         log_msg(
             logFile, f"Шар '{layer.name()}' успішно перемальовано. Додано {layer.featureCount()} об'єкт(ів).")
@@ -133,18 +139,15 @@ class LandsParcels:
                     polygon.addInteriorRing(interior_ring)
         return polygon
 
-    def add_lands_layer(self):
-        """Створює та заповнює шар 'Угіддя'."""
-        layer_name = "Угіддя"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
-        self.layer.setCustomProperty("skip_save_dialog", True)
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "lands_parcel.qml"))
-        provider = self.layer.dataProvider()
-
-        ensure_object_layer_fields(self.layer)
+    def data_fields(self):
+        """Поля даних шару 'Угіддя'."""
+        return object_layer_fields()
 
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Угіддя' за деревом: призначає відсутні
+        object_id і додає ShapeInfo шару self.layer до xml_data.shapes.
+        """
         existing_shapes_in_layer = set()
         if self.xml_data:
             for si in self.xml_data.shapes:
@@ -159,7 +162,8 @@ class LandsParcels:
 
         try:
             from .topology import GeometryProcessor
-            processor = GeometryProcessor(self.root.getroottree())
+            processor = GeometryProcessor(
+                self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
         except Exception as e:
             log_msg(
                 logFile, f"Не вдалося створити GeometryProcessor в LandsParcels: {e}")
@@ -172,6 +176,7 @@ class LandsParcels:
                 used_object_ids.add(int(obj_id_text))
         next_object_id = 1
 
+        features = []
         for lands_parcel in self.root.findall(".//LandsParcel/LandParcelInfo/MetricInfo"):
             land_parcel_info = lands_parcel.getparent()
             object_id_text = str(land_parcel_info.get("object_id") or "").strip() if land_parcel_info is not None else ""
@@ -227,7 +232,7 @@ class LandsParcels:
                             [QgsPointXY(p.y(), p.x()) for p in internal_coords])
                         polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
 
             feature.setGeometry(QgsGeometry(polygon))
             object_id = int(object_id_text) if object_id_text.isdigit() else None
@@ -240,12 +245,24 @@ class LandsParcels:
                     object_shape=object_shape)
                 self.xml_data.shapes.append(shape_info)
 
-            provider.addFeature(feature)
+            features.append(feature)
+
+        return features
+
+    def add_lands_layer(self):
+        """Створює та заповнює шар 'Угіддя'."""
+        layer_name = "Угіддя"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
+        self.layer.setCustomProperty("skip_save_dialog", True)
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "lands_parcel.qml"))
+        provider = self.layer.dataProvider()
+
+        ensure_object_layer_fields(self.layer)
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        self.xml_ua_layers.added_layers.append(layer_node)
-        self.xml_ua_layers.last_to_first(self.group)
+        provider.addFeatures(self.build_features(self.layer.fields()))
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
@@ -12,6 +12,13 @@ from qgis.PyQt.QtGui import QFont, QFontMetricsF
 from qgis.PyQt.QtWidgets import QApplication
 
 from .common import config
+from .xml_paths import LocalNamePath
+from .xml_paths import child_text
+from .xml_paths import uses_namespace
+
+
+_LAND_PARCEL_INFOS = LocalNamePath("//LandsParcel/LandParcelInfo")
+_LAND_AREA_SIZE = LocalNamePath("./MetricInfo[1]/Area[1]/Size[1]")
 
 
 class LandsExplicationTable:
@@ -80,10 +87,10 @@ class LandsExplicationTable:
         lands_code_map = LandsExplicationTable._lands_code_dict()
 
         try:
-            infos = xml_root.xpath(
-                "//*[local-name()='LandsParcel']/*[local-name()='LandParcelInfo']"
-            )
+            namespaced = uses_namespace(xml_root)
+            infos = _LAND_PARCEL_INFOS(xml_root, namespaced)
         except Exception:
+            namespaced = False
             infos = []
 
         rows: List[Tuple[str, str, str, str]] = []
@@ -95,17 +102,13 @@ class LandsExplicationTable:
 
             land_code = ""
             try:
-                lc = info.xpath("./*[local-name()='LandCode'][1]")
-                if lc and getattr(lc[0], "text", None):
-                    land_code = str(lc[0].text).strip()
+                land_code = child_text(info, "LandCode", namespaced)
             except Exception:
                 land_code = ""
 
             size = ""
             try:
-                sz = info.xpath(
-                    "./*[local-name()='MetricInfo'][1]/*[local-name()='Area'][1]/*[local-name()='Size'][1]"
-                )
+                sz = _LAND_AREA_SIZE(info, namespaced)
                 if sz and getattr(sz[0], "text", None):
                     size = str(sz[0].text).strip()
             except Exception:
@@ -0,0 +1,85 @@
+"""
+Пакетне додавання шарів у групу дерева шарів.
+
+Обробники шарів додають свої шари через add_layer_to_group(). Поза пакетом
+шар одразу реєструється в проекті й вставляється в групу. Усередині
+group_batch(group) шари накопичуються, а при виході з блоку:
+- усі шари реєструються в проекті одним викликом addMapLayers;
+- вузли дерева вставляються в групу вже в остаточному порядку (шари
+  "нагору" — у зворотному порядку додавання, решта — в кінець групи);
+- полотно карти, заморожене на час побудови, оновлюється один раз.
+"""
+
+from contextlib import contextmanager
+
+from qgis.core import QgsLayerTreeLayer
+from qgis.core import QgsProject
+from qgis.utils import iface
+
+
+_batches = {}
+
+
+def add_layer_to_group(group, layer, on_top=False, visible=True):
+    """
+    Додає шар у проект і групу: нагору групи (on_top) або в кінець.
+    Повертає вузол дерева або None, якщо шар відкладено до кінця пакета.
+    """
+    batch = _batches.get(id(group))
+    if batch is not None:
+        batch.append((layer, on_top, visible))
+        return None
+
+    QgsProject.instance().addMapLayer(layer, False)
+    node = group.insertLayer(0, layer) if on_top else group.addLayer(layer)
+    if node is not None and not visible:
+        node.setItemVisibilityChecked(False)
+    return node
+
+
+def _flush(group, entries):
+    if not entries:
+        return
+    QgsProject.instance().addMapLayers([layer for layer, _, _ in entries], False)
+
+    def make_node(layer, visible):
+        node = QgsLayerTreeLayer(layer)
+        node.setItemVisibilityChecked(visible)
+        return node
+
+    top = [make_node(layer, visible) for layer, on_top, visible in reversed(entries) if on_top]
+    bottom = [make_node(layer, visible) for layer, on_top, visible in entries if not on_top]
+    if not group.children():
+        group.insertChildNodes(0, top + bottom)
+        return
+    if top:
+        group.insertChildNodes(0, top)
+    if bottom:
+        group.insertChildNodes(len(group.children()), bottom)
+
+
+@contextmanager
+def group_batch(group):
+    """Накопичує шари, що додаються в group, і вставляє їх разом при виході з блоку."""
+    if group is None or id(group) in _batches:
+        yield
+        return
+
+    canvas = None
+    try:
+        canvas = iface.mapCanvas()
+        canvas.freeze(True)
+    except Exception:
+        canvas = None
+
+    entries = _batches[id(group)] = []
+    try:
+        yield
+    finally:
+        _batches.pop(id(group), None)
+        try:
+            _flush(group, entries)
+        finally:
+            if canvas is not None:
+                canvas.freeze(False)
+                canvas.refresh()
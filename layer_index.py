@@ -0,0 +1,122 @@
+"""
+Просторові та атрибутні індекси шарів плагіна.
+
+prepare_layer_indexes() під час побудови шару створює просторовий індекс
+провайдера (використовується при ідентифікації, виділенні та запитах за
+прямокутником) і, якщо провайдер це підтримує, атрибутні індекси на полях
+UIDP, ULID, object_id та object_shape.
+
+index_for(layer) повертає LayerIndex — словники {значення ключа: fid} та
+QgsSpatialIndex з геометріями, які будуються ліниво при першому запиті і
+скидаються при зміні даних шару (invalidate_layer_index(), сигнал
+dataChanged). Пошук об'єкта за ключем — доступ до словника.
+"""
+
+from qgis.core import QgsFeatureRequest
+from qgis.core import QgsRectangle
+from qgis.core import QgsSpatialIndex
+from qgis.core import QgsVectorDataProvider
+
+
+KEY_FIELDS = ("UIDP", "ULID", "object_id", "object_shape")
+
+_indexes = {}
+
+
+def _key(value):
+    if value is None or (hasattr(value, "isNull") and value.isNull()):
+        return None
+    text = str(value).strip()
+    return text if text and text != "NULL" else None
+
+
+class LayerIndex:
+    """Атрибутні словники та просторовий індекс одного шару."""
+
+    def __init__(self, layer):
+        self.layer = layer
+        self._lookup = None
+        self._spatial = None
+
+    def _build_lookup(self):
+        fields = self.layer.fields()
+        indexed = [(name, fields.indexFromName(name)) for name in KEY_FIELDS]
+        indexed = [(name, idx) for name, idx in indexed if idx != -1]
+        lookup = {name: {} for name, _ in indexed}
+        if indexed:
+            request = QgsFeatureRequest()
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+            request.setSubsetOfAttributes([idx for _, idx in indexed])
+            for feature in self.layer.getFeatures(request):
+                for name, idx in indexed:
+                    key = _key(feature.attribute(idx))
+                    if key is not None:
+                        lookup[name].setdefault(key, feature.id())
+        self._lookup = lookup
+
+    def fid_by(self, field_name, value):
+        """fid об'єкта з field_name == value або None."""
+        if self._lookup is None:
+            self._build_lookup()
+        return self._lookup.get(field_name, {}).get(_key(value))
+
+    def feature_by(self, field_name, value):
+        """Об'єкт з field_name == value або None."""
+        fid = self.fid_by(field_name, value)
+        if fid is None:
+            return None
+        feature = self.layer.getFeature(fid)
+        return feature if feature.isValid() else None
+
+    @property
+    def spatial(self):
+        """QgsSpatialIndex шару зі збереженими геометріями."""
+        if self._spatial is None:
+            self._spatial = QgsSpatialIndex(
+                self.layer.getFeatures(), None, QgsSpatialIndex.FlagStoreFeatureGeometries)
+        return self._spatial
+
+    def fids_near(self, x, y, tolerance):
+        """fid об'єктів, чий охоплюючий прямокутник перетинає квадрат ±tolerance навколо (x, y)."""
+        return self.spatial.intersects(QgsRectangle(x - tolerance, y - tolerance, x + tolerance, y + tolerance))
+
+    def invalidate(self):
+        self._lookup = None
+        self._spatial = None
+
+
+def index_for(layer):
+    """LayerIndex для шару (створюється при першому зверненні)."""
+    layer_id = layer.id()
+    index = _indexes.get(layer_id)
+    if index is None:
+        index = LayerIndex(layer)
+        _indexes[layer_id] = index
+        layer.dataChanged.connect(lambda lid=layer_id: invalidate_layer_index(lid))
+        layer.willBeDeleted.connect(lambda lid=layer_id: _indexes.pop(lid, None))
+    return index
+
+
+def invalidate_layer_index(layer_or_id):
+    """Скидає індекси шару після зміни його об'єктів."""
+    layer_id = layer_or_id if isinstance(layer_or_id, str) else layer_or_id.id()
+    index = _indexes.get(layer_id)
+    if index is not None:
+        index.invalidate()
+
+
+def prepare_layer_indexes(layer):
+    """Створює індекси провайдера для шару плагіна під час його побудови."""
+    if layer is None or not layer.isValid():
+        return
+    provider = layer.dataProvider()
+    capabilities = provider.capabilities()
+    if capabilities & QgsVectorDataProvider.CreateSpatialIndex:
+        provider.createSpatialIndex()
+    if capabilities & QgsVectorDataProvider.CreateAttributeIndex:
+        fields = layer.fields()
+        for name in KEY_FIELDS:
+            idx = fields.indexFromName(name)
+            if idx != -1:
+                provider.createAttributeIndex(idx)
+    index_for(layer)
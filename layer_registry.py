@@ -0,0 +1,137 @@
+"""
+Реєстр відкритих документів XML та їхніх шарів.
+
+Замінює перебір dockwidget.opened_xmls та шарів проекту словниками:
+- id(xml_data) -> xml_data (значення властивості шару xml_data_object_id);
+- назва групи -> xml_data;
+- id(tree) -> xml_data (для функцій, що отримують лише дерево lxml);
+- id шару -> xml_data та (id(xml_data), назва шару) -> id шару.
+
+Документи додаються/видаляються разом з opened_xmls (add_document /
+remove_document). Шари реєструє xmlUaLayers після побудови групи; реєстр
+також підхоплює шари з властивістю xml_data_object_id із сигналу
+layersAdded (напр., шари, перенесені у GeoPackage) та забуває шари за
+сигналом layerWillBeRemoved. Назва групи та дерево документа можуть
+змінитися (перестворення шарів, повторне прикріплення дерева) — такі
+записи перевіряються під час пошуку й переіндексовуються.
+"""
+
+from qgis.core import QgsProject
+
+
+class LayerRegistry:
+    """Словники відповідностей "документ XML ↔ група ↔ дерево ↔ шари"."""
+
+    def __init__(self):
+        self._docs = {}
+        self._docs_by_group = {}
+        self._docs_by_tree = {}
+        self._doc_by_layer = {}
+        self._layer_by_name = {}
+
+    # --- документи ------------------------------------------------------
+
+    def add_document(self, xml_data):
+        self._docs[id(xml_data)] = xml_data
+        self._index_document(xml_data)
+
+    def remove_document(self, xml_data):
+        doc_id = id(xml_data)
+        self._docs.pop(doc_id, None)
+        for mapping in (self._docs_by_group, self._docs_by_tree):
+            for key in [k for k, doc in mapping.items() if doc is xml_data]:
+                del mapping[key]
+        for layer_id in [lid for lid, doc in self._doc_by_layer.items() if doc is xml_data]:
+            del self._doc_by_layer[layer_id]
+        for key in [k for k in self._layer_by_name if k[0] == doc_id]:
+            del self._layer_by_name[key]
+
+    def _index_document(self, xml_data):
+        group_name = getattr(xml_data, "group_name", None)
+        if group_name:
+            self._docs_by_group[group_name] = xml_data
+        tree = getattr(xml_data, "tree", None)
+        if tree is not None:
+            self._docs_by_tree[id(tree)] = xml_data
+
+    def _reindex(self):
+        self._docs_by_group.clear()
+        self._docs_by_tree.clear()
+        for xml_data in self._docs.values():
+            self._index_document(xml_data)
+
+    def documents(self):
+        return list(self._docs.values())
+
+    def document_by_id(self, xml_data_object_id):
+        """xml_data за значенням властивості шару xml_data_object_id."""
+        try:
+            return self._docs.get(int(xml_data_object_id))
+        except (TypeError, ValueError):
+            return None
+
+    def document_for_group(self, group_name):
+        xml_data = self._docs_by_group.get(group_name)
+        if xml_data is not None and xml_data.group_name == group_name:
+            return xml_data
+        self._reindex()
+        return self._docs_by_group.get(group_name)
+
+    def document_for_tree(self, tree):
+        if tree is None:
+            return None
+        xml_data = self._docs_by_tree.get(id(tree))
+        if xml_data is not None and getattr(xml_data, "tree", None) is tree:
+            return xml_data
+        self._reindex()
+        return self._docs_by_tree.get(id(tree))
+
+    # --- шари -----------------------------------------------------------
+
+    def register_layer(self, xml_data, layer):
+        """Пов'язує шар групи з документом xml_data."""
+        if xml_data is None or layer is None:
+            return
+        self._doc_by_layer[layer.id()] = xml_data
+        self._layer_by_name[(id(xml_data), layer.name())] = layer.id()
+
+    def document_for_layer(self, layer):
+        """xml_data відкритого документа, якому належить шар, або None."""
+        if layer is None:
+            return None
+        xml_data = self._doc_by_layer.get(layer.id())
+        if xml_data is None:
+            xml_data = self.document_by_id(layer.customProperty("xml_data_object_id"))
+            if xml_data is None:
+                return None
+            self.register_layer(xml_data, layer)
+        return xml_data if id(xml_data) in self._docs else None
+
+    def layer_for(self, xml_data, layer_name):
+        """Шар layer_name документа xml_data або None."""
+        layer_id = self._layer_by_name.get((id(xml_data), layer_name))
+        layer = QgsProject.instance().mapLayer(layer_id) if layer_id else None
+        if layer is None or layer.name() != layer_name:
+            return None
+        return layer
+
+    def layer_ids_for(self, xml_data):
+        """id усіх зареєстрованих шарів документа (зокрема вже вилучених з дерева шарів)."""
+        return [lid for lid, doc in self._doc_by_layer.items() if doc is xml_data]
+
+    # --- сигнали проекту ------------------------------------------------
+
+    def on_layers_added(self, layers):
+        for layer in layers:
+            xml_data = self.document_by_id(layer.customProperty("xml_data_object_id"))
+            if xml_data is not None:
+                self.register_layer(xml_data, layer)
+
+    def on_layer_will_be_removed(self, layer_id):
+        xml_data = self._doc_by_layer.pop(layer_id, None)
+        layer = QgsProject.instance().mapLayer(layer_id)
+        if xml_data is None or layer is None:
+            return
+        key = (id(xml_data), layer.name())
+        if self._layer_by_name.get(key) == layer_id:
+            del self._layer_by_name[key]
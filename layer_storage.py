@@ -0,0 +1,207 @@
+"""
+Зберігання похідних шарів XML у тимчасовому GeoPackage.
+
+За замовчуванням усі шари плагіна — шари в пам'яті (provider "memory"), тож
+усі об'єкти лежать у RAM поруч із деревом lxml та моделлю Qt. Для файлів
+рівня кварталу чи зони можна увімкнути режим (налаштування
+xml_ua/gpkg_layer_storage, дія "Зберігати шари у тимчасовому GeoPackage" в
+меню інструментів), у якому великі шари (вузли, полілінії, ділянка, угіддя,
+обмеження, суміжники) після побудови переносяться у тимчасовий GeoPackage
+з просторовими індексами.
+
+Назви шарів, стилі, порядок у групі та власні властивості
+(xml_data_object_id, xml_group_name, ...) зберігаються; обробники шарів та
+ShapeInfo переключаються на нові шари, тож решта плагіна працює без змін.
+"""
+
+import os
+import tempfile
+import time
+import uuid
+
+from qgis.core import QgsLayerTreeLayer
+from qgis.core import QgsMapLayerStyle
+from qgis.core import QgsProject
+from qgis.core import QgsVectorFileWriter
+from qgis.core import QgsVectorLayer
+
+from .common import logFile
+from .common import log_calls
+
+
+GPKG_STORAGE_SETTING_KEY = "xml_ua/gpkg_layer_storage"
+
+# Назва шару -> назва таблиці в GeoPackage.
+FILE_BACKED_LAYERS = {
+    "Вузли": "nodes",
+    "Полілінії": "lines",
+    "Ділянка": "parcel",
+    "Угіддя": "lands",
+    "Обмеження": "restrictions",
+    "Суміжники": "adjacents",
+}
+
+STORAGE_DIR_NAME = "xml_ua_layers"
+STALE_AGE_SEC = 24 * 3600
+
+
+def storage_dir():
+    """Каталог тимчасових GeoPackage плагіна."""
+    return os.path.join(tempfile.gettempdir(), STORAGE_DIR_NAME)
+
+
+def new_storage_path(base_name):
+    """Унікальний шлях до нового GeoPackage для документа base_name."""
+    os.makedirs(storage_dir(), exist_ok=True)
+    safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(base_name)) or "xml"
+    return os.path.join(storage_dir(), f"{safe_name}_{uuid.uuid4().hex[:8]}.gpkg")
+
+
+def prune_stale_storage(max_age_sec=STALE_AGE_SEC):
+    """
+    Видаляє тимчасові GeoPackage (разом з -wal/-shm), старші за max_age_sec.
+    Викликається під час запуску плагіна. Повертає кількість видалених файлів.
+    """
+    directory = storage_dir()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+
+    removed = 0
+    deadline = time.time() - max_age_sec
+    for name in names:
+        if not name.endswith((".gpkg", ".gpkg-wal", ".gpkg-shm")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _write_table(layer, path, table, append):
+    """Записує шар у таблицю GeoPackage з просторовим індексом."""
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = table
+    options.fileEncoding = "UTF-8"
+    options.layerOptions = ["SPATIAL_INDEX=YES"]
+    options.actionOnExistingFile = (
+        QgsVectorFileWriter.CreateOrOverwriteLayer if append else QgsVectorFileWriter.CreateOrOverwriteFile)
+
+    result = QgsVectorFileWriter.writeAsVectorFormatV3(
+        layer, path, QgsProject.instance().transformContext(), options)
+    if result[0] != QgsVectorFileWriter.NoError:
+        raise RuntimeError(result[1] or f"код помилки {result[0]}")
+
+
+def _open_table(source_layer, path, table):
+    """Відкриває таблицю як шар з назвою, стилем і властивостями source_layer."""
+    layer = QgsVectorLayer(f"{path}|layername={table}", source_layer.name(), "ogr")
+    if not layer.isValid():
+        return None
+
+    style = QgsMapLayerStyle()
+    style.readFromLayer(source_layer)
+    style.writeToLayer(layer)
+
+    for key in source_layer.customPropertyKeys():
+        layer.setCustomProperty(key, source_layer.customProperty(key))
+    layer.setReadOnly(source_layer.readOnly())
+    return layer
+
+
+def _replace_in_group(group, old_layer, new_layer):
+    """Ставить new_layer на місце old_layer у групі та видаляє old_layer з проекту."""
+    project = QgsProject.instance()
+    old_id = old_layer.id()
+
+    index = None
+    for i, child in enumerate(group.children()):
+        if isinstance(child, QgsLayerTreeLayer) and child.layerId() == old_id:
+            index = i
+            break
+    if index is None:
+        return False
+
+    old_node = group.children()[index]
+    visible = old_node.itemVisibilityChecked()
+    expanded = old_node.isExpanded()
+
+    project.addMapLayer(new_layer, False)
+    new_node = group.insertLayer(index, new_layer)
+    new_node.setItemVisibilityChecked(visible)
+    new_node.setExpanded(expanded)
+
+    group.removeLayer(old_layer)
+    project.removeMapLayer(old_id)
+    return True
+
+
+def move_layers_to_geopackage(layers_obj):
+    """
+    Переносить шари FILE_BACKED_LAYERS групи layers_obj (xmlUaLayers) у новий
+    тимчасовий GeoPackage. Шари, які не вдалося перенести, залишаються в
+    пам'яті. Повертає шлях до GeoPackage або None, якщо нічого не перенесено.
+    """
+    group = getattr(layers_obj, "group", None)
+    handlers = [
+        h for h in getattr(layers_obj, "handlers", [])
+        if getattr(h, "layer", None) is not None and h.layer.name() in FILE_BACKED_LAYERS
+    ]
+    if group is None or not handlers:
+        return None
+
+    path = new_storage_path(getattr(layers_obj, "fileNameNoExt", "xml"))
+    dockwidget = getattr(getattr(layers_obj, "plugin", None), "dockwidget", None)
+    prev_suppress = getattr(dockwidget, "_suppress_close_on_layer_remove", False)
+    if dockwidget is not None:
+        dockwidget._suppress_close_on_layer_remove = True
+
+    started = time.perf_counter()
+    layer_id_map = {}
+    written = False
+    try:
+        for handler in handlers:
+            memory_layer = handler.layer
+            name = memory_layer.name()
+            table = FILE_BACKED_LAYERS[name]
+            try:
+                _write_table(memory_layer, path, table, append=written)
+                written = True
+                file_layer = _open_table(memory_layer, path, table)
+            except Exception as e:
+                log_calls(logFile, f"Шар '{name}' залишено в пам'яті: не вдалося записати у GeoPackage ({e}).")
+                continue
+            if file_layer is None:
+                log_calls(logFile, f"Шар '{name}' залишено в пам'яті: таблицю '{table}' не відкрито.")
+                continue
+
+            old_id = memory_layer.id()
+            if not _replace_in_group(group, memory_layer, file_layer):
+                QgsProject.instance().removeMapLayer(file_layer.id())
+                continue
+            handler.layer = file_layer
+            layer_id_map[old_id] = file_layer.id()
+    finally:
+        if dockwidget is not None:
+            dockwidget._suppress_close_on_layer_remove = prev_suppress
+
+    xml_data_obj = getattr(layers_obj, "xml_data", None)
+    for shape in getattr(xml_data_obj, "shapes", None) or []:
+        if shape.layer_id in layer_id_map:
+            shape.layer_id = layer_id_map[shape.layer_id]
+
+    if not layer_id_map:
+        return None
+
+    log_calls(
+        logFile,
+        f"Шари групи '{group.name()}' перенесено у GeoPackage '{path}' "
+        f"({len(layer_id_map)} шт., {time.perf_counter() - started:.3f} с)."
+    )
+    return path
@@ -0,0 +1,154 @@
+
+
+"""
+Інкрементне оновлення шарів групи XML після збереження.
+
+Замість видалення групи та створення всіх шарів заново xmlUaLayers
+проходить обробники шарів у наявній групі (context "save_sync"). Кожен
+обробник будує бажаний список об'єктів за збереженим деревом
+(build_features) — той самий, що використовують redraw_pickets_layer /
+redraw_lines_layer, — і цей список приводиться в наявному шарі до стану
+дерева лише відмінностями: додавання, видалення та зміна геометрії/атрибутів
+об'єктів. Стилі, видимість, порядок та розгорнутість шарів у дереві
+зберігаються.
+
+Новий шар будується (add_*_layer) лише тоді, коли шару ще немає або його
+поля відрізняються від полів обробника (напр. заглушка відкладеного шару);
+він стає на місце старого.
+"""
+
+from qgis.core import QgsLayerTreeLayer
+from qgis.core import QgsProject
+
+from .common import logFile
+from .common import log_calls
+from .deferred_layers import is_deferred
+from .feature_diff import apply_feature_diff
+from .feature_diff import data_field_names
+from .feature_diff import key_field_for_layer
+from .layers import xmlUaLayers
+
+
+def _node_index(group, layer_id):
+    for i, child in enumerate(group.children()):
+        if isinstance(child, QgsLayerTreeLayer) and child.layerId() == layer_id:
+            return i, child
+    return None, None
+
+
+class LayerSync:
+    """Розміщення шарів обробників у наявній групі під час оновлення."""
+
+    def __init__(self, group, xml_data_obj):
+        self.group = group
+        self.xml_key = str(id(xml_data_obj))
+        self.summary = []
+        self._obsolete_ids = []
+        self._current = {}
+        for node in group.children():
+            if isinstance(node, QgsLayerTreeLayer) and node.layer() is not None:
+                self._current.setdefault(node.layer().name(), node.layer())
+
+    def place(self, layer_name, handler, build):
+        """
+        Оновлює шар layer_name обробника handler. Якщо в групі є шар з тими
+        самими полями, що й handler.data_fields(), handler.layer стає цим
+        шаром, а об'єкти handler.build_features() застосовуються до нього
+        відмінностями. Інакше build() будує новий шар на місці наявного.
+        """
+        target = self._current.pop(layer_name, None)
+        if target is not None and not is_deferred(target):
+            fields = handler.data_fields()
+            if data_field_names(target) == list(fields.names()):
+                handler.layer = target
+                added, removed, changed = apply_feature_diff(
+                    target, handler.build_features(fields), key_field_for_layer(target))
+                if added or removed or changed:
+                    self.summary.append(f"{layer_name}: +{added} -{removed} ~{changed}")
+                return target
+
+        visible = None
+        if target is not None:
+            _, node = _node_index(self.group, target.id())
+            if node is not None:
+                visible = node.itemVisibilityChecked()
+
+        layer = build()
+        if target is None:
+            if layer is not None:
+                self.summary.append(f"{layer_name}: новий шар")
+            return layer
+
+        if layer is not None:
+            index, _ = _node_index(self.group, target.id())
+            _, built_node = _node_index(self.group, layer.id())
+            if index is not None and built_node is not None:
+                # Спершу новий вузол на місце старого, потім видалення вузла,
+                # створеного build(): інакше шар на мить лишається без вузла і
+                # міст дерева шарів видаляє його з проекту.
+                node = self.group.insertLayer(index, layer)
+                self.group.removeChildNode(built_node)
+                if node is not None and visible is not None:
+                    node.setItemVisibilityChecked(visible)
+            self.summary.append(f"{layer_name}: шар замінено")
+        else:
+            self.summary.append(f"{layer_name}: шар видалено")
+        self._drop(target)
+        return layer
+
+    def _drop(self, layer):
+        project = QgsProject.instance()
+        if project.mapLayer(layer.id()) is None:
+            # add_*_layer вже видалив шар з тією ж назвою.
+            return
+        self.group.removeLayer(layer)
+        self._obsolete_ids.append(layer.id())
+
+    def finish(self):
+        """Видаляє шари файлу, яких у дереві більше немає."""
+        for layer_name, layer in self._current.items():
+            if str(layer.customProperty("xml_data_object_id")) == self.xml_key:
+                self._drop(layer)
+                self.summary.append(f"{layer_name}: шар видалено")
+        self._current = {}
+        if self._obsolete_ids:
+            QgsProject.instance().removeMapLayers(self._obsolete_ids)
+            self._obsolete_ids = []
+
+
+def refresh_layers_incrementally(xml_data_obj, plugin=None):
+    """
+    Оновлює шари наявної групи xml_data_obj за поточним деревом.
+    Повертає новий xmlUaLayers (з обробниками, що вказують на шари групи)
+    або None, якщо групу не знайдено.
+    """
+    project = QgsProject.instance()
+    group = project.layerTreeRoot().findGroup(xml_data_obj.group_name)
+    if group is None:
+        return None
+
+    # Заглушки відкладених шарів замінюються повними шарами (поля заглушки
+    # не збігаються з полями обробника).
+    deferred = getattr(getattr(xml_data_obj, "layers_obj", None), "deferred", None)
+    if deferred is not None:
+        deferred.discard()
+
+    xml_data_obj.shapes = []
+    sync = LayerSync(group, xml_data_obj)
+    layers_obj = xmlUaLayers(
+        xmlFilePath=xml_data_obj.path,
+        tree=xml_data_obj.tree,
+        plugin=plugin,
+        xml_data=xml_data_obj,
+        context="save_sync",
+        group=group,
+        layer_sync=sync,
+    )
+    sync.finish()
+
+    log_calls(
+        logFile,
+        f"Інкрементне оновлення шарів групи '{group.name()}': "
+        + ("; ".join(sync.summary) if sync.summary else "змін немає")
+    )
+    return layers_obj
@@ -1,6 +1,8 @@
 
 
+import contextlib
 import os
+import time
 import xml.etree.ElementTree as ET
 
 from qgis.PyQt.QtWidgets import QMessageBox
@@ -17,6 +19,13 @@ from lxml import etree as ET
 from .common import logFile
 from .common import log_msg
 from .data_models import xml_data
+from .ring_cache import RingCache
+from .layer_storage import move_layers_to_geopackage
+from .deferred_layers import DEFERRED_LAYERS
+from .deferred_layers import DeferredLayers
+from .layer_batch import group_batch
+from .layer_index import index_for
+from .layer_index import prepare_layer_indexes
 from .points import Points
 from .control_point import ControlPoint
 from .lines import PLs
@@ -39,13 +48,17 @@ class xmlUaLayers:
                  tree=None,
                  plugin=None,
                  xml_data=None,
-                 context="open"):
+                 context="open",
+                 group=None,
+                 layer_sync=None):
 
         self.xml_data = xml_data  # Store the xml_data object
+        self.ring_cache = getattr(xml_data, "ring_cache", None) or RingCache()
         self.cleanup()
 
         self.plugin = plugin
         self.context = context
+        self.layer_sync = layer_sync
 
         xmlUaLayers._id_counter += 1
 
@@ -71,7 +84,13 @@ class xmlUaLayers:
         if self.xml_data is not None:
             preferred_group_name = str(getattr(self.xml_data, "group_name", "") or "").strip()
 
-        if preferred_group_name:
+        if group is not None:
+            # Готова група, напр. наявна група файлу під час інкрементного
+            # оновлення шарів після збереження.
+            self.group_name = group.name()
+            self.group = group
+            existing_group = group
+        elif preferred_group_name:
             existing_group = self.layers_root.findGroup(preferred_group_name)
             if existing_group:
                 self.group_name = preferred_group_name
@@ -114,74 +133,96 @@ class xmlUaLayers:
                 self.group.setCustomProperty(
                     "xml_data_object_id", id(self.xml_data))
 
-        self.points_handler = Points(
-            self.root, self.crsEpsg, self.group, self.plugin_dir, self.layers_root)
-        self.points_handler.read_points()
-
-        self.lines_handler = PLs(self.root, self.crsEpsg, self.group,
-                                 self.plugin_dir, self.layers_root, self.points_handler.qgisPoints)
-        self.lines_handler.read_lines()
-        self.qgisLines = self.lines_handler.qgis_lines  # Keep for other methods
-
-        lands_handler = None
-        leases_handler = None
-        self.subleases_handler = None
-        restrictions_handler = None
-        quarter_handler = None
-        zone_handler = None
-        parcel_handler = None
-        self.adjacents_handler = None
-
-        self.points_handler.add_pickets_layer()  # Вузли
-
-        self.control_points_handler = ControlPoint(
-            self.root,
-            self.crsEpsg,
-            self.group,
-            self.plugin_dir,
-            self.layers_root,
-            points_handler=self.points_handler,
-            xml_data=self.xml_data,
-        )
-        self.control_points_handler.add_control_points_layer()  # Закріплені вузли
-        self.lines_handler.add_lines_layer()  # Полілінії
-
-        zone_handler = CadastralZoneInfo(self.root, self.crsEpsg, self.group,
-                                         self.plugin_dir, self.linesToCoordinates, self, xml_data=self.xml_data)
-        zone_handler.add_zone_layer()
-
-        quarter_handler = CadastralQuarters(
-            self.root, self.crsEpsg, self.group, self.plugin_dir, self.linesToCoordinates, self, xml_data=self.xml_data)
-        quarter_handler.add_quarter_layer()
-
-        parcel_handler = CadastralParcel(self.root, self.crsEpsg, self.group, self.plugin_dir,
+        started = time.perf_counter()
+        self.deferred = DeferredLayers(self)
+        # Відкладені шари лише при відкритті файлу: після збереження та
+        # перемалювання група має бути повною.
+        lazy = getattr(self.plugin, "lazy_layers_enabled", False) and self.context == "open"
+
+        def build_or_defer(layer_name, handler, build):
+            if self.layer_sync is not None:
+                # Після збереження: відмінності в наявний шар або заміна шару.
+                self.layer_sync.place(layer_name, handler, build)
+            elif lazy and layer_name in DEFERRED_LAYERS:
+                self.deferred.defer(layer_name, build)
+            else:
+                build()
+
+        # Шари додаються в проект і групу разом після побудови всіх обробників;
+        # полотно карти оновлюється один раз. Синхронізація ставить нові шари
+        # на місця наявних одразу, тож додає їх без відкладення.
+        batch = group_batch(self.group) if self.layer_sync is None else contextlib.nullcontext()
+        with batch:
+            self.points_handler = Points(
+                self.root, self.crsEpsg, self.group, self.plugin_dir, self.layers_root)
+            self.points_handler.read_points()
+
+            self.lines_handler = PLs(self.root, self.crsEpsg, self.group,
+                                     self.plugin_dir, self.layers_root, self.points_handler.qgisPoints,
+                                     ring_cache=self.ring_cache)
+            self.lines_handler.read_lines()
+            self.qgisLines = self.lines_handler.qgis_lines  # Keep for other methods
+
+            lands_handler = None
+            leases_handler = None
+            self.subleases_handler = None
+            restrictions_handler = None
+            quarter_handler = None
+            zone_handler = None
+            parcel_handler = None
+            self.adjacents_handler = None
+
+            build_or_defer("Вузли", self.points_handler, self.points_handler.add_pickets_layer)
+
+            self.control_points_handler = ControlPoint(
+                self.root,
+                self.crsEpsg,
+                self.group,
+                self.plugin_dir,
+                self.layers_root,
+                points_handler=self.points_handler,
+                xml_data=self.xml_data,
+            )
+            build_or_defer("Закріплені вузли", self.control_points_handler,
+                           self.control_points_handler.add_control_points_layer)
+            build_or_defer("Полілінії", self.lines_handler, self.lines_handler.add_lines_layer)
+
+            zone_handler = CadastralZoneInfo(self.root, self.crsEpsg, self.group,
+                                             self.plugin_dir, self.linesToCoordinates, self, xml_data=self.xml_data)
+            build_or_defer("Кадастрова зона", zone_handler, zone_handler.add_zone_layer)
+
+            quarter_handler = CadastralQuarters(
+                self.root, self.crsEpsg, self.group, self.plugin_dir, self.linesToCoordinates, self, xml_data=self.xml_data)
+            build_or_defer("Кадастровий квартал", quarter_handler, quarter_handler.add_quarter_layer)
+
+            parcel_handler = CadastralParcel(self.root, self.crsEpsg, self.group, self.plugin_dir,
+                                             self.layers_root, self.linesToCoordinates, self, xml_data=self.xml_data)
+            build_or_defer("Ділянка", parcel_handler, parcel_handler.add_parcel_layer)
+
+            lands_handler = LandsParcels(self.root, self.crsEpsg, self.group, self.plugin_dir,
                                          self.layers_root, self.linesToCoordinates, self, xml_data=self.xml_data)
-        parcel_handler.add_parcel_layer()
+            if self.root.find(".//LandsParcel") is not None:
+                build_or_defer("Угіддя", lands_handler, lands_handler.add_lands_layer)
 
-        lands_handler = LandsParcels(self.root, self.crsEpsg, self.group, self.plugin_dir,
-                                     self.layers_root, self.linesToCoordinates, self, xml_data=self.xml_data)
-        if self.root.find(".//LandsParcel") is not None:
-            lands_handler.add_lands_layer()
+            leases_handler = Leases(self.root, self.crsEpsg, self.group, self.plugin_dir,
+                                    self.linesToCoordinates, self, xml_data=self.xml_data)  # Оренда
+            if self.root.find(".//Leases") is not None:
+                build_or_defer("Оренда", leases_handler, leases_handler.add_leases_layer)
 
-        leases_handler = Leases(self.root, self.crsEpsg, self.group, self.plugin_dir,
-                                self.linesToCoordinates, self, xml_data=self.xml_data)  # Оренда
-        if self.root.find(".//Leases") is not None:
-            leases_handler.add_leases_layer()
+            self.subleases_handler = Subleases(self.root, self.crsEpsg, self.group, self.plugin_dir,
+                                               self.linesToCoordinates, self, xml_data=self.xml_data)  # Суборенда
+            if self.root.find(".//Subleases") is not None:
+                build_or_defer("Суборенда", self.subleases_handler, self.subleases_handler.add_subleases_layer)
 
-        self.subleases_handler = Subleases(self.root, self.crsEpsg, self.group, self.plugin_dir,
-                                           self.linesToCoordinates, self, xml_data=self.xml_data)  # Суборенда
-        if self.root.find(".//Subleases") is not None:
-            self.subleases_handler.add_subleases_layer()
+            restrictions_handler = Restrictions(self.root, self.crsEpsg, self.group, self.plugin_dir,
+                                                self.linesToCoordinates, self, xml_data=self.xml_data)  # Обмеження
+            if self.root.find(".//Restrictions") is not None:
+                build_or_defer("Обмеження", restrictions_handler, restrictions_handler.add_restrictions_layer)
 
-        restrictions_handler = Restrictions(self.root, self.crsEpsg, self.group, self.plugin_dir,
-                                            self.linesToCoordinates, self, xml_data=self.xml_data)  # Обмеження
-        if self.root.find(".//Restrictions") is not None:
-            restrictions_handler.add_restrictions_layer()
-
-        self.adjacents_handler = AdjacentUnits(
-            self.root, self.crsEpsg, self.group, self.plugin_dir, self, self.xml_data)
-        if self.root.find(".//AdjacentUnits") is not None:
-            self.adjacents_handler.add_adjacents_layer()
+            self.adjacents_handler = AdjacentUnits(
+                self.root, self.crsEpsg, self.group, self.plugin_dir, self, self.xml_data)
+            if self.root.find(".//AdjacentUnits") is not None:
+                build_or_defer("Суміжники", self.adjacents_handler, self.adjacents_handler.add_adjacents_layer)
 
         all_handlers = [
             self.points_handler, self.control_points_handler, self.lines_handler, quarter_handler, zone_handler,
@@ -189,6 +230,19 @@ class xmlUaLayers:
             restrictions_handler, self.adjacents_handler
         ]
 
+        self.handlers = [h for h in all_handlers if h is not None]
+
+        # object_id елементів призначено обробниками шарів вище.
+        if self.xml_data and self.context != "save_sync":
+            self.xml_data.element_registry.rebuild(self.tree)
+
+        log_msg(
+            logFile,
+            f"Шари створено за {time.perf_counter() - started:.3f} с: "
+            f"вузлів {len(self.points_handler.qgisPoints)}, ліній {len(self.qgisLines)}, "
+            f"кеш кілець: {self.ring_cache.hits} влучань / {self.ring_cache.misses} промахів")
+
+        layer_registry = getattr(getattr(self.plugin, "dockwidget", None), "layer_registry", None)
         for layer_obj in all_handlers:
 
             if layer_obj and hasattr(layer_obj, 'layer') and layer_obj.layer and self.xml_data:
@@ -197,6 +251,52 @@ class xmlUaLayers:
 
                 layer_obj.layer.setCustomProperty(
                     "xml_group_name", self.group_name)
+                if layer_registry is not None:
+                    layer_registry.register_layer(self.xml_data, layer_obj.layer)
+
+        # Під час інкрементного оновлення ("save_sync") шари вже на своїх
+        # місцях (у т. ч. в GeoPackage), нові будуються в пам'яті.
+        self.storage_path = None
+        if getattr(self.plugin, "gpkg_storage_enabled", False) and self.context != "save_sync":
+            self.storage_path = move_layers_to_geopackage(self)
+
+        for handler in self.handlers:
+            if getattr(handler, "layer", None) is not None:
+                prepare_layer_indexes(handler.layer)
+
+    def layer_by_name(self, layer_name):
+        """
+        Шар групи з назвою layer_name, створений цим екземпляром, або None.
+        Відкладений шар при цьому будується.
+        """
+        for handler in self.handlers:
+            layer = getattr(handler, "layer", None)
+            if layer is not None and layer.name() == layer_name:
+                return layer
+        return self.deferred.materialize(layer_name)
+
+    def adopt_layer(self, layer):
+        """Підключає до групи шар, збудований після __init__ (відкладений шар)."""
+        if self.xml_data:
+            layer.setCustomProperty("xml_data_object_id", str(id(self.xml_data)))
+            layer.setCustomProperty("xml_group_name", self.group_name)
+            layer_registry = getattr(getattr(self.plugin, "dockwidget", None), "layer_registry", None)
+            if layer_registry is not None:
+                layer_registry.register_layer(self.xml_data, layer)
+            # Обробник шару призначив object_id елементам, яких ще не було в реєстрі.
+            self.xml_data.element_registry.rebuild(self.tree)
+        prepare_layer_indexes(layer)
+
+    def feature_by(self, layer_name, field_name, value):
+        """
+        Повертає об'єкт шару layer_name, у якого field_name (UIDP, ULID,
+        object_id або object_shape) дорівнює value, або None. Пошук іде через
+        атрибутний індекс шару, без перебору об'єктів.
+        """
+        layer = self.layer_by_name(layer_name)
+        if layer is None:
+            return None
+        return index_for(layer).feature_by(field_name, value)
 
     def check_construction_status(self):
         """
@@ -280,7 +380,7 @@ class xmlUaLayers:
 
         return
 
-    def linesToCoordinates(self, lines_element):
+    def linesToCoordinates(self, lines_element, context="unknown"):
         """ Формує список координат замкненого полігону на основі ULID ліній 
             і їх точок.
 
@@ -296,6 +396,11 @@ class xmlUaLayers:
         if lines_element is None:
             raise ValueError("lines_element не може бути None.")
 
+        key = RingCache.key_for(lines_element)
+        cached = self.ring_cache.get_coordinates(key)
+        if cached is not None:
+            return cached
+
         lines = []
 
         for line in lines_element.findall(".//Line"):
@@ -341,6 +446,7 @@ class xmlUaLayers:
         if polygon_coordinates[0] != polygon_coordinates[-1]:
             polygon_coordinates.append(polygon_coordinates[0])
 
+        self.ring_cache.put_coordinates(key, polygon_coordinates)
         return polygon_coordinates
 
     def on_editing_stopped(self):
@@ -9,12 +9,14 @@ from qgis.core import (
     QgsPolygon,
     QgsLineString,
     QgsPointXY,
-    QgsWkbTypes,
-    QgsProject
+    QgsWkbTypes
 )
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .data_models import ShapeInfo  # noqa
 from .common import logFile
 from .common import ensure_object_layer_fields, log_msg
+from .common import object_layer_fields
 
 
 class Leases:
@@ -62,6 +64,7 @@ class Leases:
             layer.commitChanges()
             return
 
+        features = []
         for lease in leases_parent.findall(".//LeaseInfo"):
             object_id_text = str(lease.get("object_id") or "").strip()
             lease_duration = lease.findtext(
@@ -92,27 +95,23 @@ class Leases:
             feature.setGeometry(QgsGeometry(polygon))
             object_id = int(object_id_text) if object_id_text.isdigit() else None
             feature.setAttributes([object_id, ""])
-            provider.addFeature(feature)
+            features.append(feature)
+        provider.addFeatures(features)
         layer.commitChanges()
 
-    def add_leases_layer(self):
-        """Створює та заповнює шар 'Оренда'."""
+    def data_fields(self):
+        """Поля даних шару 'Оренда'."""
+        return object_layer_fields()
 
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Оренда' за деревом: призначає відсутні
+        object_id і додає ShapeInfo шару self.layer до xml_data.shapes.
+        """
         parcel_info = self.root.find(".//ParcelInfo")
         leases_parent = parcel_info.find("Leases")
         if leases_parent is None:
-
-            return None
-
-        layer_name = "Оренда"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
-        self.layer.setCustomProperty("skip_save_dialog", True)
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "lease.qml"))
-        provider = self.layer.dataProvider()
-
-        ensure_object_layer_fields(self.layer)
+            return []
 
         existing_shapes_in_layer = set()
         if self.xml_data:
@@ -127,6 +126,7 @@ class Leases:
                 used_object_ids.add(int(obj_id_text))
         next_object_id = 1
 
+        features = []
         for lease in leases_parent.findall(".//LeaseInfo"):
             lease_duration = lease.findtext(
                 ".//LeaseAgreement/LeaseTerm/LeaseDuration")
@@ -135,7 +135,8 @@ class Leases:
 
             try:
                 from .topology import GeometryProcessor
-                processor = GeometryProcessor(self.root.getroottree())
+                processor = GeometryProcessor(
+                    self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
             except Exception as e:
                 log_msg(
                     logFile, f"Не вдалося створити GeometryProcessor в Leases: {e}")
@@ -186,7 +187,7 @@ class Leases:
                             [QgsPointXY(p.y(), p.x()) for p in internal_coords])
                         polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
             feature.setGeometry(QgsGeometry(polygon))
             object_id_int = int(object_id_text) if object_id_text.isdigit() else None
             feature.setAttributes([object_id_int, object_shape])
@@ -199,12 +200,31 @@ class Leases:
                 self.xml_data.shapes.append(shape_info)
                 log_msg(
                     logFile, f"Додавання об'єкта до shapes: Оренда, ID:{object_id_text}, shape='{object_shape}'")
-            provider.addFeature(feature)
+            features.append(feature)
+        return features
+
+    def add_leases_layer(self):
+        """Створює та заповнює шар 'Оренда'."""
+
+        parcel_info = self.root.find(".//ParcelInfo")
+        leases_parent = parcel_info.find("Leases")
+        if leases_parent is None:
+
+            return None
+
+        layer_name = "Оренда"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
+        self.layer.setCustomProperty("skip_save_dialog", True)
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "lease.qml"))
+        provider = self.layer.dataProvider()
+
+        ensure_object_layer_fields(self.layer)
+
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        self.xml_ua_layers.added_layers.append(layer_node)
-        self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
@@ -225,7 +245,7 @@ class Leases:
         self.layer = QgsVectorLayer(
             f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
         self.layer.setCustomProperty("skip_save_dialog", True)
-        self.layer.loadNamedStyle(os.path.join(
+        load_named_style(self.layer, os.path.join(
             self.plugin_dir, "templates", "lease.qml"))
         provider = self.layer.dataProvider()
 
@@ -244,6 +264,7 @@ class Leases:
                 used_object_ids.add(int(obj_id_text))
         next_object_id = 1
 
+        features = []
         for lease in leases_parent.findall(".//LeaseInfo"):
             lease_duration = lease.findtext(
                 ".//LeaseAgreement/LeaseTerm/LeaseDuration")
@@ -252,7 +273,8 @@ class Leases:
 
             try:
                 from .topology import GeometryProcessor
-                processor = GeometryProcessor(self.root.getroottree())
+                processor = GeometryProcessor(
+                    self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
             except Exception as e:
                 log_msg(
                     logFile, f"Не вдалося створити GeometryProcessor в Leases: {e}")
@@ -316,12 +338,10 @@ class Leases:
                 self.xml_data.shapes.append(shape_info)
                 log_msg(
                     logFile, f"Додавання об'єкта до shapes: Оренда, ID:{object_id_text}, shape='{object_shape}'")
-            provider.addFeature(feature)
+            features.append(feature)
+        provider.addFeatures(features)
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        self.xml_ua_layers.added_layers.append(layer_node)
-        self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
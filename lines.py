@@ -4,6 +4,7 @@ import os
 from qgis.core import (
     QgsVectorLayer,
     QgsField,
+    QgsFields,
     QgsFeature,
     QgsGeometry,
     QgsPointXY,
@@ -13,11 +14,15 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtWidgets import QMessageBox
 
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
+from .feature_diff import apply_feature_diff
+
 
 class PLs:
     """Клас для обробки поліліній з XML-файлу."""
 
-    def __init__(self, root, crs_epsg, group, plugin_dir, layers_root, qgis_points, xml_data=None):
+    def __init__(self, root, crs_epsg, group, plugin_dir, layers_root, qgis_points, xml_data=None, ring_cache=None):
         """
         Ініціалізація об'єкта для роботи з полілініями.
 
@@ -28,6 +33,7 @@ class PLs:
             plugin_dir (str): Шлях до директорії плагіна.
             layers_root (QgsLayerTreeGroup): Кореневий вузол дерева шарів QGIS.
             qgis_points (dict): Словник зчитаних точок (вузлів).
+            ring_cache (RingCache): Кеш кілець документа, що скидається при зміні ліній.
         """
         self.root = root
         self.crs_epsg = crs_epsg
@@ -38,6 +44,7 @@ class PLs:
         self.qgis_points = qgis_points
         self.xml_lines = []
         self.qgis_lines = {}
+        self.ring_cache = ring_cache
 
     def read_lines(self):
         """Зчитує полілінії з XML та заповнює атрибути."""
@@ -59,28 +66,50 @@ class PLs:
                 self.qgis_lines[ulid] = [self.qgis_points[uidp]
                                          for uidp in points_uidp]
 
+        if self.ring_cache is not None:
+            self.ring_cache.sync_lines({
+                line_data["ULID"]: (
+                    tuple(line_data["Points"]),
+                    tuple((p.x(), p.y()) for p in self.qgis_lines.get(line_data["ULID"], ())),
+                )
+                for line_data in self.xml_lines
+            })
+
     def redraw_lines_layer(self):
-        """Очищує та заповнює існуючий шар 'Полілінії'."""
+        """
+        Оновлює існуючий шар 'Полілінії' за XML: змінює лише ті об'єкти, чия
+        геометрія чи атрибути відрізняються (зіставлення за ULID).
+        Повертає (додано, видалено, змінено).
+        """
         if not hasattr(self, 'layer') or not self.layer:
 
-            return
+            return None
 
         self.read_lines()  # Перечитуємо лінії з XML
 
-        provider = self.layer.dataProvider()
-        self.layer.startEditing()
-        self.layer.deleteFeatures(self.layer.allFeatureIds())
+        return apply_feature_diff(self.layer, self.build_features(self.layer.fields()), "ULID")
 
+    def data_fields(self):
+        """Поля даних шару 'Полілінії'."""
+        fields = QgsFields()
+        fields.append(QgsField("ULID", QVariant.String))
+        fields.append(QgsField("Length", QVariant.String))
+        return fields
+
+    def build_features(self, fields):
+        """Будує всі об'єкти шару 'Полілінії' для одного пакетного addFeatures."""
+        features = []
         for line_data in self.xml_lines:
-            feature = QgsFeature(self.layer.fields())
-            feature.setAttributes([line_data["ULID"], line_data["Length"]])
+            feature = QgsFeature(fields)
+            feature.setAttribute("ULID", line_data["ULID"])
+            feature.setAttribute("Length", line_data["Length"])
             if line_data["ULID"] in self.qgis_lines:
                 polyline_points = [QgsPointXY(p.y(), p.x())
                                    for p in self.qgis_lines[line_data["ULID"]]]
                 feature.setGeometry(
                     QgsGeometry.fromPolylineXY(polyline_points))
-            provider.addFeature(feature)
-        self.layer.commitChanges()
+            features.append(feature)
+        return features
 
     def add_lines_layer(self):
         """Створює та заповнює шар 'Полілінії'."""
@@ -102,7 +131,7 @@ class PLs:
                 None, "xml_ua", "Виникла помилка при створенні шару ліній.")
             return None
 
-        self.layer.loadNamedStyle(os.path.join(
+        load_named_style(self.layer, os.path.join(
 
             self.plugin_dir, "templates", "lines.qml"))
 
@@ -110,26 +139,12 @@ class PLs:
 
         provider = self.layer.dataProvider()
 
-        provider.addAttributes(
-            [QgsField("ULID", QVariant.String), QgsField("Length", QVariant.String)])
+        provider.addAttributes(self.data_fields().toList())
         self.layer.updateFields()
 
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        for line_data in self.xml_lines:
-            feature = QgsFeature(self.layer.fields())
-            feature.setAttributes([line_data["ULID"], line_data["Length"]])
-            if line_data["ULID"] in self.qgis_lines:
-                polyline_points = [QgsPointXY(p.y(), p.x())
-                                   for p in self.qgis_lines[line_data["ULID"]]]
-                feature.setGeometry(
-                    QgsGeometry.fromPolylineXY(polyline_points))
-            provider.addFeature(feature)
-
-
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        if hasattr(self, 'xml_ua_layers'):
-            self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer)
 
         if self.xml_data:
             self.layer.setCustomProperty(
@@ -58,41 +58,49 @@ def snapshot_geometry_numbering(xml_tree) -> GeometryNumberingSnapshot:
     після зміни дерева порівняти "до/після" для того ж самого елемента.
     """
     root = xml_tree.getroot()
+    return numbering_snapshot_from_elements(
+        points=root.findall(".//PointInfo/Point"),
+        lines=root.findall(".//Polyline/PL"),
+        polyline_point_refs=root.xpath(P_REF_XPATH),
+        boundary_ulid_refs=root.xpath(ULID_REF_XPATH),
+    )
+
 
-    points: list[PointState] = []
-    for point in root.findall(".//PointInfo/Point"):
-        points.append(
+def numbering_snapshot_from_elements(
+    *,
+    points: Iterable,
+    lines: Iterable,
+    polyline_point_refs: Iterable,
+    boundary_ulid_refs: Iterable,
+    namespaced: bool = False,
+) -> GeometryNumberingSnapshot:
+    """
+    Те саме, що snapshot_geometry_numbering, але з уже знайдених елементів
+    (Point, PL, посилань P та ULID у порядку документа), напр. зібраних
+    document_lint під час спільного обходу дерева.
+    """
+    ns = "{*}" if namespaced else ""
+    return GeometryNumberingSnapshot(
+        points=tuple(
             PointState(
                 elem=point,
-                uidp=_safe_text(point.findtext("UIDP")),
-                pn=_safe_text(point.findtext("PN")),
-                x=_safe_text(point.findtext("X")),
-                y=_safe_text(point.findtext("Y")),
+                uidp=_safe_text(point.findtext(f"{ns}UIDP")),
+                pn=_safe_text(point.findtext(f"{ns}PN")),
+                x=_safe_text(point.findtext(f"{ns}X")),
+                y=_safe_text(point.findtext(f"{ns}Y")),
             )
-        )
-
-    lines: list[LineState] = []
-    for pl in root.findall(".//Polyline/PL"):
-        lines.append(
+            for point in points
+        ),
+        lines=tuple(
             LineState(
                 elem=pl,
-                ulid=_safe_text(pl.findtext("ULID")),
-                point_refs=tuple(_safe_text(p.text) for p in pl.findall("Points/P")),
+                ulid=_safe_text(pl.findtext(f"{ns}ULID")),
+                point_refs=tuple(_safe_text(p.text) for p in pl.findall(f"{ns}Points/{ns}P")),
             )
-        )
-
-    polyline_point_refs = tuple(
-        RefState(elem=el, value=_safe_text(el.text)) for el in root.xpath(P_REF_XPATH)
-    )
-    boundary_ulid_refs = tuple(
-        RefState(elem=el, value=_safe_text(el.text)) for el in root.xpath(ULID_REF_XPATH)
-    )
-
-    return GeometryNumberingSnapshot(
-        points=tuple(points),
-        lines=tuple(lines),
-        polyline_point_refs=polyline_point_refs,
-        boundary_ulid_refs=boundary_ulid_refs,
+            for pl in lines
+        ),
+        polyline_point_refs=tuple(RefState(elem=el, value=_safe_text(el.text)) for el in polyline_point_refs),
+        boundary_ulid_refs=tuple(RefState(elem=el, value=_safe_text(el.text)) for el in boundary_ulid_refs),
     )
 
 
@@ -0,0 +1,247 @@
+"""
+Дисковий кеш результатів підготовки XML до відкриття.
+
+Ключ — SHA-256 вмісту файлу разом з параметрами перевірок, відбитком файлу
+схеми XSD і відбитком коду модулів аналізу. Запис містить стиснутий
+(zlib + pickle) PreparedXml: виправлений XML після площ/object_id/порядку ParcelInfo/перенумерації, підсумки
+перевірок площ, нумерації, PN, близьких/створних точок та XSD. Повторне
+відкриття незміненого файлу лише розбирає збережений XML і перезаписує звіти
+поруч із файлом — без жодної перевірки.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import io
+import os
+import pickle
+import zlib
+from pathlib import Path
+
+from lxml import etree
+
+from . import area_checks
+from .numbering_report import write_numbering_report
+from .open_pipeline import PreparedXml, attach_tree, prepare_xml_for_open
+from .proximity_checks import build_proximity_report, write_proximity_report
+from .topology_checks import build_topology_report, write_topology_report
+
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".xmlua-cache"
+MAX_ENTRIES = 200
+
+# Зміна будь-якого з цих модулів робить усі записи кешу недійсними.
+_ANALYSIS_MODULES = ("open_pipeline.py", "open_cache.py", "area_checks.py", "numbering_report.py", "proximity_checks.py", "proximity_vectorized.py", "geometry_snapshot.py", "xml_paths.py", "document_lint.py", "topology_checks.py", "check_runner.py")
+
+
+def default_cache_dir() -> str:
+    """Каталог кешу користувача: %LOCALAPPDATA%/xml_ua/cache або ~/.cache/xml_ua."""
+    base = os.environ.get("LOCALAPPDATA")
+    if base:
+        return os.path.join(base, "xml_ua", "cache")
+    return os.path.join(os.path.expanduser("~"), ".cache", "xml_ua")
+
+
+def _file_stamp(path: str) -> str:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "-"
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _code_fingerprint() -> str:
+    plugin_dir = os.path.dirname(__file__)
+    parts = [str(CACHE_VERSION)]
+    for name in _ANALYSIS_MODULES:
+        parts.append(f"{name}:{_file_stamp(os.path.join(plugin_dir, name))}")
+    return "|".join(parts)
+
+
+def cache_key(data: bytes, *, xsd_path: str | None, proximity_threshold_m: float) -> str:
+    """Ключ запису: код аналізу, схема XSD (шлях, розмір, час зміни), поріг і вміст файлу."""
+    digest = hashlib.sha256()
+    digest.update(_code_fingerprint().encode("utf-8"))
+    xsd_stamp = _file_stamp(xsd_path) if xsd_path else ""
+    digest.update(f"|xsd={xsd_path or ''}:{xsd_stamp}|threshold={proximity_threshold_m!r}|".encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _entry_path(cache_dir: str, key: str) -> Path:
+    return Path(cache_dir) / f"{key}{CACHE_SUFFIX}"
+
+
+def load_entry(cache_dir: str, key: str) -> PreparedXml | None:
+    """Повертає PreparedXml (з xml_bytes, без tree) або None, якщо запису немає чи він пошкоджений."""
+    path = _entry_path(cache_dir, key)
+    try:
+        payload = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        prepared = pickle.loads(zlib.decompress(payload))
+    except Exception:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return None
+    if not isinstance(prepared, PreparedXml) or prepared.xml_bytes is None:
+        return None
+    try:
+        os.utime(path)  # для витіснення найдавніше використаних записів
+    except OSError:
+        pass
+    return prepared
+
+
+def store_entry(cache_dir: str, key: str, prepared: PreparedXml, xml_bytes: bytes) -> None:
+    """Атомарно записує результат підготовки та обрізає кеш до MAX_ENTRIES записів."""
+    entry = dataclasses.replace(prepared, tree=None, geometry=None, xml_bytes=xml_bytes, log_messages=[], from_cache=False)
+    payload = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(cache_dir, key)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, path)
+    prune(cache_dir)
+
+
+def prune(cache_dir: str, max_entries: int = MAX_ENTRIES) -> int:
+    """Видаляє найдавніше використані записи понад max_entries. Повертає кількість видалених."""
+    try:
+        entries = [p for p in Path(cache_dir).iterdir() if p.name.endswith(CACHE_SUFFIX)]
+    except OSError:
+        return 0
+    if len(entries) <= max_entries:
+        return 0
+
+    def mtime(p: Path) -> float:
+        try:
+            return p.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    removed = 0
+    for p in sorted(entries, key=mtime)[: len(entries) - max_entries]:
+        try:
+            p.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _rewrite_reports(prepared: PreparedXml, cached_xml_path: str, xml_path: str, checks) -> None:
+    """Відтворює звіти перевірок поруч із xml_path з кешованих результатів."""
+    log = prepared.log_messages.append
+
+    if prepared.area_report_path and prepared.area_result is not None:
+        try:
+            report_text = checks.build_area_err_report(xml_path=xml_path, result=prepared.area_result)
+            prepared.area_report_path = checks.write_area_err_report(xml_path=xml_path, report_text=report_text)
+        except Exception as e:
+            prepared.area_report_error = str(e)
+            prepared.area_report_path = ""
+
+    if prepared.numbering_report_path and prepared.numbering_report_text:
+        try:
+            report_text = prepared.numbering_report_text.replace(
+                f"Файл: {cached_xml_path}", f"Файл: {xml_path}", 1)
+            prepared.numbering_report_path = write_numbering_report(xml_path=xml_path, report_text=report_text)
+        except Exception as e:
+            log(f"Помилка створення звіту про нумерацію: {e}")
+            prepared.numbering_report_path = ""
+
+    if prepared.proximity_report_path and prepared.proximity_result is not None:
+        try:
+            report_text = build_proximity_report(xml_path=xml_path, result=prepared.proximity_result)
+            prepared.proximity_report_path = write_proximity_report(xml_path=xml_path, report_text=report_text)
+        except Exception as e:
+            log(f"Помилка створення звіту proximity: {e}")
+            prepared.proximity_report_path = ""
+
+    if prepared.topology_report_path and prepared.topology_result is not None:
+        try:
+            report_text = build_topology_report(xml_path=xml_path, result=prepared.topology_result)
+            prepared.topology_report_path = write_topology_report(xml_path=xml_path, report_text=report_text)
+        except Exception as e:
+            log(f"Помилка створення звіту топології: {e}")
+            prepared.topology_report_path = ""
+
+
+def prepare_xml_cached(
+    xml_path: str,
+    *,
+    cache_dir: str | None,
+    backup_path: str | None = None,
+    original_path: str | None = None,
+    area_checks_module=None,
+    xsd_path: str | None = None,
+    proximity_threshold_m: float = 0.3,
+    progress=None,
+    keep_bytes: bool = False,
+) -> PreparedXml:
+    """
+    prepare_xml_for_open() з дисковим кешем. За cache_dir=None кеш не
+    використовується. keep_bytes=True повертає xml_bytes замість tree
+    (для передачі результату з worker-процесу).
+    """
+    if not cache_dir:
+        prepared = prepare_xml_for_open(
+            xml_path,
+            backup_path=backup_path,
+            original_path=original_path,
+            area_checks_module=area_checks_module,
+            xsd_path=xsd_path,
+            proximity_threshold_m=proximity_threshold_m,
+            progress=progress,
+        )
+        if keep_bytes:
+            prepared.xml_bytes = etree.tostring(prepared.tree, encoding="utf-8", xml_declaration=True)
+            prepared.tree = None
+            prepared.geometry = None
+        return prepared
+
+    checks = area_checks_module or area_checks
+    data = Path(xml_path).read_bytes()
+    key = cache_key(data, xsd_path=xsd_path, proximity_threshold_m=proximity_threshold_m)
+
+    prepared = load_entry(cache_dir, key)
+    if prepared is not None:
+        cached_xml_path = prepared.xml_path
+        prepared.xml_path = xml_path
+        prepared.backup_path = backup_path
+        prepared.original_path = original_path
+        prepared.from_cache = True
+        prepared.elapsed_sec = 0.0
+        prepared.log_messages = [f"Результати перевірок взято з кешу ({key[:12]})."]
+        _rewrite_reports(prepared, cached_xml_path, xml_path, checks)
+        if progress is not None:
+            progress(100)
+        return prepared if keep_bytes else attach_tree(prepared)
+
+    tree = etree.parse(io.BytesIO(data))
+    prepared = prepare_xml_for_open(
+        xml_path,
+        tree=tree,
+        backup_path=backup_path,
+        original_path=original_path,
+        area_checks_module=checks,
+        xsd_path=xsd_path,
+        proximity_threshold_m=proximity_threshold_m,
+        progress=progress,
+    )
+    xml_bytes = etree.tostring(prepared.tree, encoding="utf-8", xml_declaration=True)
+    try:
+        store_entry(cache_dir, key, prepared, xml_bytes)
+    except Exception as e:
+        prepared.log_messages.append(f"Не вдалося записати кеш відкриття: {e}")
+    if keep_bytes:
+        prepared.xml_bytes = xml_bytes
+        prepared.tree = None
+        prepared.geometry = None
+    return prepared
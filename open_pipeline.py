@@ -0,0 +1,590 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+from lxml import etree
+
+from . import area_checks
+from .document_lint import run_open_lint
+from .geometry_snapshot import GeometrySnapshot, build_geometry_snapshot
+from .numbering_report import (
+    ULID_REF_XPATH,
+    P_REF_XPATH,
+    GeometryNumberingSnapshot,
+    snapshot_geometry_numbering,
+    build_geometry_numbering_report,
+    write_numbering_report,
+)
+from .proximity_checks import (
+    ProximityCheckResult,
+    build_proximity_report,
+    write_proximity_report,
+)
+from .topology_checks import (
+    TopologyCheckResult,
+    build_topology_report,
+    write_topology_report,
+)
+
+
+ProgressCb = Callable[[int], None]
+LogCb = Callable[[str], None]
+
+
+PARCEL_INFO_ORDER = (
+    "ParcelLocationInfo",
+    "CategoryPurposeInfo",
+    "OwnershipInfo",
+    "ParcelMetricInfo",
+    "Proprietors",
+    "LegalModeInfo",
+    "TechnicalDocumentationInfo",
+    "StateActInfo",
+    "ValuationInfo",
+    "Leases",
+    "Subleases",
+    "Restrictions",
+    "LandsParcel",
+    "AdjacentUnits",
+    "AdditionalInfoBlock",
+)
+
+
+class OpenCanceled(Exception):
+    """Підготовку XML до відкриття скасовано користувачем."""
+
+
+@dataclass
+class PreparedXml:
+    """
+    Результат підготовки XML до відкриття: виправлене дерево та підсумки
+    перевірок. Помилки окремих кроків зберігаються текстом, щоб результат
+    можна було передати з іншого процесу.
+    """
+    xml_path: str
+    backup_path: str | None = None
+    original_path: str | None = None
+    tree: object = None
+    xml_bytes: bytes | None = None
+    # Знімок геометрії остаточного дерева; між процесами та в кеш не передається.
+    geometry: GeometrySnapshot | None = None
+
+    area_result: area_checks.AreaChecksResult | None = None
+    area_report_path: str = ""
+    area_report_error: str | None = None
+    area_error: str | None = None
+
+    removed_object_ids: int = 0
+    was_reordered: bool = False
+
+    was_renumbered: bool = False
+    numbering_report_path: str = ""
+    numbering_report_text: str = ""
+    renumber_error: str | None = None
+
+    empty_pn: int = 0
+    duplicate_pn: tuple[str, ...] = ()
+
+    proximity_result: ProximityCheckResult | None = None
+    proximity_report_path: str = ""
+    proximity_error: str | None = None
+
+    topology_result: TopologyCheckResult | None = None
+    topology_report_path: str = ""
+    topology_error: str | None = None
+
+    xsd_errors: tuple[str, ...] | None = None
+    log_messages: list[str] = field(default_factory=list)
+    elapsed_sec: float = 0.0
+    from_cache: bool = False
+
+
+def remove_object_id_attributes(xml_tree) -> int:
+    """Видаляє технічні object_id з XML-дерева. Повертає кількість видалених атрибутів."""
+    if xml_tree is None:
+        return 0
+
+    root = xml_tree.getroot()
+    if root is None:
+        return 0
+
+    removed_count = 0
+    for node in root.xpath(".//*[@object_id]"):
+        if "object_id" in node.attrib:
+            del node.attrib["object_id"]
+            removed_count += 1
+
+    return removed_count
+
+
+def sort_children_in_parcel_info(parcel_info_element) -> bool:
+    """
+    Сортує дочірні елементи <ParcelInfo> згідно з порядком, визначеним у схемі XSD.
+    Повертає True, якщо порядок було змінено, інакше False.
+    """
+
+    current_children = list(parcel_info_element)
+    current_tags = [child.tag for child in current_children]
+
+    sorted_children = []
+
+    children_map = {child.tag: child for child in current_children}
+
+    for tag in PARCEL_INFO_ORDER:
+        if tag in children_map:
+            sorted_children.append(children_map[tag])
+
+    present_tags_sorted = [child.tag for child in sorted_children]
+    if current_tags != present_tags_sorted:
+
+        parcel_info_element.clear()
+        for child in sorted_children:
+            parcel_info_element.append(child)
+        return True  # Порядок було змінено
+
+    return False  # Порядок не змінювався
+
+
+def _set_text(element, text, journal=None) -> bool:
+    """Змінює текст елемента; True, якщо текст справді змінився."""
+    changed = element.text != text
+    if journal is not None:
+        journal.set_text(element, text)
+    else:
+        element.text = text
+    return changed
+
+
+def _remove(element, journal=None) -> None:
+    if journal is not None:
+        journal.remove(element)
+    else:
+        element.getparent().remove(element)
+
+
+def renumber_geometry(root, log: LogCb | None = None, journal=None) -> bool:
+    """
+    Перенумеровує всі вузли (Points) та лінії (Polylines) для усунення прогалин
+    та оновлює всі посилання на них у XML-дереві. Якщо передано journal
+    (EditJournal), зміни записуються в нього. Повертає True, якщо змінено
+    хоча б один UIDP/ULID чи посилання.
+    """
+    changed = False
+
+    old_uidp_to_new = {}
+    all_points = root.findall('.//PointInfo/Point')
+
+    all_points.sort(key=lambda p: int(p.findtext('UIDP', '0')))
+
+    for i, point_elem in enumerate(all_points, 1):
+        new_uidp = str(i)
+        old_uidp = point_elem.findtext('UIDP')
+
+        if old_uidp and old_uidp != new_uidp:
+            old_uidp_to_new[old_uidp] = new_uidp
+
+        changed |= _set_text(point_elem.find('UIDP'), new_uidp, journal)
+
+    old_ulid_to_new = {}
+    all_lines = root.findall('.//Polyline/PL')
+
+    all_lines.sort(key=lambda pl: int(pl.findtext('ULID', '0')))
+
+    for i, line_elem in enumerate(all_lines, 1):
+        new_ulid = str(i)
+        old_ulid = line_elem.findtext('ULID')
+
+        if old_ulid and old_ulid != new_ulid:
+            old_ulid_to_new[old_ulid] = new_ulid
+
+        changed |= _set_text(line_elem.find('ULID'), new_ulid, journal)
+
+    if old_uidp_to_new:
+        updated_p_refs = 0
+        for p_ref in root.xpath(P_REF_XPATH):
+            old_ref = p_ref.text
+            if old_ref in old_uidp_to_new:
+                changed |= _set_text(p_ref, old_uidp_to_new[old_ref], journal)
+                updated_p_refs += 1
+        if log:
+            log(f"Оновлено {updated_p_refs} посилань на вузли в полілініях.")
+
+    if old_ulid_to_new:
+        updated_ulid_refs = 0
+        for ulid_ref in root.xpath(ULID_REF_XPATH):
+            old_ref = ulid_ref.text
+            if old_ref in old_ulid_to_new:
+                changed |= _set_text(ulid_ref, old_ulid_to_new[old_ref], journal)
+                updated_ulid_refs += 1
+        if log:
+            log(f"Оновлено {updated_ulid_refs} посилань на лінії в контурах.")
+    return changed
+
+
+def cleanup_and_renumber_geometry(
+    root,
+    log: LogCb | None = None,
+    journal=None,
+    numbering: GeometryNumberingSnapshot | None = None,
+) -> bool:
+    """
+    Видаляє невикористані полілінії та вузли і перенумеровує геометрію.
+    Повертає True, якщо були внесені зміни, інакше False.
+
+    numbering — зріз нумерації цього ж дерева (snapshot_geometry_numbering або
+    document_lint): використані ULID/UIDP беруться з нього без окремого
+    пошуку посилань у дереві.
+    """
+
+    if numbering is not None:
+        used_ulids = {r.value for r in numbering.boundary_ulid_refs if r.value}
+    else:
+        used_ulids = set()
+        for line_ref in root.xpath(ULID_REF_XPATH):
+            if line_ref.text:
+                used_ulids.add(line_ref.text)
+
+    polyline_container = root.find('.//Polyline')  # Блок опису поліліній
+    lines_removed_count = 0
+    lines_removed_str = ""
+    if polyline_container is not None:
+        for pl in list(polyline_container):
+            ulid = pl.findtext('ULID')
+            if ulid not in used_ulids:
+                _remove(pl, journal)
+                lines_removed_count += 1
+                lines_removed_str += str(ulid) + ','
+    if lines_removed_count > 0 and log:
+        log(f"2. Видалено {lines_removed_count} поліліній: {lines_removed_str}")
+
+    used_uidps = set()
+    if polyline_container is not None:
+        if numbering is not None:
+            # Лінії, що лишились у контейнері після видалення.
+            for line in numbering.lines:
+                if line.elem.getparent() is polyline_container:
+                    used_uidps.update(r for r in line.point_refs if r)
+        else:
+            for p_ref in polyline_container.xpath('.//PL/Points/P'):
+                if p_ref.text:
+                    used_uidps.add(p_ref.text)
+
+    point_info_container = root.find('.//PointInfo')
+    points_removed_count = 0
+    if point_info_container is not None:
+        for point in list(point_info_container):
+            uidp = point.findtext('UIDP')
+            if uidp not in used_uidps:
+                _remove(point, journal)
+                points_removed_count += 1
+    if points_removed_count > 0 and log:
+        log(f"4. Видалено {points_removed_count} невикористовуваних точок (<Point>).")
+
+    renumbered = renumber_geometry(root, log=log, journal=journal)
+
+    if lines_removed_count or points_removed_count or renumbered:
+        if log:
+            log("--- Завершено очищення та перенумерацію. Зміни внесено. ---")
+        return True
+    return False
+
+
+def _find_pn_issues(xml_tree) -> tuple[int, tuple[str, ...]]:
+    empty_pn = 0
+    counts: dict[str, int] = {}
+    for p in xml_tree.findall(".//PointInfo/Point"):
+        pn_text = p.findtext("PN")
+        if pn_text is None or not str(pn_text).strip():
+            empty_pn += 1
+        else:
+            pn = str(pn_text).strip()
+            counts[pn] = counts.get(pn, 0) + 1
+    return empty_pn, tuple(pn for pn, c in counts.items() if c > 1)
+
+
+def xsd_error_log(xml_tree, xsd_path: str) -> tuple[tuple[str, int, str], ...]:
+    """
+    Перевіряє копію дерева (без технічних object_id) за XSD.
+    Повертає помилки як (шлях XPath, рядок, повідомлення).
+    """
+    schema = etree.XMLSchema(etree.parse(xsd_path))
+    tree_copy = etree.ElementTree(etree.fromstring(etree.tostring(xml_tree.getroot())))
+    remove_object_id_attributes(tree_copy)
+    if schema.validate(tree_copy):
+        return ()
+    return tuple((err.path or "", err.line, str(err.message)) for err in schema.error_log)
+
+
+def validate_xsd(xml_tree, xsd_path: str) -> tuple[str, ...]:
+    """
+    Перевіряє копію дерева (без технічних object_id) за XSD.
+    Повертає тексти помилок у вигляді "шлях (рядок N): повідомлення".
+    """
+    return tuple(
+        f"{path or 'XML'} (рядок {line}): {message}" for path, line, message in xsd_error_log(xml_tree, xsd_path)
+    )
+
+
+def check_report_path(xml_path: str) -> str:
+    return str(Path(xml_path).with_name(f"Check_{Path(xml_path).name}.txt"))
+
+
+def write_check_report(*, xml_path: str, errors: Iterable[str]) -> str:
+    lines = [f"Звіт про помилки для файлу: {xml_path}", "=" * 50]
+    lines.extend(f"{i}. {error}" for i, error in enumerate(errors, 1))
+    report_path = check_report_path(xml_path)
+    Path(report_path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return report_path
+
+
+def collect_used_point_ids(root) -> set[str]:
+    """Збирає всі UIDP, на які є посилання (полілінії, ControlPoint, межі, AdjacentRests)."""
+    used_ids: set[str] = set()
+
+    metric_info = root.find('.//MetricInfo')
+    if metric_info is not None:
+        used_ids.update(metric_info.xpath('.//Polyline/PL/Points/P/text()'))
+        used_ids.update(metric_info.xpath('.//ControlPoint/P/text()'))
+
+    used_ids.update(root.xpath('.//Boundary/Lines/Line/FP/text() | .//Boundary/Lines/Line/TP/text()'))
+    used_ids.update(root.xpath('.//AdjacentRests/Points/P/text()'))
+    return used_ids
+
+
+def collect_used_polyline_ids(root) -> set[str]:
+    """Збирає всі ULID, на які посилаються межі (Boundary/Lines/Line)."""
+    return set(root.xpath('.//Boundary/Lines/Line/ULID/text()'))
+
+
+def find_unused_geometry(root) -> tuple[list, list]:
+    """
+    Повертає (невикористані Point, невикористані PL) — "сиротські" вузли
+    та полілінії, як їх визначає XmlTopologyFixer.
+    """
+    metric_info = root.find('.//MetricInfo')
+    if metric_info is None:
+        return [], []
+    point_info = metric_info.find('PointInfo')
+    polyline_info = metric_info.find('Polyline')
+    if point_info is None or polyline_info is None:
+        return [], []
+
+    used_point_ids = collect_used_point_ids(root)
+    used_polyline_ids = collect_used_polyline_ids(root)
+    unused_points = [p for p in point_info.findall('Point')
+                     if p.findtext('UIDP') not in used_point_ids]
+    unused_polylines = [pl for pl in polyline_info.findall('PL')
+                        if pl.findtext('ULID') not in used_polyline_ids]
+    return unused_points, unused_polylines
+
+
+def prepare_xml_for_open(
+    xml_path: str,
+    *,
+    tree=None,
+    backup_path: str | None = None,
+    original_path: str | None = None,
+    area_checks_module=None,
+    xsd_path: str | None = None,
+    proximity_threshold_m: float = 0.3,
+    progress: ProgressCb | None = None,
+) -> PreparedXml:
+    """
+    Розбирає XML (якщо tree не передано) і виконує всі перевірки та виправлення, що не потребують Qt:
+    площі/десяткова кома, object_id, порядок ParcelInfo, нумерація геометрії,
+    PN, близькі/створні точки, топологія полігонів та (за наявності xsd_path) XSD.
+
+    progress отримує значення 0..100; щоб перервати роботу, він може підняти
+    OpenCanceled.
+    """
+    started = time.time()
+    checks = area_checks_module or area_checks
+    prepared = PreparedXml(xml_path=xml_path, backup_path=backup_path, original_path=original_path)
+    log = prepared.log_messages.append
+
+    def step(value: float) -> None:
+        if progress is not None:
+            progress(int(value))
+
+    step(0)
+    if tree is None:
+        tree = etree.parse(xml_path)
+    prepared.tree = tree
+    step(5)
+
+    # Один обхід дерева замість окремих: десяткова кома, object_id, площа
+    # ділянки, зріз нумерації, PN і знімок геометрії (document_lint).
+    try:
+        lint = run_open_lint(tree)
+    except Exception as e:
+        lint = None
+        log(f"Помилка спільного обходу XML: {e}")
+    step(10)
+
+    def build_geometry(xml_tree) -> GeometrySnapshot:
+        if lint is not None and lint.geometry.snapshot is not None:
+            prepared.geometry = lint.geometry.snapshot
+        else:
+            prepared.geometry = build_geometry_snapshot(xml_tree)
+        return prepared.geometry
+
+    try:
+        prepared.area_result = checks.run_area_checks_and_fix_tree(
+            xml_tree=tree,
+            parcel_area_computer=checks.compute_parcel_area_ha_from_lines,
+            geometry_builder=build_geometry,
+            lint=lint,
+        )
+    except Exception as e:
+        prepared.area_error = str(e)
+    if prepared.area_result is not None and prepared.area_result.any_issue:
+        try:
+            report_text = checks.build_area_err_report(xml_path=xml_path, result=prepared.area_result)
+            prepared.area_report_path = checks.write_area_err_report(xml_path=xml_path, report_text=report_text)
+        except Exception as e:
+            prepared.area_report_error = str(e)
+            prepared.area_report_path = ""
+    step(25)
+
+    if lint is not None:
+        prepared.removed_object_ids = lint.object_ids.removed
+    else:
+        prepared.removed_object_ids = remove_object_id_attributes(tree)
+    parcel_info_element = tree.find('.//ParcelInfo')
+    if parcel_info_element is not None:
+        prepared.was_reordered = sort_children_in_parcel_info(parcel_info_element)
+    step(30)
+
+    try:
+        if lint is not None:
+            before_numbering = lint.geometry.numbering
+        else:
+            before_numbering = snapshot_geometry_numbering(tree)
+        prepared.was_renumbered = cleanup_and_renumber_geometry(
+            tree.getroot(), log=log, numbering=before_numbering)
+    except Exception as e:
+        prepared.renumber_error = str(e)
+    if prepared.was_renumbered:
+        try:
+            report_text = build_geometry_numbering_report(
+                xml_path=xml_path,
+                before=before_numbering,
+                after=snapshot_geometry_numbering(tree),
+            )
+            prepared.numbering_report_text = report_text
+            prepared.numbering_report_path = write_numbering_report(xml_path=xml_path, report_text=report_text)
+            log(f"Створено звіт про нумерацію вузлів/ліній: {prepared.numbering_report_path}")
+        except Exception as e:
+            log(f"Помилка створення звіту про нумерацію: {e}")
+    step(45)
+
+    pn_from_lint = False
+    if lint is not None:
+        try:
+            prepared.empty_pn, prepared.duplicate_pn = lint.geometry.pn_issues()
+            pn_from_lint = True
+        except Exception as e:
+            log(f"Помилка перевірки PN при відкритті XML: {e}")
+    step(50)
+
+    # Знімок, побудований для перевірки площ, придатний, доки геометрію не
+    # очищено/перенумеровано.
+    if prepared.geometry is None or prepared.was_renumbered or prepared.renumber_error:
+        try:
+            prepared.geometry = build_geometry_snapshot(tree)
+        except Exception as e:
+            prepared.geometry = None
+            log(f"Помилка розбору геометрії XML: {e}")
+
+    # Перевірки, що лише читають уже виправлене дерево, виконуються
+    # одночасно (check_runner); check_runner сам використовує функції цього
+    # модуля, тому імпортується тут.
+    from .check_runner import CheckSnapshot, run_checks
+
+    names = ["proximity", "topology"]
+    if not pn_from_lint:
+        names.append("pn")
+    if xsd_path:
+        names.append("xsd")
+    snapshot = CheckSnapshot(
+        xml_path, tree, geometry=prepared.geometry, xsd_path=xsd_path, threshold_m=proximity_threshold_m)
+    outcomes = run_checks(snapshot, names, progress=lambda value: step(50 + value / 2.0))
+
+    proximity = outcomes.get("proximity")
+    if proximity is not None and proximity.error is None:
+        prepared.proximity_result = proximity.result
+    elif proximity is not None:
+        prepared.proximity_error = proximity.error
+    if prepared.proximity_result is not None:
+        try:
+            report_text = build_proximity_report(xml_path=xml_path, result=prepared.proximity_result)
+            prepared.proximity_report_path = write_proximity_report(xml_path=xml_path, report_text=report_text)
+            log(f"Створено звіт proximity: {prepared.proximity_report_path}")
+        except Exception as e:
+            log(f"Помилка створення звіту proximity: {e}")
+            prepared.proximity_report_path = ""
+
+    topology = outcomes.get("topology")
+    if topology is not None and topology.error is None:
+        prepared.topology_result = topology.result
+    elif topology is not None:
+        prepared.topology_error = topology.error
+    if prepared.topology_result is not None and prepared.topology_result.issues:
+        try:
+            report_text = build_topology_report(xml_path=xml_path, result=prepared.topology_result)
+            prepared.topology_report_path = write_topology_report(xml_path=xml_path, report_text=report_text)
+            log(f"Створено звіт топології: {prepared.topology_report_path}")
+        except Exception as e:
+            log(f"Помилка створення звіту топології: {e}")
+            prepared.topology_report_path = ""
+
+    pn = outcomes.get("pn")
+    if pn is not None and pn.error is None:
+        prepared.empty_pn, prepared.duplicate_pn = pn.result
+    elif pn is not None:
+        log(f"Помилка перевірки PN при відкритті XML: {pn.error}")
+
+    xsd = outcomes.get("xsd")
+    if xsd is not None and xsd.error is None:
+        prepared.xsd_errors = tuple(xsd.details)
+    elif xsd is not None:
+        log(f"Помилка перевірки XSD: {xsd.error}")
+
+    prepared.elapsed_sec = time.time() - started
+    step(100)
+    return prepared
+
+
+def prepare_xml_in_worker(
+    xml_path: str,
+    backup_path: str | None = None,
+    original_path: str | None = None,
+    xsd_path: str | None = None,
+    cache_dir: str | None = None,
+) -> PreparedXml:
+    """
+    Точка входу для пулу процесів: дерево lxml не передається між процесами,
+    тому повертається серіалізований XML (xml_bytes) замість tree.
+    """
+    from .open_cache import prepare_xml_cached
+
+    return prepare_xml_cached(
+        xml_path,
+        cache_dir=cache_dir,
+        backup_path=backup_path,
+        original_path=original_path,
+        xsd_path=xsd_path,
+        keep_bytes=True,
+    )
+
+
+def attach_tree(prepared: PreparedXml) -> PreparedXml:
+    """Відновлює tree з xml_bytes після отримання результату з іншого процесу."""
+    if prepared.tree is None and prepared.xml_bytes is not None:
+        parser = etree.XMLParser(huge_tree=True)
+        prepared.tree = etree.ElementTree(etree.fromstring(prepared.xml_bytes, parser))
+        prepared.xml_bytes = None
+    return prepared
@@ -9,11 +9,13 @@ from qgis.core import (
     QgsPolygon,
     QgsLineString,
     QgsPointXY,
-    QgsWkbTypes,
-    QgsProject
+    QgsWkbTypes
 )
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .data_models import ShapeInfo  # noqa
 from .common import ensure_object_layer_fields, logFile, log_msg
+from .common import object_layer_fields
 
 
 class CadastralParcel:
@@ -36,28 +38,25 @@ class CadastralParcel:
             [QgsPointXY(p.y(), p.x()) for p in coordinates])
         return QgsPolygon(exterior_ring)
 
-    def add_parcel_layer(self):
-        """Створює та заповнює шар 'Ділянка'."""
-        layer_name = "Ділянка"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
-
-        self.layer.setCustomProperty("skip_save_dialog", True)
-
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "parcel.qml"))
-        provider = self.layer.dataProvider()
-
-        ensure_object_layer_fields(self.layer)
+    def data_fields(self):
+        """Поля даних шару 'Ділянка'."""
+        return object_layer_fields()
 
+    def build_features(self, fields):
+        """
+        Будує об'єкт шару 'Ділянка' за ParcelMetricInfo і додає його ShapeInfo
+        шару self.layer до xml_data.shapes.
+        """
         try:
             from .topology import GeometryProcessor
-            processor = GeometryProcessor(self.root.getroottree())
+            processor = GeometryProcessor(
+                self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
         except Exception as e:
             log_msg(
                 logFile, f"Не вдалося створити GeometryProcessor в CadastralParcel: {e}")
             processor = None
 
+        features = []
         parcel_metric_info = self.root.find(".//ParcelMetricInfo")
         if parcel_metric_info is not None:
             parcel_id = parcel_metric_info.findtext("ParcelID")
@@ -102,7 +101,7 @@ class CadastralParcel:
                     interior_ring = QgsLineString([QgsPointXY(p.y(), p.x()) for p in internal_coords])
                     polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
             feature.setGeometry(QgsGeometry(polygon))
 
             object_id = 1
@@ -115,13 +114,26 @@ class CadastralParcel:
                     object_shape=object_shape)
                 shape_info.object_id = str(object_id)
                 self.xml_data.shapes.append(shape_info)
+            features.append(feature)
+        return features
+
+    def add_parcel_layer(self):
+        """Створює та заповнює шар 'Ділянка'."""
+        layer_name = "Ділянка"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
+
+        self.layer.setCustomProperty("skip_save_dialog", True)
+
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "parcel.qml"))
+        provider = self.layer.dataProvider()
+
+        ensure_object_layer_fields(self.layer)
 
-            provider.addFeature(feature)
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        if hasattr(self, 'xml_ua_layers'):
-            self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
@@ -45,6 +45,7 @@ from qgis.PyQt.QtGui import QFontMetricsF
 from qgis.PyQt.QtWidgets import QApplication
 
 from .common import PARCEL_MARGIN_FACTOR, log_calls, log_msg, logFile
+from .layer_index import index_for
 from .symbols import Symbols
 from .cases import to_genitive
 from .lands_explication import LandsExplicationTable
@@ -1892,7 +1893,12 @@ class PlanLayoutCreator:
             base = base[:-1]
         doubled = base + base
 
-        uidp_to_pt = {str(f["uidp"]): f.geometry().asPoint() for f in nodes_root.getFeatures()}
+        nodes_index = index_for(nodes_root)
+
+        def node_point(uidp):
+            feature = nodes_index.feature_by("UIDP", uidp)
+            return feature.geometry().asPoint() if feature is not None else None
+
         uidp_to_lit: Dict[str, str] = {str(f[F_NODE_UIDP]).strip(): str(f[F_NODE_LIT]).strip() for f in nodes.getFeatures()}
 
         def contains_sequence(inner):
@@ -1970,8 +1976,8 @@ class PlanLayoutCreator:
                 continue
             seen_whiskers.add(whisker_key)
 
-            place_pt = uidp_to_pt.get(place_uidp)
-            shared_pt = uidp_to_pt.get(shared_uidp)
+            place_pt = node_point(place_uidp)
+            shared_pt = node_point(shared_uidp)
             if not place_pt or not shared_pt:
                 continue
 
@@ -4,6 +4,7 @@ import os
 from qgis.core import (
     QgsVectorLayer,
     QgsField,
+    QgsFields,
     QgsFeature,
     QgsGeometry,
     QgsPointXY,
@@ -13,10 +14,16 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtWidgets import QMessageBox
 
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
+from .feature_diff import apply_feature_diff
+
 
 class Points:
     """Клас для обробки точок (вузлів) з XML-файлу."""
 
+    FIELD_NAMES = ("UIDP", "PN", "H", "MX", "MY", "MH", "Description")
+
     def __init__(self, root, crs_epsg, group, plugin_dir, layers_root, xml_data=None):
         """
         Ініціалізація об'єкта для роботи з точками.
@@ -69,28 +76,37 @@ class Points:
                 self.qgisPoints[uidp] = QgsPointXY(float(x), float(y))
 
     def redraw_pickets_layer(self):
-        """Очищує та заповнює існуючий шар 'Вузли'."""
+        """
+        Оновлює існуючий шар 'Вузли' за XML: змінює лише ті об'єкти, чиї
+        координати чи атрибути відрізняються (зіставлення за UIDP).
+        Повертає (додано, видалено, змінено).
+        """
         if not hasattr(self, 'layer') or not self.layer:
 
-            return
+            return None
 
         self.read_points()  # Перечитуємо точки з XML
 
-        provider = self.layer.dataProvider()
-        self.layer.startEditing()
-        self.layer.deleteFeatures(self.layer.allFeatureIds())
+        return apply_feature_diff(self.layer, self.build_features(self.layer.fields()), "UIDP")
 
+    def data_fields(self):
+        """Поля даних шару 'Вузли'."""
+        fields = QgsFields()
+        for name in self.FIELD_NAMES:
+            fields.append(QgsField(name, QVariant.String))
+        return fields
+
+    def build_features(self, fields):
+        """Будує всі об'єкти шару 'Вузли' для одного пакетного addFeatures."""
+        features = []
         for xmlPoint in self.xmlPoints:
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
             feature.setGeometry(QgsGeometry.fromPointXY(
                 QgsPointXY(float(xmlPoint["Y"]), float(xmlPoint["X"]))))
-            feature.setAttributes([
-                xmlPoint["UIDP"], xmlPoint["PN"], xmlPoint["H"],
-                xmlPoint["MX"], xmlPoint["MY"], xmlPoint["MH"],
-                xmlPoint["Description"]
-            ])
-            provider.addFeature(feature)
-        self.layer.commitChanges()
+            for name in self.FIELD_NAMES:
+                feature.setAttribute(name, xmlPoint[name])
+            features.append(feature)
+        return features
 
     def add_pickets_layer(self):
         """
@@ -114,39 +130,19 @@ class Points:
                 None, "xml_ua", "Виникла помилка при створенні шару точок.")
             return None
 
-        self.layer.loadNamedStyle(os.path.join(
+        load_named_style(self.layer, os.path.join(
             self.plugin_dir, "templates", "points.qml"))
 
         self.layer.setReadOnly(True)
 
         provider = self.layer.dataProvider()
 
-        provider.addAttributes([
-            QgsField("UIDP", QVariant.String),
-            QgsField("PN", QVariant.String),
-            QgsField("H", QVariant.String),
-            QgsField("MX", QVariant.String),
-            QgsField("MY", QVariant.String),
-            QgsField("MH", QVariant.String),
-            QgsField("Description", QVariant.String)
-        ])
+        provider.addAttributes(self.data_fields().toList())
         self.layer.updateFields()
 
-        for xmlPoint in self.xmlPoints:
-            feature = QgsFeature()
-            feature.setGeometry(QgsGeometry.fromPointXY(
-                QgsPointXY(float(xmlPoint["Y"]), float(xmlPoint["X"]))))
-            feature.setAttributes([
-                xmlPoint["UIDP"], xmlPoint["PN"], xmlPoint["H"],
-                xmlPoint["MX"], xmlPoint["MY"], xmlPoint["MH"],
-                xmlPoint["Description"]
-            ])
-            provider.addFeature(feature)
-
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        if hasattr(self, 'xml_ua_layers'):
-            self.xml_ua_layers.last_to_first(self.group)
+        provider.addFeatures(self.build_features(self.layer.fields()))
+
+        add_layer_to_group(self.group, self.layer)
 
         if self.xml_data:
             self.layer.setCustomProperty(
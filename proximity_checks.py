@@ -5,7 +5,10 @@ import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Iterable
+from typing import Callable, Sequence
+
+from . import proximity_vectorized
+from .geometry_snapshot import GeometrySnapshot, build_geometry_snapshot
 
 
 ProgressCb = Callable[[int], None]
@@ -37,19 +40,6 @@ class ProximityCheckResult:
     elapsed_sec: float
 
 
-def _parse_point_xy(point_elem) -> tuple[float, float] | None:
-    """
-    Повертає (x, y) в метрах.
-    У цьому проєкті X/Y в XML читаються як: y <- X, x <- Y.
-    """
-    try:
-        y = float(point_elem.findtext("X"))
-        x = float(point_elem.findtext("Y"))
-        return x, y
-    except (TypeError, ValueError):
-        return None
-
-
 def _cell_key(x: float, y: float, cell: float) -> tuple[int, int]:
     return (int(math.floor(x / cell)), int(math.floor(y / cell)))
 
@@ -78,17 +68,78 @@ def _point_segment_dist2(px: float, py: float, ax: float, ay: float, bx: float,
     return _dist2(px, py, cx, cy)
 
 
+class SegmentGrid:
+    """
+    Ієрархічна сітка сегментів для пошуку тих, що можуть бути ближчі за thr
+    до точки. Рівень k має клітинку base * 2**k; сегмент (його рамка,
+    розширена на thr) потрапляє на найменший рівень, клітинка якого не менша
+    за 1/SPLIT рамки, тож займає не більше (SPLIT + 2)**2 клітинок незалежно
+    від довжини. Пам'ять і час побудови лінійні щодо кількості сегментів;
+    точка перевіряє по одній клітинці на кожному зайнятому рівні.
+    """
+
+    SPLIT = 4
+
+    def __init__(self, segments, thr: float):
+        # Запас на похибку округлення; остаточний відбір — точне d2 < thr2.
+        pad = thr * (1.0 + 1e-9) + 1e-6
+        self.base = max(0.01, 2.0 * pad / self.SPLIT)
+        self.cells: dict[tuple[int, int, int], list[int]] = {}
+        levels: set[int] = set()
+        for si, s in enumerate(segments):
+            min_x = min(s.ax, s.bx) - pad
+            max_x = max(s.ax, s.bx) + pad
+            min_y = min(s.ay, s.by) - pad
+            max_y = max(s.ay, s.by) + pad
+            size = max(max_x - min_x, max_y - min_y) / self.SPLIT
+            level = 0
+            cell = self.base
+            while cell < size:
+                level += 1
+                cell = math.ldexp(self.base, level)
+            levels.add(level)
+            cx0, cy0 = _cell_key(min_x, min_y, cell)
+            cx1, cy1 = _cell_key(max_x, max_y, cell)
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.cells.setdefault((level, cx, cy), []).append(si)
+        self.levels = tuple((level, math.ldexp(self.base, level)) for level in sorted(levels))
+
+    def candidates(self, x: float, y: float) -> set[int]:
+        """Індекси сегментів, розширені рамки яких містять точку (x, y)."""
+        result: set[int] = set()
+        for level, cell in self.levels:
+            ids = self.cells.get((level, *_cell_key(x, y, cell)))
+            if ids:
+                result.update(ids)
+        return result
+
+
 def _sort_uidp(uidp: str):
     s = str(uidp)
     return int(s) if s.isdigit() else 10**18
 
 
-def find_close_points(*, xml_tree, threshold_m: float, progress: ProgressCb | None = None) -> tuple[ClosePointHit, ...]:
+def _snapshot_for(xml_tree, geometry: GeometrySnapshot | None) -> GeometrySnapshot:
+    if geometry is not None:
+        return geometry
+    if xml_tree is None:
+        raise ValueError("Потрібне xml_tree або geometry")
+    return build_geometry_snapshot(xml_tree)
+
+
+def find_close_points(
+    *,
+    xml_tree=None,
+    threshold_m: float,
+    progress: ProgressCb | None = None,
+    geometry: GeometrySnapshot | None = None,
+) -> tuple[ClosePointHit, ...]:
     """
     Близькі точки: для кожного UIDP повертає найближчу іншу точку (UIDP) з відстанню < threshold_m.
+    Працює зі знімком geometry; якщо його не передано, знімок будується з xml_tree.
     """
-    root = xml_tree.getroot()
-    point_elems = root.findall(".//PointInfo/Point")
+    geometry = _snapshot_for(xml_tree, geometry)
 
     cell = max(0.01, float(threshold_m))
     thr2 = threshold_m * threshold_m
@@ -96,16 +147,8 @@ def find_close_points(*, xml_tree, threshold_m: float, progress: ProgressCb | No
     grid: dict[tuple[int, int], list[tuple[str, float, float]]] = {}
     best: dict[str, tuple[str, float]] = {}  # uidp -> (other_uidp, best_d2)
 
-    total = len(point_elems)
-    for idx, p in enumerate(point_elems, 1):
-        uidp = p.findtext("UIDP")
-        if not uidp or not str(uidp).strip():
-            continue
-        xy = _parse_point_xy(p)
-        if xy is None:
-            continue
-        x, y = xy
-
+    total = len(geometry.points)
+    for idx, (uidp, x, y) in enumerate(geometry.points, 1):
         ck = _cell_key(x, y, cell)
         for dx in (-1, 0, 1):
             for dy in (-1, 0, 1):
@@ -115,16 +158,14 @@ def find_close_points(*, xml_tree, threshold_m: float, progress: ProgressCb | No
                 for other_uidp, ox, oy in bucket:
                     d2 = _dist2(x, y, ox, oy)
                     if d2 < thr2:
-                        uidp_s = str(uidp).strip()
-                        other_s = str(other_uidp).strip()
-                        prev = best.get(uidp_s)
+                        prev = best.get(uidp)
                         if prev is None or d2 < prev[1]:
-                            best[uidp_s] = (other_s, d2)
-                        prev_other = best.get(other_s)
+                            best[uidp] = (other_uidp, d2)
+                        prev_other = best.get(other_uidp)
                         if prev_other is None or d2 < prev_other[1]:
-                            best[other_s] = (uidp_s, d2)
+                            best[other_uidp] = (uidp, d2)
 
-        grid.setdefault(ck, []).append((str(uidp).strip(), x, y))
+        grid.setdefault(ck, []).append((uidp, x, y))
 
         if progress and (idx % 500 == 0 or idx == total):
             # 0..50
@@ -137,103 +178,36 @@ def find_close_points(*, xml_tree, threshold_m: float, progress: ProgressCb | No
     return tuple(hits)
 
 
-@dataclass(frozen=True)
-class _Segment:
-    ax: float
-    ay: float
-    bx: float
-    by: float
-    poly_idx: int
-    ulid: str
-
-
-def _iter_polylines(xml_tree) -> Iterable[tuple[list[str], object]]:
-    root = xml_tree.getroot()
-    for pl in root.findall(".//Polyline/PL"):
-        ulid = pl.findtext("ULID")
-        uidps = []
-        for p in pl.findall("Points/P"):
-            if p.text and str(p.text).strip():
-                uidps.append(str(p.text).strip())
-        yield uidps, ulid, pl
-
-
 def find_points_near_lines(
     *,
-    xml_tree,
+    xml_tree=None,
     threshold_m: float,
     progress: ProgressCb | None = None,
+    geometry: GeometrySnapshot | None = None,
 ) -> tuple[tuple[NearLineHit, ...], int, int]:
     """
     Створні точки: UIDP таких точок, що відстань до будь-якого сегмента будь-якої лінії < threshold_m.
+    Працює зі знімком geometry; якщо його не передано, знімок будується з xml_tree.
 
     Важливо: щоб не позначати всі вузли як "створні" (бо вони лежать на своїх лініях),
     точки НЕ перевіряються відносно лінії, в якій вони використані (Polyline/PL/Points/P).
     """
-    root = xml_tree.getroot()
-
-    point_elems = root.findall(".//PointInfo/Point")
-    points: list[tuple[str, float, float]] = []
-    uidp_to_xy: dict[str, tuple[float, float]] = {}
-    for p in point_elems:
-        uidp = p.findtext("UIDP")
-        if not uidp or not str(uidp).strip():
-            continue
-        xy = _parse_point_xy(p)
-        if xy is None:
-            continue
-        uidp = str(uidp).strip()
-        x, y = xy
-        points.append((uidp, x, y))
-        uidp_to_xy[uidp] = (x, y)
-
-    polylines = list(_iter_polylines(xml_tree))
-    poly_uidps: list[set[str]] = [set(uidps) for uidps, _, _ in polylines]
-
-    segments: list[_Segment] = []
-    for poly_idx, (uidps, ulid, _) in enumerate(polylines):
-        if len(uidps) < 2:
-            continue
-        for i in range(len(uidps) - 1):
-            a = uidps[i]
-            b = uidps[i + 1]
-            axy = uidp_to_xy.get(a)
-            bxy = uidp_to_xy.get(b)
-            if axy is None or bxy is None:
-                continue
-            ax, ay = axy
-            bx, by = bxy
-            segments.append(_Segment(ax=ax, ay=ay, bx=bx, by=by, poly_idx=poly_idx, ulid=str(ulid or "").strip()))
+    geometry = _snapshot_for(xml_tree, geometry)
+    segments = geometry.segments
+    poly_uidps = geometry.poly_uidps
 
-    # Індекс сегментів по сітці
-    cell = 1.0
     thr = float(threshold_m)
-    seg_grid: dict[tuple[int, int], list[int]] = {}
-    for si, s in enumerate(segments):
-        min_x = min(s.ax, s.bx) - thr
-        max_x = max(s.ax, s.bx) + thr
-        min_y = min(s.ay, s.by) - thr
-        max_y = max(s.ay, s.by) + thr
-        cx0, cy0 = _cell_key(min_x, min_y, cell)
-        cx1, cy1 = _cell_key(max_x, max_y, cell)
-        for cx in range(cx0, cx1 + 1):
-            for cy in range(cy0, cy1 + 1):
-                seg_grid.setdefault((cx, cy), []).append(si)
+    seg_grid = SegmentGrid(segments, thr)
 
     thr2 = thr * thr
     best: dict[str, tuple[str, float]] = {}  # uidp -> (ulid, best_d2)
 
-    total = len(points)
-    for idx, (uidp, x, y) in enumerate(points, 1):
-        ck = _cell_key(x, y, cell)
-        candidate_seg_ids: set[int] = set()
-        for dx in (-1, 0, 1):
-            for dy in (-1, 0, 1):
-                ids = seg_grid.get((ck[0] + dx, ck[1] + dy))
-                if ids:
-                    candidate_seg_ids.update(ids)
+    total = len(geometry.points)
+    for idx, (uidp, x, y) in enumerate(geometry.points, 1):
+        candidate_seg_ids = seg_grid.candidates(x, y)
 
-        for si in candidate_seg_ids:
+        # Серед рівновіддалених сегментів перемагає перший за порядком документа.
+        for si in sorted(candidate_seg_ids):
             s = segments[si]
             if uidp in poly_uidps[s.poly_idx]:
                 continue
@@ -252,47 +226,79 @@ def find_points_near_lines(
     for uidp_s, (ulid, d2) in best.items():
         hits.append(NearLineHit(uidp=uidp_s, ulid=ulid, distance_m=math.sqrt(d2)))
     hits.sort(key=lambda h: _sort_uidp(h.uidp))
-    return tuple(hits), len(polylines), len(segments)
+    return tuple(hits), geometry.polylines_total, len(segments)
 
 
-def run_proximity_checks(
+def run_proximity_checks_multi(
     *,
-    xml_tree,
-    threshold_m: float = 0.3,
+    xml_tree=None,
+    thresholds: Sequence[float],
     progress: ProgressCb | None = None,
-) -> ProximityCheckResult:
+    geometry: GeometrySnapshot | None = None,
+    vectorized: bool = True,
+) -> dict[float, ProximityCheckResult]:
+    """
+    Обидві перевірки для кількох порогів (напр. 0.05/0.1/0.3 м) над одним
+    знімком геометрії. Повертає {поріг: ProximityCheckResult}.
+
+    За наявності NumPy (vectorized=True) кандидати шукаються один раз для
+    найбільшого порогу (proximity_vectorized); інакше кожен поріг
+    перевіряється Python-реалізацією. Результати однакові.
+    """
     started = time.time()
 
-    root = xml_tree.getroot()
-    points_total = len(root.findall(".//PointInfo/Point"))
+    geometry = _snapshot_for(xml_tree, geometry)
+    thresholds = [float(t) for t in thresholds]
 
-    close_hits = find_close_points(xml_tree=xml_tree, threshold_m=threshold_m, progress=progress)
-    near_line_hits, polylines_total, segments_total = find_points_near_lines(
-        xml_tree=xml_tree, threshold_m=threshold_m, progress=progress
-    )
+    raw: dict[float, tuple] = {}
+    if vectorized and thresholds and proximity_vectorized.supports(geometry):
+        for thr, (close, near) in proximity_vectorized.proximity_hits(geometry, thresholds, progress).items():
+            raw[thr] = (
+                tuple(ClosePointHit(uidp=u, other_uidp=o, distance_m=d) for u, o, d in close),
+                tuple(NearLineHit(uidp=u, ulid=ulid, distance_m=d) for u, ulid, d in near),
+            )
+    else:
+        for k, thr in enumerate(thresholds):
+            def sub_progress(value: int, k: int = k) -> None:
+                if progress:
+                    progress(int((k * 100 + value) / len(thresholds)))
+
+            close = find_close_points(threshold_m=thr, progress=sub_progress, geometry=geometry)
+            near, _, _ = find_points_near_lines(threshold_m=thr, progress=sub_progress, geometry=geometry)
+            raw[thr] = (close, near)
 
     elapsed = time.time() - started
 
-    # Parsed points = those with UIDP + valid coords
-    parsed = 0
-    for p in root.findall(".//PointInfo/Point"):
-        uidp = p.findtext("UIDP")
-        if not uidp or not str(uidp).strip():
-            continue
-        if _parse_point_xy(p) is None:
-            continue
-        parsed += 1
-
-    return ProximityCheckResult(
-        threshold_m=float(threshold_m),
-        points_total=points_total,
-        points_parsed=parsed,
-        polylines_total=polylines_total,
-        segments_total=segments_total,
-        close_hits=close_hits,
-        near_line_hits=near_line_hits,
-        elapsed_sec=float(elapsed),
+    return {
+        thr: ProximityCheckResult(
+            threshold_m=thr,
+            points_total=geometry.points_total,
+            points_parsed=geometry.points_parsed,
+            polylines_total=geometry.polylines_total,
+            segments_total=len(geometry.segments),
+            close_hits=close,
+            near_line_hits=near,
+            elapsed_sec=float(elapsed),
+        )
+        for thr, (close, near) in raw.items()
+    }
+
+
+def run_proximity_checks(
+    *,
+    xml_tree=None,
+    threshold_m: float = 0.3,
+    progress: ProgressCb | None = None,
+    geometry: GeometrySnapshot | None = None,
+) -> ProximityCheckResult:
+    """
+    Обидві перевірки над одним знімком геометрії: переданим (geometry) або
+    побудованим з xml_tree один раз.
+    """
+    results = run_proximity_checks_multi(
+        xml_tree=xml_tree, thresholds=(threshold_m,), progress=progress, geometry=geometry
     )
+    return results[float(threshold_m)]
 
 
 def proximity_report_path(xml_path: str) -> str:
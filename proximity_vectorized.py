@@ -0,0 +1,373 @@
+"""
+Векторизований рушій перевірок близьких і створних точок (NumPy).
+
+Працює над знімком геометрії (GeometrySnapshot) і за один пошук кандидатів
+повертає результати для кількох порогів одразу. Кандидатні пари вузлів дає
+scipy.spatial.cKDTree, а без SciPy — сітка на NumPy; пари "вузол — сегмент"
+дає ієрархічна сітка сегментів. Точні відстані рахуються тими самими
+формулами, що й у proximity_checks, тому результати збігаються з чисто
+Python-реалізацією, зокрема вибір серед рівновіддалених сусідів.
+
+NumPy не є обов'язковою залежністю: якщо його немає (або UIDP не є
+унікальними числами), proximity_checks використовує Python-реалізацію.
+"""
+from __future__ import annotations
+
+from typing import Callable, Sequence
+
+from .geometry_snapshot import GeometrySnapshot
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+NUMPY_AVAILABLE = np is not None
+SCIPY_AVAILABLE = NUMPY_AVAILABLE and cKDTree is not None
+
+ProgressCb = Callable[[int], None]
+
+# (UIDP, UIDP/ULID, відстань) для кожного порогу.
+RawHits = tuple[tuple[str, str, float], ...]
+
+# Запас для пошуку кандидатів: остаточний відбір робиться точним порівнянням d2 < thr2.
+_MARGIN_REL = 1e-9
+_MARGIN_ABS = 1e-6
+
+# Як proximity_checks.SegmentGrid.SPLIT.
+_GRID_SPLIT = 4
+
+# Скільки кандидатних пар "вузол — сегмент" обробляється за раз. Довгі
+# похилі лінії дають кандидатів порядку "вузли x сегменти", тож їх
+# відсіюють частинами, а зберігають лише пари ближчі за поріг.
+_SEGMENT_PAIR_CHUNK = 1_000_000
+
+
+def supports(geometry: GeometrySnapshot) -> bool:
+    """
+    True, якщо знімок можна обробити векторизовано з тим самим результатом:
+    є NumPy, а UIDP — унікальні цілі числа (від них залежить порядок звіту).
+    """
+    if not NUMPY_AVAILABLE:
+        return False
+    if len(geometry.uidp_to_xy) != len(geometry.points):
+        return False
+    seen: set[int] = set()
+    for uidp, _, _ in geometry.points:
+        if not uidp.isdigit() or int(uidp) >= 2**63:
+            return False
+        seen.add(int(uidp))
+    return len(seen) == len(geometry.points)
+
+
+def _expand(thr: float) -> float:
+    return thr * (1.0 + _MARGIN_REL) + _MARGIN_ABS
+
+
+def _cell_codes(cx, cy, origin_x: int, origin_y: int, span_y: int):
+    return (cx - origin_x) * span_y + (cy - origin_y)
+
+
+def _join_chunks(query_codes, entry_codes, entry_ids, max_pairs=None):
+    """
+    Пари (індекс запиту, id запису) з однаковим кодом клітинки, частинами
+    приблизно по max_pairs пар (запит не ділиться між частинами), щоб
+    пам'ять не залежала від загальної кількості кандидатів.
+    """
+    order = np.argsort(entry_codes, kind="stable")
+    sorted_codes = entry_codes[order]
+    sorted_ids = entry_ids[order]
+    lo = np.searchsorted(sorted_codes, query_codes, side="left")
+    hi = np.searchsorted(sorted_codes, query_codes, side="right")
+    counts = hi - lo
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if len(ends) else 0
+    if total == 0:
+        return
+    step = total if max_pairs is None else max_pairs
+    n = len(query_codes)
+    q0 = 0
+    while q0 < n:
+        base = int(ends[q0 - 1]) if q0 else 0
+        q1 = max(q0 + 1, int(np.searchsorted(ends, base + step, side="right")))
+        chunk_counts = counts[q0:q1]
+        chunk_total = int(ends[q1 - 1]) - base
+        if chunk_total:
+            query_idx = np.repeat(np.arange(q0, q1, dtype=np.int64), chunk_counts)
+            starts = np.repeat(lo[q0:q1] - (ends[q0:q1] - chunk_counts - base), chunk_counts)
+            yield query_idx, sorted_ids[starts + np.arange(chunk_total, dtype=np.int64)]
+        q0 = q1
+
+
+def _join(query_codes, entry_codes, entry_ids):
+    """Пари (індекс запиту, id запису) з однаковим кодом клітинки."""
+    parts = list(_join_chunks(query_codes, entry_codes, entry_ids))
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return parts[0]
+
+
+def _point_pairs(xs, ys, radius: float):
+    """Невпорядковані пари вузлів (i < j), що можуть бути ближчі за radius."""
+    n = len(xs)
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    if SCIPY_AVAILABLE:
+        pairs = cKDTree(np.column_stack((xs, ys))).query_pairs(radius, output_type="ndarray")
+        if len(pairs) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        i = pairs[:, 0].astype(np.int64)
+        j = pairs[:, 1].astype(np.int64)
+        swap = i > j
+        return np.where(swap, j, i), np.where(swap, i, j)
+
+    cell = max(0.01, radius)
+    cx = np.floor(xs / cell).astype(np.int64)
+    cy = np.floor(ys / cell).astype(np.int64)
+    origin_x, origin_y = int(cx.min()) - 1, int(cy.min()) - 1
+    span_y = int(cy.max()) - origin_y + 2
+    entry_codes = _cell_codes(cx, cy, origin_x, origin_y, span_y)
+    ids = np.arange(n, dtype=np.int64)
+
+    parts_i = []
+    parts_j = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            i, j = _join(_cell_codes(cx + dx, cy + dy, origin_x, origin_y, span_y), entry_codes, ids)
+            keep = i < j
+            parts_i.append(i[keep])
+            parts_j.append(j[keep])
+    return np.concatenate(parts_i), np.concatenate(parts_j)
+
+
+def _dist2(ax, ay, bx, by):
+    dx = ax - bx
+    dy = ay - by
+    return dx * dx + dy * dy
+
+
+def _point_segment_dist2(px, py, ax, ay, bx, by):
+    """Векторна копія proximity_checks._point_segment_dist2 (ті самі операції)."""
+    abx = bx - ax
+    aby = by - ay
+    apx = px - ax
+    apy = py - ay
+    denom = abx * abx + aby * aby
+    degenerate = denom <= 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (apx * abx + apy * aby) / np.where(degenerate, 1.0, denom)
+    cx = ax + t * abx
+    cy = ay + t * aby
+    d2 = _dist2(px, py, cx, cy)
+    d2 = np.where(t >= 1.0, _dist2(px, py, bx, by), d2)
+    d2 = np.where(degenerate | (t <= 0.0), _dist2(px, py, ax, ay), d2)
+    return d2
+
+
+def _segment_pairs(xs, ys, seg, radius: float):
+    """
+    Пари (вузол, сегмент), ближчі за radius, і квадрати відстаней до них.
+    Кандидати — вузли в рамці сегмента, розширеній на radius. Ієрархічна
+    сітка, як proximity_checks.SegmentGrid: сегмент займає не більше
+    (split + 2)**2 клітинок свого рівня, тож кількість записів лінійна щодо
+    кількості сегментів; кандидати перебираються частинами по
+    _SEGMENT_PAIR_CHUNK.
+    """
+    ax, ay, bx, by = seg
+    n_seg = len(ax)
+    if n_seg == 0 or len(xs) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=float)
+    radius2 = radius * radius
+
+    min_x = np.minimum(ax, bx) - radius
+    max_x = np.maximum(ax, bx) + radius
+    min_y = np.minimum(ay, by) - radius
+    max_y = np.maximum(ay, by) + radius
+    split = _GRID_SPLIT
+    size = np.maximum(max_x - min_x, max_y - min_y) / split
+    base = max(0.01, 2.0 * radius / split)
+    with np.errstate(divide="ignore"):
+        level = np.maximum(0, np.ceil(np.log2(size / base))).astype(np.int64)
+    level[np.ldexp(base, level) < size] += 1
+    seg_ids = np.arange(n_seg, dtype=np.int64)
+
+    parts_p = []
+    parts_s = []
+    parts_d2 = []
+    for lv in np.unique(level).tolist():
+        m = level == lv
+        cell = float(np.ldexp(base, lv))
+        cx0 = np.floor(min_x[m] / cell).astype(np.int64)
+        cx1 = np.floor(max_x[m] / cell).astype(np.int64)
+        cy0 = np.floor(min_y[m] / cell).astype(np.int64)
+        cy1 = np.floor(max_y[m] / cell).astype(np.int64)
+        ids = seg_ids[m]
+
+        pcx = np.floor(xs / cell).astype(np.int64)
+        pcy = np.floor(ys / cell).astype(np.int64)
+        origin_x = int(min(cx0.min(), pcx.min()))
+        origin_y = int(min(cy0.min(), pcy.min()))
+        span_y = int(max(cy1.max(), pcy.max())) - origin_y + 1
+
+        entry_codes = []
+        entry_ids = []
+        nx = cx1 - cx0 + 1
+        ny = cy1 - cy0 + 1
+        for ox in range(int(nx.max())):
+            for oy in range(int(ny.max())):
+                keep = (ox < nx) & (oy < ny)
+                entry_codes.append(_cell_codes(cx0[keep] + ox, cy0[keep] + oy, origin_x, origin_y, span_y))
+                entry_ids.append(ids[keep])
+
+        for point_idx, seg_idx in _join_chunks(
+            _cell_codes(pcx, pcy, origin_x, origin_y, span_y),
+            np.concatenate(entry_codes),
+            np.concatenate(entry_ids),
+            _SEGMENT_PAIR_CHUNK,
+        ):
+            inside = (
+                (xs[point_idx] >= min_x[seg_idx]) & (xs[point_idx] <= max_x[seg_idx])
+                & (ys[point_idx] >= min_y[seg_idx]) & (ys[point_idx] <= max_y[seg_idx])
+            )
+            point_idx, seg_idx = point_idx[inside], seg_idx[inside]
+            d2 = _point_segment_dist2(xs[point_idx], ys[point_idx], ax[seg_idx], ay[seg_idx], bx[seg_idx], by[seg_idx])
+            near = d2 < radius2
+            parts_p.append(point_idx[near])
+            parts_s.append(seg_idx[near])
+            parts_d2.append(d2[near])
+    if not parts_p:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=float)
+    return np.concatenate(parts_p), np.concatenate(parts_s), np.concatenate(parts_d2)
+
+
+def _first_per_group(group, *keys):
+    """Індекси найкращого елемента в кожній групі: найменші keys за порядком."""
+    order = np.lexsort(tuple(reversed(keys)) + (group,))
+    sorted_group = group[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_group[1:] != sorted_group[:-1]
+    return order[first]
+
+
+def _close_hits_for_threshold(thr, xs, ys, i, j, d2, order_key, uidps):
+    mask = d2 < thr * thr
+    i, j, pair_d2 = i[mask], j[mask], d2[mask]
+    if len(i) == 0:
+        return ()
+
+    # Порядок, у якому Python-реалізація перебирає сусідів вузла u: спершу
+    # попередні вузли (за клітинками сітки 3x3, потім за порядком), далі
+    # наступні вузли за порядком. Переможцем серед рівних d2 стає перший.
+    cell = max(0.01, float(thr))
+    cx = np.floor(xs / cell).astype(np.int64)
+    cy = np.floor(ys / cell).astype(np.int64)
+    ddx = cx[i] - cx[j]
+    ddy = cy[i] - cy[j]
+    in_grid = (np.abs(ddx) <= 1) & (np.abs(ddy) <= 1)
+    i, j, pair_d2, ddx, ddy = i[in_grid], j[in_grid], pair_d2[in_grid], ddx[in_grid], ddy[in_grid]
+
+    n = len(xs)
+    offset = (ddx + 1) * 3 + (ddy + 1)  # клітинка i відносно клітинки j
+    later_key = offset * n + i          # для j: попередній вузол i
+    earlier_key = 9 * n + j             # для i: наступний вузол j
+
+    owner = np.concatenate((j, i))
+    other = np.concatenate((i, j))
+    key = np.concatenate((later_key, earlier_key))
+    both_d2 = np.concatenate((pair_d2, pair_d2))
+
+    best = _first_per_group(owner, both_d2, key)
+    best = best[np.argsort(order_key[owner[best]], kind="stable")]
+    dist = np.sqrt(both_d2[best])
+    return tuple(
+        (uidps[u], uidps[o], float(d))
+        for u, o, d in zip(owner[best].tolist(), other[best].tolist(), dist.tolist())
+    )
+
+
+def _near_hits_for_threshold(thr, pt, sg, d2, order_key, uidps, seg_ulids):
+    mask = d2 < thr * thr
+    pt, sg, pair_d2 = pt[mask], sg[mask], d2[mask]
+    if len(pt) == 0:
+        return ()
+    # Серед рівновіддалених сегментів перемагає перший за порядком документа.
+    best = _first_per_group(pt, pair_d2, sg)
+    best = best[np.argsort(order_key[pt[best]], kind="stable")]
+    dist = np.sqrt(pair_d2[best])
+    return tuple(
+        (uidps[p], seg_ulids[s] or "?", float(d))
+        for p, s, d in zip(pt[best].tolist(), sg[best].tolist(), dist.tolist())
+    )
+
+
+def proximity_hits(
+    geometry: GeometrySnapshot,
+    thresholds: Sequence[float],
+    progress: ProgressCb | None = None,
+) -> dict[float, tuple[RawHits, RawHits]]:
+    """
+    Для кожного порогу повертає (близькі вузли, створні точки) у вигляді
+    кортежів (UIDP, інший UIDP/ULID, відстань), упорядкованих за UIDP.
+    Кандидати шукаються один раз — за найбільшим порогом.
+    """
+    if not supports(geometry):
+        raise ValueError("Знімок геометрії не підтримується векторизованим рушієм")
+
+    thresholds = [float(t) for t in thresholds]
+    radius = _expand(max(thresholds)) if thresholds else 0.0
+
+    uidps = [uidp for uidp, _, _ in geometry.points]
+    xs = np.fromiter((p[1] for p in geometry.points), dtype=float, count=len(uidps))
+    ys = np.fromiter((p[2] for p in geometry.points), dtype=float, count=len(uidps))
+    order_key = np.fromiter((int(u) for u in uidps), dtype=np.int64, count=len(uidps))
+    point_index = {uidp: k for k, uidp in enumerate(uidps)}
+
+    i, j = _point_pairs(xs, ys, radius)
+    d2 = _dist2(xs[j], ys[j], xs[i], ys[i])
+    if progress:
+        progress(30)
+
+    segments = geometry.segments
+    seg = tuple(
+        np.fromiter((getattr(s, name) for s in segments), dtype=float, count=len(segments))
+        for name in ("ax", "ay", "bx", "by")
+    )
+    seg_poly = np.fromiter((s.poly_idx for s in segments), dtype=np.int64, count=len(segments))
+    seg_ulids = [s.ulid for s in segments]
+
+    pt, sg, seg_d2 = _segment_pairs(xs, ys, seg, radius)
+    if len(pt):
+        # Вузол не перевіряється відносно ліній, у яких він використаний.
+        n_points = max(1, len(uidps))
+        own = np.array(sorted({
+            poly_idx * n_points + point_index[u]
+            for poly_idx, members in enumerate(geometry.poly_uidps)
+            for u in members
+            if u in point_index
+        }), dtype=np.int64)
+        keep = ~np.isin(seg_poly[sg] * n_points + pt, own)
+        pt, sg, seg_d2 = pt[keep], sg[keep], seg_d2[keep]
+    if progress:
+        progress(70)
+
+    result: dict[float, tuple[RawHits, RawHits]] = {}
+    for thr in thresholds:
+        result[thr] = (
+            _close_hits_for_threshold(thr, xs, ys, i, j, d2, order_key, uidps),
+            _near_hits_for_threshold(thr, pt, sg, seg_d2, order_key, uidps, seg_ulids),
+        )
+    if progress:
+        progress(100)
+    return result
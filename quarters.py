@@ -8,13 +8,15 @@ from qgis.core import (
     QgsGeometry,
     QgsPolygon,
     QgsLineString,
-    QgsPointXY,
-    QgsProject
+    QgsPointXY
 )
 from qgis.PyQt.QtWidgets import QMessageBox
 from lxml import etree
 
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .common import ensure_object_layer_fields
+from .common import object_layer_fields
 
 
 class CadastralQuarters:
@@ -59,32 +61,25 @@ class CadastralQuarters:
         polygon = QgsPolygon(exterior_ring)
         return polygon
 
-    def add_quarter_layer(self):
-        """Створює та заповнює шар 'Кадастровий квартал'."""
-        self.layer_name = "Кадастровий квартал"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", self.layer_name, "memory")
-
-        self.layer.setCustomProperty("skip_save_dialog", True)
-
-        if not self.layer.isValid():
-            QMessageBox.critical(
-                None, "xml_ua", "Виникла помилка при створенні шару кварталів.")
-            return None
-
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "quarter.qml"))
-        provider = self.layer.dataProvider()
-        ensure_object_layer_fields(self.layer)
+    def data_fields(self):
+        """Поля даних шару 'Кадастровий квартал'."""
+        return object_layer_fields()
 
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Кадастровий квартал' за деревом; Externals
+        кварталу в дереві формуються заново з ParcelMetricInfo/Externals.
+        """
         try:
             from .topology import GeometryProcessor
-            processor = GeometryProcessor(self.root.getroottree())
+            processor = GeometryProcessor(
+                self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
         except Exception:
             processor = None
 
         object_id = 0
 
+        features = []
         for quarter_element in self.root.findall(".//CadastralQuarterInfo"):
             object_id += 1
 
@@ -140,7 +135,7 @@ class CadastralQuarters:
                     interior_ring = QgsLineString([QgsPointXY(p.y(), p.x()) for p in internal_coords])
                     polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
             feature.setGeometry(QgsGeometry(polygon))
             object_shape = ""
             if processor:
@@ -156,12 +151,30 @@ class CadastralQuarters:
                 except Exception:
                     object_shape = ""
             feature.setAttributes([object_id, object_shape])
-            provider.addFeature(feature)
+            features.append(feature)
+        return features
+
+    def add_quarter_layer(self):
+        """Створює та заповнює шар 'Кадастровий квартал'."""
+        self.layer_name = "Кадастровий квартал"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", self.layer_name, "memory")
+
+        self.layer.setCustomProperty("skip_save_dialog", True)
+
+        if not self.layer.isValid():
+            QMessageBox.critical(
+                None, "xml_ua", "Виникла помилка при створенні шару кварталів.")
+            return None
+
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "quarter.qml"))
+        provider = self.layer.dataProvider()
+        ensure_object_layer_fields(self.layer)
+
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        if hasattr(self, 'xml_ua_layers'):
-            self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
@@ -10,13 +10,16 @@ from qgis.core import (
     QgsPolygon,
     QgsLineString,
     QgsPointXY,
-    QgsWkbTypes,
-    QgsProject
+    QgsWkbTypes
 )
 from qgis.utils import iface
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .data_models import ShapeInfo  # noqa
 from .common import ensure_object_layer_fields, log_msg
+from .common import set_object_attributes
 from .common import logFile
+from .common import object_layer_fields
 
 
 class Restrictions:
@@ -61,7 +64,8 @@ class Restrictions:
 
         try:
             from .topology import GeometryProcessor
-            processor = GeometryProcessor(self.root.getroottree())
+            processor = GeometryProcessor(
+                self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
         except Exception:
             processor = None
 
@@ -70,6 +74,7 @@ class Restrictions:
             layer.commitChanges()
             return
 
+        features = []
         for restriction in restrictions_parent.findall(".//RestrictionInfo"):
             restriction_code = restriction.findtext(".//RestrictionCode")
             restriction_name = restriction.findtext(".//RestrictionName")
@@ -108,27 +113,24 @@ class Restrictions:
             feature = QgsFeature(layer.fields())
             feature.setGeometry(QgsGeometry(polygon))
             object_id = int(object_id_text) if object_id_text.isdigit() else None
-            feature.setAttributes([object_id, object_shape])
-            provider.addFeature(feature)
+            set_object_attributes(feature, object_id, object_shape)
+            features.append(feature)
+        provider.addFeatures(features)
         layer.commitChanges()
 
-    def add_restrictions_layer(self):
-        """Створює та заповнює шар 'Обмеження'."""
+    def data_fields(self):
+        """Поля даних шару 'Обмеження'."""
+        return object_layer_fields()
+
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Обмеження' за деревом: призначає відсутні
+        object_id і додає ShapeInfo шару self.layer до xml_data.shapes.
+        """
         parcel_info = self.root.find(".//ParcelInfo")
         restrictions_parent = parcel_info.find("Restrictions")
         if restrictions_parent is None:
-
-            return None
-
-        layer_name = "Обмеження"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
-        self.layer.setCustomProperty("skip_save_dialog", True)
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "restriction.qml"))
-        provider = self.layer.dataProvider()
-
-        ensure_object_layer_fields(self.layer)
+            return []
 
         existing_shapes_in_layer = set()
         if self.xml_data:
@@ -143,6 +145,7 @@ class Restrictions:
                 used_object_ids.add(int(obj_id_text))
         next_object_id = 1
 
+        features = []
         for restriction in restrictions_parent.findall(".//RestrictionInfo"):
             restriction_code = restriction.findtext(".//RestrictionCode")
             restriction_name = restriction.findtext(".//RestrictionName")
@@ -162,7 +165,8 @@ class Restrictions:
 
             try:
                 from .topology import GeometryProcessor
-                processor = GeometryProcessor(self.root.getroottree())
+                processor = GeometryProcessor(
+                    self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
             except Exception as e:
                 log_msg(
                     logFile, f"Не вдалося створити GeometryProcessor в Restrictions: {e}")
@@ -208,7 +212,7 @@ class Restrictions:
                             [QgsPointXY(p.y(), p.x()) for p in internal_coords])
                         polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
             feature.setGeometry(QgsGeometry(polygon))
             object_id = int(object_id_text) if object_id_text.isdigit() else None
             feature.setAttributes([object_id, object_shape])
@@ -221,12 +225,30 @@ class Restrictions:
                 self.xml_data.shapes.append(shape_info)
                 log_msg(
                     logFile, f"Додавання об'єкта до shapes: Обмеження, ID:{object_id_text}, shape='{object_shape}'")
-            provider.addFeature(feature)
+            features.append(feature)
+        return features
+
+    def add_restrictions_layer(self):
+        """Створює та заповнює шар 'Обмеження'."""
+        parcel_info = self.root.find(".//ParcelInfo")
+        restrictions_parent = parcel_info.find("Restrictions")
+        if restrictions_parent is None:
+
+            return None
+
+        layer_name = "Обмеження"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
+        self.layer.setCustomProperty("skip_save_dialog", True)
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "restriction.qml"))
+        provider = self.layer.dataProvider()
+
+        ensure_object_layer_fields(self.layer)
+
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        self.xml_ua_layers.added_layers.append(layer_node)
-        self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
@@ -0,0 +1,97 @@
+"""
+Кеш кілець (контурів) полігональних об'єктів одного XML-документа.
+
+Кільце — елемент <Lines> з переліком <Line>/<ULID>. Ключ запису —
+впорядкований кортеж ULID, тож спільні кільця (межа угіддя, що збігається
+з межею ділянки) збираються в ланцюжок лише один раз для всіх шарів.
+
+Запис містить зібрані координати (результат linesToCoordinates) та
+object_shape (результат GeometryProcessor._get_polyline_object_shape).
+Записи, що посилаються на змінені лінії або точки, скидаються:
+- координати — через sync_lines(), який викликається при кожному
+  перечитуванні поліліній (PLs.read_lines);
+- object_shape — додатково звіряється з сегментами (парами UIDP) ліній,
+  за якими його зібрано.
+"""
+from __future__ import annotations
+
+
+class RingCache:
+    """Кеш координат та object_shape кілець за кортежем ULID."""
+
+    def __init__(self):
+        self._coords: dict[tuple, list] = {}
+        self._shapes: dict[tuple, tuple] = {}
+        self._keys_by_ulid: dict[str, set] = {}
+        self._line_state: dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(lines_element) -> tuple:
+        """Ключ кільця: кортеж ULID елементів <Line> у порядку документа."""
+        return tuple((line.findtext("ULID") or "") for line in lines_element.iter("Line"))
+
+    def _index(self, key: tuple) -> None:
+        for ulid in key:
+            self._keys_by_ulid.setdefault(ulid, set()).add(key)
+
+    # --- координати ---------------------------------------------------
+
+    def get_coordinates(self, key: tuple) -> list | None:
+        coords = self._coords.get(key)
+        if coords is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(coords)
+
+    def put_coordinates(self, key: tuple, coords: list) -> None:
+        self._coords[key] = list(coords)
+        self._index(key)
+
+    # --- object_shape -------------------------------------------------
+
+    def get_shape(self, key: tuple, segments: tuple) -> str | None:
+        """Повертає object_shape, якщо його зібрано з тих самих сегментів."""
+        entry = self._shapes.get(key)
+        if entry is None or entry[0] != segments:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put_shape(self, key: tuple, segments: tuple, shape: str) -> None:
+        self._shapes[key] = (segments, shape)
+        self._index(key)
+
+    # --- інвалідація --------------------------------------------------
+
+    def invalidate(self, ulids) -> int:
+        """Скидає всі записи, що посилаються на будь-який з ulids. Повертає їх кількість."""
+        dropped = 0
+        for ulid in ulids:
+            for key in self._keys_by_ulid.pop(ulid, ()):
+                dropped += (self._coords.pop(key, None) is not None)
+                dropped += (self._shapes.pop(key, None) is not None)
+        return dropped
+
+    def sync_lines(self, line_state: dict) -> int:
+        """
+        Приймає {ULID: (кортеж UIDP, кортеж координат)} щойно прочитаних ліній
+        і скидає записи для ліній, що з'явилися, зникли або змінилися.
+        Повертає кількість скинутих записів.
+        """
+        old_state = self._line_state
+        self._line_state = line_state
+        if not self._coords and not self._shapes:
+            return 0
+        changed = [ulid for ulid, state in line_state.items() if old_state.get(ulid) != state]
+        changed.extend(ulid for ulid in old_state if ulid not in line_state)
+        return self.invalidate(changed)
+
+    def clear(self) -> None:
+        self._coords.clear()
+        self._shapes.clear()
+        self._keys_by_ulid.clear()
+        self._line_state = {}
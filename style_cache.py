@@ -0,0 +1,57 @@
+"""
+Кеш стилів QML шаблонів плагіна (templates/*.qml).
+
+load_named_style(layer, path) замінює layer.loadNamedStyle(path): файл стилю
+читається й розбирається у QgsMapLayerStyle один раз, а далі застосовується
+до нових шарів з пам'яті. Запис кешу скидається, якщо змінився час
+модифікації (mtime) файлу, тож правки шаблонів підхоплюються без
+перезапуску QGIS. Якщо стиль з кешу застосувати не вдалося, шар завантажує
+файл звичайним loadNamedStyle.
+"""
+
+import os
+
+from qgis.core import QgsMapLayerStyle
+
+from .common import logFile
+from .common import log_calls
+
+
+_styles = {}  # нормалізований шлях -> (mtime, QgsMapLayerStyle)
+
+
+def _cached_style(path):
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    entry = _styles.get(path)
+    if entry is not None and entry[0] == mtime:
+        return entry[1]
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            style = QgsMapLayerStyle(f.read())
+    except (OSError, UnicodeDecodeError) as e:
+        log_calls(logFile, f"Стиль '{path}' не прочитано: {e}")
+        _styles.pop(path, None)
+        return None
+    if not style.isValid():
+        _styles.pop(path, None)
+        return None
+
+    _styles[path] = (mtime, style)
+    return style
+
+
+def load_named_style(layer, path):
+    """
+    Застосовує до шару стиль з файлу QML path через кеш.
+    Повертає (повідомлення, успіх), як QgsMapLayer.loadNamedStyle.
+    """
+    path = os.path.normpath(path)
+    style = _cached_style(path)
+    if style is not None and style.writeToLayer(layer):
+        return "", True
+    return layer.loadNamedStyle(path)
@@ -9,12 +9,14 @@ from qgis.core import (
     QgsPolygon,
     QgsLineString,
     QgsPointXY,
-    QgsWkbTypes,
-    QgsProject
+    QgsWkbTypes
 )
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .data_models import ShapeInfo  # noqa
 from .common import logFile
 from .common import ensure_object_layer_fields, log_msg
+from .common import object_layer_fields
 
 
 class Subleases:
@@ -62,6 +64,7 @@ class Subleases:
             layer.commitChanges()
             return
 
+        features = []
         for sublease in subleases_parent.findall(".//SubleaseInfo"):
             object_id_text = str(sublease.get("object_id") or "").strip()
             registration_date = sublease.findtext(
@@ -90,26 +93,23 @@ class Subleases:
             feature.setGeometry(QgsGeometry(polygon))
             object_id = int(object_id_text) if object_id_text.isdigit() else None
             feature.setAttributes([object_id, ""])
-            provider.addFeature(feature)
+            features.append(feature)
+        provider.addFeatures(features)
         layer.commitChanges()
 
-    def add_subleases_layer(self):
-        """Створює та заповнює шар 'Суборенда'."""
+    def data_fields(self):
+        """Поля даних шару 'Суборенда'."""
+        return object_layer_fields()
+
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Суборенда' за деревом: призначає відсутні
+        object_id і додає ShapeInfo шару self.layer до xml_data.shapes.
+        """
         parcel_info = self.root.find(".//ParcelInfo")
         subleases_parent = parcel_info.find("Subleases")
         if subleases_parent is None:
-
-            return None
-
-        layer_name = "Суборенда"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
-        self.layer.setCustomProperty("skip_save_dialog", True)
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "sublease.qml"))
-        provider = self.layer.dataProvider()
-
-        ensure_object_layer_fields(self.layer)
+            return []
 
         existing_shapes_in_layer = set()
         if self.xml_data:
@@ -124,13 +124,15 @@ class Subleases:
                 used_object_ids.add(int(obj_id_text))
         next_object_id = 1
 
+        features = []
         for sublease in subleases_parent.findall(".//SubleaseInfo"):
             registration_date = sublease.findtext(
                 ".//SubleaseInfo/RegistrationDate")
 
             try:
                 from .topology import GeometryProcessor
-                processor = GeometryProcessor(self.root.getroottree())
+                processor = GeometryProcessor(
+                    self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
             except Exception as e:
                 log_msg(
                     logFile, f"Не вдалося створити GeometryProcessor в Subleases: {e}")
@@ -181,7 +183,7 @@ class Subleases:
                             [QgsPointXY(p.y(), p.x()) for p in internal_coords])
                         polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
             feature.setGeometry(QgsGeometry(polygon))
             object_id_int = int(object_id) if str(object_id).isdigit() else None
             feature.setAttributes([object_id_int, object_shape])
@@ -194,12 +196,30 @@ class Subleases:
                 self.xml_data.shapes.append(shape_info)
                 log_msg(
                     logFile, f"Додавання об'єкта до shapes: Суборенда, ID:{object_id}, shape='{object_shape}'")
-            provider.addFeature(feature)
+            features.append(feature)
+        return features
+
+    def add_subleases_layer(self):
+        """Створює та заповнює шар 'Суборенда'."""
+        parcel_info = self.root.find(".//ParcelInfo")
+        subleases_parent = parcel_info.find("Subleases")
+        if subleases_parent is None:
+
+            return None
+
+        layer_name = "Суборенда"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", layer_name, "memory")
+        self.layer.setCustomProperty("skip_save_dialog", True)
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "sublease.qml"))
+        provider = self.layer.dataProvider()
+
+        ensure_object_layer_fields(self.layer)
+
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        self.xml_ua_layers.added_layers.append(layer_node)
-        self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(
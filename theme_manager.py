@@ -4,6 +4,8 @@ import os
 from qgis.core import QgsProject
 from collections import namedtuple
 
+from .style_cache import load_named_style
+
 Theme = namedtuple("Theme", ["name", "styles"])
 
 EDIT_THEME = Theme(
@@ -84,7 +86,7 @@ class ThemeManager:
                     style_path = os.path.join(
                         self.plugin_dir, "templates", style_filename)
                     if os.path.exists(style_path):
-                        layer.loadNamedStyle(style_path)
+                        load_named_style(layer, style_path)
                         layer.triggerRepaint()
                     else:
                         print(f"Файл стилю не знайдено: {style_path}")
@@ -8,6 +8,7 @@ from lxml import etree as etree
 from qgis.core import QgsGeometry, QgsPolygon, QgsMultiPolygon, QgsWkbTypes, QgsPointXY
 
 from .common import log_calls, log_calls, logFile, insert_element_in_order, next_object_id_in_container
+from .open_pipeline import cleanup_and_renumber_geometry, renumber_geometry
 
 
 class GeometryProcessor:
@@ -16,8 +17,10 @@ class GeometryProcessor:
     при додаванні нових геометричних об'єктів до XML.
     """
 
-    def __init__(self, tree):
+    def __init__(self, tree, journal=None, ring_cache=None):
         self.tree = tree
+        self.journal = journal  # EditJournal документа; None — зміни не журналюються
+        self.ring_cache = ring_cache  # RingCache документа; None — object_shape не кешується
         self.root = self.tree.getroot()
         self.points = self._get_all_points()
         self.polylines = self._get_all_polylines()
@@ -32,6 +35,16 @@ class GeometryProcessor:
         self.polyline_info = self.root.find(".//Polyline")
         self.existing_points = self._get_existing_points()
 
+    def _record_insert(self, element):
+        if self.journal is not None:
+            self.journal.record_insert(element)
+
+    def _remove_element(self, element):
+        if self.journal is not None:
+            self.journal.remove(element)
+        else:
+            element.getparent().remove(element)
+
     def _get_max_id(self, xpath, tag):
         """Знаходить максимальний числовий ID для UIDP або ULID."""
         max_id = 0
@@ -103,6 +116,7 @@ class GeometryProcessor:
         if self.point_info is None:
             metric_info = self.root.find(".//MetricInfo")
             self.point_info = etree.SubElement(metric_info, "PointInfo")
+            self._record_insert(self.point_info)
 
         self.max_uidp += 1
         self.max_pn += 1
@@ -115,6 +129,7 @@ class GeometryProcessor:
         etree.SubElement(new_point_element, "Y").text = f"{qgs_point.x():.3f}"
 
         self.point_info.append(new_point_element)
+        self._record_insert(new_point_element)
 
         self.points[str(self.max_uidp)] = {'x': qgs_point.x(
         ), 'y': qgs_point.y(), 'elem': new_point_element}
@@ -149,6 +164,7 @@ class GeometryProcessor:
         if self.polyline_info is None:
             metric_info = self.root.find(".//MetricInfo")
             self.polyline_info = etree.SubElement(metric_info, "Polyline")
+            self._record_insert(self.polyline_info)
 
         self.max_ulid += 1
         new_ulid = str(self.max_ulid)
@@ -165,6 +181,7 @@ class GeometryProcessor:
         etree.SubElement(pl_element, "Length").text = f"{length:.2f}"
 
         self.polyline_info.append(pl_element)
+        self._record_insert(pl_element)
 
         self.polylines[new_ulid] = {
             'points': [uidp1, uidp2], 'elem': pl_element}
@@ -231,10 +248,14 @@ class GeometryProcessor:
         if point_info_container is not None:
 
             point_info_container.extend(new_points_to_add)
+            for p_elem in new_points_to_add:
+                self._record_insert(p_elem)
 
         polyline_container = self.root.find('.//Polyline')
         if polyline_container is not None:
             polyline_container.extend(new_polylines_to_add)
+            for pl_elem in new_polylines_to_add:
+                self._record_insert(pl_elem)
 
         if internals is not None:
             externals.append(internals)
@@ -423,11 +444,13 @@ class GeometryProcessor:
                 log_calls(
                     logFile, "(після створення контейнера): Розділ 'AdjacentUnits' тепер ІСНУЄ.")
             insert_element_in_order(parcel_info, adjacent_units_container)
+            self._record_insert(adjacent_units_container)
 
         adj_unit_info = etree.SubElement(
             adjacent_units_container, "AdjacentUnitInfo")
         object_id = next_object_id_in_container(adjacent_units_container, "AdjacentUnitInfo")
         adj_unit_info.set("object_id", object_id)
+        self._record_insert(adj_unit_info)
 
         adj_boundary = etree.SubElement(adj_unit_info, "AdjacentBoundary")
         lines = etree.SubElement(adj_boundary, "Lines")
@@ -478,12 +501,12 @@ class GeometryProcessor:
                 break
 
         if element_to_delete is not None:
-            adjacent_units_container.remove(element_to_delete)
+            self._remove_element(element_to_delete)
             log_calls(
                 logFile, f"Суміжника {object_shape_to_delete} було видалено з XML.")
 
             if not adjacent_units_container.findall("AdjacentUnitInfo"):
-                adjacent_units_container.getparent().remove(adjacent_units_container)
+                self._remove_element(adjacent_units_container)
                 log_calls(
                     logFile, "Розділ 'AdjacentUnits' став порожнім і був видалений.")
 
@@ -543,7 +566,7 @@ class GeometryProcessor:
                 elements_to_delete.append(adj_unit)
 
         for element in elements_to_delete:
-            adjacent_units_container.remove(element)
+            self._remove_element(element)
 
         return elements_to_delete
 
@@ -607,6 +630,13 @@ class GeometryProcessor:
         if not segments:
             return ""
 
+        if self.ring_cache is not None:
+            cache_key = tuple(ulids_in_container)
+            cache_segments = tuple(tuple(seg) for seg in segments)
+            cached = self.ring_cache.get_shape(cache_key, cache_segments)
+            if cached is not None:
+                return cached
+
         shape_points = []
 
         if segments:
@@ -649,6 +679,8 @@ class GeometryProcessor:
 
         result = "-".join(shape_points)
 
+        if self.ring_cache is not None:
+            self.ring_cache.put_shape(cache_key, cache_segments, result)
         return result
 
     def get_shape_from_qgis_feature(self, feature: 'QgsFeature'):
@@ -682,120 +714,21 @@ class GeometryProcessor:
         Виконує повне очищення та перенумерацію геометрії згідно з алгоритмом.
         Повертає True, якщо були внесені зміни (видалення або перенумерація), інакше False.
         """
-
-        initial_state = etree.tostring(self.root)
-
-        used_ulids = set()
-
-        xpath_for_ulids = ".//Externals/Boundary/Lines/Line/ULID | .//Internals/Boundary/Lines/Line/ULID | .//AdjacentBoundary/Lines/Line/ULID"
-        for line_ref in self.root.xpath(xpath_for_ulids):
-            if line_ref.text:
-                used_ulids.add(line_ref.text)
-
-        polyline_container = self.root.find(
-            './/Polyline')  # Блок опису поліліній
-        lines_removed_count = 0
-        lines_removed_str = ""
-        if polyline_container is not None:
-            for pl in list(polyline_container):
-                ulid = pl.findtext('ULID')
-                if ulid not in used_ulids:
-                    polyline_container.remove(pl)
-                    lines_removed_count += 1
-                    lines_removed_str += ulid + ','
-        if lines_removed_count > 0:
-            log_calls(
-                logFile, f"2. Видалено {lines_removed_count} поліліній: {lines_removed_str}")
-
-        used_uidps = set()
-        if polyline_container is not None:
-            for p_ref in polyline_container.xpath('.//PL/Points/P'):
-                if p_ref.text:
-                    used_uidps.add(p_ref.text)
-
-        point_info_container = self.root.find('.//PointInfo')
-        points_removed_count = 0
-        if point_info_container is not None:
-            for point in list(point_info_container):
-                uidp = point.findtext('UIDP')
-                if uidp not in used_uidps:
-                    point_info_container.remove(point)
-                    points_removed_count += 1
-        if points_removed_count > 0:
-            log_calls(
-                logFile, f"4. Видалено {points_removed_count} невикористовуваних точок (<Point>).")
-
-        self.renumber_geometry()
-
-        final_state = etree.tostring(self.root)
-        if initial_state != final_state:
-            log_calls(
-                logFile, "--- Завершено очищення та перенумерацію. Зміни внесено. ---")
-            return True
-        else:
-
-            return False
+        changed = cleanup_and_renumber_geometry(
+            self.root, log=lambda msg: log_calls(logFile, msg), journal=self.journal)
+        self._refresh_geometry_state()
+        return changed
 
     def renumber_geometry(self):
         """
         Перенумеровує всі вузли (Points) та лінії (Polylines) для усунення прогалин
         та оновлює всі посилання на них у XML-дереві.
         """
+        renumber_geometry(self.root, log=lambda msg: log_calls(logFile, msg), journal=self.journal)
+        self._refresh_geometry_state()
 
-        old_uidp_to_new = {}
-        all_points = self.root.findall('.//PointInfo/Point')
-
-        all_points.sort(key=lambda p: int(p.findtext('UIDP', '0')))
-
-        for i, point_elem in enumerate(all_points, 1):
-            new_uidp = str(i)
-            old_uidp = point_elem.findtext('UIDP')
-
-            if old_uidp and old_uidp != new_uidp:
-                old_uidp_to_new[old_uidp] = new_uidp
-
-            point_elem.find('UIDP').text = new_uidp
-
-        old_ulid_to_new = {}
-        all_lines = self.root.findall('.//Polyline/PL')
-
-        all_lines.sort(key=lambda pl: int(pl.findtext('ULID', '0')))
-
-        for i, line_elem in enumerate(all_lines, 1):
-            new_ulid = str(i)
-            old_ulid = line_elem.findtext('ULID')
-
-            if old_ulid and old_ulid != new_ulid:
-                old_ulid_to_new[old_ulid] = new_ulid
-
-            line_elem.find('ULID').text = new_ulid
-
-        if old_uidp_to_new:
-            updated_p_refs = 0
-            for p_ref in self.root.xpath(".//Polyline/PL/Points/P"):
-                old_ref = p_ref.text
-                if old_ref in old_uidp_to_new:
-                    p_ref.text = old_uidp_to_new[old_ref]
-                    updated_p_refs += 1
-            log_calls(
-                logFile, f"Оновлено {updated_p_refs} посилань на вузли в полілініях.")
-
-        if old_ulid_to_new:
-            updated_ulid_refs = 0
-
-            ulid_refs = self.root.xpath(
-                ".//Externals/Boundary/Lines/Line/ULID | "
-                ".//Internals/Boundary/Lines/Line/ULID | "
-                ".//AdjacentBoundary/Lines/Line/ULID"
-            )
-            for ulid_ref in ulid_refs:
-                old_ref = ulid_ref.text
-                if old_ref in old_ulid_to_new:
-                    ulid_ref.text = old_ulid_to_new[old_ref]
-                    updated_ulid_refs += 1
-            log_calls(
-                logFile, f"Оновлено {updated_ulid_refs} посилань на лінії в контурах.")
-
+    def _refresh_geometry_state(self):
+        """Оновлює кеші вузлів/ліній та максимальні ідентифікатори після змін дерева."""
         self.points = self._get_all_points()
         self.polylines = self._get_all_polylines()
         self.max_uidp = self._get_max_id('.//PointInfo/Point', 'UIDP')
@@ -0,0 +1,755 @@
+"""
+Топологічна перевірка полігонів документа: накладання угідь, розриви між
+угіддями всередині ділянки, вихід угідь за межі ділянки та самоперетини
+контурів ділянки, угідь, оренди, суборенди й обмежень.
+
+Кільця (контури) збираються з ліній Lines/Line/ULID за спільним знімком
+геометрії (GeometrySnapshot), тож кожне ребро кільця — пара вузлів UIDP
+лінії ULID; ці посилання й потрапляють у звіт.
+
+Перетини ребер шукаються одним проходом замітальної прямої (sweep-and-prune)
+по ребрах усіх кілець, відсортованих за x: ребро порівнюється лише з
+активними ребрами, x-проєкції яких його перекривають. Належність точки
+полігону та "точка на межі" визначаються за індексом горизонтальних смуг
+(_BandIndex), тож на великих файлах кварталу перевірка близька до
+O(n log n), а не до перебору всіх пар ребер.
+
+Координати — як у знімку геометрії: x <- Y, y <- X.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from .geometry_snapshot import GeometrySnapshot, build_geometry_snapshot
+from .xml_paths import LocalNamePath, child_text, uses_namespace
+
+
+ProgressCb = Callable[[int], None]
+
+# Допуск збігу/дотику, м: координати у файлах обміну задаються до мм.
+EPS_M = 0.001
+# Площа розриву між угіддями, яку ще вважаємо похибкою обчислень, м².
+GAP_TOLERANCE_M2 = 0.01
+
+ISSUE_TITLES = {
+    "open_ring": "Незамкнені контури",
+    "self_intersection": "Самоперетини контурів",
+    "overlap": "Накладання угідь",
+    "outside_parcel": "Угіддя за межами ділянки",
+    "gap": "Розриви між угіддями",
+}
+
+_PARCEL_INFOS = LocalNamePath("//ParcelInfo")
+_PARCEL_ID = LocalNamePath("string(./ParcelMetricInfo/ParcelID[1])")
+_PARCEL_EXTERNALS = LocalNamePath("./ParcelMetricInfo/Externals[1]")
+_LAND_INFOS = LocalNamePath("./LandsParcel/LandParcelInfo")
+_LAND_EXTERNALS = LocalNamePath("./MetricInfo/Externals[1]")
+_LEASE_INFOS = LocalNamePath("./Leases//LeaseInfo")
+_SUBLEASE_INFOS = LocalNamePath("./Subleases//SubleaseInfo")
+_RESTRICTION_INFOS = LocalNamePath("./Restrictions//RestrictionInfo")
+_FIRST_EXTERNALS = LocalNamePath("(.//Externals)[1]")
+_RESTRICTION_CODE = LocalNamePath("string((.//RestrictionCode)[1])")
+_BOUNDARY_LINES = LocalNamePath("./Boundary/Lines[1]")
+_INTERNAL_LINES = LocalNamePath("./Internals/Boundary/Lines[1]")
+_LINE_ULIDS = LocalNamePath("./Line/ULID/text()")
+
+
+@dataclass(frozen=True)
+class TopologyIssue:
+    kind: str  # ключ ISSUE_TITLES
+    objects: tuple[str, ...]
+    ulids: tuple[str, ...] = ()
+    uidps: tuple[str, ...] = ()
+    x: float | None = None
+    y: float | None = None
+    detail: str = ""
+
+
+@dataclass(frozen=True)
+class TopologyCheckResult:
+    objects_total: int
+    rings_total: int
+    edges_total: int
+    issues: tuple[TopologyIssue, ...]
+    elapsed_sec: float
+
+    def issues_of(self, kind: str) -> tuple[TopologyIssue, ...]:
+        return tuple(issue for issue in self.issues if issue.kind == kind)
+
+
+@dataclass
+class _Ring:
+    poly: int
+    hole: bool
+    uidps: list[str]  # без повтору першого вузла в кінці
+    ulids: list[str]  # ULID ребра i -> i+1
+    xy: list[tuple[float, float]]
+
+
+@dataclass
+class _Polygon:
+    label: str
+    kind: str  # "parcel" | "land" | "lease" | "sublease" | "restriction"
+    parcel: int = -1  # для угідь — індекс полігону ділянки
+    rings: list[int] = field(default_factory=list)  # перше — зовнішнє кільце
+
+
+# --- геометричні примітиви ------------------------------------------------
+
+def _dist_point_segment(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx = bx - ax
+    dy = by - ay
+    den = dx * dx + dy * dy
+    if den <= 0.0:
+        return math.hypot(px - ax, py - ay)
+    t = ((px - ax) * dx + (py - ay) * dy) / den
+    t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _side(ax: float, ay: float, bx: float, by: float, cx: float, cy: float, length: float) -> int:
+    """Бік точки c відносно прямої ab: -1/0/1 (0 — ближче за EPS_M)."""
+    d = ((bx - ax) * (cy - ay) - (by - ay) * (cx - ax)) / length
+    if d > EPS_M:
+        return 1
+    if d < -EPS_M:
+        return -1
+    return 0
+
+
+def _crossing(a, b) -> tuple[str, float, float] | None:
+    """
+    Перетин відрізків a і b (x1, y1, x2, y2, довжина): ("cross", x, y) —
+    перетин внутрішніх точок, ("touch", x, y) — кінець одного лежить на
+    іншому (дотик, накладання на одній прямій), None — не перетинаються.
+    """
+    ax1, ay1, ax2, ay2, alen = a
+    bx1, by1, bx2, by2, blen = b
+    s1 = _side(ax1, ay1, ax2, ay2, bx1, by1, alen)
+    s2 = _side(ax1, ay1, ax2, ay2, bx2, by2, alen)
+    s3 = _side(bx1, by1, bx2, by2, ax1, ay1, blen)
+    s4 = _side(bx1, by1, bx2, by2, ax2, ay2, blen)
+    if s1 * s2 < 0 and s3 * s4 < 0:
+        den = (ax2 - ax1) * (by2 - by1) - (ay2 - ay1) * (bx2 - bx1)
+        t = ((bx1 - ax1) * (by2 - by1) - (by1 - ay1) * (bx2 - bx1)) / den
+        return "cross", ax1 + t * (ax2 - ax1), ay1 + t * (ay2 - ay1)
+    for px, py, sx1, sy1, sx2, sy2 in (
+        (bx1, by1, ax1, ay1, ax2, ay2),
+        (bx2, by2, ax1, ay1, ax2, ay2),
+        (ax1, ay1, bx1, by1, bx2, by2),
+        (ax2, ay2, bx1, by1, bx2, by2),
+    ):
+        if _dist_point_segment(px, py, sx1, sy1, sx2, sy2) <= EPS_M:
+            return "touch", px, py
+    return None
+
+
+def _ring_area_m2(xy: list[tuple[float, float]]) -> float:
+    area = 0.0
+    n = len(xy)
+    for i in range(n):
+        x1, y1 = xy[i]
+        x2, y2 = xy[(i + 1) % n]
+        area += x1 * y2 - x2 * y1
+    return abs(area) / 2.0
+
+
+class _BandIndex:
+    """
+    Індекс ребер для "точка в полігоні" та "точка на межі".
+
+    Для променя вправо ребра розкладено по горизонтальних смугах: смуга
+    точки містить усі ребра, що перетинають її горизонталь (горизонтальні
+    ребра парність променя не змінюють і в смуги не потрапляють). Для
+    "на межі" ребра розкладено в сітку клітинок зі стороною в середнє ребро,
+    розширених на EPS_M.
+    """
+
+    def __init__(self, edges: list[tuple[float, float, float, float, int]]):
+        self._bands: dict[int, list] = {}
+        self._grid: dict[tuple[int, int], list] = {}
+        if not edges:
+            self._y0, self._h, self._cell = 0.0, 1.0, 1.0
+            return
+        y_min = min(min(e[1], e[3]) for e in edges) - EPS_M
+        y_max = max(max(e[1], e[3]) for e in edges) + EPS_M
+        self._y0 = y_min
+        self._h = max((y_max - y_min) / len(edges), EPS_M)
+        self._cell = max(sum(math.hypot(e[2] - e[0], e[3] - e[1]) for e in edges) / len(edges), EPS_M * 10)
+        cell = self._cell
+        for e in edges:
+            x1, y1, x2, y2, _ = e
+            if y1 != y2:
+                lo = int((min(y1, y2) - y_min) // self._h)
+                hi = int((max(y1, y2) - y_min) // self._h)
+                for band in range(lo, hi + 1):
+                    self._bands.setdefault(band, []).append(e)
+            for cx in range(int((min(x1, x2) - EPS_M) // cell), int((max(x1, x2) + EPS_M) // cell) + 1):
+                for cy in range(int((min(y1, y2) - EPS_M) // cell), int((max(y1, y2) + EPS_M) // cell) + 1):
+                    self._grid.setdefault((cx, cy), []).append(e)
+
+    def _near(self, x: float, y: float):
+        return self._grid.get((int(x // self._cell), int(y // self._cell)), ())
+
+    def locate(self, x: float, y: float) -> int:
+        """1 — всередині, 0 — на межі, -1 — зовні (враховує внутрішні контури)."""
+        if self.on_boundary(x, y):
+            return 0
+        inside = False
+        for x1, y1, x2, y2, _ in self._bands.get(int((y - self._y0) // self._h), ()):
+            if (y1 > y) != (y2 > y) and x1 + (y - y1) * (x2 - x1) / (y2 - y1) > x:
+                inside = not inside
+        return 1 if inside else -1
+
+    def on_boundary(self, x: float, y: float, exclude_tag: int = -1) -> bool:
+        for x1, y1, x2, y2, tag in self._near(x, y):
+            if tag != exclude_tag and _dist_point_segment(x, y, x1, y1, x2, y2) <= EPS_M:
+                return True
+        return False
+
+
+# --- збирання полігонів --------------------------------------------------
+
+def _chain_ring(ulids, geometry: GeometrySnapshot, ulid_to_uidps: dict) -> tuple[list, list] | str:
+    """
+    Збирає кільце з ліній ulids (у будь-якому порядку та напрямку), з'єднуючи
+    їх за координатами кінцевих вузлів. Повертає (UIDP, ULID ребер) або текст
+    помилки.
+    """
+    uidp_to_xy = geometry.uidp_to_xy
+    pieces = []
+    for ulid in ulids:
+        uidps = ulid_to_uidps.get(ulid)
+        if not uidps or len(uidps) < 2:
+            return f"лінія {ulid} відсутня в Polyline або має менше 2 вузлів"
+        for uidp in uidps:
+            if uidp not in uidp_to_xy:
+                return f"вузол {uidp} лінії {ulid} без координат"
+        pieces.append((ulid, uidps))
+    if not pieces:
+        return "контур без ліній"
+
+    by_end: dict[tuple[float, float], list[int]] = {}
+    for i, (_, uidps) in enumerate(pieces[1:], 1):
+        by_end.setdefault(uidp_to_xy[uidps[0]], []).append(i)
+        by_end.setdefault(uidp_to_xy[uidps[-1]], []).append(i)
+
+    first_ulid, first_uidps = pieces[0]
+    chain = list(first_uidps)
+    edge_ulids = [first_ulid] * (len(first_uidps) - 1)
+    used = {0}
+    while len(used) < len(pieces):
+        last_xy = uidp_to_xy[chain[-1]]
+        nxt = next((i for i in by_end.get(last_xy, ()) if i not in used), None)
+        if nxt is None:
+            return f"розрив після вузла {chain[-1]} (лінія {edge_ulids[-1]})"
+        used.add(nxt)
+        ulid, uidps = pieces[nxt]
+        ext = uidps[1:] if uidp_to_xy[uidps[0]] == last_xy else list(reversed(uidps[:-1]))
+        chain.extend(ext)
+        edge_ulids.extend([ulid] * len(ext))
+
+    if uidp_to_xy[chain[0]] != uidp_to_xy[chain[-1]]:
+        return f"контур не замкнено: вузли {chain[0]} і {chain[-1]}"
+    chain.pop()
+
+    # Послідовні вузли з однаковими координатами дають ребра нульової довжини.
+    uidps_out, ulids_out = [], []
+    for i, uidp in enumerate(chain):
+        if uidps_out and uidp_to_xy[uidp] == uidp_to_xy[uidps_out[-1]]:
+            ulids_out[-1] = edge_ulids[i]
+            continue
+        uidps_out.append(uidp)
+        ulids_out.append(edge_ulids[i])
+    if len(uidps_out) > 1 and uidp_to_xy[uidps_out[0]] == uidp_to_xy[uidps_out[-1]]:
+        uidps_out.pop()
+        ulids_out.pop()
+    if len(uidps_out) < 3:
+        return "контур має менше 3 різних вузлів"
+    return uidps_out, ulids_out
+
+
+class _Model:
+    """Полігони документа, їхні кільця та ребра."""
+
+    def __init__(self, xml_tree, geometry: GeometrySnapshot):
+        self.geometry = geometry
+        self.polygons: list[_Polygon] = []
+        self.rings: list[_Ring] = []
+        self.issues: list[TopologyIssue] = []
+        self._ulid_to_uidps = {ulid: uidps for ulid, uidps in geometry.polylines if ulid}
+
+        root = xml_tree.getroot() if hasattr(xml_tree, "getroot") else xml_tree
+        if root is None:
+            return
+        ns = uses_namespace(root)
+        for p_idx, parcel in enumerate(_PARCEL_INFOS(root, ns), 1):
+            parcel_id = (_PARCEL_ID(parcel, ns) or "").strip()
+            parcel_poly = self._add_polygon(
+                f"Ділянка {parcel_id or p_idx}", "parcel", _PARCEL_EXTERNALS(parcel, ns), ns)
+            for i, land in enumerate(_LAND_INFOS(parcel, ns), 1):
+                code = child_text(land, "LandCode", ns)
+                self._add_polygon(
+                    f"Угіддя {i}" + (f" ({code})" if code else ""), "land", _LAND_EXTERNALS(land, ns), ns,
+                    parcel=parcel_poly)
+            for i, lease in enumerate(_LEASE_INFOS(parcel, ns), 1):
+                self._add_polygon(f"Оренда {i}", "lease", _FIRST_EXTERNALS(lease, ns), ns)
+            for i, sublease in enumerate(_SUBLEASE_INFOS(parcel, ns), 1):
+                self._add_polygon(f"Суборенда {i}", "sublease", _FIRST_EXTERNALS(sublease, ns), ns)
+            for i, restriction in enumerate(_RESTRICTION_INFOS(parcel, ns), 1):
+                code = (_RESTRICTION_CODE(restriction, ns) or "").strip()
+                self._add_polygon(
+                    f"Обмеження {i}" + (f" ({code})" if code else ""), "restriction",
+                    _FIRST_EXTERNALS(restriction, ns), ns)
+
+    def _add_polygon(self, label: str, kind: str, externals, ns: bool, parcel: int = -1) -> int:
+        if not externals:
+            return -1
+        externals = externals[0]
+        poly_idx = len(self.polygons)
+        poly = _Polygon(label=label, kind=kind, parcel=parcel)
+
+        contours = [(False, _BOUNDARY_LINES(externals, ns))]
+        contours.extend((True, [lines]) for lines in _INTERNAL_LINES(externals, ns))
+        for hole, lines in contours:
+            if not lines:
+                continue
+            ulids = [str(t).strip() for t in _LINE_ULIDS(lines[0], ns) if str(t).strip()]
+            chained = _chain_ring(ulids, self.geometry, self._ulid_to_uidps)
+            if isinstance(chained, str):
+                self.issues.append(TopologyIssue(
+                    kind="open_ring",
+                    objects=(label,),
+                    ulids=tuple(dict.fromkeys(ulids)),
+                    detail=("внутрішній контур: " if hole else "") + chained,
+                ))
+                if not hole:
+                    # Без зовнішнього контуру полігон не перевіряється.
+                    return -1
+                continue
+            uidps, ring_ulids = chained
+            poly.rings.append(len(self.rings))
+            self.rings.append(_Ring(
+                poly=poly_idx,
+                hole=hole,
+                uidps=uidps,
+                ulids=ring_ulids,
+                xy=[self.geometry.uidp_to_xy[u] for u in uidps],
+            ))
+        if not poly.rings or self.rings[poly.rings[0]].hole:
+            return -1
+        self.polygons.append(poly)
+        return poly_idx
+
+    def edges(self):
+        """(x1, y1, x2, y2, довжина, кільце, номер ребра) для всіх кілець."""
+        out = []
+        for r_idx, ring in enumerate(self.rings):
+            xy = ring.xy
+            n = len(xy)
+            for i in range(n):
+                x1, y1 = xy[i]
+                x2, y2 = xy[(i + 1) % n]
+                out.append((x1, y1, x2, y2, math.hypot(x2 - x1, y2 - y1), r_idx, i))
+        return out
+
+    def polygon_area_m2(self, poly_idx: int) -> float:
+        rings = self.polygons[poly_idx].rings
+        area = _ring_area_m2(self.rings[rings[0]].xy)
+        for r_idx in rings[1:]:
+            area -= _ring_area_m2(self.rings[r_idx].xy)
+        return area
+
+    def band_index(self, poly_indices) -> _BandIndex:
+        """Індекс ребер полігонів poly_indices; мітка ребра — індекс полігону."""
+        edges = []
+        for poly_idx in poly_indices:
+            for r_idx in self.polygons[poly_idx].rings:
+                xy = self.rings[r_idx].xy
+                n = len(xy)
+                for i in range(n):
+                    x1, y1 = xy[i]
+                    x2, y2 = xy[(i + 1) % n]
+                    edges.append((x1, y1, x2, y2, poly_idx))
+        return _BandIndex(edges)
+
+    def probe_points(self, poly_idx: int):
+        """Вузли та середини ребер зовнішнього кільця: (x, y, UIDP, ULID)."""
+        ring = self.rings[self.polygons[poly_idx].rings[0]]
+        xy = ring.xy
+        n = len(xy)
+        for i in range(n):
+            x1, y1 = xy[i]
+            x2, y2 = xy[(i + 1) % n]
+            yield x1, y1, ring.uidps[i], ""
+            yield (x1 + x2) / 2.0, (y1 + y2) / 2.0, "", ring.ulids[i]
+
+
+# --- перевірки ----------------------------------------------------------
+
+def _sweep_crossings(model: _Model, progress: ProgressCb | None) -> None:
+    """Самоперетини кілець та перетини угідь між собою і з межею ділянки."""
+    edges = model.edges()
+    rings = model.rings
+    polygons = model.polygons
+    order = sorted(range(len(edges)), key=lambda e: min(edges[e][0], edges[e][2]))
+
+    pair_hits: dict[tuple[str, int, int], list] = {}
+    self_hits: list[TopologyIssue] = []
+
+    def relation(ra: int, rb: int) -> str | None:
+        if ra == rb:
+            return "ring"
+        pa, pb = rings[ra].poly, rings[rb].poly
+        if pa == pb:
+            return "rings"
+        a, b = polygons[pa], polygons[pb]
+        if a.kind == "land" and b.kind == "land" and a.parcel == b.parcel:
+            return "overlap"
+        if (a.kind == "land" and a.parcel == pb) or (b.kind == "land" and b.parcel == pa):
+            return "outside_parcel"
+        return None
+
+    # Активні ребра (x-проєкція перекриває поточну позицію прямої), розкладені
+    # за y-смугами висотою із середнє ребро: у щільних контурах активних
+    # ребер багато, але поруч по y — одиниці.
+    lengths = [e[4] for e in edges]
+    cell = max(sum(lengths) / len(lengths), EPS_M * 10) if lengths else 1.0
+    cells: dict[int, dict[int, None]] = {}
+    edge_cells: dict[int, range] = {}
+    expiry: list[tuple[float, int]] = []
+    total = len(order) or 1
+    for step, e in enumerate(order):
+        if progress is not None and step % 2000 == 0:
+            progress(int(10 + 60 * step / total))
+        x1, y1, x2, y2, length, r, i = edges[e]
+        if length <= EPS_M:
+            continue
+        x_lo = min(x1, x2)
+        while expiry and expiry[0][0] < x_lo - EPS_M:
+            old = heapq.heappop(expiry)[1]
+            for c in edge_cells.pop(old):
+                del cells[c][old]
+        y_lo, y_hi = min(y1, y2) - EPS_M, max(y1, y2) + EPS_M
+        span = range(int(y_lo // cell), int(y_hi // cell) + 1)
+        if len(span) == 1:
+            candidates = tuple(cells.get(span[0], ()))
+        else:
+            candidates = {o for c in span for o in cells.get(c, ())}
+        seg = (x1, y1, x2, y2, length)
+        for o in candidates:
+            ox1, oy1, ox2, oy2, olength, orr, oi = edges[o]
+            if max(oy1, oy2) < y_lo or min(oy1, oy2) > y_hi:
+                continue
+            rel = relation(r, orr)
+            if rel is None:
+                continue
+            hit = _crossing(seg, (ox1, oy1, ox2, oy2, olength))
+            if hit is None:
+                continue
+            kind, hx, hy = hit
+            if rel == "ring":
+                n = len(rings[r].xy)
+                adjacent = (i - oi) % n in (1, n - 1)
+                if adjacent:
+                    # Сусідні ребра мають спільний вузол; помилка — лише
+                    # "злам назад", коли ребра лягають одне на одне.
+                    first, second = (i, oi) if (i + 1) % n == oi else (oi, i)
+                    ax, ay = rings[r].xy[first]
+                    vx, vy = rings[r].xy[second]
+                    bx, by = rings[r].xy[(second + 1) % n]
+                    if (
+                        _dist_point_segment(bx, by, ax, ay, vx, vy) > EPS_M
+                        and _dist_point_segment(ax, ay, vx, vy, bx, by) > EPS_M
+                    ):
+                        continue
+                    kind = "spike"
+                ring = rings[r]
+                n = len(ring.uidps)
+                self_hits.append(TopologyIssue(
+                    kind="self_intersection",
+                    objects=(polygons[ring.poly].label,),
+                    ulids=tuple(dict.fromkeys((ring.ulids[oi], ring.ulids[i]))),
+                    uidps=(ring.uidps[oi], ring.uidps[(oi + 1) % n], ring.uidps[i], ring.uidps[(i + 1) % n]),
+                    x=hx,
+                    y=hy,
+                    detail={
+                        "cross": "ребра перетинаються",
+                        "touch": "контур торкається сам себе",
+                        "spike": "ребра накладаються (злам назад)",
+                    }[kind] + (" (внутрішній контур)" if ring.hole else ""),
+                ))
+                continue
+            if kind != "cross":
+                continue
+            pa, pb = sorted((rings[r].poly, rings[orr].poly))
+            ra, ea, rb, eb = (r, i, orr, oi) if rings[r].poly == pa else (orr, oi, r, i)
+            pair_hits.setdefault((rel, pa, pb), []).append(
+                (hx, hy, rings[ra].ulids[ea], rings[rb].ulids[eb]))
+        edge_cells[e] = span
+        for c in span:
+            cells.setdefault(c, {})[e] = None
+        heapq.heappush(expiry, (max(x1, x2), e))
+
+    model.issues.extend(self_hits)
+    for (rel, pa, pb), hits in pair_hits.items():
+        hx, hy = hits[0][0], hits[0][1]
+        ulids = tuple(dict.fromkeys(u for h in hits for u in h[2:]))
+        if rel == "rings":
+            model.issues.append(TopologyIssue(
+                kind="self_intersection",
+                objects=(polygons[pa].label,),
+                ulids=ulids,
+                x=hx,
+                y=hy,
+                detail=f"контури полігону перетинаються (перетинів: {len(hits)})",
+            ))
+        elif rel == "overlap":
+            model.issues.append(TopologyIssue(
+                kind="overlap",
+                objects=(polygons[pa].label, polygons[pb].label),
+                ulids=ulids,
+                x=hx,
+                y=hy,
+                detail=f"межі перетинаються (перетинів: {len(hits)})",
+            ))
+        else:
+            land = pa if polygons[pa].kind == "land" else pb
+            model.issues.append(TopologyIssue(
+                kind="outside_parcel",
+                objects=(polygons[land].label, polygons[polygons[land].parcel].label),
+                ulids=ulids,
+                x=hx,
+                y=hy,
+                detail=f"межа угіддя перетинає межу ділянки (перетинів: {len(hits)})",
+            ))
+
+
+def _probe(model: _Model, poly_idx: int, index: _BandIndex, want: int):
+    """Перша пробна точка полігону poly_idx, для якої index.locate() == want."""
+    for x, y, uidp, ulid in model.probe_points(poly_idx):
+        if index.locate(x, y) == want:
+            return x, y, uidp, ulid
+    return None
+
+
+def _check_lands(model: _Model, progress: ProgressCb | None) -> None:
+    """Накладання без перетину меж, угіддя поза ділянкою та розриви."""
+    polygons = model.polygons
+    flagged = {(issue.kind, issue.objects) for issue in model.issues}
+    label_of = {i: p.label for i, p in enumerate(polygons)}
+
+    lands_by_parcel: dict[int, list[int]] = {}
+    for i, poly in enumerate(polygons):
+        if poly.kind == "land" and poly.parcel >= 0:
+            lands_by_parcel.setdefault(poly.parcel, []).append(i)
+
+    indexes: dict[int, _BandIndex] = {}
+
+    def index_of(poly_idx: int) -> _BandIndex:
+        if poly_idx not in indexes:
+            indexes[poly_idx] = model.band_index((poly_idx,))
+        return indexes[poly_idx]
+
+    def bbox(poly_idx: int):
+        xy = model.rings[polygons[poly_idx].rings[0]].xy
+        xs = [p[0] for p in xy]
+        ys = [p[1] for p in xy]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    done = 0
+    total = sum(len(v) for v in lands_by_parcel.values()) or 1
+    for parcel, lands in lands_by_parcel.items():
+        parcel_label = label_of[parcel]
+        parcel_index = index_of(parcel)
+        parcel_has_issue = False
+
+        # Угіддя за межами ділянки (без перетину меж — напр. повністю зовні).
+        for land in lands:
+            if ("outside_parcel", (label_of[land], parcel_label)) in flagged:
+                parcel_has_issue = True
+                continue
+            hit = _probe(model, land, parcel_index, -1)
+            if hit is not None:
+                x, y, uidp, ulid = hit
+                parcel_has_issue = True
+                model.issues.append(TopologyIssue(
+                    kind="outside_parcel",
+                    objects=(label_of[land], parcel_label),
+                    ulids=(ulid,) if ulid else (),
+                    uidps=(uidp,) if uidp else (),
+                    x=x,
+                    y=y,
+                    detail="вузол угіддя поза ділянкою" if uidp else "ребро угіддя поза ділянкою",
+                ))
+                continue
+            # Угіддя, що накриває внутрішній контур (виключення) ділянки.
+            for hole in polygons[parcel].rings[1:]:
+                ring = model.rings[hole]
+                inside = next(
+                    (i for i, (x, y) in enumerate(ring.xy) if index_of(land).locate(x, y) == 1), None)
+                if inside is None:
+                    continue
+                parcel_has_issue = True
+                model.issues.append(TopologyIssue(
+                    kind="outside_parcel",
+                    objects=(label_of[land], parcel_label),
+                    uidps=(ring.uidps[inside],),
+                    x=ring.xy[inside][0],
+                    y=ring.xy[inside][1],
+                    detail="угіддя накриває внутрішній контур ділянки",
+                ))
+                break
+
+        # Накладання: пари угідь з перекритими габаритами, відсортовані за x.
+        boxes = sorted((bbox(land), land) for land in lands)
+        active: list[tuple[tuple, int]] = []
+        for box, land in boxes:
+            done += 1
+            if progress is not None and done % 200 == 0:
+                progress(int(70 + 25 * done / total))
+            active = [(b, o) for b, o in active if b[2] >= box[0] - EPS_M]
+            for other_box, other in active:
+                if other_box[1] > box[3] + EPS_M or other_box[3] < box[1] - EPS_M:
+                    continue
+                a, b = sorted((land, other))
+                objects = (label_of[a], label_of[b])
+                if ("overlap", objects) in flagged:
+                    parcel_has_issue = True
+                    continue
+                ring_a = model.rings[polygons[a].rings[0]]
+                ring_b = model.rings[polygons[b].rings[0]]
+                if sorted(ring_a.xy) == sorted(ring_b.xy):
+                    hit = (ring_a.xy[0][0], ring_a.xy[0][1], ring_a.uidps[0], "")
+                    detail = "контури збігаються"
+                else:
+                    hit = _probe(model, a, index_of(b), 1) or _probe(model, b, index_of(a), 1)
+                    detail = "частина одного угіддя лежить всередині іншого"
+                if hit is None:
+                    continue
+                x, y, uidp, ulid = hit
+                parcel_has_issue = True
+                flagged.add(("overlap", objects))
+                model.issues.append(TopologyIssue(
+                    kind="overlap",
+                    objects=objects,
+                    ulids=(ulid,) if ulid else (),
+                    uidps=(uidp,) if uidp else (),
+                    x=x,
+                    y=y,
+                    detail=detail,
+                ))
+            active.append((box, land))
+
+        if parcel_has_issue:
+            # Сума площ при накладаннях чи виході за межі не показує розривів.
+            continue
+        gap_m2 = model.polygon_area_m2(parcel) - sum(model.polygon_area_m2(land) for land in lands)
+        if gap_m2 <= GAP_TOLERANCE_M2:
+            continue
+
+        # Межі без сусіда: ребра угідь, що не лежать на межі ділянки чи
+        # іншого угіддя, та ребра ділянки, не покриті жодним угіддям.
+        lands_index = model.band_index(lands)
+        ulids: list[str] = []
+        first_xy = None
+        for land in lands:
+            for x, y, _, ulid in model.probe_points(land):
+                if not ulid:
+                    continue
+                if parcel_index.locate(x, y) == 0 or lands_index.on_boundary(x, y, exclude_tag=land):
+                    continue
+                ulids.append(ulid)
+                first_xy = first_xy or (x, y)
+        for x, y, _, ulid in model.probe_points(parcel):
+            if ulid and not lands_index.on_boundary(x, y):
+                ulids.append(ulid)
+                first_xy = first_xy or (x, y)
+        model.issues.append(TopologyIssue(
+            kind="gap",
+            objects=(parcel_label,),
+            ulids=tuple(dict.fromkeys(ulids)),
+            x=first_xy[0] if first_xy else None,
+            y=first_xy[1] if first_xy else None,
+            detail=f"площа ділянки не покрита угіддями: {gap_m2:.2f} м²",
+        ))
+
+
+def run_topology_checks(
+    *,
+    xml_tree,
+    progress: ProgressCb | None = None,
+    geometry: GeometrySnapshot | None = None,
+) -> TopologyCheckResult:
+    """
+    Топологічна перевірка полігонів xml_tree за знімком геометрії geometry
+    (якщо не передано — будується з xml_tree).
+    """
+    started = time.time()
+    if geometry is None:
+        geometry = build_geometry_snapshot(xml_tree)
+    if progress is not None:
+        progress(0)
+
+    model = _Model(xml_tree, geometry)
+    if progress is not None:
+        progress(10)
+    _sweep_crossings(model, progress)
+    _check_lands(model, progress)
+    if progress is not None:
+        progress(100)
+
+    order = {kind: i for i, kind in enumerate(ISSUE_TITLES)}
+    issues = sorted(model.issues, key=lambda issue: order.get(issue.kind, len(order)))
+    return TopologyCheckResult(
+        objects_total=len(model.polygons),
+        rings_total=len(model.rings),
+        edges_total=sum(len(ring.xy) for ring in model.rings),
+        issues=tuple(issues),
+        elapsed_sec=time.time() - started,
+    )
+
+
+def topology_report_path(xml_path: str) -> str:
+    p = Path(xml_path)
+    return str(p.with_name(f"{p.stem}_topology.txt"))
+
+
+def build_topology_report(*, xml_path: str, result: TopologyCheckResult) -> str:
+    out: list[str] = []
+    out.append(f"Файл: {xml_path}")
+    out.append(f"Дата/час: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    out.append(f"Полігонів: {result.objects_total}, Контурів: {result.rings_total}, Ребер: {result.edges_total}")
+    out.append(f"Допуск: {EPS_M} м")
+    out.append(f"Час: {result.elapsed_sec:.2f} сек")
+    out.append("")
+
+    for n, (kind, title) in enumerate(ISSUE_TITLES.items(), 1):
+        out.append(f"{n}. {title}:")
+        issues = result.issues_of(kind)
+        if not issues:
+            out.append("  немає")
+        for i, issue in enumerate(issues, 1):
+            line = f"  {i}. {' / '.join(issue.objects)}: {issue.detail}"
+            if issue.x is not None and issue.y is not None:
+                line += f"  X={issue.y:.3f} Y={issue.x:.3f}"
+            out.append(line)
+            if issue.ulids:
+                out.append(f"     ULID: {', '.join(issue.ulids)}")
+            if issue.uidps:
+                out.append(f"     UIDP: {', '.join(dict.fromkeys(issue.uidps))}")
+        out.append("")
+
+    return "\n".join(out).rstrip("\n") + "\n"
+
+
+def write_topology_report(*, xml_path: str, report_text: str) -> str:
+    report_path = topology_report_path(xml_path)
+    Path(report_path).write_text(report_text, encoding="utf-8")
+    return report_path
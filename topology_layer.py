@@ -0,0 +1,84 @@
+"""
+Тимчасовий шар "Топологічні помилки" з місцями порушень, знайдених
+topology_checks при відкритті XML.
+
+Шар будується лише за увімкненого налаштування xml_ua/topology_highlight_layer
+(дія "Підсвічувати топологічні помилки на карті" в меню інструментів) і лише
+коли помилки є. Шар лише для читання, у файл не зберігається і
+перебудовується при кожному відкритті.
+"""
+
+from qgis.core import QgsFeature
+from qgis.core import QgsField
+from qgis.core import QgsGeometry
+from qgis.core import QgsMarkerSymbol
+from qgis.core import QgsPointXY
+from qgis.core import QgsProject
+from qgis.core import QgsVectorLayer
+from qgis.PyQt.QtCore import QVariant
+
+from .layer_batch import add_layer_to_group
+from .topology_checks import ISSUE_TITLES
+
+
+TOPOLOGY_LAYER_SETTING_KEY = "xml_ua/topology_highlight_layer"
+TOPOLOGY_LAYER_NAME = "Топологічні помилки"
+
+
+def add_topology_layer(group, crs_epsg, result):
+    """
+    Додає до group шар точок порушень з result (TopologyCheckResult).
+    Координати — як у знімку геометрії (x <- Y, y <- X), тобто вже в порядку
+    карти. Повертає шар або None, якщо показувати нічого.
+    """
+    existing_layer_node = group.findLayer(TOPOLOGY_LAYER_NAME)
+    if existing_layer_node:
+        group.removeChildNode(existing_layer_node)
+        QgsProject.instance().removeMapLayer(existing_layer_node.layerId())
+
+    issues = [issue for issue in result.issues if issue.x is not None and issue.y is not None]
+    if not issues:
+        return None
+
+    layer = QgsVectorLayer(f"Point?crs={crs_epsg}", TOPOLOGY_LAYER_NAME, "memory")
+    layer.setCustomProperty("skip_save_dialog", True)
+    if not layer.isValid():
+        return None
+
+    provider = layer.dataProvider()
+    provider.addAttributes([
+        QgsField("kind", QVariant.String),
+        QgsField("objects", QVariant.String),
+        QgsField("ULID", QVariant.String),
+        QgsField("UIDP", QVariant.String),
+        QgsField("detail", QVariant.String),
+    ])
+    layer.updateFields()
+
+    fields = layer.fields()
+    features = []
+    for issue in issues:
+        feature = QgsFeature(fields)
+        feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(issue.x, issue.y)))
+        feature.setAttributes([
+            ISSUE_TITLES.get(issue.kind, issue.kind),
+            " / ".join(issue.objects),
+            ", ".join(issue.ulids),
+            ", ".join(dict.fromkeys(issue.uidps)),
+            issue.detail,
+        ])
+        features.append(feature)
+    provider.addFeatures(features)
+    layer.updateExtents()
+
+    layer.renderer().setSymbol(QgsMarkerSymbol.createSimple({
+        "name": "circle",
+        "color": "255,0,0,90",
+        "outline_color": "255,0,0",
+        "outline_width": "0.6",
+        "size": "4",
+    }))
+    layer.setReadOnly(True)
+
+    add_layer_to_group(group, layer, on_top=True)
+    return layer
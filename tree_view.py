@@ -30,6 +30,7 @@ from .common import config
 from .common import connector
 from .date_dialog import DateInputDialog
 from .validators import validate_element
+from .xml_writer import write_xml_targets
 from .delegates import StateActTypeDelegate, CategoryDelegate, PurposeDelegate, OwnershipCodeDelegate, DocumentCodeDelegate, DispatcherDelegate, DocumentationTypeDelegate, LandCodeDelegate, ClosedDelegate
 
 CONTAINER_TAGS_TO_DELETE_LAYER = [
@@ -78,6 +79,7 @@ class CustomTreeView(QTreeView):
         self.parent = parent
         self.tree_upd = False   # Флаг для запобігання циклічним змінам
         self.xml_tree = None
+        self.element_registry = None  # ElementRegistry документа (xml_data.element_registry)
         self.xsd_appinfo = {}
         self.xsd_descriptions = {}
         self.xsd_schema = {}
@@ -2403,6 +2405,8 @@ class CustomTreeView(QTreeView):
                 self.xml_tree = etree.parse(xml_path)
 
             self.model.removeRows(0, self.model.rowCount())
+            if self.element_registry is not None:
+                self.element_registry.clear_items()
 
             root = self.xml_tree.getroot()
 
@@ -2448,6 +2452,8 @@ class CustomTreeView(QTreeView):
         name_item.setEditable(False)
         name_item.setData(full_path, Qt.UserRole)
         name_item.setData(element, Qt.UserRole + 10)
+        if self.element_registry is not None:
+            self.element_registry.register_item(element, name_item)
         if description:
             name_item.setToolTip(description)
 
@@ -2601,59 +2607,32 @@ class CustomTreeView(QTreeView):
 
         return name_item, value_item
 
-    def save_xml_tree(self, xml_tree, xml_path):
+    def save_xml_tree(self, xml_tree, xml_path, *extra_paths):
         """
-        Saves an lxml ElementTree object to a file.
+        Saves an lxml ElementTree object to one or more files.
+
+        The tree is serialized once by xml_writer.write_xml_targets: technical
+        object_id attributes are skipped and empty CoordinateSystem/HeightSystem/
+        MeasurementUnit nodes are written without text while streaming, so the
+        document is not copied. The same buffer is written to every path.
 
         Args:
             xml_tree (etree._ElementTree): The lxml ElementTree object to save.
             xml_path (str): The file path where the XML should be saved.
+            *extra_paths (str): Additional paths that receive the same content.
         Raises:
-            TypeError: If xml_tree is not an etree._ElementTree object.
             Exception: If there is an error saving the XML file.
         """
 
-        try:
-
-            root_original = xml_tree.getroot()
-            if root_original is None:
-                raise Exception("XML tree has no root element.")
-
-            root_to_write = etree.fromstring(etree.tostring(root_original, encoding="utf-8"))
-            xml_tree_to_write = etree.ElementTree(root_to_write)
-
-            for node in root_to_write.xpath(".//*[@object_id]"):
-                try:
-                    del node.attrib["object_id"]
-                except Exception:
-                    pass
-
-
-
-            root = xml_tree_to_write.getroot()
-            if root is not None:
-                coord_roots = root.xpath(".//*[local-name()='CoordinateSystem']")
-                height_roots = root.xpath(".//*[local-name()='HeightSystem']")
-                unit_roots = root.xpath(".//*[local-name()='MeasurementUnit']")
-                fixed_empty_names = {"USC2000", "WGS84", "X", "C", "P", "T", "Baltic", "Baltic77", "M", "Km"}
-                container_names = {"CoordinateSystem", "SC63", "Local", "HeightSystem", "MeasurementUnit"}
-                for branch_root in coord_roots + height_roots + unit_roots:
-                    for node in branch_root.iter():
-                        try:
-                            local_name = etree.QName(node).localname
-                        except Exception:
-                            local_name = ""
-
-                        is_fixed_empty = local_name in fixed_empty_names
-                        is_container = local_name in container_names
+        if xml_tree is None or xml_tree.getroot() is None:
+            raise Exception("XML tree has no root element.")
 
-                        if (is_fixed_empty or is_container) and node.text is not None and node.text.strip() == "":
-                            node.text = None
-
-            xml_tree_to_write.write(xml_path, encoding="utf-8", xml_declaration=True)
-            print(f"XML file successfully saved to: {xml_path}")
+        paths = (xml_path,) + tuple(extra_paths)
+        try:
+            write_xml_targets(xml_tree, paths)
+            print(f"XML file successfully saved to: {', '.join(p for p in paths if p)}")
         except OSError as e:
-            raise Exception(f"Error saving XML file to {xml_path}: {e}") from e
+            raise Exception(f"Error saving XML file to {e.filename or xml_path}: {e}") from e
 
     def find_element_index(self, path=None, element_name=None):
         """
@@ -3098,7 +3077,6 @@ class CustomTreeView(QTreeView):
         Перевіряє XML-дерево на відповідність XSD та підсвічує помилки.
         НЕ змінює XML-структуру/значення.
         """
-        errors = []
         active_tree = xml_tree if xml_tree is not None else self.xml_tree
         if active_tree is None:
             return ["XML дерево не завантажено."]
@@ -3141,28 +3119,45 @@ class CustomTreeView(QTreeView):
             if is_valid:
                 return []
 
-            for err in schema.error_log:
-                err_path = getattr(err, "path", "") or ""
-                raw_message = str(getattr(err, "message", str(err)))
-                item = self._find_item_by_xpath_path(err_path)
-
-                item_path = item.data(Qt.UserRole) if item else ""
-                schema_path = re.sub(r"\[\d+\]", "", item_path or "")
-
-                err_message = self._translate_xsd_error_message(raw_message, schema_path=schema_path)
-                self._mark_item_as_invalid(item, err_message)
-
-                if generate_report:
-                    readable_path = self._generate_ukr_path(
-                        re.sub(r"\[\d+\]", "", item_path or ""))
-                    if not readable_path:
-                        readable_path = err_path or "XML"
-                    errors.append(f"{readable_path}: {err_message}")
+            return self._mark_xsd_error_log(
+                [(getattr(err, "path", "") or "", str(getattr(err, "message", str(err)))) for err in schema.error_log],
+                generate_report=generate_report,
+            )
+        finally:
+            self.tree_upd = False
 
-            return errors
+    def mark_xsd_errors(self, error_log, generate_report=False):
+        """
+        Підсвічує помилки XSD, знайдені поза деревом (check_runner, перевірка
+        "xsd"): error_log — (шлях XPath, рядок, повідомлення). Повертає
+        перекладені тексти помилок (за generate_report).
+        """
+        self.tree_upd = True
+        try:
+            return self._mark_xsd_error_log(
+                [(path, message) for path, _line, message in error_log], generate_report=generate_report)
         finally:
             self.tree_upd = False
 
+    def _mark_xsd_error_log(self, error_log, generate_report=False):
+        errors = []
+        for err_path, raw_message in error_log:
+            item = self._find_item_by_xpath_path(err_path)
+
+            item_path = item.data(Qt.UserRole) if item else ""
+            schema_path = re.sub(r"\[\d+\]", "", item_path or "")
+
+            err_message = self._translate_xsd_error_message(raw_message, schema_path=schema_path)
+            self._mark_item_as_invalid(item, err_message)
+
+            if generate_report:
+                readable_path = self._generate_ukr_path(
+                    re.sub(r"\[\d+\]", "", item_path or ""))
+                if not readable_path:
+                    readable_path = err_path or "XML"
+                errors.append(f"{readable_path}: {err_message}")
+        return errors
+
     def sort_xml_tree_by_xsd(self):
         """
         Впорядковує дочірні елементи XML-дерева згідно з порядком children у xsd_schema.
@@ -0,0 +1,65 @@
+"""
+Пошук елементів XML з простором імен і без нього.
+
+Файли обміну зазвичай не мають простору імен, а вирази з
+*[local-name()='…'] у кілька разів повільніші за звичайні кроки XPath чи
+findtext. LocalNamePath компілює вираз, записаний простими іменами
+елементів, у два etree.XPath: звичайний (швидкий шлях) і з local-name()
+(запасний шлях для документів з простором імен). Чи має документ простір
+імен, визначає uses_namespace() — один раз на документ, за кореневим
+елементом (там оголошується простір імен файлу обміну).
+"""
+from __future__ import annotations
+
+import re
+
+from lxml import etree
+
+
+# Ім'я елемента на початку кроку: після "/", "(" або на початку виразу,
+# перед "/", "[", ")" або в кінці (функції на кшталт text() не зачіпає).
+_STEP_NAME = re.compile(r"(^|[/(])([A-Za-z_][\w.-]*)(?=$|[/\[)])")
+
+_CHILD_TEXT_LOCAL = etree.XPath("string(./*[local-name()=$name][1])")
+
+
+def to_local_name_xpath(expr: str) -> str:
+    """"a/b[1]/text()" -> "*[local-name()='a']/*[local-name()='b'][1]/text()"."""
+    return _STEP_NAME.sub(lambda m: f"{m.group(1)}*[local-name()='{m.group(2)}']", expr)
+
+
+def uses_namespace(node) -> bool:
+    """True, якщо корінь документа (або його дочірні елементи) у просторі імен."""
+    if node is None:
+        return False
+    if hasattr(node, "getroottree"):
+        node = node.getroottree()
+    root = node.getroot()
+    if root is None:
+        return False
+    if str(root.tag).startswith("{") or None in root.nsmap:
+        return True
+    return any(isinstance(child.tag, str) and child.tag.startswith("{") for child in root)
+
+
+class LocalNamePath:
+    """Вираз XPath з простих імен елементів у двох скомпільованих варіантах."""
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self._plain = etree.XPath(expr)
+        self._local = etree.XPath(to_local_name_xpath(expr))
+
+    def __call__(self, node, namespaced: bool):
+        return (self._local if namespaced else self._plain)(node)
+
+
+# Точки розділу MetricInfo документа (спільні для xml_ua та dockwidget).
+METRIC_POINTS = LocalNamePath("/UkrainianCadastralExchangeFile/InfoPart/MetricInfo/PointInfo/Point")
+
+
+def child_text(node, name: str, namespaced: bool) -> str:
+    """Текст першого дочірнього елемента name без пробілів на краях або ""."""
+    if not namespaced:
+        return (node.findtext(name) or "").strip()
+    return (_CHILD_TEXT_LOCAL(node, name=name) or "").strip()
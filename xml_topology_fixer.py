@@ -9,6 +9,8 @@ from qgis.PyQt.QtWidgets import QMessageBox
 from qgis.core import Qgis
 from qgis.utils import iface
 
+from .open_pipeline import collect_used_point_ids, collect_used_polyline_ids
+
 
 class XmlTopologyFixer:
     """
@@ -114,31 +116,11 @@ class XmlTopologyFixer:
 
     def _get_used_point_ids(self, metric_info):
         """Collects all referenced point IDs (UIDP)."""
-        used_ids = set()
-
-        for p_id in metric_info.xpath('.//Polyline/PL/Points/P/text()'):
-            used_ids.add(p_id)
-
-        for p_id in metric_info.xpath('.//ControlPoint/P/text()'):
-            used_ids.add(p_id)
-
-        for p_id in self.root.xpath('.//Boundary/Lines/Line/FP/text() | .//Boundary/Lines/Line/TP/text()'):
-            used_ids.add(p_id)
-
-        for p_id in self.root.xpath('.//AdjacentRests/Points/P/text()'):
-            used_ids.add(p_id)
-
-        for p_id in self.root.xpath('.//ParcelInfo/LandParcelInfo/MetricInfo/Externals/Boundary/Lines/Line/FP/text() | .//ParcelInfo/LandParcelInfo/MetricInfo/Externals/Boundary/Lines/Line/TP/text()'):
-            used_ids.add(p_id)
-        return used_ids
+        return collect_used_point_ids(self.root)
 
     def _get_used_polyline_ids(self):
         """Collects all referenced polyline IDs (ULID)."""
-        used_ids = set()
-
-        for ulid in self.root.xpath('.//Boundary/Lines/Line/ULID/text()'):
-            used_ids.add(ulid)
-        return used_ids
+        return collect_used_polyline_ids(self.root)
 
     def _confirm_fix(self, unused_points_count, unused_polylines_count):
         """Shows a confirmation dialog to the user."""
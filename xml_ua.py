@@ -33,6 +33,7 @@ import importlib.util
 from qgis.core import Qgis
 from qgis.core import QgsGeometry
 from qgis.core import QgsFeature
+from qgis.core import QgsFeatureRequest
 from qgis.core import QgsWkbTypes
 from qgis.core import QgsProject
 from qgis.core import QgsVectorLayer
@@ -70,6 +71,7 @@ from qgis.PyQt.QtWidgets import QFileIconProvider
 from qgis.utils import iface
 
 from . import resources  # noqa: F401
+from .style_cache import load_named_style
 
 
 from .dockwidget import xml_uaDockWidget
@@ -84,6 +86,15 @@ from .layer_tree_menu_provider import XmlUaLayerTreeMenuProvider
 from .topology import GeometryProcessor
 from .plan_layout import PlanLayoutCreator, compute_map_scale, MAP_SIDE_MM
 from .boundary_agreement import BoundaryAgreementCreator
+from .dev_reload import reload_analysis_modules
+from .layer_storage import GPKG_STORAGE_SETTING_KEY
+from .layer_storage import prune_stale_storage
+from .deferred_layers import LAZY_LAYERS_SETTING_KEY
+from .topology_layer import TOPOLOGY_LAYER_SETTING_KEY
+from .layer_index import index_for
+from .xml_paths import METRIC_POINTS
+from .xml_paths import child_text
+from .xml_paths import uses_namespace
 
 LOG = True
 
@@ -172,6 +183,11 @@ class xml_ua:
         self.signal_log_enabled = self._read_signal_log_setting()
         self._apply_signal_log_setting(
             self.signal_log_enabled, persist=False, notify=False)
+        self.dev_reload_setting_key = "xml_ua/dev_reload_modules"
+        self.dev_reload_enabled = self._read_dev_reload_setting()
+        self.gpkg_storage_enabled = self._read_gpkg_storage_setting()
+        self.lazy_layers_enabled = self._read_lazy_layers_setting()
+        self.topology_layer_enabled = self._read_topology_layer_setting()
 
     
     def _read_signal_log_setting(self) -> bool:
@@ -219,6 +235,102 @@ class xml_ua:
     def on_toggle_signal_log(self, checked):
         self._apply_signal_log_setting(checked, persist=True, notify=True)
 
+    def _read_dev_reload_setting(self) -> bool:
+        value = QSettings().value(self.dev_reload_setting_key, False)
+        if isinstance(value, bool):
+            return value
+        if value is None:
+            return False
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+    def _read_gpkg_storage_setting(self) -> bool:
+        value = QSettings().value(GPKG_STORAGE_SETTING_KEY, False)
+        if isinstance(value, bool):
+            return value
+        if value is None:
+            return False
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+    def on_toggle_gpkg_storage(self, checked):
+        """
+        Режим для великих файлів: шари вузлів, поліліній, ділянки, угідь,
+        обмежень та суміжників зберігаються у тимчасовому GeoPackage замість
+        пам'яті. Діє для шарів, створених після перемикання.
+        """
+        self.gpkg_storage_enabled = bool(checked)
+        QSettings().setValue(GPKG_STORAGE_SETTING_KEY, self.gpkg_storage_enabled)
+
+        message = "Зберігання шарів у тимчасовому GeoPackage " + (
+            "увімкнено" if self.gpkg_storage_enabled else "вимкнено")
+        message += ". Діє для наступних відкритих XML"
+        log_calls(logFile, message)
+        self.iface.messageBar().pushMessage("XML-UA", message, level=Qgis.Info, duration=4)
+
+    def _read_lazy_layers_setting(self) -> bool:
+        value = QSettings().value(LAZY_LAYERS_SETTING_KEY, False)
+        if isinstance(value, bool):
+            return value
+        if value is None:
+            return False
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+    def on_toggle_lazy_layers(self, checked):
+        """
+        Режим відкладених шарів: шари зони, кварталу, оренди, суборенди,
+        обмежень та суміжників при відкритті XML додаються як заглушки і
+        будуються, коли їх вмикають, вибирають або запитують.
+        """
+        self.lazy_layers_enabled = bool(checked)
+        QSettings().setValue(LAZY_LAYERS_SETTING_KEY, self.lazy_layers_enabled)
+
+        message = "Відкладене створення рідковживаних шарів " + (
+            "увімкнено" if self.lazy_layers_enabled else "вимкнено")
+        message += ". Діє для наступних відкритих XML"
+        log_calls(logFile, message)
+        self.iface.messageBar().pushMessage("XML-UA", message, level=Qgis.Info, duration=4)
+
+    def _read_topology_layer_setting(self) -> bool:
+        value = QSettings().value(TOPOLOGY_LAYER_SETTING_KEY, False)
+        if isinstance(value, bool):
+            return value
+        if value is None:
+            return False
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+    def on_toggle_topology_layer(self, checked):
+        """
+        Підсвічування топологічних помилок: при відкритті XML місця накладань,
+        розривів, виходу угідь за межі ділянки та самоперетинів показуються
+        на тимчасовому шарі "Топологічні помилки".
+        """
+        self.topology_layer_enabled = bool(checked)
+        QSettings().setValue(TOPOLOGY_LAYER_SETTING_KEY, self.topology_layer_enabled)
+
+        message = "Підсвічування топологічних помилок " + (
+            "увімкнено" if self.topology_layer_enabled else "вимкнено")
+        message += ". Діє для наступних відкритих XML"
+        log_calls(logFile, message)
+        self.iface.messageBar().pushMessage("XML-UA", message, level=Qgis.Info, duration=4)
+
+    def on_toggle_dev_reload(self, checked):
+        """
+        Режим розробника: модулі аналізу (area_checks, proximity_checks, ...)
+        перезавантажуються перед кожним відкриттям XML. Увімкнення одразу
+        перезавантажує їх.
+        """
+        self.dev_reload_enabled = bool(checked)
+        QSettings().setValue(self.dev_reload_setting_key, self.dev_reload_enabled)
+
+        message = "Перезавантаження модулів аналізу " + ("увімкнено" if self.dev_reload_enabled else "вимкнено")
+        if self.dev_reload_enabled:
+            try:
+                reloaded = reload_analysis_modules()
+                message += f". Перезавантажено: {', '.join(reloaded)}"
+            except Exception as e:
+                message += f". Помилка перезавантаження: {e}"
+        log_calls(logFile, message)
+        self.iface.messageBar().pushMessage("XML-UA", message, level=Qgis.Info, duration=4)
+
     def _clear_signal_logs(self):
         try:
             if logFile and not logFile.closed:
@@ -306,26 +418,15 @@ class xml_ua:
         root = xml_data.tree.getroot()
 
 
-        points = root.xpath(
-            "/*[local-name()='UkrainianCadastralExchangeFile']"
-            "/*[local-name()='InfoPart']"
-            "/*[local-name()='MetricInfo']"
-            "/*[local-name()='PointInfo']"
-            "/*[local-name()='Point']"
-        )
+        namespaced = uses_namespace(root)
+        points = METRIC_POINTS(root, namespaced)
 
         out = []
         for p in points:
-            def _t(name: str) -> str:
-                r = p.xpath(f"./*[local-name()='{name}'][1]")
-                if not r:
-                    return ""
-                return (r[0].text or "").strip()
-
-            uidp = _t("UIDP")
-            x = _t("X")
-            y = _t("Y")
-            desc = _t("Description")
+            uidp = child_text(p, "UIDP", namespaced)
+            x = child_text(p, "X", namespaced)
+            y = child_text(p, "Y", namespaced)
+            desc = child_text(p, "Description", namespaced)
 
 
             if (not desc) or (desc == uidp):
@@ -479,6 +580,10 @@ class xml_ua:
                 dw.closingPlugin.disconnect(self.onClosePlugin)
             except (TypeError, RuntimeError):
                 pass
+            try:
+                dw.shutdown_check_pool()
+            except Exception:
+                pass
             self.iface.removeDockWidget(dw)
         self.dockwidget = None  # Очищуємо основне посилання
 
@@ -627,24 +732,13 @@ class xml_ua:
             bool: True, якщо шар належить до однієї з груп, інакше False.
         """
 
-        layer_name = layer.name()
-
-        if not self.dockwidget or not hasattr(self.dockwidget, 'opened_xmls'):
+        if not self.dockwidget or not hasattr(self.dockwidget, 'layer_registry'):
             return False
 
-        project = QgsProject.instance()
-        root = project.layerTreeRoot()
-
-        for xml_data in self.dockwidget.opened_xmls:
-            group_name = xml_data.group_name
-            group = root.findGroup(group_name)
-
-            if group:
-                for child in group.children():
-                    if isinstance(child, QgsLayerTreeLayer):
-                        if child.layer() == layer:
-                            return True
-        return False
+        xml_data = self.dockwidget.layer_registry.document_for_layer(layer)
+        if xml_data is None:
+            return False
+        return layer.customProperty("xml_group_name") == xml_data.group_name
 
     def run(self):
         """
@@ -701,6 +795,16 @@ class xml_ua:
         self.dockwidget.process_action_save_as_template()
         return
 
+    def on_undo_tool(self):
+
+        if self.dockwidget is not None:
+            self.dockwidget.undo_xml_edit()
+
+    def on_redo_tool(self):
+
+        if self.dockwidget is not None:
+            self.dockwidget.redo_xml_edit()
+
     def on_check_tool(self):
 
         self.dockwidget.process_action_check()
@@ -1118,6 +1222,13 @@ class xml_ua:
         self.action_check_tool.setEnabled(False)
         self.action_sort_by_xsd_tool.setEnabled(False)
 
+        self.action_undo_tool = QAction("Скасувати зміну", self.iface.mainWindow())
+        self.action_undo_tool.setIcon(QIcon(QgsApplication.iconPath("mActionUndo.svg")))
+        self.action_undo_tool.setEnabled(False)
+        self.action_redo_tool = QAction("Повторити зміну", self.iface.mainWindow())
+        self.action_redo_tool.setIcon(QIcon(QgsApplication.iconPath("mActionRedo.svg")))
+        self.action_redo_tool.setEnabled(False)
+
         self.action_create_document = QAction(
             "Документація", self.iface.mainWindow())
         doc_icon = QgsApplication.iconPath("mActionNewReport.svg")
@@ -1146,15 +1257,40 @@ class xml_ua:
         self.action_signal_log = QAction("Налагоджувальний режим", self.iface.mainWindow())
         self.action_signal_log.setCheckable(True)
         self.action_signal_log.setChecked(self.signal_log_enabled)
+        self.action_dev_reload = QAction("Перезавантажувати модулі аналізу", self.iface.mainWindow())
+        self.action_dev_reload.setToolTip(
+            "Режим розробника: перезавантажувати модулі перевірок перед кожним відкриттям XML")
+        self.action_dev_reload.setCheckable(True)
+        self.action_dev_reload.setChecked(self.dev_reload_enabled)
+        self.action_gpkg_storage = QAction("Зберігати шари у тимчасовому GeoPackage", self.iface.mainWindow())
+        self.action_gpkg_storage.setToolTip(
+            "Для великих файлів: зберігати шари вузлів, ліній та полігонів у тимчасовому GeoPackage замість пам'яті")
+        self.action_gpkg_storage.setCheckable(True)
+        self.action_gpkg_storage.setChecked(self.gpkg_storage_enabled)
+        self.action_lazy_layers = QAction("Створювати рідковживані шари за потреби", self.iface.mainWindow())
+        self.action_lazy_layers.setToolTip(
+            "Шари зони, кварталу, оренди, суборенди, обмежень та суміжників будуються при першому ввімкненні або виборі")
+        self.action_lazy_layers.setCheckable(True)
+        self.action_lazy_layers.setChecked(self.lazy_layers_enabled)
+        self.action_topology_layer = QAction("Підсвічувати топологічні помилки на карті", self.iface.mainWindow())
+        self.action_topology_layer.setToolTip(
+            "Після відкриття XML показувати накладання, розриви та самоперетини полігонів на тимчасовому шарі")
+        self.action_topology_layer.setCheckable(True)
+        self.action_topology_layer.setChecked(self.topology_layer_enabled)
 
         self.tools_menu.addActions([self.action_new_tool, self.action_open_tool,
                                    self.action_save_tool, self.action_save_as_template_tool, self.action_check_tool, self.action_sort_by_xsd_tool])
+        self.tools_menu.addActions([self.action_undo_tool, self.action_redo_tool])
         self.tools_menu.addAction(self.action_clear_data)
         self.tools_menu.addAction(self.action_restore_backup)
 
         self.tools_menu.addAction(self.action_create_document)
         self.tools_menu.addSeparator()
         self.tools_menu.addAction(self.action_signal_log)
+        self.tools_menu.addAction(self.action_dev_reload)
+        self.tools_menu.addAction(self.action_gpkg_storage)
+        self.tools_menu.addAction(self.action_lazy_layers)
+        self.tools_menu.addAction(self.action_topology_layer)
 
         self.tools_button = QToolButton()
         try:
@@ -1188,12 +1324,31 @@ class xml_ua:
                           "triggered", self.on_check_tool)
         connector.connect(self.action_sort_by_xsd_tool,
                           "triggered", self.on_sort_by_xsd_tool)
+        connector.connect(self.action_undo_tool,
+                          "triggered", self.on_undo_tool)
+        connector.connect(self.action_redo_tool,
+                          "triggered", self.on_redo_tool)
         connector.connect(self.action_clear_data,
                           "triggered", self.on_clear_tool)
         connector.connect(self.action_restore_backup,
                           "triggered", self.restore_from_copy)
         connector.connect(self.action_signal_log,
                           "triggered", self.on_toggle_signal_log)
+        connector.connect(self.action_dev_reload,
+                          "triggered", self.on_toggle_dev_reload)
+        connector.connect(self.action_gpkg_storage,
+                          "triggered", self.on_toggle_gpkg_storage)
+        connector.connect(self.action_lazy_layers,
+                          "triggered", self.on_toggle_lazy_layers)
+        connector.connect(self.action_topology_layer,
+                          "triggered", self.on_toggle_topology_layer)
+
+        try:
+            removed = prune_stale_storage()
+            if removed:
+                log_calls(logFile, f"Видалено застарілих тимчасових GeoPackage: {removed}.")
+        except Exception:
+            pass
 
         self.tools_button.setObjectName("xml_ua_tools_button")
         self.toolbar.addWidget(self.tools_button)
@@ -1408,7 +1563,7 @@ class xml_ua:
             style_path = os.path.join(os.path.dirname(
                 __file__), "templates", style_file)
             if os.path.exists(style_path):
-                duplicated_layer.loadNamedStyle(style_path)
+                load_named_style(duplicated_layer, style_path)
                 duplicated_layer.triggerRepaint()
 
             cadastral_plan_group.addLayer(duplicated_layer)
@@ -1470,7 +1625,7 @@ class xml_ua:
             special_style_path = os.path.join(os.path.dirname(
                 __file__), "templates", special_style_file)
             if os.path.exists(special_style_path):
-                memory_layer.loadNamedStyle(special_style_path)
+                load_named_style(memory_layer, special_style_path)
                 memory_layer.triggerRepaint()
 
             cadastral_plan_group.addLayer(memory_layer)
@@ -1615,13 +1770,16 @@ class xml_ua:
         prov.addAttributes(nodes_layer.fields())
         mem_layer.updateFields()
 
-        feats_to_add = []
+        nodes_index = index_for(nodes_layer)
+        matched_fids = set()
+        for x, y in parcel_vertices:
+            for fid in nodes_index.fids_near(x, y, 1e-6):
+                pt = nodes_layer.getFeature(fid).geometry().asPoint()
+                if (round(pt.x(), 6), round(pt.y(), 6)) == (x, y):
+                    matched_fids.add(fid)
 
-        for f in nodes_layer.getFeatures():
-            pt = f.geometry().asPoint()
-            key = (round(pt.x(), 6), round(pt.y(), 6))
-            if key in parcel_vertices:
-                feats_to_add.append(f)
+        request = QgsFeatureRequest().setFilterFids(sorted(matched_fids))
+        feats_to_add = list(nodes_layer.getFeatures(request)) if matched_fids else []
 
         prov.addFeatures(feats_to_add)
         mem_layer.updateExtents()
@@ -1634,7 +1792,7 @@ class xml_ua:
         )
     
         if os.path.exists(style_path):
-            mem_layer.loadNamedStyle(style_path)
+            load_named_style(mem_layer, style_path)
             mem_layer.triggerRepaint()
         else:
             log_msg(logFile, f"Стиль не знайдено: {style_path}")
@@ -1689,7 +1847,7 @@ class xml_ua:
         style_path = os.path.join(os.path.dirname(
             __file__), "templates", adj_style_file)
         if os.path.exists(style_path):
-            duplicated_layer.loadNamedStyle(style_path)
+            load_named_style(duplicated_layer, style_path)
             duplicated_layer.triggerRepaint()
 
         xml_data_for_group = self.dockwidget.get_xml_data_for_group(group_name)
@@ -1815,7 +1973,7 @@ class xml_ua:
         style_path = os.path.join(os.path.dirname(
             __file__), "templates", "points_plan.qml")
         if os.path.exists(style_path):
-            layer.loadNamedStyle(style_path)
+            load_named_style(layer, style_path)
             labeling = layer.labeling()
             if labeling:
                 settings = labeling.settings()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import io
+from typing import Iterable
+
+from lxml import etree
+
+
+XML_DECLARATION = b"<?xml version='1.0' encoding='UTF-8'?>\n"
+
+# Гілки, в яких "порожні" службові елементи записуються як <X/>.
+EMPTY_TEXT_BRANCHES = ("CoordinateSystem", "HeightSystem", "MeasurementUnit")
+FIXED_EMPTY_NAMES = {"USC2000", "WGS84", "X", "C", "P", "T", "Baltic", "Baltic77", "M", "Km"}
+CONTAINER_NAMES = {"CoordinateSystem", "SC63", "Local", "HeightSystem", "MeasurementUnit"}
+
+_FILTERED_NODES_XPATH = etree.XPath(
+    ".//*[@object_id] | "
+    ".//*[local-name()='CoordinateSystem' or local-name()='HeightSystem' or local-name()='MeasurementUnit']"
+)
+
+
+def _local_name(node) -> str:
+    try:
+        return etree.QName(node).localname
+    except Exception:
+        return ""
+
+
+def _output_attrib(node) -> dict:
+    return {k: v for k, v in node.attrib.items() if k != "object_id"}
+
+
+def _output_text(node, in_branch: bool):
+    text = node.text
+    if in_branch and text is not None and not text.strip():
+        local_name = _local_name(node)
+        if local_name in FIXED_EMPTY_NAMES or local_name in CONTAINER_NAMES:
+            return None
+    return text
+
+
+def _collect_filtered_paths(root) -> set:
+    """
+    Повертає множину елементів, які треба серіалізувати вручну: вузли з object_id,
+    гілки CoordinateSystem/HeightSystem/MeasurementUnit та всі їхні предки.
+    Решта піддерев записується lxml цілком.
+    """
+    marked = set()
+    for node in _FILTERED_NODES_XPATH(root):
+        for current in (node, *node.iterancestors()):
+            if current in marked:
+                break
+            marked.add(current)
+    return marked
+
+
+def _without_inherited_ns(data: bytes, parent_nsmap: dict) -> bytes:
+    """
+    lxml, записуючи піддерево окремо, повторює в його першому тезі всі
+    успадковані оголошення xmlns. Прибирає ті з них, що вже оголошені
+    предками з тим самим URI.
+    """
+    if not parent_nsmap:
+        return data
+    end = data.find(b">")
+    if end < 0:
+        return data
+    head = data[:end]
+    for prefix, uri in parent_nsmap.items():
+        name = b"xmlns" if prefix is None else b"xmlns:" + prefix.encode("utf-8")
+        head = head.replace(b" " + name + b'="' + uri.encode("utf-8") + b'"', b"", 1)
+    return head + data[end:]
+
+
+def _write_node(out, node, marked: set, in_branch: bool, parent_nsmap: dict, is_root: bool = False) -> None:
+    if not isinstance(node.tag, str):
+        out.write(etree.tostring(node, encoding="utf-8"))
+        return
+
+    in_branch = in_branch or _local_name(node) in EMPTY_TEXT_BRANCHES
+    if not in_branch and node not in marked:
+        out.write(_without_inherited_ns(etree.tostring(node, encoding="utf-8"), parent_nsmap))
+        return
+
+    # object_id знімається лише з нащадків кореня, як і раніше.
+    attrib = dict(node.attrib) if is_root else _output_attrib(node)
+    nsmap = node.nsmap
+
+    # Неглибока копія вузла: тег, відфільтровані атрибути, текст і хвіст.
+    shallow = etree.Element(node.tag, attrib, nsmap=nsmap)
+    shallow.text = _output_text(node, in_branch)
+    shallow.tail = node.tail
+    if len(node) == 0:
+        out.write(_without_inherited_ns(etree.tostring(shallow, encoding="utf-8"), parent_nsmap))
+        return
+
+    if shallow.text is None:
+        shallow.text = ""
+    data = _without_inherited_ns(etree.tostring(shallow, encoding="utf-8"), parent_nsmap)
+    # Текст і хвіст екрановані, тож останнє "</" — закривальний тег.
+    close_at = data.rfind(b"</")
+    out.write(data[:close_at])
+    for child in node:
+        _write_node(out, child, marked, in_branch, nsmap)
+    out.write(data[close_at:])
+
+
+def serialize_for_save(xml_tree) -> bytes:
+    """
+    Серіалізує дерево для запису на диск без копіювання документа: технічні
+    атрибути object_id нащадків кореня пропускаються, а порожні службові
+    елементи гілок CoordinateSystem/HeightSystem/MeasurementUnit записуються
+    без тексту. Саме дерево не змінюється.
+    """
+    root = xml_tree.getroot()
+    if root is None:
+        raise ValueError("XML tree has no root element.")
+
+    marked = _collect_filtered_paths(root)
+    buffer = io.BytesIO()
+    buffer.write(XML_DECLARATION)
+    _write_node(buffer, root, marked, False, {}, is_root=True)
+    return buffer.getvalue()
+
+
+def write_xml_targets(xml_tree, xml_paths: Iterable[str]) -> bytes:
+    """Серіалізує дерево один раз і записує той самий буфер у кожен шлях."""
+    data = serialize_for_save(xml_tree)
+    written = set()
+    for xml_path in xml_paths:
+        if not xml_path or xml_path in written:
+            continue
+        with open(xml_path, "wb") as f:
+            f.write(data)
+        written.add(xml_path)
+    return data
@@ -8,13 +8,15 @@ from qgis.core import (
     QgsGeometry,
     QgsPolygon,
     QgsLineString,
-    QgsPointXY,
-    QgsProject
+    QgsPointXY
 )
 from qgis.PyQt.QtWidgets import QMessageBox
 from lxml import etree
 
+from .style_cache import load_named_style
+from .layer_batch import add_layer_to_group
 from .common import ensure_object_layer_fields
+from .common import object_layer_fields
 
 
 class CadastralZoneInfo:
@@ -50,30 +52,23 @@ class CadastralZoneInfo:
         polygon = QgsPolygon(exterior_ring)
         return polygon
 
-    def add_zone_layer(self):
-        """Створює та заповнює шар 'Кадастрова зона'."""
-        self.layer_name = "Кадастрова зона"
-        self.layer = QgsVectorLayer(
-            f"MultiPolygon?crs={self.crs_epsg}", self.layer_name, "memory")
-
-        self.layer.setCustomProperty("skip_save_dialog", True)
-
-        if not self.layer.isValid():
-            QMessageBox.critical(
-                None, "xml_ua", "Виникла помилка при створенні шару зон.")
-            return None
-
-        self.layer.loadNamedStyle(os.path.join(
-            self.plugin_dir, "templates", "zone.qml"))
-        provider = self.layer.dataProvider()
-        ensure_object_layer_fields(self.layer)
+    def data_fields(self):
+        """Поля даних шару 'Кадастрова зона'."""
+        return object_layer_fields()
 
+    def build_features(self, fields):
+        """
+        Будує об'єкти шару 'Кадастрова зона' за деревом; Externals
+        зони в дереві формуються заново з ParcelMetricInfo/Externals.
+        """
         try:
             from .topology import GeometryProcessor
-            processor = GeometryProcessor(self.root.getroottree())
+            processor = GeometryProcessor(
+                self.root.getroottree(), ring_cache=getattr(self.xml_ua_layers, "ring_cache", None))
         except Exception:
             processor = None
 
+        features = []
         for zone_element in self.root.findall(".//CadastralZoneInfo"):
 
             parcel_metric_info = self.root.find(".//ParcelMetricInfo")
@@ -127,7 +122,7 @@ class CadastralZoneInfo:
                     interior_ring = QgsLineString([QgsPointXY(p.y(), p.x()) for p in internal_coords])
                     polygon.addInteriorRing(interior_ring)
 
-            feature = QgsFeature(self.layer.fields())
+            feature = QgsFeature(fields)
 
             feature.setGeometry(QgsGeometry(polygon))
             object_shape = ""
@@ -145,12 +140,30 @@ class CadastralZoneInfo:
                     object_shape = ""
 
             feature.setAttributes([1, object_shape])
-            provider.addFeature(feature)
+            features.append(feature)
+        return features
+
+    def add_zone_layer(self):
+        """Створює та заповнює шар 'Кадастрова зона'."""
+        self.layer_name = "Кадастрова зона"
+        self.layer = QgsVectorLayer(
+            f"MultiPolygon?crs={self.crs_epsg}", self.layer_name, "memory")
+
+        self.layer.setCustomProperty("skip_save_dialog", True)
+
+        if not self.layer.isValid():
+            QMessageBox.critical(
+                None, "xml_ua", "Виникла помилка при створенні шару зон.")
+            return None
+
+        load_named_style(self.layer, os.path.join(
+            self.plugin_dir, "templates", "zone.qml"))
+        provider = self.layer.dataProvider()
+        ensure_object_layer_fields(self.layer)
+
+        provider.addFeatures(self.build_features(self.layer.fields()))
 
-        QgsProject.instance().addMapLayer(self.layer, False)
-        layer_node = self.group.addLayer(self.layer)
-        if hasattr(self, 'xml_ua_layers'):
-            self.xml_ua_layers.last_to_first(self.group)
+        add_layer_to_group(self.group, self.layer, on_top=True)
 
         if self.xml_data:
             self.layer.setCustomProperty(